@@ -0,0 +1,12 @@
+# benchmarks/__init__.py
+"""
+Benchmarks hors ligne des constructions de tables et des dashboards.
+
+    python -m benchmarks.run --scale 10k
+    python -m benchmarks.compare avant.json apres.json
+
+Les données bronze sont synthétiques (synthetic_bronze.py) et tout est
+exécuté sur la session DuckDB locale (pipeline/local_session.py) : aucun
+accès à Snowflake n'est nécessaire. Les résultats JSON (durées, mémoire
+pic, commit) se comparent d'un commit à l'autre.
+"""
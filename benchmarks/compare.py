@@ -0,0 +1,142 @@
+# compare.py
+"""
+Comparaison de deux résultats de benchmarks.run (avant / après un commit).
+
+    python -m benchmarks.compare avant.json apres.json
+    python -m benchmarks.compare avant.json apres.json --threshold 0.2 --all
+
+Les durées sont ramenées à des métriques stables d'un commit à l'autre :
+pipeline et scripts, instructions par objet construit, rafraîchissements,
+pages (médiane des exécutions) et loaders. Une variation au-delà du seuil
+est signalée (▲ plus lent, ▼ plus rapide) ; la mémoire pic est comparée de
+la même façon.
+"""
+import argparse
+import json
+import statistics
+import sys
+from collections import defaultdict
+
+DEFAULT_THRESHOLD = 0.10
+MIN_SECONDS = 0.01  # en dessous, les variations sont du bruit de mesure
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def flatten(results):
+    """{métrique: (secondes, mémoire pic en Mo)}"""
+    samples = defaultdict(list)
+    builds = results.get("builds", {})
+
+    if "pipeline" in builds:
+        samples["pipeline"].append(builds["pipeline"])
+    occurrences = defaultdict(int)
+    scripts = defaultdict(lambda: {"seconds": 0.0, "peak_rss_mb": 0.0})
+    for record in builds.get("statements", []):
+        scripts[record["script"]]["seconds"] += record["seconds"]
+        scripts[record["script"]]["peak_rss_mb"] = max(scripts[record["script"]]["peak_rss_mb"], record["peak_rss_mb"])
+        if record.get("target") is None:
+            continue
+        name = f"{record['script']} : {record['kind']} {record['target']}"
+        occurrences[name] += 1
+        if occurrences[name] > 1:
+            name += f" #{occurrences[name]}"
+        samples[name].append(record)
+    for script, record in scripts.items():
+        samples[f"script {script}"].append(record)
+    for mode, record in builds.get("refresh_sales_enriched", {}).items():
+        samples[f"refresh sales_enriched ({mode})"].append(record)
+
+    for record in results.get("dashboards", []):
+        page = f"{record['page']} [{record['mode']}, {record['cache']}]"
+        samples[page].append(record)
+        for loader, seconds in record.get("loaders", {}).items():
+            if seconds is not None:
+                samples[f"{page} {loader}"].append({"seconds": seconds})
+
+    return {
+        name: (
+            statistics.median(r["seconds"] for r in records),
+            max((r["peak_rss_mb"] for r in records if "peak_rss_mb" in r), default=None),
+        )
+        for name, records in samples.items()
+    }
+
+
+def _flag(ratio, threshold):
+    if ratio is None:
+        return ""
+    if ratio > 1 + threshold:
+        return "▲"
+    if ratio < 1 - threshold:
+        return "▼"
+    return ""
+
+
+def _ratio(before, after):
+    if before is None or after is None or before <= 0:
+        return None
+    return after / before
+
+
+def compare(before, after, threshold=DEFAULT_THRESHOLD, show_all=False):
+    """Lignes (métrique, avant, après, ratio, signal) pour durées puis mémoire"""
+    base, new = flatten(before), flatten(after)
+    durations, memory = [], []
+    for name in sorted(set(base) | set(new)):
+        (b_seconds, b_peak), (a_seconds, a_peak) = base.get(name, (None, None)), new.get(name, (None, None))
+        ratio = _ratio(b_seconds, a_seconds)
+        significant = max(b_seconds or 0, a_seconds or 0) >= MIN_SECONDS
+        if show_all or (significant and (_flag(ratio, threshold) or ratio is None)):
+            durations.append((name, b_seconds, a_seconds, ratio, _flag(ratio, threshold)))
+        peak_ratio = _ratio(b_peak, a_peak)
+        if b_peak is not None or a_peak is not None:
+            if show_all or _flag(peak_ratio, threshold):
+                memory.append((name, b_peak, a_peak, peak_ratio, _flag(peak_ratio, threshold)))
+    return durations, memory
+
+
+def _format_rows(title, unit, rows):
+    lines = [title]
+    if not rows:
+        return lines + ["  (aucune variation au-delà du seuil)"]
+    width = max(len(row[0]) for row in rows)
+    for name, before, after, ratio, flag in rows:
+        b = f"{before:.3f}{unit}" if before is not None else "—"
+        a = f"{after:.3f}{unit}" if after is not None else "—"
+        r = f"×{ratio:.2f}" if ratio is not None else ""
+        lines.append(f"  {name:<{width}}  {b:>12}  {a:>12}  {r:>7} {flag}")
+    return lines
+
+
+def _describe(results):
+    meta = results.get("meta", {})
+    dirty = " (modifié)" if meta.get("dirty") else ""
+    return f"{(meta.get('commit') or '?')[:10]}{dirty} {meta.get('commit_subject') or ''} — {meta.get('timestamp')}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparer deux résultats de benchmark")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Variation relative signalée (défaut : 0.10)")
+    parser.add_argument("--all", action="store_true", help="Afficher toutes les métriques")
+    args = parser.parse_args(argv)
+
+    before, after = load_results(args.before), load_results(args.after)
+    print(f"Avant : {_describe(before)}")
+    print(f"Après : {_describe(after)}")
+    for key in ("scale", "transactions", "seed", "machine", "cpu_count"):
+        if before.get("meta", {}).get(key) != after.get("meta", {}).get(key):
+            print(f"⚠️ {key} différent : {before['meta'].get(key)} / {after['meta'].get(key)}", file=sys.stderr)
+
+    durations, memory = compare(before, after, args.threshold, args.all)
+    print("\n".join(_format_rows("\nDurées", "s", durations)))
+    print("\n".join(_format_rows("\nMémoire pic (RSS)", " Mo", memory)))
+
+
+if __name__ == "__main__":
+    main()
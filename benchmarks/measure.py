@@ -0,0 +1,105 @@
+# measure.py
+"""
+Mesure de durée et de mémoire pic pour les benchmarks.
+
+La mémoire est la RSS du processus, échantillonnée par un thread de fond :
+elle inclut la mémoire native de DuckDB et d'Arrow, que tracemalloc ne voit
+pas. Sources par ordre de préférence : psutil, /proc/self/statm (Linux),
+puis ru_maxrss (pic depuis le démarrage du processus uniquement).
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # dépendance optionnelle
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+
+
+def _max_rss():
+    """Pic de RSS depuis le démarrage du processus (octets)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux : Kio
+
+
+def current_rss():
+    """RSS courante du processus (octets)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _max_rss()
+
+
+class PeakMemory:
+    """Échantillonneur de RSS ; measure() renvoie durée et pic d'un bloc"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._peak = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss() or 0
+            with self._lock:
+                self._peak = max(self._peak, rss)
+
+    def reset(self):
+        """Repartir de la RSS courante ; renvoie cette valeur"""
+        rss = current_rss() or 0
+        with self._lock:
+            self._peak = rss
+        return rss
+
+    def peak(self):
+        rss = current_rss() or 0
+        with self._lock:
+            self._peak = max(self._peak, rss)
+            return self._peak
+
+    @contextmanager
+    def measure(self, record):
+        """Remplir record avec seconds, rss_start_mb et peak_rss_mb du bloc"""
+        start = self.reset()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 4)
+            record["rss_start_mb"] = round(start / MB, 1)
+            record["peak_rss_mb"] = round(self.peak() / MB, 1)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def process_peak_mb():
+    """Pic de RSS du processus entier (Mo), None si indisponible"""
+    peak = _max_rss()
+    return round(peak / MB, 1) if peak is not None else None
@@ -0,0 +1,234 @@
+# promotion_calendar.py
+"""
+Benchmark des analyses promotion vs référence (SQL analytique.sql, 2.3.1 et
+2.3.2) : jointures BETWEEN / NOT EXISTS d'origine contre jointures
+d'égalité sur ANALYTICS.promotion_day_calendar.
+
+    python -m benchmarks.promotion_calendar --scale 10m
+    python -m benchmarks.promotion_calendar --scale 1m --repeat 5 --out calendar.json
+
+Étapes :
+1. données bronze synthétiques (partagées avec benchmarks.run) ;
+2. base DuckDB neuve : ETL SQL.sql puis promotion_day_calendar.sql
+   (durée de construction du calendrier relevée) ;
+3. chaque analyse, ancienne puis nouvelle forme, exécutée --repeat fois
+   (meilleure durée retenue) ; les résultats doivent être identiques.
+
+CURRENT_DATE() est remplacé par le jour comptant le plus de promotions
+actives : sur les données synthétiques (2021-2024), la date du jour ne
+tomberait dans aucune fenêtre.
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+from benchmarks.measure import PeakMemory
+from benchmarks.run import BENCH_DIR, _remove_database, prepare_data
+from benchmarks.synthetic_bronze import DEFAULT_SEED, resolve_scale
+from pipeline.local_run import run_pipeline
+from pipeline.session import get_local_session
+from pipeline.sql_script import read_script, split_statements
+
+ANALYTIC_SCRIPT = "SQL analytique.sql"
+BUILD_SCRIPTS = ["ETL SQL.sql"]
+CALENDAR_SCRIPT = "promotion_day_calendar.sql"
+
+# Formes d'origine (jointures sur intervalle), avant promotion_day_calendar
+LEGACY_QUERIES = {
+    "2.3.1 ventes avec / sans promotion": """
+WITH promotion_periods AS (
+    SELECT product_category, start_date, end_date
+    FROM promotions_clean
+    WHERE CURRENT_DATE() BETWEEN start_date AND end_date
+),
+sales_with_promotion AS (
+    SELECT
+        p.product_category,
+        'Avec promotion' AS promotion_status,
+        COUNT(*) AS transaction_count,
+        SUM(ft.amount) AS total_revenue,
+        AVG(ft.amount) AS avg_transaction_value
+    FROM financial_transactions_clean ft
+    JOIN promotion_periods p ON ft.transaction_date BETWEEN p.start_date AND p.end_date
+    WHERE ft.transaction_type = 'Sale'
+    GROUP BY p.product_category
+),
+sales_without_promotion AS (
+    SELECT
+        'Sans promotion' AS promotion_status,
+        COUNT(*) AS transaction_count,
+        SUM(ft.amount) AS total_revenue,
+        AVG(ft.amount) AS avg_transaction_value
+    FROM financial_transactions_clean ft
+    WHERE ft.transaction_type = 'Sale'
+    AND NOT EXISTS (
+        SELECT 1 FROM promotion_periods p
+        WHERE ft.transaction_date BETWEEN p.start_date AND p.end_date
+    )
+)
+SELECT * FROM sales_with_promotion
+UNION ALL
+SELECT 'Toutes catégories', promotion_status, transaction_count, total_revenue, avg_transaction_value
+FROM sales_without_promotion
+ORDER BY product_category, promotion_status
+""",
+    "2.3.2 sensibilité des catégories": """
+WITH promotion_impact AS (
+    SELECT
+        p.product_category,
+        p.discount_percentage,
+        COUNT(DISTINCT p.promotion_id) AS promotion_count,
+        COUNT(ft.transaction_id) AS sales_during_promotion,
+        SUM(ft.amount) AS revenue_during_promotion,
+        AVG(ft.amount) AS avg_sale_during_promotion
+    FROM promotions_clean p
+    LEFT JOIN financial_transactions_clean ft
+        ON ft.transaction_date BETWEEN p.start_date AND p.end_date
+        AND ft.transaction_type = 'Sale'
+    GROUP BY p.product_category, p.discount_percentage
+),
+category_baseline AS (
+    SELECT
+        REGEXP_SUBSTR(entity, '([A-Za-z]+)') AS inferred_category,
+        COUNT(*) AS total_sales,
+        AVG(amount) AS avg_sale_baseline
+    FROM financial_transactions_clean
+    WHERE transaction_type = 'Sale'
+    GROUP BY REGEXP_SUBSTR(entity, '([A-Za-z]+)')
+)
+SELECT
+    pi.product_category,
+    pi.discount_percentage,
+    pi.promotion_count,
+    pi.sales_during_promotion,
+    pi.revenue_during_promotion,
+    cb.total_sales,
+    cb.avg_sale_baseline,
+    pi.avg_sale_during_promotion,
+    ROUND((pi.avg_sale_during_promotion - cb.avg_sale_baseline) * 100.0 / cb.avg_sale_baseline, 2) AS lift_percentage
+FROM promotion_impact pi
+LEFT JOIN category_baseline cb ON pi.product_category = cb.inferred_category
+ORDER BY lift_percentage DESC
+""",
+}
+
+# Requête de SQL analytique.sql correspondant à chaque analyse (repère unique)
+MARKERS = {
+    "2.3.1 ventes avec / sans promotion": "sales_without_promotion",
+    "2.3.2 sensibilité des catégories": "category_baseline",
+}
+
+REFERENCE_DATE_SQL = """
+SELECT calendar_date
+FROM ANALYTICS.promotion_category_days
+GROUP BY calendar_date
+ORDER BY SUM(active_promotion_count) DESC, calendar_date
+LIMIT 1
+"""
+
+
+def current_queries():
+    """Formes actuelles des analyses, lues dans SQL analytique.sql"""
+    statements = split_statements(read_script(ANALYTIC_SCRIPT))
+    queries = {}
+    for name, marker in MARKERS.items():
+        matches = [statement for statement in statements if marker in statement]
+        if len(matches) != 1:
+            raise ValueError(f"{ANALYTIC_SCRIPT} : {len(matches)} requête(s) contenant {marker}")
+        queries[name] = matches[0]
+    return queries
+
+
+def _normalized(rows):
+    """Lignes comparables : flottants arrondis, ordre indifférent"""
+    def _value(value):
+        if isinstance(value, float):
+            return None if math.isnan(value) else round(value, 6)
+        return value
+    return sorted((tuple(_value(v) for v in row.as_dict().values()) for row in rows), key=repr)
+
+
+def _timed(session, query, repeat):
+    """(meilleure durée en secondes, lignes de la dernière exécution)"""
+    best, rows = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = session.sql(query).collect()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+def benchmark_queries(session, repeat=3, log=print):
+    """Ancienne et nouvelle forme de chaque analyse : durées et égalité des résultats"""
+    reference_date = session.sql(REFERENCE_DATE_SQL).collect()[0][0]
+    log(f"Date de référence (CURRENT_DATE) : {reference_date}")
+    on_date = lambda query: query.replace("CURRENT_DATE()", f"DATE '{reference_date}'")
+
+    results = {}
+    current = current_queries()
+    for name, legacy in LEGACY_QUERIES.items():
+        legacy_s, legacy_rows = _timed(session, on_date(legacy), repeat)
+        calendar_s, calendar_rows = _timed(session, on_date(current[name]), repeat)
+        identical = _normalized(legacy_rows) == _normalized(calendar_rows)
+        results[name] = {
+            "legacy_s": round(legacy_s, 4),
+            "calendar_s": round(calendar_s, 4),
+            "speedup": round(legacy_s / calendar_s, 1) if calendar_s else None,
+            "rows": len(calendar_rows),
+            "identical": identical,
+        }
+        log(f"  {name} : {legacy_s:.3f}s -> {calendar_s:.3f}s (x{results[name]['speedup']}), "
+            f"{len(calendar_rows)} lignes, résultats {'identiques' if identical else 'DIFFÉRENTS'}")
+    return {"reference_date": str(reference_date), "queries": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des jointures sur le calendrier promotion × jour")
+    parser.add_argument("--scale", default="10m", help="10k, 1m, 10m, 50m ou nombre de transactions")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=3, help="Exécutions de chaque requête (meilleure retenue)")
+    parser.add_argument("--data-dir", default=None, help="Dossier des fichiers bronze (défaut : local/benchmarks/data/<échelle>)")
+    parser.add_argument("--database", default=None, help="Base DuckDB recréée (défaut : local/benchmarks/<échelle>-calendar.duckdb)")
+    parser.add_argument("--out", default=None, help="Fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    scale = str(args.scale).lower()
+    transactions = resolve_scale(scale)
+    data_dir = args.data_dir or os.path.join(BENCH_DIR, "data", f"{scale}-{args.seed}")
+    database = os.path.abspath(args.database or os.path.join(BENCH_DIR, f"{scale}-calendar.duckdb"))
+    os.makedirs(os.path.dirname(database), exist_ok=True)
+
+    results = {"meta": {"scale": scale, "transactions": transactions, "seed": args.seed, "repeat": args.repeat}}
+    with PeakMemory() as memory:
+        results["data"] = prepare_data(data_dir, transactions, args.seed)
+
+        _remove_database(database)
+        session = get_local_session(database, stage_dir=data_dir)
+        try:
+            print(f"Constructions -> {database}")
+            run_pipeline(session, BUILD_SCRIPTS, log=lambda *_: None)
+            calendar = {}
+            with memory.measure(calendar):
+                run_pipeline(session, [CALENDAR_SCRIPT], log=lambda *_: None)
+            calendar["rows"] = session.sql("SELECT COUNT(*) FROM ANALYTICS.promotion_day_calendar").collect()[0][0]
+            results["calendar"] = calendar
+            print(f"  {CALENDAR_SCRIPT} : {calendar['seconds']:.2f}s, {calendar['rows']:,} lignes")
+
+            session.sql("USE SCHEMA SILVER").collect()
+            results.update(benchmark_queries(session, repeat=args.repeat))
+        finally:
+            session.close()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+        print(f"Résultats : {args.out}")
+    if not all(query["identical"] for query in results["queries"].values()):
+        raise SystemExit("Résultats différents entre l'ancienne et la nouvelle forme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# run.py
+"""
+Benchmark des constructions de tables et des chargements de dashboards.
+
+    python -m benchmarks.run --scale 10k
+    python -m benchmarks.run --scale 1m --repeat 3
+    python -m benchmarks.run --scale 50m --skip-dashboards
+
+Étapes :
+1. données bronze synthétiques (réutilisées si déjà générées pour l'échelle
+   et la graine) ;
+2. pipeline sql/ complet sur une base DuckDB neuve : durée et mémoire pic
+   de chaque instruction, avec la table ou vue construite ;
+3. rafraîchissement de ANALYTICS.sales_enriched (complet puis incrémental
+   sans nouveauté) ;
+4. chaque dashboard exécuté par streamlit.testing (AppTest) sur la base
+   produite, cache froid puis chaud, en mode scan unique et requête par
+   requête ; dans ce dernier mode la durée de chaque loader est relevée.
+
+Le résultat JSON (défaut local/benchmarks/results/<échelle>/) contient le
+commit, les versions et la machine : voir benchmarks/compare.py.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from benchmarks.measure import PeakMemory, process_peak_mb
+from benchmarks.synthetic_bronze import DEFAULT_SEED, generate_bronze, resolve_scale
+from pipeline.local_run import PIPELINE_SCRIPTS, run_pipeline
+from pipeline.sales_enriched import refresh_sales_enriched
+from pipeline.session import ROOT_DIR, get_local_session
+
+BENCH_DIR = os.path.join(ROOT_DIR, "local", "benchmarks")
+STREAMLIT_DIR = os.path.join(ROOT_DIR, "streamlit")
+
+PAGES = ["sales_dashboard.py", "promotion_analysis.py", "marketing_roi.py"]
+SCAN_CHECKBOX = "⚡ Mode scan unique"
+TIMINGS_COLUMN = "Requête"
+
+_TARGET = re.compile(
+    r"^\s*(?:CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:TEMPORARY|TEMP|TRANSIENT|SECURE)\s+)?"
+    r"(?:TABLE|VIEW|STAGE|FILE\s+FORMAT|SCHEMA)\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+    r"|INSERT\s+(?:OVERWRITE\s+)?INTO\s+|COPY\s+INTO\s+|MERGE\s+INTO\s+|DELETE\s+FROM\s+|UPDATE\s+"
+    r"|ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?|DROP\s+\w+\s+(?:IF\s+EXISTS\s+)?)([\w.$]+)",
+    re.IGNORECASE
+)
+
+
+# ============================================================================
+# MÉTADONNÉES
+# ============================================================================
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True, text=True,
+                              timeout=30).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _version(module):
+    try:
+        return __import__(module).__version__
+    except Exception:
+        return None
+
+
+def environment_metadata():
+    """Commit, versions et machine (pour comparer des résultats entre eux)"""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "commit_subject": _git("log", "-1", "--format=%s"),
+        "branch": _git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "duckdb": _version("duckdb"),
+        "pandas": _version("pandas"),
+        "streamlit": _version("streamlit"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ============================================================================
+# DONNÉES ET CONSTRUCTIONS
+# ============================================================================
+
+def prepare_data(directory, transactions, seed, regenerate=False, log=print):
+    """Générer les fichiers bronze, ou réutiliser ceux d'une exécution précédente"""
+    manifest_path = os.path.join(directory, "generation.json")
+    if not regenerate and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("transactions") == transactions and manifest.get("seed") == seed:
+            log(f"Données bronze réutilisées : {directory}")
+            return dict(manifest, reused=True)
+
+    log(f"Génération de {transactions:,} transactions -> {directory}")
+    started = time.perf_counter()
+    files = generate_bronze(directory, transactions, seed=seed, log=log)
+    manifest = {
+        "transactions": transactions,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 3),
+        "files": files,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return dict(manifest, reused=False)
+
+
+def statement_target(statement):
+    """Objet construit ou modifié par une instruction (None pour SELECT, SET...)"""
+    match = _TARGET.match(statement)
+    return match.group(1).upper() if match else None
+
+
+def _remove_database(path):
+    for suffix in ("", ".wal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def benchmark_builds(database, stage_dir, memory, log=print):
+    """Pipeline complet puis rafraîchissements de sales_enriched"""
+    statements = []
+
+    @contextmanager
+    def _measure(script, statement):
+        record = {"script": script, "index": len(statements), "kind": statement.split(None, 1)[0].upper(),
+                  "target": statement_target(statement)}
+        with memory.measure(record):
+            yield
+        statements.append(record)
+
+    _remove_database(database)
+    session = get_local_session(database, stage_dir=stage_dir)
+    try:
+        pipeline = {}
+        with memory.measure(pipeline):
+            run_pipeline(session, PIPELINE_SCRIPTS, log=log, wrap=_measure)
+
+        refresh = {}
+        for mode, full in (("full", True), ("incremental_noop", False)):
+            record = {}
+            with memory.measure(record):
+                report = refresh_sales_enriched(session, full=full)
+            record["rows_inserted"] = report["rows_inserted"]
+            record["rows_updated"] = report["rows_updated"]
+            refresh[mode] = record
+            log(f"  Rafraîchissement sales_enriched ({mode}) : {record['seconds']:.2f}s")
+
+        tables = {
+            f"{row['SCHEMA_NAME']}.{row['TABLE_NAME']}".upper(): int(row["ESTIMATED_SIZE"])
+            for row in session.sql(
+                "SELECT schema_name, table_name, estimated_size FROM duckdb_tables() WHERE NOT temporary"
+            ).collect()
+        }
+    finally:
+        session.close()
+
+    return {
+        "pipeline": pipeline,
+        "statements": statements,
+        "refresh_sales_enriched": refresh,
+        "tables": tables,
+        "database_mb": round(os.path.getsize(database) / 1024 / 1024, 1),
+    }
+
+
+# ============================================================================
+# DASHBOARDS
+# ============================================================================
+
+def _clear_caches():
+    """Cache de requêtes partagé et caches st.cache_data (la session reste ouverte)"""
+    import streamlit as st
+    from query_cache import get_query_cache
+
+    get_query_cache().invalidate()
+    st.cache_data.clear()
+
+
+def _loader_timings(app):
+    """Durées par loader affichées dans « Temps de chargement des requêtes »"""
+    for element in app.dataframe:
+        frame = element.value
+        if TIMINGS_COLUMN in frame.columns:
+            return {row[TIMINGS_COLUMN]: row["Durée (s)"] for row in frame.to_dict("records")}
+    return {}
+
+
+def _run_page(app, memory, record):
+    with memory.measure(record):
+        app.run()
+    errors = [str(e.value) for e in app.exception] + [str(e.value) for e in app.error]
+    if errors:
+        record["errors"] = errors[:5]
+    loaders = _loader_timings(app)
+    if loaders:
+        record["loaders"] = loaders
+    return record
+
+
+def benchmark_dashboards(database, memory, repeat=1, timeout=3600, log=print):
+    """Chaque page : cache froid puis chaud, pour chaque mode de chargement"""
+    os.environ["ANYCOMPANY_BACKEND"] = "local"
+    os.environ["ANYCOMPANY_DUCKDB"] = database
+    if STREAMLIT_DIR not in sys.path:
+        sys.path.insert(0, STREAMLIT_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    # Avertissements émis à chaque exécution hors serveur (« No runtime found »...)
+    logging.disable(logging.WARNING)
+    try:
+        return [
+            record
+            for page in PAGES
+            for record in _benchmark_page(AppTest, os.path.join(STREAMLIT_DIR, page), memory, repeat, timeout, log)
+        ]
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def _benchmark_page(app_test, path, memory, repeat, timeout, log):
+    page = os.path.basename(path)
+    # Exécution de chauffe : imports, session, compilation du script
+    app_test.from_file(path, default_timeout=timeout).run()
+
+    runs = []
+    for iteration in range(repeat):
+        _clear_caches()
+        app = app_test.from_file(path, default_timeout=timeout)
+        checkboxes = []
+        for cache in ("cold", "warm"):
+            record = {"page": page, "mode": "scan", "cache": cache, "run": iteration}
+            runs.append(_run_page(app, memory, record))
+            checkboxes = [c for c in app.checkbox if c.label == SCAN_CHECKBOX]
+            if not checkboxes:
+                record["mode"] = "default"
+
+        if checkboxes:
+            checkboxes[0].uncheck()
+            _clear_caches()
+            for cache in ("cold", "warm"):
+                record = {"page": page, "mode": "queries", "cache": cache, "run": iteration}
+                runs.append(_run_page(app, memory, record))
+
+    for record in runs:
+        if record["run"] == 0:
+            status = " ⚠️ erreurs" if record.get("errors") else ""
+            log(f"  {page} [{record['mode']}, {record['cache']}] : {record['seconds']:.2f}s, "
+                f"pic {record['peak_rss_mb']:.0f} Mo{status}")
+    return runs
+
+
+# ============================================================================
+# POINT D'ENTRÉE
+# ============================================================================
+
+def default_output(scale, metadata):
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    commit = (metadata.get("commit") or "nogit")[:10]
+    return os.path.join(BENCH_DIR, "results", scale, f"{stamp}_{commit}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne (DuckDB) du pipeline et des dashboards")
+    parser.add_argument("--scale", default="10k", help="10k, 1m, 50m ou nombre de transactions")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=1, help="Exécutions de chaque page (défaut : 1)")
+    parser.add_argument("--data-dir", default=None, help="Dossier des fichiers bronze (défaut : local/benchmarks/data/<échelle>)")
+    parser.add_argument("--database", default=None, help="Base DuckDB recréée (défaut : local/benchmarks/<échelle>.duckdb)")
+    parser.add_argument("--out", default=None, help="Fichier JSON de résultats")
+    parser.add_argument("--regenerate", action="store_true", help="Régénérer les fichiers bronze")
+    parser.add_argument("--skip-dashboards", action="store_true", help="Ne mesurer que les constructions")
+    parser.add_argument("--timeout", type=float, default=3600, help="Durée maximale d'une exécution de page (s)")
+    args = parser.parse_args(argv)
+
+    scale = str(args.scale).lower()
+    transactions = resolve_scale(scale)
+    data_dir = args.data_dir or os.path.join(BENCH_DIR, "data", f"{scale}-{args.seed}")
+    database = os.path.abspath(args.database or os.path.join(BENCH_DIR, f"{scale}.duckdb"))
+    os.makedirs(os.path.dirname(database), exist_ok=True)
+
+    metadata = environment_metadata()
+    results = {"meta": dict(metadata, scale=scale, transactions=transactions, seed=args.seed, repeat=args.repeat)}
+
+    with PeakMemory() as memory:
+        results["data"] = prepare_data(data_dir, transactions, args.seed, regenerate=args.regenerate)
+
+        print(f"Constructions -> {database}")
+        results["builds"] = benchmark_builds(database, data_dir, memory)
+        print(f"  Pipeline : {results['builds']['pipeline']['seconds']:.1f}s, "
+              f"pic {results['builds']['pipeline']['peak_rss_mb']:.0f} Mo")
+
+        if not args.skip_dashboards:
+            print("Dashboards")
+            results["dashboards"] = benchmark_dashboards(database, memory, repeat=args.repeat, timeout=args.timeout)
+
+    results["meta"]["process_peak_rss_mb"] = process_peak_mb()
+    out = args.out or default_output(scale, metadata)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    print(f"Résultats : {out}")
+
+
+if __name__ == "__main__":
+    main()
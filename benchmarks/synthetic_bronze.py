@@ -0,0 +1,313 @@
+# synthetic_bronze.py
+"""
+Jeux de données bronze synthétiques pour les benchmarks.
+
+    python -m benchmarks.synthetic_bronze --scale 1m --out local/benchmarks/data/1m
+
+Les fichiers produits portent les noms du stage S3 et suivent les schémas
+des tables BRONZE de sql/ETL SQL.sql (mêmes colonnes, même ordre), avec une
+part de valeurs à nettoyer : montants avec espaces ou non numériques,
+doublons de transaction_id, dates incohérentes, remises hors limites...
+
+La génération est faite par DuckDB (COPY (SELECT ...) TO) : chaque valeur
+est dérivée de hash(ligne, graine, colonne), ce qui la rend déterministe
+pour une graine donnée et parallélisable, y compris à 50M de transactions.
+"""
+import argparse
+import os
+import time
+
+try:
+    import duckdb
+except ImportError:  # dépendance optionnelle : uniquement pour l'exécution locale
+    duckdb = None
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000, "50m": 50_000_000}
+DEFAULT_SEED = 42
+
+START_DATE = "2021-01-01"
+DAYS = 1461  # 2021-01-01 -> 2024-12-31
+
+REGIONS = ["North America", "Europe", "Asia Pacific", "Latin America", "Middle East", "Africa", "Oceania"]
+COUNTRIES = ["USA", "France", "Japan", "Brazil", "UAE", "Nigeria", "Australia"]
+CITIES = ["New York", "Paris", "Tokyo", "São Paulo", "Dubai", "Lagos", "Sydney"]
+CATEGORIES = ["Beverages", "Snacks", "Dairy", "Bakery", "Frozen Foods", "Organic", "Confectionery"]
+ENTITIES = ["AnyCompany Foods", "AnyCompany Drinks", "AnyCompany Retail", "AnyCompany Online"]
+PAYMENT_METHODS = ["Credit Card", "Cash", "Bank Transfer", "Mobile Payment", "Debit Card"]
+PROMOTION_TYPES = ["Discount", "Buy One Get One", "Bundle", "Flash Sale", "Seasonal"]
+CAMPAIGN_TYPES = ["Email", "Social Media", "TV", "Display", "Influencer"]
+AUDIENCES = ["Young Adults", "Families", "Seniors", "Professionals", "Students"]
+
+
+def resolve_scale(scale):
+    """'10k' / '1m' / '10m' / '50m' ou nombre de transactions"""
+    if str(scale).lower() in SCALES:
+        return SCALES[str(scale).lower()]
+    return int(str(scale).replace("_", ""))
+
+
+def dataset_sizes(transactions):
+    """Nombre de lignes de chaque fichier pour un volume de transactions"""
+    return {
+        "financial_transactions": transactions,
+        "promotions": max(200, transactions // 5_000),
+        "marketing_campaigns": max(200, transactions // 5_000),
+        "customer_demographics": max(1_000, transactions // 50),
+        "customer_service_interactions": max(1_000, transactions // 100),
+        "logistics_and_shipping": max(1_000, transactions // 20),
+        "supplier_information": 500,
+        "employee_records": max(500, transactions // 10_000),
+        "product_reviews": max(1_000, transactions // 100),
+        "inventory": max(500, transactions // 10_000),
+        "store_locations": 300,
+    }
+
+
+# ============================================================================
+# EXPRESSIONS PSEUDO-ALÉATOIRES (déterministes)
+# ============================================================================
+
+class _Random:
+    """Expressions SQL pseudo-aléatoires fonction de (i, graine, colonne)"""
+
+    def __init__(self, seed):
+        self.seed = int(seed)
+
+    def int(self, salt, modulo):
+        return f"CAST(hash(i, {self.seed}, '{salt}') % {int(modulo)} AS BIGINT)"
+
+    def uniform(self, salt, low, high):
+        return f"({low} + (hash(i, {self.seed}, '{salt}') % 1000000) / 1000000.0 * ({high} - {low}))"
+
+    def choice(self, salt, values):
+        items = ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+        return f"list_extract([{items}], 1 + {self.int(salt, len(values))})"
+
+    def date(self, salt, days=DAYS, start=START_DATE):
+        return f"(DATE '{start}' + CAST({self.int(salt, days)} AS INTEGER))"
+
+    def percent(self, salt):
+        """Tirage 0..99 (pour les proportions de valeurs sales)"""
+        return self.int(salt, 100)
+
+
+def _identifier(prefix, width, expression="i"):
+    return f"'{prefix}' || lpad(CAST({expression} AS VARCHAR), {width}, '0')"
+
+
+def _table_queries(sizes, r):
+    """Requête SELECT de chaque fichier (colonnes dans l'ordre des tables BRONZE)"""
+    amount = f"CAST(round({r.uniform('amount', 2, 2500)}, 2) AS VARCHAR)"
+    region = r.choice("region", REGIONS)
+    promo_start = r.date("start", DAYS - 60)
+    campaign_start = r.date("start", DAYS - 90)
+
+    return {
+        "financial_transactions.csv": f"""
+            SELECT
+                {_identifier('TXN', 10, 'CASE WHEN i % 200 = 199 THEN i - 1 ELSE i END')} AS transaction_id,
+                {r.date('date')} AS transaction_date,
+                CASE WHEN {r.percent('type')} < 80 THEN 'Sale'
+                     WHEN {r.percent('type')} < 90 THEN 'Refund' ELSE 'Expense' END AS transaction_type,
+                CASE WHEN {r.percent('dirty')} = 0 THEN substr({amount}, 1, 1) || ' ' || substr({amount}, 2)
+                     WHEN {r.percent('dirty')} = 1 THEN 'N/A'
+                     WHEN {r.percent('dirty')} = 2 THEN '-' || {amount}
+                     ELSE {amount} END AS amount,
+                {r.choice('payment', PAYMENT_METHODS)} AS payment_method,
+                {r.choice('entity', ENTITIES)} AS entity,
+                {region} AS region,
+                {_identifier('ACC', 4, r.int('account', 1000))} AS account_code
+            FROM range({sizes['financial_transactions']}) t(i)
+        """,
+        "promotions-data.csv": f"""
+            SELECT
+                {_identifier('PROMO', 6)} AS promotion_id,
+                {r.choice('category', CATEGORIES)} AS product_category,
+                {r.choice('type', PROMOTION_TYPES)} AS promotion_type,
+                CASE WHEN {r.percent('dirty')} = 0 THEN 150.0
+                     ELSE CAST(5 + {r.int('discount', 46)} AS DOUBLE) END AS discount_percentage,
+                {promo_start} AS start_date,
+                CASE WHEN {r.percent('dirty')} = 1 THEN {promo_start} - 5
+                     ELSE {promo_start} + CAST(3 + {r.int('length', 45)} AS INTEGER) END AS end_date,
+                {region} AS region
+            FROM range({sizes['promotions']}) t(i)
+        """,
+        "marketing_campaigns.csv": f"""
+            SELECT
+                {_identifier('CAMP', 6)} AS campaign_id,
+                'Campagne ' || i AS campaign_name,
+                {r.choice('type', CAMPAIGN_TYPES)} AS campaign_type,
+                {r.choice('category', CATEGORIES)} AS product_category,
+                {r.choice('audience', AUDIENCES)} AS target_audience,
+                {campaign_start} AS start_date,
+                {campaign_start} + CAST(7 + {r.int('length', 84)} AS INTEGER) AS end_date,
+                {region} AS region,
+                1000 + {r.int('budget', 200000)} AS budget,
+                500 + {r.int('reach', 1000000)} AS reach,
+                round({r.uniform('conversion', 0, 0.15)}, 4) AS conversion_rate
+            FROM range({sizes['marketing_campaigns']}) t(i)
+        """,
+        "customer_demographics.csv": f"""
+            SELECT
+                i AS customer_id,
+                'Client ' || i AS name,
+                {r.date('birth', 20000, '1950-01-01')} AS date_of_birth,
+                {r.choice('gender', ['Male', 'Female', 'Other'])} AS gender,
+                {region} AS region,
+                {r.choice('region', COUNTRIES)} AS country,
+                {r.choice('region', CITIES)} AS city,
+                {r.choice('marital', ['Single', 'Married', 'Divorced', 'Widowed'])} AS marital_status,
+                15000 + {r.int('income', 185000)} AS annual_income
+            FROM range({sizes['customer_demographics']}) t(i)
+        """,
+        "customer_service_interactions.csv": f"""
+            SELECT
+                {_identifier('INT', 8)} AS interaction_id,
+                {r.date('date')} AS interaction_date,
+                {r.choice('type', ['Phone', 'Email', 'Chat', 'In-Store'])} AS interaction_type,
+                {r.choice('issue', ['Billing', 'Delivery', 'Product Quality', 'Returns', 'Other'])} AS issue_category,
+                'Demande client, suivi ' || i AS description,
+                {r.int('duration', 90)} AS duration_minutes,
+                {r.choice('status', ['Resolved', 'Pending', 'Escalated', 'Closed'])} AS resolution_status,
+                {r.choice('follow', ['Yes', 'No'])} AS follow_up_required,
+                1 + {r.int('satisfaction', 5)} AS customer_satisfaction
+            FROM range({sizes['customer_service_interactions']}) t(i)
+        """,
+        "logistics_and_shipping.csv": f"""
+            SELECT
+                {_identifier('SHP', 9)} AS shipment_id,
+                i AS order_id,
+                {r.date('ship')} AS ship_date,
+                {r.date('ship')} + CAST(1 + {r.int('delay', 14)} AS INTEGER) AS estimated_delivery,
+                {r.choice('method', ['Standard', 'Express', 'Overnight', 'Freight'])} AS shipping_method,
+                {r.choice('status', ['Delivered', 'In Transit', 'Pending', 'Returned'])} AS status,
+                CASE WHEN {r.percent('dirty')} = 0 THEN 'unknown'
+                     ELSE CAST(round({r.uniform('cost', 3, 150)}, 2) AS VARCHAR) END AS shipping_cost,
+                CASE WHEN {r.percent('dirty')} = 1 THEN '' ELSE {region} END AS destination_region,
+                {r.choice('region', COUNTRIES)} AS destination_country,
+                {r.choice('carrier', ['DHL', 'FedEx', 'UPS', 'La Poste'])} AS carrier
+            FROM range({sizes['logistics_and_shipping']}) t(i)
+        """,
+        "supplier_information.csv": f"""
+            SELECT
+                {_identifier('SUP', 5)} AS supplier_id,
+                'Fournisseur ' || i AS supplier_name,
+                {r.choice('category', CATEGORIES)} AS product_category,
+                {region} AS region,
+                {r.choice('region', COUNTRIES)} AS country,
+                {r.choice('region', CITIES)} AS city,
+                1 + {r.int('lead', 30)} AS lead_time,
+                round({r.uniform('reliability', 0.3, 1)}, 2) AS reliability_score,
+                {r.choice('quality', ['A', 'B', 'C'])} AS quality_rating
+            FROM range({sizes['supplier_information']}) t(i)
+        """,
+        "employee_records.csv": f"""
+            SELECT
+                {_identifier('EMP', 6)} AS employee_id,
+                'Employé ' || i AS name,
+                {r.date('birth', 15000, '1960-01-01')} AS date_of_birth,
+                {r.date('hire', 5000, '2005-01-01')} AS hire_date,
+                {r.choice('department', ['Sales', 'Marketing', 'Logistics', 'Finance', 'IT'])} AS department,
+                {r.choice('title', ['Analyst', 'Manager', 'Associate', 'Director'])} AS job_title,
+                CAST(25000 + {r.int('salary', 95000)} AS VARCHAR) AS salary,
+                {region} AS region,
+                {r.choice('region', COUNTRIES)} AS country,
+                'mailto:employe' || i || '@anycompany.com' AS email
+            FROM range({sizes['employee_records']}) t(i)
+        """,
+        "product_reviews.csv": f"""
+            SELECT
+                {_identifier('REV', 8)} AS reviewer_id,
+                'Client ' || {r.int('reviewer', 100000)} AS reviewer_name,
+                CASE WHEN {r.percent('dirty')} = 0 THEN 'n/a' ELSE CAST(1 + {r.int('rating', 5)} AS VARCHAR) END AS rating,
+                {r.date('date')} AS review_date,
+                {r.choice('category', CATEGORIES)} AS product_category
+            FROM range({sizes['product_reviews']}) t(i)
+        """,
+        "inventory.json": f"""
+            SELECT
+                {_identifier('PRD', 6)} AS product_id,
+                {r.choice('category', CATEGORIES)} AS product_category,
+                {region} AS region,
+                {r.choice('region', COUNTRIES)} AS country,
+                'Entrepôt ' || {r.int('warehouse', 20)} AS warehouse,
+                {r.int('stock', 1000)} AS current_stock,
+                10 + {r.int('reorder', 190)} AS reorder_point,
+                1 + {r.int('lead', 30)} AS lead_time,
+                {r.date('restock')} AS last_restock_date
+            FROM range({sizes['inventory']}) t(i)
+        """,
+        "store_locations.json": f"""
+            SELECT
+                {_identifier('STR', 5)} AS store_id,
+                'Magasin ' || i AS store_name,
+                {r.choice('type', ['Supermarket', 'Convenience', 'Hypermarket', 'Online Hub'])} AS store_type,
+                {region} AS region,
+                {r.choice('region', COUNTRIES)} AS country,
+                {r.choice('region', CITIES)} AS city,
+                i || ' rue du Commerce' AS address,
+                10000 + {r.int('postal', 89999)} AS postal_code,
+                round({r.uniform('surface', 200, 8000)}, 2) AS square_footage,
+                5 + {r.int('employees', 195)} AS employee_count
+            FROM range({sizes['store_locations']}) t(i)
+        """,
+    }
+
+
+# ============================================================================
+# GÉNÉRATION
+# ============================================================================
+
+def generate_bronze(directory, transactions, seed=DEFAULT_SEED, log=print):
+    """Écrire les fichiers bronze dans directory ; renvoie {fichier: {rows, bytes, seconds}}"""
+    if duckdb is None:
+        raise ImportError("La génération des données de benchmark nécessite duckdb : pip install duckdb")
+    os.makedirs(directory, exist_ok=True)
+    sizes = dataset_sizes(transactions)
+    rows = {
+        "financial_transactions.csv": sizes["financial_transactions"],
+        "promotions-data.csv": sizes["promotions"],
+        "marketing_campaigns.csv": sizes["marketing_campaigns"],
+        "customer_demographics.csv": sizes["customer_demographics"],
+        "customer_service_interactions.csv": sizes["customer_service_interactions"],
+        "logistics_and_shipping.csv": sizes["logistics_and_shipping"],
+        "supplier_information.csv": sizes["supplier_information"],
+        "employee_records.csv": sizes["employee_records"],
+        "product_reviews.csv": sizes["product_reviews"],
+        "inventory.json": sizes["inventory"],
+        "store_locations.json": sizes["store_locations"],
+    }
+
+    files = {}
+    connection = duckdb.connect()
+    try:
+        for name, query in _table_queries(sizes, _Random(seed)).items():
+            path = os.path.join(directory, name)
+            options = "FORMAT JSON, ARRAY true" if name.endswith(".json") else "FORMAT CSV, HEADER true"
+            started = time.monotonic()
+            connection.execute(f"COPY ({query}) TO '{path}' ({options})")
+            files[name] = {
+                "rows": rows[name],
+                "bytes": os.path.getsize(path),
+                "seconds": round(time.monotonic() - started, 3),
+            }
+            log(f"  {name} : {rows[name]:,} lignes, {files[name]['bytes'] / 1e6:,.1f} Mo")
+    finally:
+        connection.close()
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génération de fichiers bronze synthétiques")
+    parser.add_argument("--scale", default="10k", help="10k, 1m, 50m ou nombre de transactions")
+    parser.add_argument("--out", required=True, help="Dossier de sortie (dossier de stage local)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    transactions = resolve_scale(args.scale)
+    print(f"Génération de {transactions:,} transactions -> {args.out}")
+    generate_bronze(args.out, transactions, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
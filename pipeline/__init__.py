@@ -0,0 +1,7 @@
+# pipeline/__init__.py
+"""
+Pilotage Python des traitements SQL AnyCompany (Snowflake).
+
+Les scripts restent dans sql/ ; ce package les découpe en instructions, les
+exécute sur une session Snowpark et remonte des compteurs d'exécution.
+"""
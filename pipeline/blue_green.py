@@ -0,0 +1,229 @@
+# blue_green.py
+"""
+Publication blue/green de ANALYTICS.promotions_active.
+
+    python -m pipeline.blue_green                # construire la version inactive puis basculer
+    python -m pipeline.blue_green --rollback     # revenir à la version précédente
+    python -m pipeline.blue_green --status
+
+Deux tables versionnées (promotions_active__blue / __green) et une vue
+ANALYTICS.promotions_active sur la version active. Un rafraîchissement
+construit la version inactive (requête de construction de
+promotion_impact.sql, en une passe), y exécute les tests de qualité du
+script, puis remplace la vue (CREATE OR REPLACE VIEW, atomique) : les
+dashboards lisent l'une ou l'autre version, sans interruption. Un test en
+échec bloque la bascule (--force pour passer outre) ; la version précédente
+reste disponible pour un retour arrière immédiat.
+
+Alternative au mode par défaut de promotion_impact.sql (SWAP WITH) : à la
+première bascule, la table promotions_active est remplacée par la vue (seule
+interruption, une fois). Ensuite, les exécutions de promotion_impact.sql
+(pipeline.local_run, pipeline.dag, pipeline.ingestion) détectent le mode
+blue/green (version active dans ANALYTICS.table_versions, vue en place) et
+remplacent la construction, l'échange, la documentation et les tests de la
+table par un rafraîchissement (published_table, refreshed_by). Pour revenir
+au mode SWAP, DROP VIEW ANALYTICS.promotions_active puis exécuter
+promotion_impact.sql.
+"""
+import argparse
+import re
+import time
+
+from pipeline.session import get_local_session, get_session
+from pipeline.snapshots import publish_after_refresh
+from pipeline.sql_script import read_script, split_statements, statement_kind
+
+CONTROL_SCRIPT = "table_versions.sql"
+VERSIONS = ("blue", "green")
+
+STATE_SQL = """
+MERGE INTO ANALYTICS.table_versions v
+USING (SELECT ? AS table_name, ? AS active_table, ? AS previous_table, ? AS build_s) n
+    ON v.table_name = n.table_name
+WHEN MATCHED THEN UPDATE SET
+    active_table = n.active_table,
+    previous_table = n.previous_table,
+    build_s = n.build_s,
+    switched_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (table_name, active_table, previous_table, build_s, switched_at)
+VALUES (n.table_name, n.active_table, n.previous_table, n.build_s, CURRENT_TIMESTAMP())
+"""
+
+
+class PublishedTable:
+    """Table publiée en blue/green et script qui la construit"""
+
+    def __init__(self, name, script, staging):
+        self.name = name.upper()
+        self.script = script
+        self.staging = staging
+
+    def version_table(self, version):
+        return f"{self.name}__{version.upper()}"
+
+    def build_statement(self, target):
+        """CREATE ... AS SELECT de la table de construction, redirigé vers target"""
+        pattern = re.compile(r"^(CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+)" + re.escape(self.staging) + r"\b",
+                             re.IGNORECASE)
+        for statement in split_statements(read_script(self.script)):
+            if pattern.match(statement):
+                return pattern.sub(lambda m: m.group(1) + target, statement, count=1)
+        raise ValueError(f"{self.script} : aucune construction de {self.staging}")
+
+    def _name_pattern(self):
+        return re.compile(r"\b" + re.escape(self.name) + r"\b", re.IGNORECASE)
+
+    def _is_check(self, statement):
+        return (statement_kind(statement) in ("SELECT", "WITH")
+                and re.search(r"\bAS\s+test_name\b", statement, re.IGNORECASE) is not None
+                and self._name_pattern().search(statement) is not None)
+
+    def check_statements(self, target):
+        """Tests de qualité du script (SELECT ... AS test_name), lus sur target"""
+        name = self._name_pattern()
+        return [name.sub(target, statement)
+                for statement in split_statements(read_script(self.script)) if self._is_check(statement)]
+
+    def refreshed_by(self, statement):
+        """
+        Instruction du script remplacée par refresh() en mode blue/green :
+        construction et échange (table de construction), COMMENT ON / ALTER
+        TABLE de la table publiée (devenue une vue) et ses tests de qualité.
+        """
+        if re.search(r"\b" + re.escape(self.staging) + r"\b", statement, re.IGNORECASE):
+            return True
+        if re.match(r"^(?:COMMENT\s+ON\s+\w+|ALTER\s+TABLE)\s+" + self._name_pattern().pattern,
+                    statement, re.IGNORECASE):
+            return True
+        return self._is_check(statement)
+
+
+PROMOTIONS_ACTIVE = PublishedTable("ANALYTICS.promotions_active", "promotion_impact.sql",
+                                   "ANALYTICS.promotions_active_staging")
+PUBLISHED_TABLES = (PROMOTIONS_ACTIVE,)
+
+
+# ============================================================================
+# ÉTAT
+# ============================================================================
+
+def read_state(session, table):
+    """(version active, version précédente) ; (None, None) avant la première bascule"""
+    rows = session.sql("SELECT active_table, previous_table FROM ANALYTICS.table_versions WHERE table_name = ?",
+                       params=[table.name]).collect()
+    if not rows:
+        return None, None
+    values = {key.lower(): value for key, value in rows[0].as_dict().items()}
+    return values["active_table"], values["previous_table"]
+
+
+def object_type(session, name):
+    """'BASE TABLE', 'VIEW' ou None"""
+    schema, table = name.split(".")
+    rows = session.sql(
+        "SELECT table_type FROM INFORMATION_SCHEMA.TABLES WHERE UPPER(table_schema) = ? AND UPPER(table_name) = ?",
+        params=[schema.upper(), table.upper()]
+    ).collect()
+    return next(iter(rows[0].as_dict().values())) if rows else None
+
+
+def is_published(session, table):
+    """Mode blue/green : vue en place et version active dans ANALYTICS.table_versions"""
+    if object_type(session, table.name) != "VIEW" or object_type(session, "ANALYTICS.table_versions") is None:
+        return False
+    active, _ = read_state(session, table)
+    return active is not None
+
+
+def published_table(session, script):
+    """
+    Table construite par script et publiée en blue/green, sinon None (mode
+    SWAP) : les runners remplacent alors ses instructions (refreshed_by) par
+    refresh().
+    """
+    for table in PUBLISHED_TABLES:
+        if table.script == script and is_published(session, table):
+            return table
+    return None
+
+
+# ============================================================================
+# RAFRAÎCHISSEMENT ET BASCULE
+# ============================================================================
+
+def switch(session, table, target, previous, build_s=None):
+    """Faire pointer la vue publiée sur target"""
+    if object_type(session, table.name) == "BASE TABLE":
+        # Passage du mode SWAP au mode blue/green (une seule fois)
+        session.sql(f"DROP TABLE {table.name}").collect()
+    session.sql(f"CREATE OR REPLACE VIEW {table.name} AS SELECT * FROM {target}").collect()
+    session.sql(STATE_SQL, params=[table.name, target, previous, build_s]).collect()
+
+
+def refresh(session, table=PROMOTIONS_ACTIVE, force=False, log=print):
+    """Construire la version inactive, la tester puis basculer ; renvoie la version active"""
+    for statement in split_statements(read_script(CONTROL_SCRIPT)):
+        session.sql(statement).collect()
+
+    active, _ = read_state(session, table)
+    version = VERSIONS[1] if active == table.version_table(VERSIONS[0]) else VERSIONS[0]
+    target = table.version_table(version)
+
+    started = time.monotonic()
+    log(f"Construction de {target}")
+    session.sql(table.build_statement(target)).collect()
+    build_s = round(time.monotonic() - started, 1)
+
+    failures = 0
+    for statement in table.check_statements(target):
+        for row in session.sql(statement).collect():
+            values = row.as_dict()
+            if "TEST_RESULT" in values:
+                log(f"  {values.get('TEST_NAME')} : {values['TEST_RESULT']}")
+                failures += not str(values["TEST_RESULT"]).startswith("✅")
+    if failures and not force:
+        raise RuntimeError(f"{failures} test(s) en échec : {table.name} reste sur {active} (--force pour basculer)")
+
+    switch(session, table, target, previous=active, build_s=build_s)
+    log(f"{table.name} -> {target} (construite en {build_s}s ; précédente : {active or 'aucune'})")
+    return target
+
+
+def rollback(session, table=PROMOTIONS_ACTIVE, log=print):
+    """Revenir à la version précédente (sans reconstruction)"""
+    active, previous = read_state(session, table)
+    if previous is None or object_type(session, previous) is None:
+        raise RuntimeError(f"{table.name} : aucune version précédente disponible")
+    switch(session, table, previous, previous=active)
+    log(f"{table.name} -> {previous} (retour arrière depuis {active})")
+    return previous
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publication blue/green de ANALYTICS.promotions_active")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--database", default=None, help="Fichier DuckDB (avec --stage)")
+    parser.add_argument("--rollback", action="store_true", help="Revenir à la version précédente")
+    parser.add_argument("--status", action="store_true", help="Afficher la version active")
+    parser.add_argument("--force", action="store_true", help="Basculer même si un test échoue")
+    args = parser.parse_args(argv)
+
+    session = get_local_session(args.database, stage_dir=args.stage) if args.stage else get_session()
+    try:
+        if args.status:
+            for statement in split_statements(read_script(CONTROL_SCRIPT)):
+                session.sql(statement).collect()
+            active, previous = read_state(session, PROMOTIONS_ACTIVE)
+            print(f"{PROMOTIONS_ACTIVE.name} : active {active or '— (mode SWAP)'}, précédente {previous or '—'}")
+        elif args.rollback:
+            rollback(session)
+            publish_after_refresh(session)
+        else:
+            refresh(session, force=args.force)
+            publish_after_refresh(session)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
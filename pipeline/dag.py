@@ -0,0 +1,469 @@
+# dag.py
+"""
+Exécution parallèle des scripts du pipeline selon leurs dépendances.
+
+    python -m pipeline.dag                       # nœuds dont une entrée a changé
+    python -m pipeline.dag --force               # tous les nœuds
+    python -m pipeline.dag --dry-run             # graphe et nœuds à reconstruire
+    python -m pipeline.dag --stage data/bronze   # exécution locale (DuckDB)
+
+Le graphe est déduit des scripts de PIPELINE_SCRIPTS (hors exploratoires) :
+un nœud par objet SILVER / ANALYTICS créé (CREATE ... TABLE / VIEW), avec
+les instructions qui le modifient ensuite (MERGE, INSERT, DROP, ALTER,
+COMMENT ON...) et les tests de qualité (SELECT ... AS test_name) qui le
+lisent. Un renommage ou un échange (ALTER TABLE a RENAME TO / SWAP WITH b)
+réunit a et b en un seul nœud : promotions_active et sa table de
+construction promotions_active_staging. Les dépendances
+sont les objets BRONZE / SILVER / ANALYTICS cités par les instructions.
+
+Les nœuds prêts sont exécutés en parallèle (--workers) : les tables SILVER
+dès le départ, puis chaque nœud dès que ses entrées sont prêtes ; la durée
+totale tend vers celle du chemin critique (plus longue chaîne).
+
+Un nœud est sauté si ses instructions et les versions de ses entrées n'ont
+pas changé depuis sa dernière exécution réussie (ANALYTICS.pipeline_node_state,
+sql/pipeline_dag.sql). Version d'une source BRONZE : COUNT(*) et HASH_AGG(*) ;
+version d'un nœud : sa signature. Le chargement BRONZE (ETL SQL.sql, section 4,
+ou pipeline.ingestion) et les SELECT de consultation restent hors du graphe.
+Après une exécution réussie, les lots SILVER nouveaux ou modifiés sont
+profilés (pipeline/data_quality.py).
+"""
+import argparse
+import hashlib
+import re
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from pipeline.data_quality import run_profiling
+from pipeline.local_run import EXPLORATORY_SCRIPTS, PIPELINE_SCRIPTS
+from pipeline.session import get_local_session, get_session
+from pipeline.sql_script import read_script, split_statements, statement_kind
+
+CONTROL_SCRIPT = "pipeline_dag.sql"
+DAG_SCRIPTS = [name for name in PIPELINE_SCRIPTS if name not in EXPLORATORY_SCRIPTS]
+SOURCE_SCHEMAS = ("BRONZE",)
+DEFAULT_WORKERS = 8
+
+_OBJECT = re.compile(r"\b((?:BRONZE|SILVER|ANALYTICS)\.\w+)", re.IGNORECASE)
+_CREATE = re.compile(
+    r"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:TEMPORARY|TRANSIENT)\s+)?(?:TABLE|VIEW)\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)",
+    re.IGNORECASE
+)
+_MODIFY = re.compile(
+    r"^(?:MERGE\s+INTO|INSERT\s+(?:OVERWRITE\s+)?INTO|DELETE\s+FROM|UPDATE|TRUNCATE(?:\s+TABLE)?"
+    r"|DROP\s+(?:TABLE|VIEW)(?:\s+IF\s+EXISTS)?|ALTER\s+(?:TABLE|VIEW)(?:\s+IF\s+EXISTS)?"
+    r"|COMMENT\s+ON\s+(?:TABLE|VIEW))\s+([\w.]+)",
+    re.IGNORECASE
+)
+_COMMENT_COLUMN = re.compile(r"^COMMENT\s+ON\s+COLUMN\s+(\w+\.\w+)\.\w+", re.IGNORECASE)
+_RENAME = re.compile(r"^ALTER\s+(?:TABLE|VIEW)\s+.*?\b(?:RENAME\s+TO|SWAP\s+WITH)\s+([\w.]+)", re.IGNORECASE | re.DOTALL)
+_TEST = re.compile(r"\bAS\s+test_name\b", re.IGNORECASE)
+
+FINGERPRINT_SQL = "SELECT COUNT(*) AS row_count, HASH_AGG(*) AS content_hash FROM {table}"
+
+STATE_SQL = """
+MERGE INTO ANALYTICS.pipeline_node_state s
+USING (SELECT ? AS node_name, ? AS script_name, ? AS signature, ? AS duration_s, ? AS run_id) n
+    ON s.node_name = n.node_name
+WHEN MATCHED THEN UPDATE SET
+    script_name = n.script_name,
+    signature = n.signature,
+    duration_s = n.duration_s,
+    run_id = n.run_id,
+    refreshed_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (node_name, script_name, signature, duration_s, run_id, refreshed_at)
+VALUES (n.node_name, n.script_name, n.signature, n.duration_s, n.run_id, CURRENT_TIMESTAMP())
+"""
+
+RUNS_SQL = """
+INSERT INTO ANALYTICS.pipeline_node_runs
+SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP()
+"""
+
+
+def _objects(statement):
+    """Objets cités par une instruction (noms qualifiés, en majuscules)"""
+    return {name.upper() for name in _OBJECT.findall(statement)}
+
+
+def _target(statement):
+    """Objet créé ou modifié par une instruction (None pour un SELECT, USE...)"""
+    match = _CREATE.match(statement) or _MODIFY.match(statement) or _COMMENT_COLUMN.match(statement)
+    return match.group(1).upper() if match and "." in match.group(1) else None
+
+
+def _digest(*parts):
+    return hashlib.sha1("\n;\n".join(parts).encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# GRAPHE
+# ============================================================================
+
+class Node:
+    """Objet du pipeline, instructions qui le produisent et état d'exécution"""
+
+    def __init__(self, name, script):
+        self.name = name
+        self.script = script
+        self.statements = []        # (position, instruction)
+        self.checks = []
+        self.outputs = {name}
+        self.inputs = set()
+        self.upstream = set()
+        self.downstream = set()
+        self.status = "PENDING"
+        self.signature = None
+        self.start = 0.0            # secondes depuis le début de l'exécution
+        self.duration = 0.0
+        self.error = None
+        self.tests = []
+
+    @property
+    def statement_hash(self):
+        return _digest(*(statement for _, statement in self.statements))
+
+    @property
+    def finish(self):
+        return self.start + self.duration
+
+    def __repr__(self):
+        return f"Node({self.name})"
+
+
+def _merge(node, into, nodes):
+    """Réunir deux nœuds (renommage, échange) en conservant l'ordre des instructions"""
+    into.statements = sorted(into.statements + node.statements, key=lambda item: item[0])
+    into.checks += node.checks
+    into.outputs |= node.outputs
+    for name in node.outputs:
+        nodes[name] = into
+
+
+def build_graph(scripts=None):
+    """Nœuds du pipeline, dans un ordre topologique ; ValueError si cycle"""
+    nodes = {}
+    for script_index, script in enumerate(scripts or DAG_SCRIPTS):
+        created = []
+        for index, statement in enumerate(split_statements(read_script(script))):
+            position = (script_index, index)
+            target = _target(statement)
+            if target is None:
+                if statement_kind(statement) in ("SELECT", "WITH") and _TEST.search(statement):
+                    # Test de qualité : après le dernier nœud du script qu'il lit
+                    owners = [node for node in created if node.outputs & _objects(statement)]
+                    if owners:
+                        owners[-1].checks.append(statement)
+                continue
+            if target.split(".")[0] in SOURCE_SCHEMAS:
+                continue
+
+            node = nodes.get(target)
+            if node is None:
+                if not _CREATE.match(statement):
+                    continue  # modification d'un objet créé hors du graphe
+                node = nodes[target] = Node(target, script)
+                created.append(node)
+            node.statements.append((position, statement))
+
+            rename = _RENAME.match(statement)
+            if rename:
+                new_name = rename.group(1).upper()
+                if "." not in new_name:
+                    new_name = target.split(".")[0] + "." + new_name
+                other = nodes.get(new_name)
+                if other is not None and other is not node:
+                    _merge(node, other, nodes)
+                    created = [n for n in created if n is not node]
+                else:
+                    node.outputs.add(new_name)
+                    nodes[new_name] = node
+
+    graph = list({id(node): node for node in nodes.values()}.values())
+    for node in graph:
+        for _, statement in node.statements:
+            node.inputs |= _objects(statement)
+        node.inputs -= node.outputs
+        node.upstream = {nodes[name] for name in node.inputs if name in nodes}
+        for upstream in node.upstream:
+            upstream.downstream.add(node)
+    return _topological(graph)
+
+
+def _topological(graph):
+    remaining = {node: len(node.upstream) for node in graph}
+    ready = deque(node for node in graph if not node.upstream)
+    ordered = []
+    while ready:
+        node = ready.popleft()
+        ordered.append(node)
+        for downstream in sorted(node.downstream, key=lambda n: n.name):
+            remaining[downstream] -= 1
+            if remaining[downstream] == 0:
+                ready.append(downstream)
+    if len(ordered) != len(graph):
+        cycle = sorted(node.name for node in graph if remaining[node] > 0)
+        raise ValueError(f"Dépendances circulaires entre : {', '.join(cycle)}")
+    return ordered
+
+
+def sources(graph):
+    """Objets lus par le graphe sans y être produits (tables BRONZE)"""
+    produced = set().union(*(node.outputs for node in graph))
+    return sorted(set().union(*(node.inputs for node in graph)) - produced)
+
+
+# ============================================================================
+# VERSIONS ET ÉTAT
+# ============================================================================
+
+def source_version(session, table):
+    """Version d'une source : nombre de lignes et empreinte du contenu"""
+    try:
+        values = session.sql(FINGERPRINT_SQL.format(table=table)).collect()[0].as_dict()
+    except Exception:
+        return "absent"
+    values = {key.lower(): value for key, value in values.items()}
+    return f"{values['row_count']}:{values['content_hash']}"
+
+
+def read_state(session):
+    """Signature de la dernière exécution réussie de chaque nœud"""
+    state = {}
+    for row in session.sql("SELECT node_name, signature FROM ANALYTICS.pipeline_node_state").collect():
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        state[values["node_name"]] = values["signature"]
+    return state
+
+
+def existing_objects(session):
+    """Tables et vues présentes (SCHEMA.NOM, en majuscules)"""
+    rows = session.sql(
+        "SELECT table_schema, table_name FROM INFORMATION_SCHEMA.TABLES "
+        "WHERE UPPER(table_schema) IN ('SILVER', 'ANALYTICS')"
+    ).collect()
+    names = set()
+    for row in rows:
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        names.add(f"{values['table_schema']}.{values['table_name']}".upper())
+    return names
+
+
+def signature(node, versions):
+    """Empreinte des instructions du nœud et des versions de ses entrées"""
+    return _digest(node.statement_hash, *(f"{name}={versions.get(name, 'absent')}" for name in sorted(node.inputs)))
+
+
+# ============================================================================
+# EXÉCUTION
+# ============================================================================
+
+def run_node(session, node, origin):
+    """
+    Exécuter les instructions puis les tests d'un nœud (dans un thread du
+    pool). Table publiée en blue/green : instructions de publication et tests
+    remplacés par un rafraîchissement (pipeline/blue_green.py).
+    """
+    # Import différé : pipeline.blue_green dépend de ce module (via pipeline.snapshots)
+    from pipeline.blue_green import published_table, refresh
+
+    started = time.monotonic()
+    node.start = started - origin
+    checks = node.checks
+    try:
+        published = published_table(session, node.script)
+        refreshed = False
+        for _, statement in node.statements:
+            if published is not None and published.refreshed_by(statement):
+                if not refreshed:
+                    refresh(session, published, log=node.tests.append)
+                    refreshed = True
+                continue
+            session.sql(statement).collect()
+        if published is not None:
+            checks = [statement for statement in checks if not published.refreshed_by(statement)]
+        node.status = "OK"
+    except Exception as e:
+        node.status = "FAILED"
+        node.error = str(e).splitlines()[0]
+    else:
+        for statement in checks:
+            try:
+                for row in session.sql(statement).collect():
+                    values = row.as_dict()
+                    if "TEST_RESULT" in values:
+                        node.tests.append(f"{values.get('TEST_NAME')} : {values['TEST_RESULT']}")
+            except Exception as e:
+                node.tests.append(f"⚠️ Test ignoré : {str(e).splitlines()[0]}")
+    node.duration = time.monotonic() - started
+    return node
+
+
+_SYMBOLS = {"OK": "✅", "SKIPPED": "⏭️ ", "FAILED": "❌", "BLOCKED": "⛔", "PLANNED": "🔄"}
+
+
+def run_graph(session, graph, workers=DEFAULT_WORKERS, force=False, dry_run=False, log=print):
+    """
+    Exécuter le graphe : chaque nœud dès que ses entrées sont prêtes, sauté
+    si sa signature n'a pas changé. Statut final des nœuds : OK, SKIPPED,
+    FAILED, BLOCKED (entrée en échec) ou PLANNED (--dry-run).
+    """
+    table_sources = sources(graph)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="dag") as pool:
+        versions = dict(zip(table_sources, pool.map(lambda t: source_version(session, t), table_sources)))
+        state = read_state(session)
+        existing = existing_objects(session)
+
+        origin = time.monotonic()
+        remaining = {node: len(node.upstream) for node in graph}
+        ready = deque(node for node in graph if not node.upstream)
+        running = {}
+
+        def finished(node):
+            versions.update((name, node.signature) for name in node.outputs)
+            if node.status != "SKIPPED":
+                duration = f" {node.duration:6.1f}s" if node.status in ("OK", "FAILED") else ""
+                log((f"  {_SYMBOLS[node.status]} {node.name:<45}{duration}" + (f"  {node.error}" if node.error else "")).rstrip())
+            for line in node.tests:
+                log(f"      {line}")
+            for downstream in sorted(node.downstream, key=lambda n: n.name):
+                remaining[downstream] -= 1
+                if remaining[downstream] == 0:
+                    ready.append(downstream)
+
+        while ready or running:
+            while ready:
+                node = ready.popleft()
+                node.signature = signature(node, versions)
+                node.start = max((u.finish for u in node.upstream), default=0.0)
+                if any(u.status in ("FAILED", "BLOCKED") for u in node.upstream):
+                    node.status = "BLOCKED"
+                elif not force and state.get(node.name) == node.signature and node.name in existing:
+                    node.status = "SKIPPED"
+                elif dry_run:
+                    node.status = "PLANNED"
+                else:
+                    running[pool.submit(run_node, session, node, origin)] = node
+                    continue
+                finished(node)
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    future.result()
+                    finished(node)
+    return time.monotonic() - origin
+
+
+def critical_path(graph):
+    """
+    Plus longue chaîne (durées mesurées, nœuds sautés à 0) : renvoie
+    (durée, nœuds de la chaîne, {nœud: (chaîne jusqu'au nœud, marge)}).
+    """
+    path = {}
+    for node in graph:
+        path[node] = max((path[u] for u in node.upstream), default=0.0) + node.duration
+    tail = {}
+    for node in reversed(graph):
+        tail[node] = max((tail[d] for d in node.downstream), default=0.0) + node.duration
+    length = max(path.values(), default=0.0)
+
+    chain = []
+    node = max(graph, key=lambda n: path[n]) if graph else None
+    while node is not None:
+        chain.append(node)
+        node = max(node.upstream, key=lambda u: path[u]) if node.upstream else None
+    timings = {node: (path[node], length - (path[node] - node.duration + tail[node])) for node in graph}
+    return length, list(reversed(chain)), timings
+
+
+def record_run(session, graph, run_id, timings, on_path):
+    """Historiser l'exécution et mémoriser la signature des nœuds exécutés"""
+    for node in graph:
+        if node.status == "OK":
+            session.sql(STATE_SQL, params=[node.name, node.script, node.signature,
+                                           round(node.duration, 3), run_id]).collect()
+        path_s, slack_s = timings[node]
+        session.sql(RUNS_SQL, params=[
+            run_id, node.name, node.status, round(node.start, 3), round(node.duration, 3),
+            round(path_s, 3), round(slack_s, 3), node in on_path, node.error,
+        ]).collect()
+
+
+def format_report(graph, elapsed):
+    """Durées par nœud et chemin critique"""
+    length, chain, timings = critical_path(graph)
+    executed = [node for node in graph if node.status == "OK"]
+    lines = [
+        f"{len(executed)} nœud(s) exécuté(s), "
+        f"{sum(node.status == 'SKIPPED' for node in graph)} sauté(s), "
+        f"{sum(node.status in ('FAILED', 'BLOCKED') for node in graph)} en échec / bloqué(s)",
+        f"Durée réelle {elapsed:.1f}s ; cumul des nœuds {sum(node.duration for node in graph):.1f}s ; "
+        f"chemin critique {length:.1f}s",
+    ]
+    if not executed:
+        return "\n".join(lines)
+
+    lines += ["", f"  {'Nœud':<45} {'Statut':<8} {'Début':>7} {'Durée':>7} {'Chaîne':>7} {'Marge':>7}"]
+    for node in sorted(executed, key=lambda n: n.start):
+        path_s, slack_s = timings[node]
+        lines.append(f"  {node.name:<45} {node.status:<8} {node.start:6.1f}s {node.duration:6.1f}s "
+                     f"{path_s:6.1f}s {slack_s:6.1f}s")
+    lines += ["", "Chemin critique :"]
+    lines += [f"  {node.name:<45} {node.duration:6.1f}s" for node in chain if node.duration > 0]
+    return "\n".join(lines)
+
+
+# ============================================================================
+# POINT D'ENTRÉE
+# ============================================================================
+
+def run_pipeline(session, workers=DEFAULT_WORKERS, force=False, dry_run=False, log=print):
+    """Construire le graphe, l'exécuter et historiser l'exécution ; renvoie les nœuds"""
+    for statement in split_statements(read_script(CONTROL_SCRIPT)):
+        session.sql(statement).collect()
+
+    graph = build_graph()
+    run_id = str(uuid.uuid4())
+    log(f"Pipeline {run_id[:8]} : {len(graph)} nœud(s), {len(sources(graph))} source(s)")
+    elapsed = run_graph(session, graph, workers=workers, force=force, dry_run=dry_run, log=log)
+    if dry_run:
+        planned = [node.name for node in graph if node.status == "PLANNED"]
+        log(f"{len(planned)} nœud(s) à reconstruire" + (" :\n  " + "\n  ".join(planned) if planned else ""))
+        return graph
+
+    length, chain, timings = critical_path(graph)
+    record_run(session, graph, run_id, timings, set(chain))
+    log("")
+    log(format_report(graph, elapsed))
+    return graph
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline AnyCompany : exécution parallèle selon les dépendances")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--database", default=None, help="Fichier DuckDB (avec --stage)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Nœuds exécutés en parallèle")
+    parser.add_argument("--force", action="store_true", help="Reconstruire tous les nœuds")
+    parser.add_argument("--dry-run", action="store_true", help="Afficher les nœuds à reconstruire sans rien exécuter")
+    args = parser.parse_args(argv)
+
+    session = get_local_session(args.database, stage_dir=args.stage) if args.stage else get_session()
+    try:
+        graph = run_pipeline(session, workers=args.workers, force=args.force, dry_run=args.dry_run)
+        if not args.dry_run and not any(node.status in ("FAILED", "BLOCKED") for node in graph):
+            # Import différé : pipeline.snapshots dépend de ce module
+            from pipeline.snapshots import publish_after_refresh
+            publish_after_refresh(session)
+            run_profiling(session)
+    finally:
+        session.close()
+    if any(node.status in ("FAILED", "BLOCKED") for node in graph):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+# data_quality.py
+"""
+Profilage incrémental des tables SILVER et détection de dérive.
+
+    python -m pipeline.data_quality                         # lots nouveaux + contrôles
+    python -m pipeline.data_quality --stage data/bronze     # exécution locale (DuckDB)
+    python -m pipeline.data_quality --drift SILVER.inventory_clean
+
+Remplace les contrôles par relecture complète de ETL SQL.sql (section 6 :
+comptes, valeurs manquantes, plages, intégrité temporelle) et de
+SQL analytique.sql (2.1.3, 2.1.4). Pour chaque table de PROFILED_TABLES :
+
+1. les lots de la table (valeurs de sa colonne de lot, ou la table entière)
+   sont listés avec leur version COUNT(*):HASH_AGG(*) ;
+2. seuls les lots nouveaux ou modifiés sont relus (par blocs) et profilés :
+   une esquisse par colonne (pipeline/profile_sketches.py) ;
+3. le total de la table fusionne les esquisses des lots courants, lues dans
+   ANALYTICS.data_quality_profiles (sql/data_quality_profiles.sql) ;
+4. les contrôles SQL du script de profils lisent ces totaux.
+
+detect_drift() compare le dernier lot d'une table à la fusion des autres
+(ou à la version précédente d'une table profilée d'un bloc) : part de
+valeurs manquantes, distribution (distance KS entre t-digests), moyenne,
+valeurs hors de la plage connue, valeurs fréquentes, valeurs nouvelles.
+"""
+import argparse
+import hashlib
+import time
+from datetime import date
+
+import pandas as pd
+
+from pipeline.local_run import run_script
+from pipeline.profile_sketches import (DATE, NUMERIC, TEXT, ColumnProfile, format_value, ks_distance, to_days,
+                                      top_values_distance)
+from pipeline.session import get_local_session, get_session
+from pipeline.sql_script import read_script, split_statements, statement_kind
+
+CONTROL_SCRIPT = "data_quality_profiles.sql"
+PROFILES_TABLE = "ANALYTICS.data_quality_profiles"
+
+# Lot d'une table sans colonne de lot, et total fusionné d'une table
+FULL = "FULL"
+TOTAL = "TOTAL"
+
+# Colonnes d'une ligne de profil (ordre de l'INSERT)
+PROFILE_COLUMNS = [
+    "table_name", "batch_id", "batch_version", "is_current", "column_name", "column_kind",
+    "row_count", "null_count", "distinct_estimate", "min_value", "max_value",
+    "mean_value", "stddev_value", "p05_value", "median_value", "p95_value",
+    "top_values", "sketch", "profiled_at",
+]
+
+# Seuils de dérive (score > seuil -> dérive signalée)
+DRIFT_THRESHOLDS = {
+    "null_rate": 0.05,      # écart absolu de la part de valeurs manquantes
+    "ks": 0.15,             # distance de Kolmogorov-Smirnov entre distributions
+    "mean_shift": 0.5,      # écart des moyennes, en écarts types de la référence
+    "out_of_range": 0.01,   # part des valeurs hors du [min, max] de la référence
+    "top_values": 0.2,      # variation totale entre valeurs fréquentes
+    "new_values": 0.2,      # part des valeurs distinctes absentes de la référence
+}
+
+# Colonne texte à forte cardinalité (identifiant) : valeurs fréquentes et
+# valeurs nouvelles non comparées
+IDENTIFIER_RATIO = 0.5
+
+
+class ProfiledTable:
+    """Table SILVER profilée : colonne de lot (None = table entière) et colonnes ignorées"""
+
+    def __init__(self, table, batch_column=None, exclude=()):
+        self.table = table.upper()
+        self.batch_column = batch_column.upper() if batch_column else None
+        self.exclude = {column.upper() for column in exclude}
+        if self.batch_column:
+            self.exclude.add(self.batch_column)
+
+
+PROFILED_TABLES = [
+    ProfiledTable("SILVER.financial_transactions_clean", batch_column="ingested_at"),
+    ProfiledTable("SILVER.promotions_clean"),
+    ProfiledTable("SILVER.customer_demographics_clean"),
+    ProfiledTable("SILVER.employee_records_clean"),
+    ProfiledTable("SILVER.supplier_information_clean"),
+    ProfiledTable("SILVER.logistics_and_shipping_clean"),
+    ProfiledTable("SILVER.customer_service_interactions_clean", exclude=("description",)),
+    ProfiledTable("SILVER.marketing_campaigns_clean"),
+    ProfiledTable("SILVER.product_reviews_clean", exclude=("review_text",)),
+    ProfiledTable("SILVER.inventory_clean", batch_column="source_file", exclude=("source_record",)),
+    ProfiledTable("SILVER.store_locations_clean"),
+]
+
+# Intégrité temporelle (ancienne section 6.4) : (libellé, table)
+TEMPORAL_CHECKS = [
+    ("Promotions", "SILVER.PROMOTIONS_CLEAN"),
+    ("Campagnes marketing", "SILVER.MARKETING_CAMPAIGNS_CLEAN"),
+]
+
+
+def _batch_expression(spec):
+    return f"COALESCE(CAST({spec.batch_column} AS VARCHAR), 'NULL')" if spec.batch_column else f"'{FULL}'"
+
+
+# ============================================================================
+# LOTS À PROFILER
+# ============================================================================
+
+def list_batches(session, spec):
+    """Lots actuels de la table : {batch_id: version}"""
+    rows = session.sql(
+        f"SELECT {_batch_expression(spec)} AS batch_id, COUNT(*) AS batch_rows, HASH_AGG(*) AS batch_hash "
+        f"FROM {spec.table} GROUP BY 1"
+    ).collect()
+    return {row["BATCH_ID"]: f"{row['BATCH_ROWS']}:{row['BATCH_HASH']}" for row in rows if row["BATCH_ROWS"]}
+
+
+def stored_batches(session, spec):
+    """Lots déjà profilés (courants), total compris : {batch_id: version}"""
+    rows = session.sql(
+        f"SELECT DISTINCT batch_id, batch_version FROM {PROFILES_TABLE} WHERE table_name = ? AND is_current",
+        params=[spec.table]
+    ).collect()
+    return {row["BATCH_ID"]: row["BATCH_VERSION"] for row in rows}
+
+
+def stored_kinds(session, spec):
+    """Type de chaque colonne au dernier total (lots ajoutés profilés de même)"""
+    rows = session.sql(
+        f"SELECT column_name, column_kind FROM {PROFILES_TABLE} "
+        f"WHERE table_name = ? AND is_current AND batch_id = '{TOTAL}'",
+        params=[spec.table]
+    ).collect()
+    return {row["COLUMN_NAME"]: row["COLUMN_KIND"] for row in rows}
+
+
+# ============================================================================
+# PROFILAGE
+# ============================================================================
+
+def profile_batches(session, spec, batch_ids, kinds=None):
+    """Profils des lots demandés, lus par blocs : {batch_id: {colonne: ColumnProfile}}"""
+    kinds = dict(kinds or {})
+    query = f"SELECT {_batch_expression(spec)} AS profile_batch_id, t.* FROM {spec.table} t"
+    params = []
+    if spec.batch_column:
+        query += f" WHERE {_batch_expression(spec)} IN ({', '.join('?' for _ in batch_ids)})"
+        params = list(batch_ids)
+
+    profiles = {}
+    for frame in session.sql(query, params=params or None).to_pandas_batches():
+        frame.columns = [column.upper() for column in frame.columns]
+        columns = [c for c in frame.columns if c != "PROFILE_BATCH_ID" and c not in spec.exclude]
+        for batch_id, rows in frame.groupby("PROFILE_BATCH_ID", sort=False):
+            batch = profiles.setdefault(batch_id, {})
+            for column in columns:
+                profile = ColumnProfile.of(rows[column], kinds.get(column))
+                kinds.setdefault(column, profile.kind)
+                batch[column] = batch[column].merge(profile) if column in batch else profile
+    return profiles
+
+
+def _profile_row(spec, batch_id, version, column, profile, profiled_at):
+    row = {
+        "table_name": spec.table, "batch_id": batch_id, "batch_version": version, "is_current": True,
+        "column_name": column, "sketch": profile.to_json(), "profiled_at": profiled_at,
+    }
+    row.update(profile.summary())
+    return [row[name] for name in PROFILE_COLUMNS]
+
+
+def _insert_profiles(session, rows):
+    if not rows:
+        return
+    values = ", ".join("(" + ", ".join("?" for _ in PROFILE_COLUMNS) + ")" for _ in rows)
+    session.sql(
+        f"INSERT INTO {PROFILES_TABLE} ({', '.join(PROFILE_COLUMNS)}) VALUES {values}",
+        params=[value for row in rows for value in row]
+    ).collect()
+
+
+def _retire(session, spec, batch_ids):
+    """Lots disparus ou remplacés : conservés en historique (is_current = FALSE)"""
+    if batch_ids:
+        session.sql(
+            f"UPDATE {PROFILES_TABLE} SET is_current = FALSE "
+            f"WHERE table_name = ? AND is_current AND batch_id IN ({', '.join('?' for _ in batch_ids)})",
+            params=[spec.table] + list(batch_ids)
+        ).collect()
+
+
+def load_batches(session, table, current_only=True):
+    """Esquisses stockées des lots d'une table (hors total), du plus ancien au plus récent :
+    [(batch_id, batch_version, is_current, {colonne: ColumnProfile})]"""
+    query = (
+        f"SELECT batch_id, batch_version, is_current, column_name, sketch, profiled_at FROM {PROFILES_TABLE} "
+        f"WHERE table_name = ? AND batch_id <> '{TOTAL}'"
+    )
+    if current_only:
+        query += " AND is_current"
+    batches = {}
+    for row in session.sql(query + " ORDER BY profiled_at, batch_id", params=[table.upper()]).collect():
+        key = (row["BATCH_ID"], row["BATCH_VERSION"], bool(row["IS_CURRENT"]))
+        batches.setdefault(key, {})[row["COLUMN_NAME"]] = ColumnProfile.from_json(row["SKETCH"])
+    return [key + (columns,) for key, columns in batches.items()]
+
+
+def merge_profiles(batches):
+    """Fusion colonne par colonne de plusieurs lots {colonne: ColumnProfile}"""
+    merged = {}
+    for columns in batches:
+        for column, profile in columns.items():
+            merged[column] = merged[column].merge(profile) if column in merged else profile
+    return merged
+
+
+def _total_version(current):
+    """Version du total : empreinte des versions des lots courants"""
+    text = "\n".join(f"{batch_id}={version}" for batch_id, version in sorted(current.items()))
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def profile_table(session, spec, log=print):
+    """Profiler les lots nouveaux ou modifiés d'une table puis recalculer son total"""
+    started = time.monotonic()
+    current = list_batches(session, spec)
+    stored = stored_batches(session, spec)
+    stored_total = stored.pop(TOTAL, None)
+    stale = [batch_id for batch_id, version in stored.items() if current.get(batch_id) != version]
+    fresh = [batch_id for batch_id, version in current.items() if stored.get(batch_id) != version]
+    total_version = _total_version(current)
+    if not stale and not fresh and stored_total == total_version:
+        log(f"  {spec.table:<45} inchangée ({len(current)} lot(s))")
+        return {"table": spec.table, "profiled": 0, "retired": 0, "rows": 0}
+
+    profiles = profile_batches(session, spec, fresh, stored_kinds(session, spec)) if fresh else {}
+    profiled_at = pd.Timestamp.now().floor("us").to_pydatetime()
+    # Ordre sûr en cas d'interruption : un lot retiré sans remplaçant est
+    # reprofilé, un total absent ou périmé est recalculé à l'exécution suivante
+    _retire(session, spec, stale)
+    _insert_profiles(session, [
+        _profile_row(spec, batch_id, current[batch_id], column, profile, profiled_at)
+        for batch_id, columns in profiles.items()
+        for column, profile in columns.items()
+    ])
+    # Total : fusion des esquisses stockées, sans relire la table
+    total = merge_profiles(columns for *_, columns in load_batches(session, spec.table))
+    _retire(session, spec, [TOTAL])
+    _insert_profiles(session, [
+        _profile_row(spec, TOTAL, total_version, column, profile, profiled_at)
+        for column, profile in total.items()
+    ])
+    rows = sum(int(current[batch_id].split(":")[0]) for batch_id in fresh)
+    log(f"  {spec.table:<45} {len(fresh)} lot(s) profilé(s) ({rows:,} lignes), "
+        f"{len(stale)} retiré(s) en {time.monotonic() - started:.1f}s")
+    return {"table": spec.table, "profiled": len(fresh), "retired": len(stale), "rows": rows}
+
+
+def temporal_integrity(session, today=None):
+    """Ancienne section 6.4 : dates de début futures et dates de fin passées
+    (estimées sur les t-digests des totaux) ; [(libellé, total, future_start, expired)]"""
+    today = to_days(today or date.today())
+    results = []
+    for label, table in TEMPORAL_CHECKS:
+        rows = session.sql(
+            f"SELECT column_name, sketch FROM {PROFILES_TABLE} "
+            f"WHERE table_name = ? AND batch_id = '{TOTAL}' AND is_current "
+            f"AND column_name IN ('START_DATE', 'END_DATE')",
+            params=[table]
+        ).collect()
+        columns = {row["COLUMN_NAME"]: ColumnProfile.from_json(row["SKETCH"]) for row in rows}
+        if set(columns) != {"START_DATE", "END_DATE"}:
+            continue
+        start, end = columns["START_DATE"], columns["END_DATE"]
+        future = start.present * (1 - start.digest.cdf(today)) if start.present else 0
+        expired = end.present * end.digest.cdf(today - 1) if end.present else 0
+        results.append((label, start.rows, round(future), round(expired)))
+    return results
+
+
+def run_profiling(session, tables=None, log=print):
+    """Profils des lots nouveaux de toutes les tables, puis contrôles du script de profils"""
+    for statement in split_statements(read_script(CONTROL_SCRIPT)):
+        if statement_kind(statement) not in ("SELECT", "WITH"):
+            session.sql(statement).collect()
+    log("Profils de qualité SILVER")
+    reports = [profile_table(session, spec, log=log) for spec in tables or PROFILED_TABLES]
+    run_script(session, CONTROL_SCRIPT, log=lambda line: log("  " + line))
+    for label, total, future, expired in temporal_integrity(session):
+        log(f"    Intégrité temporelle {label} : {total} ligne(s), ≈ {future} début(s) futur(s), "
+            f"≈ {expired} terminée(s)")
+    return reports
+
+
+# ============================================================================
+# DÉTECTION DE DÉRIVE
+# ============================================================================
+
+def _metric(rows, column, metric, baseline, current, score, thresholds):
+    threshold = thresholds[metric]
+    rows.append({
+        "column_name": column, "metric": metric, "baseline": baseline, "current": current,
+        "score": score, "threshold": threshold, "drift": bool(pd.notna(score) and score > threshold),
+    })
+
+
+def compare_profiles(baseline, current, thresholds=None):
+    """Comparer deux profils {colonne: ColumnProfile} ; une ligne par colonne × indicateur"""
+    thresholds = dict(DRIFT_THRESHOLDS, **(thresholds or {}))
+    rows = []
+    for column in sorted(set(baseline) & set(current)):
+        b, c = baseline[column], current[column]
+        _metric(rows, column, "null_rate", b.null_rate, c.null_rate, abs(c.null_rate - b.null_rate), thresholds)
+        if not b.present or not c.present or b.kind != c.kind:
+            continue
+        if b.kind in (NUMERIC, DATE):
+            _metric(rows, column, "ks", format_value(b.quantile(0.5), b.kind), format_value(c.quantile(0.5), c.kind),
+                    ks_distance(b.digest, c.digest), thresholds)
+            below = c.digest.cdf(b.minimum) if c.minimum < b.minimum else 0.0
+            above = 1 - c.digest.cdf(b.maximum) if c.maximum > b.maximum else 0.0
+            outside = below + above
+            _metric(rows, column, "out_of_range", 0.0, outside, outside, thresholds)
+        if b.kind == NUMERIC and b.stddev:
+            _metric(rows, column, "mean_shift", b.mean, c.mean, abs(c.mean - b.mean) / b.stddev, thresholds)
+        distinct = b.hll.estimate()
+        if b.kind == TEXT and distinct / b.present <= IDENTIFIER_RATIO:
+            _metric(rows, column, "top_values", b.topk.top(1), c.topk.top(1),
+                    top_values_distance(b.topk, c.topk, b.present, c.present), thresholds)
+            added = max(b.hll.merge(c.hll).estimate() - distinct, 0)
+            current_distinct = max(c.hll.estimate(), 1)
+            _metric(rows, column, "new_values", distinct, current_distinct,
+                    min(added / current_distinct, 1.0), thresholds)
+    return pd.DataFrame(rows, columns=["column_name", "metric", "baseline", "current", "score", "threshold", "drift"])
+
+
+def detect_drift(session, table, batch_id=None, thresholds=None):
+    """Dérive du lot batch_id (défaut : le plus récent) par rapport aux autres lots courants
+    de la table, ou à sa version précédente s'il est seul (table profilée d'un bloc)"""
+    batches = load_batches(session, table, current_only=False)
+    current = [batch for batch in batches if batch[2]]
+    if batch_id is not None:
+        current = [batch for batch in current if batch[0] == batch_id]
+    if not current:
+        raise ValueError(f"Aucun lot profilé pour {table}" + (f" ({batch_id})" if batch_id else ""))
+    target = current[-1]
+    baseline = [batch[3] for batch in batches if batch[2] and batch[0] != target[0]]
+    if not baseline:
+        previous = [batch[3] for batch in batches if not batch[2] and batch[0] == target[0]]
+        baseline = previous[-1:]
+    if not baseline:
+        return compare_profiles({}, {}, thresholds)
+    return compare_profiles(merge_profiles(baseline), target[3], thresholds)
+
+
+# ============================================================================
+# POINT D'ENTRÉE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profils de qualité incrémentaux des tables SILVER")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--database", default=None, help="Fichier DuckDB (avec --stage)")
+    parser.add_argument("--table", nargs="+", default=None, help="Tables à profiler (défaut : PROFILED_TABLES)")
+    parser.add_argument("--drift", default=None, help="Table dont le dernier lot est comparé aux précédents")
+    parser.add_argument("--batch", default=None, help="Lot comparé (avec --drift)")
+    args = parser.parse_args(argv)
+
+    session = get_local_session(args.database, stage_dir=args.stage) if args.stage else get_session()
+    started = time.monotonic()
+    try:
+        if args.drift:
+            report = detect_drift(session, args.drift, args.batch)
+            with pd.option_context("display.width", 200, "display.max_rows", None):
+                print(report.to_string(index=False) if len(report) else "Aucune référence pour comparer ce lot")
+            return
+        tables = PROFILED_TABLES
+        if args.table:
+            wanted = {name.upper() for name in args.table}
+            tables = [spec for spec in PROFILED_TABLES if spec.table in wanted]
+        run_profiling(session, tables)
+    finally:
+        session.close()
+    print(f"Terminé en {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+# ingestion.py
+"""
+Ingestion incrémentale du stage @BRONZE.food_beverage_stage vers BRONZE.
+
+    python -m pipeline.ingestion                        # nouveaux fichiers + rafraîchissements aval
+    python -m pipeline.ingestion --dry-run              # plan de chargement uniquement
+    python -m pipeline.ingestion --stage data/bronze    # stage local (DuckDB)
+
+Remplace, pour les rafraîchissements, le rechargement complet de ETL SQL.sql
+(CREATE OR REPLACE TABLE puis COPY INTO de chaque fichier) :
+
+1. les fichiers du stage (LIST : nom, md5 / ETag) sont comparés au manifeste
+   BRONZE.ingestion_manifest (sql/bronze_ingestion.sql) ;
+2. par table, en parallèle : ajout des fichiers nouveaux, ou TRUNCATE puis
+   rechargement complet si un fichier déjà chargé a changé ou a disparu du
+   stage (ou si la table n'a encore aucune entrée au manifeste). Les COPY
+   INTO de ETL SQL.sql sont réutilisés tels quels, restreints aux fichiers
+   du lot (FILES = (...)) ;
+3. les lignes rejetées (ON_ERROR = 'CONTINUE') sont copiées dans
+   BRONZE.ingestion_quarantine via TABLE(VALIDATE(...)) ;
+4. seules les instructions SILVER de ETL SQL.sql et les scripts ANALYTICS
+   qui lisent une table modifiée sont relancés ; sales_enriched (et son
+   calendrier, son cube, ses esquisses et ses audiences) passe par le
+   rafraîchissement incrémental, de même que inventory_clean (MERGE par
+   product_id, warehouse) quand seuls des fichiers d'inventaire nouveaux
+   sont chargés ;
+5. les profils de qualité SILVER ne sont calculés que pour les lots
+   nouveaux ou modifiés (pipeline/data_quality.py).
+
+product_reviews.csv est d'abord analysé en Parquet typé (pipeline/product_reviews.py),
+les JSON d'inventaire et de magasins découpés de même (pipeline/json_staging.py),
+puis déposés dans @BRONZE.parsed_stage : sortie identique pour un fichier
+inchangé, donc rechargée seulement si le fichier d'origine a changé.
+
+Les tables BRONZE doivent exister (ETL SQL.sql, ou pipeline.local_run en
+local) : sinon l'ingestion s'arrête avant tout chargement.
+
+Snowflake ne sait pas valider un COPY INTO avec transformation
+(financial_transactions) : ses rejets ne sont alors que comptés au manifeste.
+"""
+import argparse
+import posixpath
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline.data_quality import run_profiling
+from pipeline.json_staging import stage_json_sources
+from pipeline.local_run import EXPLORATORY_SCRIPTS, PIPELINE_SCRIPTS, run_script
+from pipeline.product_reviews import stage_product_reviews
+from pipeline.sales_enriched import format_report, refresh_sales_enriched
+from pipeline.session import get_local_session, get_session
+from pipeline.sql_script import read_script, split_statements, statement_kind
+
+ETL_SCRIPT = "ETL SQL.sql"
+CONTROL_SCRIPT = "bronze_ingestion.sql"
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_FILES = 50
+
+# Scripts remplacés par le rafraîchissement incrémental de sales_enriched
+SALES_ENRICHED_SCRIPTS = (
+    "promo_campaign_calendar.sql", "sales_trends.sql", "sales_rollups.sql", "customer_reach_sketches.sql",
+    "customer_audiences.sql",
+)
+
+# Tables SILVER fusionnées par un script incrémental quand leur table BRONZE
+# ne reçoit que des fichiers nouveaux (APPEND) : table SILVER -> (BRONZE, script)
+INCREMENTAL_SILVER = {
+    "SILVER.INVENTORY_CLEAN": ("BRONZE.INVENTORY_STAGING", "inventory_incremental.sql"),
+    "SILVER.INVENTORY_CLEAN_FILES": ("BRONZE.INVENTORY_STAGING", "inventory_incremental.sql"),
+}
+
+_COPY_TABLE = re.compile(r"^COPY\s+INTO\s+([\w.]+)\s", re.IGNORECASE)
+_STAGE_FILE = re.compile(r"@([\w.]+)/([\w./-]+)")
+_STAGE_URL = re.compile(r"^CREATE\s+(?:OR\s+REPLACE\s+)?STAGE\s+([\w.]+).*?\bURL\s*=\s*'([^']*)'",
+                        re.IGNORECASE | re.DOTALL)
+_CREATE_TARGET = re.compile(
+    r"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:TEMPORARY\s+)?(?:TABLE|VIEW)\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)",
+    re.IGNORECASE
+)
+
+QUARANTINE_SQL = """
+INSERT INTO BRONZE.ingestion_quarantine
+SELECT ?, ?, file, line, column_name, error, rejected_record, ?, CURRENT_TIMESTAMP()
+FROM TABLE(VALIDATE({table}, JOB_ID => '{query_id}'))
+"""
+
+MANIFEST_SQL = """
+MERGE INTO BRONZE.ingestion_manifest m
+USING (
+    SELECT ? AS file_name, ? AS table_name, ? AS file_md5, ? AS file_size, ? AS last_modified,
+           ? AS status, ? AS rows_parsed, ? AS rows_loaded, ? AS errors_seen, ? AS first_error,
+           ? AS load_mode, ? AS copy_query_id, ? AS run_id
+) s
+    ON m.file_name = s.file_name
+WHEN MATCHED THEN UPDATE SET
+    table_name = s.table_name,
+    file_md5 = s.file_md5,
+    file_size = s.file_size,
+    last_modified = s.last_modified,
+    status = s.status,
+    rows_parsed = s.rows_parsed,
+    rows_loaded = s.rows_loaded,
+    errors_seen = s.errors_seen,
+    first_error = s.first_error,
+    load_mode = s.load_mode,
+    copy_query_id = s.copy_query_id,
+    run_id = s.run_id,
+    loaded_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT
+    (file_name, table_name, file_md5, file_size, last_modified, status, rows_parsed, rows_loaded,
+     errors_seen, first_error, load_mode, copy_query_id, run_id, loaded_at)
+VALUES
+    (s.file_name, s.table_name, s.file_md5, s.file_size, s.last_modified, s.status, s.rows_parsed, s.rows_loaded,
+     s.errors_seen, s.first_error, s.load_mode, s.copy_query_id, s.run_id, CURRENT_TIMESTAMP())
+"""
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _references(text, names):
+    """Vrai si le SQL cite l'un des objets (noms qualifiés, en majuscules)"""
+    return any(re.search(r"\b" + re.escape(name) + r"\b", text, re.IGNORECASE) for name in names)
+
+
+# ============================================================================
+# SOURCES : COPY INTO DE ETL SQL.sql
+# ============================================================================
+
+class StageFile:
+    """Fichier listé dans le stage"""
+
+    def __init__(self, name, relative, size, md5, last_modified):
+        self.name = name
+        self.relative = relative
+        self.size = size
+        self.md5 = md5
+        self.last_modified = last_modified
+
+
+class BronzeSource:
+    """Table BRONZE et instruction COPY INTO qui la charge depuis le stage"""
+
+    def __init__(self, table, stage, path, statement):
+        self.table = table.upper()
+        self.stage = stage
+        self.path = path
+        self.statement = statement
+        self.directory, file_name = posixpath.split(path)
+        self.stem, self.extension = posixpath.splitext(file_name)
+
+    def matches(self, relative):
+        """Fichier d'origine, lot daté (stem_*.ext) ou fichier du sous-dossier stem/"""
+        directory, file_name = posixpath.split(relative)
+        stem, extension = posixpath.splitext(file_name)
+        if extension.lower() != self.extension.lower():
+            return False
+        if directory == self.directory:
+            return stem == self.stem or stem.startswith(self.stem + "_")
+        return directory == posixpath.join(self.directory, self.stem)
+
+    def copy_statement(self, files):
+        """COPY INTO d'origine restreint aux fichiers donnés (chemins relatifs au stage)"""
+        location = f"@{self.stage}/{self.directory}" if self.directory else f"@{self.stage}"
+        statement = self.statement.replace(f"@{self.stage}/{self.path}", location, 1)
+        names = ", ".join(_quote(posixpath.relpath(f, self.directory) if self.directory else f) for f in files)
+        return re.sub(r"\bFILE_FORMAT\b", f"FILES = ({names})\nFILE_FORMAT", statement, count=1, flags=re.IGNORECASE)
+
+
+def load_sources(script=ETL_SCRIPT):
+    """Sources BRONZE (COPY INTO du script) et URL des stages déclarés"""
+    sources = []
+    stage_urls = {}
+    for statement in split_statements(read_script(script)):
+        match = _STAGE_URL.match(statement)
+        if match:
+            stage_urls[match.group(1).upper()] = match.group(2)
+        if statement_kind(statement) != "COPY":
+            continue
+        stage_file = _STAGE_FILE.search(statement)
+        sources.append(BronzeSource(_COPY_TABLE.match(statement).group(1), stage_file.group(1),
+                                    stage_file.group(2), statement))
+    return sources, stage_urls
+
+
+def _relative(name, stage, stage_urls):
+    """Chemin relatif au stage d'un nom renvoyé par LIST (URL S3 ou stage/chemin)"""
+    url = stage_urls.get(stage.upper(), "").rstrip("/")
+    if url and name.startswith(url + "/"):
+        return name[len(url) + 1:]
+    return name.split("/", 1)[1] if "/" in name else name
+
+
+def list_stage(session, stage, stage_urls):
+    """Fichiers du stage"""
+    files = []
+    for row in session.sql(f"LIST @{stage}").collect():
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        files.append(StageFile(values["name"], _relative(values["name"], stage, stage_urls),
+                               values.get("size"), values.get("md5"), values.get("last_modified")))
+    return files
+
+
+# ============================================================================
+# PLAN DE CHARGEMENT
+# ============================================================================
+
+class MissingBronzeTables(RuntimeError):
+    """Tables BRONZE des COPY INTO absentes : ETL SQL.sql n'a pas encore été exécuté"""
+
+
+def missing_tables(session, sources):
+    """Tables cibles des sources absentes de la base (noms en majuscules)"""
+    rows = session.sql(
+        "SELECT table_schema, table_name FROM INFORMATION_SCHEMA.TABLES WHERE UPPER(table_schema) = 'BRONZE'"
+    ).collect()
+    existing = set()
+    for row in rows:
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        existing.add(f"{values['table_schema']}.{values['table_name']}".upper())
+    return sorted({source.table for source in sources} - existing)
+
+
+class TablePlan:
+    """Chargement prévu pour une table : APPEND, RELOAD ou UNCHANGED"""
+
+    def __init__(self, source, mode, files, reason=""):
+        self.source = source
+        self.mode = mode
+        self.files = files
+        self.reason = reason
+        self.rows_loaded = 0
+        self.errors_seen = 0
+        self.quarantined = 0
+        self.error = None
+
+    @property
+    def changed(self):
+        return self.mode != "UNCHANGED" and self.error is None
+
+
+def plan_ingestion(session, sources, stage_urls):
+    """Comparer le stage au manifeste et décider du chargement de chaque table"""
+    listing = {}
+    for stage in sorted({source.stage for source in sources}):
+        listing[stage] = list_stage(session, stage, stage_urls)
+
+    manifest = {}
+    for row in session.sql("SELECT file_name, table_name, file_md5 FROM BRONZE.ingestion_manifest").collect():
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        manifest.setdefault(values["table_name"].upper(), {})[values["file_name"]] = values["file_md5"]
+
+    plans = []
+    for source in sources:
+        files = [f for f in listing[source.stage] if source.matches(f.relative)]
+        known = manifest.get(source.table, {})
+        modified = [f for f in files if f.relative in known and known[f.relative] != f.md5]
+        new = [f for f in files if f.relative not in known]
+        # Fichier chargé puis retiré du stage : ses lignes ne doivent plus rester dans BRONZE
+        listed = {f.relative for f in files}
+        removed = sorted(name for name in known if name not in listed)
+        if removed:
+            plans.append(TablePlan(source, "RELOAD", files,
+                                   f"{len(removed)} fichier(s) absent(s) du stage : {removed[0]}"))
+        elif not files:
+            plans.append(TablePlan(source, "UNCHANGED", [], "aucun fichier dans le stage"))
+        elif not known:
+            plans.append(TablePlan(source, "RELOAD", files, "table absente du manifeste"))
+        elif modified:
+            plans.append(TablePlan(source, "RELOAD", files,
+                                   f"{len(modified)} fichier(s) modifié(s) : {modified[0].relative}"))
+        elif new:
+            plans.append(TablePlan(source, "APPEND", new, f"{len(new)} fichier(s) nouveau(x)"))
+        else:
+            plans.append(TablePlan(source, "UNCHANGED", [], "aucun fichier nouveau"))
+    return plans
+
+
+# ============================================================================
+# CHARGEMENT
+# ============================================================================
+
+def _copy_rows(rows, files):
+    """Résultats du COPY INTO par fichier (nom renvoyé = chemin complet ou relatif)"""
+    results = {}
+    for row in rows:
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        if "file" not in values:
+            continue  # "Copy executed with 0 files processed."
+        for f in files:
+            if values["file"] == f.relative or values["file"].endswith("/" + f.relative):
+                results[f.relative] = values
+    return results
+
+
+def ingest_table(session, plan, run_id, batch_files=DEFAULT_BATCH_FILES):
+    """Charger les fichiers prévus d'une table, par lots, puis tenir manifeste et quarantaine"""
+    source = plan.source
+    if plan.mode == "RELOAD":
+        # Manifeste vidé d'abord : un rechargement interrompu sera repris au prochain passage
+        session.sql("DELETE FROM BRONZE.ingestion_manifest WHERE table_name = ?", params=[source.table]).collect()
+        session.sql(f"TRUNCATE TABLE {source.table}").collect()
+
+    for start in range(0, len(plan.files), batch_files):
+        batch = plan.files[start:start + batch_files]
+        job = session.sql(source.copy_statement([f.relative for f in batch])).collect_nowait()
+        results = _copy_rows(job.result(), batch)
+        query_id = getattr(job, "query_id", None)
+
+        if any(int(r.get("errors_seen") or 0) for r in results.values()):
+            try:
+                rows = session.sql(QUARANTINE_SQL.format(table=source.table, query_id=query_id),
+                                   params=[run_id, source.table, query_id]).collect()
+                plan.quarantined += int(rows[0].as_dict().get("number of rows inserted", 0)) if rows else 0
+            except Exception as e:
+                # VALIDATE indisponible (COPY avec transformation) : rejets comptés seulement
+                plan.reason += f" ; quarantaine indisponible ({str(e).splitlines()[0][:80]})"
+
+        for f in batch:
+            values = results.get(f.relative, {})
+            plan.rows_loaded += int(values.get("rows_loaded") or 0)
+            plan.errors_seen += int(values.get("errors_seen") or 0)
+            session.sql(MANIFEST_SQL, params=[
+                f.relative, source.table, f.md5, f.size, f.last_modified,
+                values.get("status", "LOAD_SKIPPED"), values.get("rows_parsed"), values.get("rows_loaded"),
+                values.get("errors_seen"), values.get("first_error"), plan.mode, query_id, run_id,
+            ]).collect()
+    return plan
+
+
+def run_ingestion(session, plans, run_id, workers=DEFAULT_WORKERS, batch_files=DEFAULT_BATCH_FILES, log=print):
+    """Charger les tables en parallèle ; une table en échec n'arrête pas les autres"""
+    pending = [plan for plan in plans if plan.mode != "UNCHANGED"]
+
+    def load(plan):
+        started = time.monotonic()
+        try:
+            ingest_table(session, plan, run_id, batch_files)
+        except Exception as e:
+            plan.error = str(e).splitlines()[0]
+        log(f"  {plan.source.table:<40} {plan.mode:<8} {len(plan.files):>3} fichier(s) "
+            f"{plan.rows_loaded:>10,} ligne(s) {plan.errors_seen:>6,} rejet(s) "
+            f"en {time.monotonic() - started:.1f}s" + (f"  ❌ {plan.error}" if plan.error else ""))
+        return plan
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingestion") as pool:
+        list(pool.map(load, pending))
+    return plans
+
+
+# ============================================================================
+# RAFRAÎCHISSEMENTS AVAL
+# ============================================================================
+
+def _created(text):
+    """Objets créés par un script ou une instruction (noms en majuscules)"""
+    return {match.group(1).upper() for match in
+            (_CREATE_TARGET.match(statement) for statement in split_statements(text)) if match}
+
+
+def downstream_plan(changed_tables, script=ETL_SCRIPT, appended_tables=()):
+    """
+    Instructions SILVER de ETL SQL.sql puis étapes ANALYTICS à relancer, dans
+    l'ordre du pipeline, pour les objets lisant (directement ou non) une table
+    modifiée. Étapes : ("script", nom) ou ("sales_enriched", None). Une table
+    de INCREMENTAL_SILVER dont la source n'a reçu que des fichiers nouveaux
+    (appended_tables) est remplacée côté SILVER par ("script", nom).
+    """
+    changed = {table.upper() for table in changed_tables}
+    appended = {table.upper() for table in appended_tables}
+    silver = []
+    for statement in split_statements(read_script(script)):
+        match = _CREATE_TARGET.match(statement)
+        if match and match.group(1).upper().startswith("SILVER.") and _references(statement, changed):
+            target = match.group(1).upper()
+            source, incremental = INCREMENTAL_SILVER.get(target, (None, None))
+            if source in appended:
+                if ("script", incremental) not in silver:
+                    silver.append(("script", incremental))
+            else:
+                silver.append(statement)
+            changed.add(target)
+
+    steps = []
+    for name in PIPELINE_SCRIPTS:
+        if name == script or name in EXPLORATORY_SCRIPTS:
+            continue
+        text = read_script(name)
+        if not _references(text, changed):
+            continue
+        changed |= _created(text)
+        if name in SALES_ENRICHED_SCRIPTS:
+            if ("sales_enriched", None) not in steps:
+                steps.append(("sales_enriched", None))
+                for other in SALES_ENRICHED_SCRIPTS:
+                    changed |= _created(read_script(other))
+        else:
+            steps.append(("script", name))
+    return silver, steps
+
+
+def run_downstream(session, silver, steps, log=print):
+    """Reconstruire les tables SILVER puis les étapes ANALYTICS concernées"""
+    for statement in silver:
+        if isinstance(statement, tuple):
+            run_script(session, statement[1], log=lambda line: log("  " + line))
+            continue
+        started = time.monotonic()
+        session.sql(statement).collect()
+        log(f"  {_CREATE_TARGET.match(statement).group(1)} en {time.monotonic() - started:.1f}s")
+    for kind, name in steps:
+        if kind == "sales_enriched":
+            log("  ANALYTICS.sales_enriched (incrémental)")
+            log("\n".join("    " + line for line in format_report(refresh_sales_enriched(session)).splitlines()))
+        else:
+            run_script(session, name, log=lambda line: log("  " + line))
+
+
+# ============================================================================
+# POINT D'ENTRÉE
+# ============================================================================
+
+def ingest(session, workers=DEFAULT_WORKERS, batch_files=DEFAULT_BATCH_FILES, dry_run=False,
+           downstream=True, log=print):
+    """Ingestion complète : plan, chargement, rafraîchissements aval ; renvoie les plans"""
+    for statement in split_statements(read_script(CONTROL_SCRIPT)):
+        session.sql(statement).collect()
+
+    sources, stage_urls = load_sources()
+    missing = missing_tables(session, sources)
+    if missing:
+        raise MissingBronzeTables(
+            f"{len(missing)} table(s) BRONZE absente(s) ({', '.join(missing)}) : exécuter d'abord "
+            f"{ETL_SCRIPT} (en local : python -m pipeline.local_run --stage ...)"
+        )
+
+    if not dry_run:
+        # Avis produits et JSON découpés : Parquet déposés dans le stage, rechargés seulement s'ils ont changé
+        stage_product_reviews(session, log=log)
+        stage_json_sources(session, log=log)
+    plans = plan_ingestion(session, sources, stage_urls)
+    run_id = str(uuid.uuid4())
+    log(f"Ingestion {run_id[:8]} : {sum(p.mode != 'UNCHANGED' for p in plans)} table(s) à charger")
+    for plan in plans:
+        log(f"  {plan.source.table:<40} {plan.mode:<9} {plan.reason}")
+    if dry_run or all(plan.mode == "UNCHANGED" for plan in plans):
+        return plans
+
+    log("Chargement BRONZE")
+    run_ingestion(session, plans, run_id, workers=workers, batch_files=batch_files, log=log)
+    quarantined = sum(plan.quarantined for plan in plans)
+    if quarantined:
+        log(f"  {quarantined:,} ligne(s) rejetée(s) en quarantaine (BRONZE.ingestion_quarantine)")
+
+    changed = [plan.source.table for plan in plans if plan.changed]
+    if downstream and changed:
+        appended = [plan.source.table for plan in plans if plan.changed and plan.mode == "APPEND"]
+        silver, steps = downstream_plan(changed, appended_tables=appended)
+        log(f"Rafraîchissements aval : {len(silver)} table(s) SILVER, {len(steps)} étape(s) ANALYTICS")
+        run_downstream(session, silver, steps, log=log)
+        run_profiling(session, log=log)
+    return plans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestion incrémentale du stage vers BRONZE")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--database", default=None, help="Fichier DuckDB (avec --stage)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Tables chargées en parallèle")
+    parser.add_argument("--batch-files", type=int, default=DEFAULT_BATCH_FILES, help="Fichiers par COPY INTO")
+    parser.add_argument("--dry-run", action="store_true", help="Afficher le plan sans rien charger")
+    parser.add_argument("--no-downstream", action="store_true", help="Ne pas rafraîchir SILVER / ANALYTICS")
+    args = parser.parse_args(argv)
+
+    session = get_local_session(args.database, stage_dir=args.stage) if args.stage else get_session()
+    started = time.monotonic()
+    try:
+        plans = ingest(session, workers=args.workers, batch_files=args.batch_files,
+                       dry_run=args.dry_run, downstream=not args.no_downstream)
+    except MissingBronzeTables as e:
+        raise SystemExit(str(e))
+    finally:
+        session.close()
+    print(f"Terminé en {time.monotonic() - started:.1f}s")
+    if any(plan.error for plan in plans):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
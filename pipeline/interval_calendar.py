@@ -0,0 +1,121 @@
+# interval_calendar.py
+"""
+Calendrier région × jour des promotions et campagnes actives (pandas / NumPy).
+
+Équivalent local de sql/promo_campaign_calendar.sql et de la jointure de
+sales_enriched, pour tester l'enrichissement sans entrepôt :
+
+    calendar = build_calendar(promotions_df, campaigns_df)
+    enriched = enrich_sales(transactions_df, calendar)
+
+Chaque fenêtre [start_date, end_date] est développée jour par jour
+(np.repeat + décalages), les chevauchements sont résolus par la règle
+ci-dessous, puis les ventes sont jointes par égalité sur (region, date) :
+le coût devient linéaire en transactions + jours de fenêtres, au lieu de
+transactions × fenêtres pour une jointure BETWEEN.
+
+Règle de résolution des chevauchements (identique au SQL) :
+- promotion : plus forte remise, puis start_date la plus récente, puis promotion_id croissant
+- campagne  : start_date la plus récente, puis plus gros budget, puis campaign_id croissant
+
+Colonnes en minuscules, comme dans les tables SILVER.
+"""
+import numpy as np
+import pandas as pd
+
+PROMOTION_COLUMNS = {
+    "promotion_id": "promotion_id",
+    "product_category": "promo_product_category",
+    "promotion_type": "promotion_type",
+    "discount_percentage": "discount_percentage",
+    "start_date": "promo_start_date",
+    "end_date": "promo_end_date",
+}
+
+CAMPAIGN_COLUMNS = {
+    "campaign_id": "campaign_id",
+    "campaign_name": "campaign_name",
+    "campaign_type": "campaign_type",
+    "product_category": "campaign_product_category",
+    "target_audience": "campaign_target",
+    "budget": "campaign_budget",
+    "reach": "campaign_reach",
+    "conversion_rate": "campaign_conversion_rate",
+}
+
+# (colonne, croissant) - départage final sur l'identifiant
+PROMOTION_PRIORITY = [("discount_percentage", False), ("start_date", False), ("promotion_id", True)]
+CAMPAIGN_PRIORITY = [("start_date", False), ("budget", False), ("campaign_id", True)]
+
+KEY = ["region", "calendar_date"]
+
+
+# ============================================================================
+# DÉVELOPPEMENT DES FENÊTRES
+# ============================================================================
+
+def expand_windows(windows):
+    """Une ligne par (fenêtre, jour) entre start_date et end_date inclus"""
+    start = pd.to_datetime(windows["start_date"])
+    end = pd.to_datetime(windows["end_date"])
+    valid = windows["region"].notna() & start.notna() & end.notna() & (start <= end)
+    windows = windows[valid]
+    start = start[valid].to_numpy().astype("datetime64[D]")
+    end = end[valid].to_numpy().astype("datetime64[D]")
+
+    lengths = (end - start).astype(np.int64) + 1
+    rows = np.repeat(np.arange(len(windows)), lengths)
+    # Décalage de chaque jour dans sa fenêtre : 0, 1, ..., longueur - 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    expanded = windows.iloc[rows].reset_index(drop=True)
+    expanded["calendar_date"] = (start[rows] + offsets.astype("timedelta64[D]")).astype("datetime64[ns]")
+    return expanded
+
+
+def resolve_overlaps(days, priority, count_column):
+    """Garder une ligne par (region, jour) selon la priorité, avec le nombre d'actifs"""
+    counts = days.groupby(KEY, sort=False).size().rename(count_column)
+    columns = [column for column, _ in priority]
+    ordered = days.sort_values(columns, ascending=[asc for _, asc in priority], na_position="last", kind="mergesort")
+    # Tri stable : le premier de chaque groupe est le prioritaire
+    ordered = ordered.sort_values(KEY, kind="mergesort")
+    winners = ordered.drop_duplicates(KEY, keep="first")
+    return winners.join(counts, on=KEY)
+
+
+# ============================================================================
+# CALENDRIER ET ENRICHISSEMENT
+# ============================================================================
+
+def build_calendar(promotions, campaigns):
+    """Calendrier (region, calendar_date) -> promotion et campagne retenues"""
+    promo = resolve_overlaps(expand_windows(promotions), PROMOTION_PRIORITY, "active_promotion_count")
+    promo = promo[KEY + list(PROMOTION_COLUMNS) + ["active_promotion_count"]].rename(columns=PROMOTION_COLUMNS)
+
+    camp = resolve_overlaps(expand_windows(campaigns), CAMPAIGN_PRIORITY, "active_campaign_count")
+    camp = camp[KEY + list(CAMPAIGN_COLUMNS) + ["active_campaign_count"]].rename(columns=CAMPAIGN_COLUMNS)
+
+    calendar = promo.merge(camp, on=KEY, how="outer")
+    for column in ("active_promotion_count", "active_campaign_count"):
+        calendar[column] = calendar[column].fillna(0).astype(np.int64)
+    return calendar.sort_values(KEY, kind="mergesort").reset_index(drop=True)
+
+
+def enrich_sales(transactions, calendar):
+    """Ventes enrichies (colonnes promotion / campagne de sales_enriched)"""
+    sales = transactions[transactions["transaction_type"] == "Sale"].copy()
+    sales["calendar_date"] = pd.to_datetime(sales["transaction_date"]).astype("datetime64[ns]")
+    enriched = sales.merge(calendar, on=KEY, how="left", validate="many_to_one").drop(columns="calendar_date")
+
+    for column in ("active_promotion_count", "active_campaign_count"):
+        enriched[column] = enriched[column].fillna(0).astype(np.int64)
+    enriched["has_promotion"] = enriched["promotion_id"].notna().astype(np.int64)
+    enriched["discount_rate"] = enriched["discount_percentage"].fillna(0)
+    enriched["has_campaign"] = enriched["campaign_id"].notna().astype(np.int64)
+    enriched["net_amount"] = enriched["amount"] * (1 - enriched["discount_rate"] / 100.0)
+    conversion = enriched["campaign_conversion_rate"]
+    enriched["estimated_campaign_impact"] = np.where(
+        enriched["campaign_id"].notna() & (conversion > 0), enriched["amount"] * conversion, 0.0
+    )
+    return enriched
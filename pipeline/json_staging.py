@@ -0,0 +1,493 @@
+# json_staging.py
+"""
+Découpage en flux des fichiers JSON du stage (inventory, store_locations) en
+un enregistrement typé par ligne (remplace VARIANT + LATERAL FLATTEN).
+
+    python -m pipeline.json_staging --stage data/bronze          # stage local
+    python -m pipeline.json_staging                              # stage Snowflake
+    python -m pipeline.json_staging --input inventory.json --out /tmp/parsed   # fichier d'essai
+
+Chaque fichier (inventory.json, lots inventory_*.json ou inventory/*.json)
+est lu une seule fois, par blocs de --block-mb, sans jamais être chargé
+entier :
+
+1. le tableau JSON de premier niveau ([{...}, {...}]) est découpé élément
+   par élément (json.JSONDecoder.raw_decode sur le tampon courant) ; un
+   fichier d'objets successifs (NDJSON) est accepté aussi. Mémoire : un bloc
+   plus un enregistrement (au plus MAX_RECORD_MB) ;
+2. chaque enregistrement est validé contre le schéma de sa table BRONZE
+   (SOURCES : VARCHAR(n), NUMBER, DECIMAL(p,s), DATE), avec les conversions
+   des anciens ::NUMBER / ::DATE ; objet invalide, champ non convertible,
+   texte trop long ou clé absente : rejet avec rang et motif ;
+3. les lignes valides sont écrites par lots dans parsed/<fichier>.parquet,
+   les rejets dans parsed/rejected_<fichier>.parquet. Une erreur de syntaxe
+   arrête la lecture du fichier : les enregistrements précédents sont
+   conservés, la suite est rejetée en une ligne.
+
+Les fichiers sont traités en parallèle (--workers processus, un fichier par
+processus). Un fichier dont les Parquet sont plus récents que lui n'est pas
+relu ; la sortie ne dépend que du fichier source : un fichier inchangé
+donne des Parquet identiques (rien à recharger pour pipeline.ingestion).
+
+ETL SQL.sql charge ces Parquet (COPY INTO depuis @BRONZE.parsed_stage) dans
+BRONZE.inventory_staging / store_locations_staging et leurs tables de rejets.
+"""
+import argparse
+import codecs
+import json
+import os
+import posixpath
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from email.utils import parsedate_to_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle : uniquement pour le découpage des JSON
+    pa = pq = None
+
+from pipeline.product_reviews import (
+    DEFAULT_WORKERS, PARSED_DIR, PARSED_STAGE, SOURCE_STAGE, https_url, open_source, stage_url,
+)
+from pipeline.session import get_session
+
+REJECTS_PREFIX = "rejected_"
+
+DEFAULT_BLOCK_MB = 8
+MAX_RECORD_MB = 64
+BATCH_ROWS = 50_000
+
+_SPACE = re.compile(r"[ \t\r\n]*")
+_SQL_TYPE = re.compile(r"^(VARCHAR|NUMBER|DECIMAL|DATE)(?:\((\d+)(?:,(\d+))?\))?$")
+
+
+class JsonSource:
+    """Fichiers JSON d'une table BRONZE et schéma typé de leurs enregistrements"""
+
+    def __init__(self, name, table, key, fields):
+        self.name = name        # inventory -> inventory.json, inventory_*.json, inventory/*.json
+        self.table = table
+        self.key = key          # champ obligatoire
+        self.fields = fields    # [(champ, type SQL)] : même ordre que la table BRONZE
+        self.key_index = [field for field, _ in fields].index(key)
+
+    def matches(self, relative):
+        """Fichier d'origine, lot daté (name_*.json) ou fichier du sous-dossier name/"""
+        directory, file_name = posixpath.split(relative)
+        stem, extension = posixpath.splitext(file_name)
+        if extension.lower() != ".json":
+            return False
+        if directory == "":
+            return stem == self.name or stem.startswith(self.name + "_")
+        return directory == self.name
+
+    def schema(self):
+        types = {"VARCHAR": pa.string(), "NUMBER": pa.int64(), "DATE": pa.date32()}
+        columns = []
+        for name, sql_type in self.fields:
+            kind, precision, scale = _column_type(sql_type)
+            columns.append((name, pa.decimal128(precision, scale) if kind == "DECIMAL" else types[kind]))
+        return pa.schema(columns + [("source_file", pa.string()), ("source_record", pa.int64())])
+
+
+# Même ordre et mêmes types que BRONZE.inventory_staging / store_locations_staging
+SOURCES = [
+    JsonSource("inventory", "BRONZE.inventory_staging", "product_id", [
+        ("product_id", "VARCHAR(50)"),
+        ("product_category", "VARCHAR(100)"),
+        ("region", "VARCHAR(100)"),
+        ("country", "VARCHAR(100)"),
+        ("warehouse", "VARCHAR(100)"),
+        ("current_stock", "NUMBER"),
+        ("reorder_point", "NUMBER"),
+        ("lead_time", "NUMBER"),
+        ("last_restock_date", "DATE"),
+    ]),
+    JsonSource("store_locations", "BRONZE.store_locations_staging", "store_id", [
+        ("store_id", "VARCHAR(50)"),
+        ("store_name", "VARCHAR(100)"),
+        ("store_type", "VARCHAR(50)"),
+        ("region", "VARCHAR(100)"),
+        ("country", "VARCHAR(100)"),
+        ("city", "VARCHAR(100)"),
+        ("address", "VARCHAR(200)"),
+        ("postal_code", "NUMBER"),
+        ("square_footage", "DECIMAL(10,2)"),
+        ("employee_count", "NUMBER"),
+    ]),
+]
+
+if pa is not None:
+    REJECTS_SCHEMA = pa.schema([
+        ("source_file", pa.string()),
+        ("source_record", pa.int64()),
+        ("error", pa.string()),
+        ("rejected_record", pa.string()),
+    ])
+
+
+@lru_cache(maxsize=None)
+def _column_type(sql_type):
+    """'DECIMAL(10,2)' -> ('DECIMAL', 10, 2)"""
+    kind, precision, scale = _SQL_TYPE.match(sql_type).groups()
+    return kind, int(precision) if precision else None, int(scale) if scale else None
+
+
+def output_paths(relative):
+    """inventory_2024.json -> (inventory_2024.parquet, rejected_inventory_2024.parquet) dans parsed/"""
+    parquet = posixpath.splitext(relative)[0] + ".parquet"
+    return posixpath.join(PARSED_DIR, parquet), posixpath.join(PARSED_DIR, REJECTS_PREFIX + parquet)
+
+
+# ============================================================================
+# DÉCOUPAGE EN FLUX
+# ============================================================================
+
+class JsonSyntaxError(ValueError):
+    """JSON mal formé : rang de l'enregistrement en cours, position et extrait"""
+
+    def __init__(self, message, record, excerpt):
+        super().__init__(message)
+        self.record = record
+        self.excerpt = excerpt
+
+
+def iter_records(stream, block_bytes=DEFAULT_BLOCK_MB << 20, max_record_bytes=MAX_RECORD_MB << 20):
+    """
+    (rang, valeur, texte) de chaque élément du tableau de premier niveau (ou
+    de chaque valeur d'un fichier NDJSON), en flux.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    # line / column : position dans le fichier du début du tampon (messages d'erreur)
+    text, position, line, column, eof, record = "", 0, 1, 0, False, 0
+
+    def more():
+        nonlocal text, position, line, column, eof
+        if eof:
+            return False
+        block = stream.read(block_bytes)
+        eof = not block
+        try:
+            decoded = utf8.decode(block, final=eof)
+        except UnicodeDecodeError as e:
+            fail(f"encodage UTF-8 invalide ({e.reason})", len(text))
+        newline = text.rfind("\n", 0, position)
+        line += text.count("\n", 0, position)
+        column = position - newline - 1 if newline >= 0 else column + position
+        text, position = text[position:] + decoded, 0
+        return True
+
+    def fail(message, at):
+        newline = text.rfind("\n", 0, at)
+        line_at = line + text.count("\n", 0, at)
+        column_at = at - newline if newline >= 0 else column + at + 1
+        raise JsonSyntaxError(f"JSON mal formé : {message} (ligne {line_at}, colonne {column_at})",
+                              record + 1, text[position:position + 1000])
+
+    def peek():
+        nonlocal position
+        while True:
+            position = _SPACE.match(text, position).end()
+            if position < len(text) or not more():
+                return text[position:position + 1]
+
+    in_array = peek() == "["
+    if in_array:
+        position += 1
+    expect_value = True
+    while True:
+        char = peek()
+        if in_array:
+            if char == "]" and (record == 0 or not expect_value):
+                position += 1
+                if peek():
+                    fail("données après la fin du tableau", position)
+                return
+            if char == "":
+                fail("fin de fichier dans le tableau", position)
+            if not expect_value:
+                if char != ",":
+                    fail("',' ou ']' attendu", position)
+                position += 1
+                expect_value = True
+                continue
+        elif char == "":
+            return
+
+        # Valeur complète : décodage réussi avant la fin du tampon (un nombre
+        # coupé par le bloc serait sinon lu tronqué), sinon lecture d'un bloc de plus
+        while True:
+            try:
+                value, end = decoder.raw_decode(text, position)
+                if end < len(text) or eof:
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    fail(e.msg, e.pos)
+                if len(text) - position > max_record_bytes:
+                    fail(f"enregistrement de plus de {max_record_bytes >> 20} Mo", position)
+            more()
+        record += 1
+        yield record, value, text[position:end]
+        position = end
+        expect_value = False
+
+
+# ============================================================================
+# VALIDATION DES ENREGISTREMENTS
+# ============================================================================
+
+def _number(value):
+    """Valeur JSON -> Decimal (nombre ou texte numérique)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{type(value).__name__} au lieu d'un nombre")
+    try:
+        number = Decimal(value.strip() if isinstance(value, str) else repr(value))
+    except InvalidOperation:
+        raise ValueError(f"« {value} » n'est pas un nombre") from None
+    if not number.is_finite():
+        raise ValueError(f"« {value} » n'est pas un nombre")
+    return number
+
+
+def convert(value, sql_type):
+    """Conversion d'une valeur JSON vers le type SQL de la colonne (ValueError sinon)"""
+    if value is None:
+        return None
+    kind, precision, scale = _column_type(sql_type)
+    if kind == "VARCHAR":
+        if type(value) is not str:
+            if isinstance(value, (dict, list)):
+                raise ValueError(f"{type(value).__name__} au lieu d'un texte")
+            value = json.dumps(value)
+        if precision is not None and len(value) > precision:
+            raise ValueError(f"{len(value)} caractères (maximum {precision})")
+        return value
+    if kind == "NUMBER":
+        # Arrondi au plus proche, comme ::NUMBER
+        number = value if type(value) is int else int(_number(value).to_integral_value(ROUND_HALF_UP))
+        if not -(1 << 63) <= number < 1 << 63:
+            raise ValueError(f"{number} hors limites")
+        return number
+    if kind == "DECIMAL":
+        number = _number(value).quantize(Decimal(1).scaleb(-scale), ROUND_HALF_UP)
+        if abs(number) >= Decimal(10) ** (precision - scale):
+            raise ValueError(f"{number} hors limites de {sql_type}")
+        return number
+    if type(value) is not str:
+        raise ValueError(f"{type(value).__name__} au lieu d'une date")
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"« {value} » n'est pas une date ISO") from None
+
+
+def validate(source, value):
+    """Enregistrement -> valeurs typées dans l'ordre de source.fields (ValueError sinon)"""
+    if not isinstance(value, dict):
+        raise ValueError(f"{type(value).__name__} au lieu d'un objet")
+    row = []
+    try:
+        for name, sql_type in source.fields:
+            row.append(convert(value.get(name), sql_type))
+    except ValueError as e:
+        raise ValueError(f"{name} : {e}") from None
+    if row[source.key_index] in (None, ""):
+        raise ValueError(f"{source.key} absent")
+    return row
+
+
+# ============================================================================
+# DÉCOUPAGE D'UN FICHIER (PROCESSUS DE TRAVAIL)
+# ============================================================================
+
+class _BatchWriter:
+    """Colonnes accumulées puis écrites par lots de BATCH_ROWS lignes"""
+
+    def __init__(self, path, schema):
+        self.writer = pq.ParquetWriter(path, schema)
+        self.schema = schema
+        self.rows = []
+        self.count = 0
+
+    def append(self, row):
+        self.rows.append(row)
+        self.count += 1
+        if len(self.rows) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            columns = list(zip(*self.rows))
+            self.writer.write_table(pa.table(
+                {name: list(column) for name, column in zip(self.schema.names, columns)}, schema=self.schema
+            ))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def split_file(task):
+    """
+    Découper un fichier : (source, emplacement, nom relatif, Parquet des
+    lignes, Parquet des rejets, taille des blocs) -> rapport (dict).
+    """
+    source, location, relative, rows_path, rejects_path, block_bytes = task
+    started = time.monotonic()
+    for path in (rows_path, rejects_path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = _BatchWriter(rows_path, source.schema())
+    rejects = _BatchWriter(rejects_path, REJECTS_SCHEMA)
+    try:
+        with open_source(location) as stream:
+            try:
+                for record, value, text in iter_records(stream, block_bytes):
+                    try:
+                        rows.append(validate(source, value) + [relative, record])
+                    except ValueError as e:
+                        rejects.append([relative, record, str(e), text[:1000]])
+            except JsonSyntaxError as e:
+                rejects.append([relative, e.record, str(e), e.excerpt])
+    finally:
+        rows.close()
+        rejects.close()
+    return {"source": source.name, "file": relative, "rows": rows.count, "rejects": rejects.count,
+            "seconds": time.monotonic() - started}
+
+
+def split_files(tasks, workers=DEFAULT_WORKERS):
+    """Découper plusieurs fichiers, un par processus ; rapports dans l'ordre des tâches"""
+    if pa is None:
+        raise ImportError("Le découpage des JSON nécessite pyarrow : pip install pyarrow")
+    if workers <= 1 or len(tasks) <= 1:
+        return [split_file(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(split_file, tasks))
+
+
+# ============================================================================
+# STAGE
+# ============================================================================
+
+def _source_of(relative):
+    return next((source for source in SOURCES if source.matches(relative)), None)
+
+
+def _local_tasks(stage_dir, block_bytes, force=False):
+    """Fichiers JSON du dossier de stage dont les Parquet sont absents ou plus anciens"""
+    tasks = []
+    for directory, subdirectories, files in os.walk(stage_dir):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith(".") and d != PARSED_DIR)
+        for file_name in sorted(files):
+            path = os.path.join(directory, file_name)
+            relative = os.path.relpath(path, stage_dir).replace(os.sep, "/")
+            source = _source_of(relative)
+            if source is None:
+                continue
+            outputs = [os.path.join(stage_dir, *p.split("/")) for p in output_paths(relative)]
+            if not force and all(os.path.exists(p) and os.path.getmtime(p) >= os.path.getmtime(path)
+                                 for p in outputs):
+                continue
+            tasks.append((source, path, relative) + tuple(outputs) + (block_bytes,))
+    return tasks
+
+
+def _listing(session, location):
+    """LIST -> {nom: date de modification}"""
+    files = {}
+    for row in session.sql(f"LIST {location}").collect():
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        files[values["name"]] = parsedate_to_datetime(values["last_modified"])
+    return files
+
+
+def _stage_tasks(session, directory, block_bytes, force=False):
+    """Fichiers JSON du stage externe (lus en HTTPS) dont les Parquet sont absents ou plus anciens"""
+    url = stage_url(session)
+    parsed = {name.split("/", 1)[1]: modified
+              for name, modified in _listing(session, f"@{PARSED_STAGE}/{PARSED_DIR}/").items()}
+    tasks = []
+    for name, modified in sorted(_listing(session, f"@{SOURCE_STAGE}").items()):
+        relative = name[len(url):] if name.startswith(url) else name
+        source = _source_of(relative)
+        if source is None:
+            continue
+        outputs = output_paths(relative)
+        if not force and all(p in parsed and parsed[p] >= modified for p in outputs):
+            continue
+        tasks.append((source, https_url(url + relative), relative)
+                     + tuple(os.path.join(directory, *p.split("/")) for p in outputs) + (block_bytes,))
+    return tasks
+
+
+def stage_json_sources(session, workers=DEFAULT_WORKERS, block_mb=DEFAULT_BLOCK_MB, force=False, log=print):
+    """
+    Découper les fichiers JSON du stage et déposer les Parquet lus par
+    ETL SQL.sql (section 4.10) ; renvoie les rapports des fichiers découpés.
+    """
+    stage_dir = getattr(session, "stage_dir", None)
+    if stage_dir:
+        reports = split_files(_local_tasks(stage_dir, block_mb << 20, force), workers)
+    else:
+        session.sql(f"CREATE STAGE IF NOT EXISTS {PARSED_STAGE}").collect()
+        with tempfile.TemporaryDirectory(prefix="json_staging_") as directory:
+            tasks = _stage_tasks(session, directory, block_mb << 20, force)
+            reports = split_files(tasks, workers)
+            for task in tasks:
+                for path in task[3:5]:
+                    target = posixpath.dirname(os.path.relpath(path, directory).replace(os.sep, "/"))
+                    session.file.put(path, f"@{PARSED_STAGE}/{target}", auto_compress=False, overwrite=True)
+    for report in reports:
+        log(f"  {report['file']} : {report['rows']:,} enregistrement(s), {report['rejects']:,} rejet(s) "
+            f"en {report['seconds']:.1f}s")
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Découpage des JSON du stage en Parquet typé")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--input", default=None, help="Fichier JSON à découper (sans session)")
+    parser.add_argument("--out", default=None, help="Dossier de sortie (avec --input)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Fichiers découpés en parallèle")
+    parser.add_argument("--block-mb", type=int, default=DEFAULT_BLOCK_MB, help="Taille des blocs lus (Mo)")
+    parser.add_argument("--force", action="store_true", help="Redécouper aussi les fichiers à jour")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        relative = os.path.basename(args.input)
+        source = _source_of(relative)
+        if source is None:
+            raise SystemExit(f"{relative} : aucune source JSON ({', '.join(s.name for s in SOURCES)})")
+        out_dir = args.out or os.path.dirname(os.path.abspath(args.input))
+        outputs = [os.path.join(out_dir, *p.split("/")[1:]) for p in output_paths(relative)]
+        report = split_file((source, args.input, relative, *outputs, args.block_mb << 20))
+        print(f"{args.input} : {report['rows']:,} enregistrement(s), {report['rejects']:,} rejet(s) "
+              f"en {report['seconds']:.1f}s -> {out_dir}")
+        return
+
+    if args.stage:
+        tasks = _local_tasks(args.stage, args.block_mb << 20, args.force)
+        for report in split_files(tasks, args.workers):
+            print(f"{report['file']} : {report['rows']:,} enregistrement(s), {report['rejects']:,} rejet(s) "
+                  f"en {report['seconds']:.1f}s")
+        print(f"{len(tasks)} fichier(s) découpé(s)")
+        return
+
+    session = get_session()
+    try:
+        stage_json_sources(session, args.workers, args.block_mb, args.force)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# local_run.py
+"""
+Exécution locale de bout en bout des scripts sql/ (DuckDB, sans entrepôt).
+
+    python -m pipeline.local_run --stage data/bronze
+    python -m pipeline.local_run --stage data/bronze --database local/anycompany.duckdb
+
+    ANYCOMPANY_BACKEND=local streamlit run streamlit/promotion_analysis.py
+
+Le dossier de stage contient les copies locales des fichiers du stage S3
+(financial_transactions.csv, promotions-data.csv, inventory.json...), au
+format d'origine ou en Parquet de même nom ; product_reviews.csv est
+d'abord analysé dans parsed/ (pipeline/product_reviews.py), inventory.json et
+store_locations.json y sont découpés (pipeline/json_staging.py). Les scripts sont
+exécutés dans l'ordre de PIPELINE_SCRIPTS ; les tables SILVER sont profilées
+après ETL SQL.sql (pipeline/data_quality.py) ; les résultats des tests de
+qualité sont affichés. Les SELECT en échec, et toute instruction en échec
+d'un script exploratoire, sont signalés sans interrompre le pipeline ; toute
+autre instruction en échec l'arrête.
+"""
+import argparse
+import time
+from contextlib import nullcontext
+
+from pipeline.json_staging import stage_json_sources
+from pipeline.product_reviews import stage_product_reviews
+from pipeline.session import DEFAULT_LOCAL_DATABASE, get_local_session
+from pipeline.sql_script import read_script, split_statements, statement_kind
+
+PIPELINE_SCRIPTS = [
+    "ETL SQL.sql",                  # BRONZE -> SILVER
+    "promo_campaign_calendar.sql",  # calendrier région × jour
+    "promotion_day_calendar.sql",   # calendrier promotion × jour
+    "sales_trends.sql",             # ANALYTICS.sales_enriched
+    "sales_rollups.sql",            # ANALYTICS.sales_daily_rollup
+    "customer_reach_sketches.sql",  # ANALYTICS.customer_reach_sketches
+    "customer_audiences.sql",       # ANALYTICS.customer_audiences
+    "promotion_impact.sql",         # ANALYTICS.promotions_active
+    "customers_marketing.sql",      # ANALYTICS.marketing_performance
+    "sales_star_export.sql",        # ANALYTICS.export_* (export BI)
+    "SQL analytique.sql",           # vues SILVER d'analyse
+]
+
+# Chargement BRONZE et nettoyage SILVER
+BRONZE_SCRIPT = "ETL SQL.sql"
+
+# Analyses exploratoires : aucune table du pipeline n'en dépend
+EXPLORATORY_SCRIPTS = ("SQL analytique.sql",)
+
+
+def _head(statement):
+    return " ".join(statement.split())[:70]
+
+
+def run_script(session, name, log=print, wrap=None):
+    """
+    Exécuter un script ; renvoie (instructions exécutées, instructions ignorées).
+    wrap(name, statement) : gestionnaire de contexte optionnel autour de
+    chaque instruction (mesures des benchmarks). Table du script publiée en
+    blue/green : ses instructions de publication sont remplacées par un
+    rafraîchissement (pipeline/blue_green.py).
+    """
+    # Import différé : pipeline.blue_green dépend de ce module (via pipeline.snapshots)
+    from pipeline.blue_green import published_table, refresh
+
+    executed = 0
+    failed = []
+    started = time.monotonic()
+    log(f"  {name}")
+    published = published_table(session, name)
+    refreshed = False
+    for statement in split_statements(read_script(name)):
+        if published is not None and published.refreshed_by(statement):
+            if not refreshed:
+                refresh(session, published, log=lambda line: log("    " + line))
+                executed += 1
+                refreshed = True
+            continue
+        kind = statement_kind(statement)
+        try:
+            with wrap(name, statement) if wrap is not None else nullcontext():
+                rows = session.sql(statement).collect()
+        except Exception as e:
+            if kind not in ("SELECT", "WITH") and name not in EXPLORATORY_SCRIPTS:
+                raise RuntimeError(f"{name} : échec de « {_head(statement)} » : {e}") from e
+            failed.append((_head(statement), str(e).splitlines()[0]))
+            log(f"    ⚠️ Instruction ignorée ({failed[-1][0]}) : {failed[-1][1]}")
+            continue
+        executed += 1
+        for row in rows:
+            values = row.as_dict()
+            if "TEST_RESULT" in values:
+                log(f"    {values.get('TEST_NAME')} : {values['TEST_RESULT']}")
+
+    log(f"    {executed} instruction(s) en {time.monotonic() - started:.1f}s, {len(failed)} ignorée(s)")
+    return executed, failed
+
+
+def run_pipeline(session, scripts=None, log=print, wrap=None):
+    """Exécuter les scripts du pipeline dans l'ordre"""
+    scripts = scripts or PIPELINE_SCRIPTS
+    if BRONZE_SCRIPT in scripts:
+        # Avis produits et JSON découpés en Parquet avant leur COPY INTO (sections 4.9, 4.10)
+        stage_product_reviews(session, log=log)
+        stage_json_sources(session, log=log)
+    for name in scripts:
+        run_script(session, name, log=log, wrap=wrap)
+        if name == BRONZE_SCRIPT:
+            # Profils de qualité SILVER (lus par SQL analytique.sql) ;
+            # import différé : pipeline.data_quality dépend de ce module
+            from pipeline.data_quality import run_profiling
+            run_profiling(session, log=log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline AnyCompany en local (DuckDB)")
+    parser.add_argument("--stage", required=True, help="Dossier des copies locales des fichiers bronze")
+    parser.add_argument("--database", default=None, help=f"Fichier DuckDB (défaut : {DEFAULT_LOCAL_DATABASE})")
+    parser.add_argument("--scripts", nargs="+", default=None, help="Scripts à exécuter (défaut : tout le pipeline)")
+    args = parser.parse_args(argv)
+
+    session = get_local_session(args.database, stage_dir=args.stage)
+    started = time.monotonic()
+    try:
+        print(f"Pipeline local -> {session.database}")
+        run_pipeline(session, args.scripts)
+        # Import différé : pipeline.snapshots dépend de ce module
+        from pipeline.snapshots import publish_after_refresh
+        publish_after_refresh(session)
+    finally:
+        session.close()
+    print(f"Terminé en {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,730 @@
+# local_session.py
+"""
+Session locale (DuckDB) remplaçant la session Snowpark hors de Snowflake.
+
+Implémente le sous-ensemble de l'API Snowpark utilisé par le projet :
+
+    session = LocalSession("local/anycompany.duckdb", stage_dir="data/bronze")
+    session.sql(query, params=[...]).to_pandas()
+    session.sql(query).collect()          # lignes Row (as_dict())
+    session.sql(query).collect_nowait()   # job : result("pandas"), cancel()
+    session.sql(query).to_pandas_batches()  # DataFrames successifs (exports)
+
+Les requêtes sont traduites du dialecte Snowflake (pipeline/sql_dialect.py).
+Les instructions propres à Snowflake sont émulées :
+
+- COPY INTO depuis @stage/fichier (ou @stage ... FILES = (...)) : lecture
+  du fichier de même nom dans stage_dir (CSV, JSON) ; un .parquet de même
+  nom est préféré s'il existe. Sans transformation, une ligne CSV dont le
+  nombre de champs diffère de celui de la table est une erreur (défaut
+  ERROR_ON_COLUMN_COUNT_MISMATCH = TRUE de Snowflake), comme un guillemet
+  non fermé. Avec ON_ERROR = 'CONTINUE', les lignes rejetées (lecture ou
+  conversion) sont comptées et conservées pour
+  TABLE(VALIDATE(table, JOB_ID => ...)) ;
+- LIST @stage : fichiers de stage_dir (name, size, md5, last_modified) ;
+- SET / UNSET et variables $nom, USE SCHEMA ;
+- ALTER TABLE a SWAP WITH b : renommages croisés dans une transaction ;
+- CREATE DATABASE / STAGE / FILE FORMAT, USE DATABASE / WAREHOUSE / ROLE,
+  COMMENT ON, GRANT : sans effet (stages et formats nommés sont mémorisés
+  pour COPY INTO) ;
+- DML : compteurs 'number of rows inserted / updated / deleted'.
+
+Les noms de colonnes renvoyés sont en majuscules, comme avec Snowflake.
+Les lectures hors transaction passent par un curseur dédié et peuvent donc
+s'exécuter en parallèle (QueryExecutor des dashboards) ; les autres
+instructions sont sérialisées sur la connexion principale.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from email.utils import formatdate
+from functools import lru_cache
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # dépendance optionnelle : uniquement pour l'exécution locale
+    duckdb = None
+
+from pipeline.sql_dialect import find_closing_paren, mask_literals, translate, unmask_literals
+from pipeline.sql_script import statement_kind
+
+DEFAULT_SCHEMAS = ("BRONZE", "SILVER", "ANALYTICS")
+# Stages et formats de fichier déclarés (persistés, comme dans Snowflake)
+OBJECTS_TABLE = "main.local_stage_objects"
+# Lignes rejetées par COPY INTO (lues par VALIDATE)
+REJECTS_TABLE = "main.local_copy_rejects"
+# Erreurs de lecture CSV de DuckDB (store_rejects), relues après chaque fichier
+READ_ERRORS_TABLE = "_copy_read_errors"
+READ_SCANS_TABLE = "_copy_read_scans"
+STATUS_OK = "Statement executed successfully."
+
+_READ_KINDS = ("SELECT", "WITH", "SHOW", "DESCRIBE")
+# Taille des lots de to_pandas_batches() (DuckDB lit par vecteurs de 2048 lignes)
+BATCH_ROWS = 100_000
+_VECTOR_ROWS = 2048
+_NO_OP = re.compile(
+    r"^(CREATE\s+(OR\s+REPLACE\s+)?(DATABASE|WAREHOUSE)\b|USE\s+(DATABASE|WAREHOUSE|ROLE)\b|"
+    r"COMMENT\s+ON\b|GRANT\b|REVOKE\b|ALTER\s+(SESSION|WAREHOUSE)\b)",
+    re.IGNORECASE
+)
+_STAGE = re.compile(r"^CREATE\s+(?:OR\s+REPLACE\s+)?STAGE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)(.*)$",
+                    re.IGNORECASE | re.DOTALL)
+_FILE_FORMAT = re.compile(r"^CREATE\s+(?:OR\s+REPLACE\s+)?FILE\s+FORMAT\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)(.*)$",
+                          re.IGNORECASE | re.DOTALL)
+_USE_SCHEMA = re.compile(r"^USE\s+SCHEMA\s+([\w.]+)$", re.IGNORECASE)
+_SET_MANY = re.compile(r"^SET\s*\(([^)]*)\)\s*=\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_SET_ONE = re.compile(r"^SET\s+(\w+)\s*=\s*(.*)$", re.IGNORECASE | re.DOTALL)
+_UNSET = re.compile(r"^UNSET\s*\(?([\w\s,]+)\)?$", re.IGNORECASE)
+_COPY = re.compile(r"^COPY\s+INTO\s+([\w.]+)\s+FROM\s+", re.IGNORECASE)
+_STAGE_PATH = re.compile(r"@([\w.]+)(?:/([\w./-]*))?(?:\s+(?:AS\s+)?(?!(?:WHERE|GROUP|ORDER|LIMIT)\b)([A-Za-z_]\w*))?",
+                         re.IGNORECASE)
+_FILES = re.compile(r"\bFILES\s*=\s*\(([^)]*)\)", re.IGNORECASE)
+_LIST = re.compile(r"^(?:LIST|LS)\s+@([\w.]+)(?:/([\w./-]*))?$", re.IGNORECASE)
+_VALIDATE = re.compile(r"TABLE\s*\(\s*VALIDATE\s*\(\s*([\w.]+)\s*,\s*JOB_ID\s*=>\s*'([^']*)'\s*\)\s*\)",
+                       re.IGNORECASE)
+_SWAP = re.compile(r"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?([\w.]+)\s+SWAP\s+WITH\s+([\w.]+)$", re.IGNORECASE)
+_OPTION = re.compile(r"(\w+)\s*=\s*(\x00\d+\x00|[\w.]+)")
+# Compteurs renvoyés par Snowflake pour les DML (et par action de MERGE)
+_ROW_COUNT_LABELS = {
+    "INSERT": "number of rows inserted",
+    "UPDATE": "number of rows updated",
+    "DELETE": "number of rows deleted",
+}
+
+
+@lru_cache(maxsize=512)
+def _translate_cached(query):
+    return translate(query)
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# ============================================================================
+# RÉSULTATS
+# ============================================================================
+
+class Row(tuple):
+    """Ligne de résultat : accès par position, par nom (row.COL, row['COL']) ou as_dict()"""
+
+    def __new__(cls, fields, values):
+        row = super().__new__(cls, values)
+        row._fields = fields
+        return row
+
+    def _index(self, name):
+        fields = self.__dict__.get("_fields", [])
+        for candidate in (name, name.upper()):
+            if candidate in fields:
+                return fields.index(candidate)
+        return None
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            index = self._index(key)
+            if index is None:
+                raise KeyError(key)
+            key = index
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        index = self._index(name)
+        if index is None:
+            raise AttributeError(name)
+        return tuple.__getitem__(self, index)
+
+    def as_dict(self):
+        return dict(zip(self._fields, self))
+
+    asDict = as_dict
+
+
+class Result:
+    """Résultat d'une instruction : colonnes, lignes ou DataFrame"""
+
+    def __init__(self, columns, rows=None, frame=None):
+        self.columns = columns
+        self.rows = rows
+        self.frame = frame
+
+    def to_pandas(self):
+        if self.frame is None:
+            self.frame = pd.DataFrame(self.rows or [], columns=self.columns)
+        return self.frame
+
+    def collect(self):
+        if self.rows is None:
+            self.rows = list(self.frame.itertuples(index=False, name=None))
+        return [Row(self.columns, values) for values in self.rows]
+
+
+def _status(message=STATUS_OK):
+    return Result(["status"], [(message,)])
+
+
+class LocalDataFrame:
+    """Équivalent minimal de snowpark.DataFrame (exécution à la demande)"""
+
+    def __init__(self, session, query, params=None):
+        self._session = session
+        self._query = query
+        self._params = params
+
+    def to_pandas(self):
+        return self._session._execute(self._query, self._params, as_pandas=True).to_pandas()
+
+    def collect(self):
+        return self._session._execute(self._query, self._params, as_pandas=False).collect()
+
+    def collect_nowait(self):
+        return LocalAsyncJob(self._session, self._query, self._params)
+
+    def to_pandas_batches(self, batch_rows=BATCH_ROWS):
+        return self._session._execute_batches(self._query, self._params, batch_rows)
+
+
+class LocalAsyncJob:
+    """Équivalent de snowpark.AsyncJob : requête exécutée dans un thread"""
+
+    def __init__(self, session, query, params=None):
+        self.query_id = str(uuid.uuid4())
+        self._session = session
+        self._query = query
+        self._params = params
+        self._cursor = None
+        self._result = None
+        self._error = None
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name=f"local-query-{self.query_id[:8]}", daemon=True).start()
+
+    def _run(self):
+        try:
+            self._result = self._session._execute(self._query, self._params, as_pandas=True, job=self)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def is_done(self):
+        return self._done.is_set()
+
+    def cancel(self):
+        cursor = self._cursor
+        if cursor is not None:
+            try:
+                cursor.interrupt()
+            except Exception:
+                pass
+
+    def result(self, result_type="row"):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        if result_type == "pandas":
+            return self._result.to_pandas()
+        return self._result.collect()
+
+
+# ============================================================================
+# SESSION
+# ============================================================================
+
+class LocalSession:
+    """Session DuckDB compatible avec l'usage de Snowpark fait par le projet"""
+
+    def __init__(self, database=":memory:", stage_dir=None, read_only=False):
+        if duckdb is None:
+            raise ImportError("Le mode local nécessite duckdb : pip install duckdb")
+        if database != ":memory:" and not read_only:
+            os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+
+        self.database = database
+        self.stage_dir = stage_dir
+        self.variables = {}
+        self._schema = None
+        self._in_transaction = False
+        self._last_copy_job = None
+        self._lock = threading.RLock()
+        self._connection = duckdb.connect(database, read_only=read_only)
+        if not read_only:
+            for schema in DEFAULT_SCHEMAS:
+                self._connection.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {OBJECTS_TABLE} "
+                "(object_type VARCHAR, name VARCHAR, options JSON, PRIMARY KEY (object_type, name))"
+            )
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {REJECTS_TABLE} "
+                "(job_id VARCHAR, table_name VARCHAR, file VARCHAR, line BIGINT, row_number BIGINT, "
+                "column_name VARCHAR, error VARCHAR, rejected_record VARCHAR)"
+            )
+
+    def sql(self, query, params=None):
+        return LocalDataFrame(self, query, params)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _connection_for(self, kind, job=None):
+        """Curseur dédié pour les lectures hors transaction, sinon connexion principale"""
+        if kind in _READ_KINDS and not self._in_transaction:
+            cursor = self._connection.cursor()
+            try:
+                if self._schema:
+                    cursor.execute(f"USE {self._schema}")
+                if job is not None:
+                    job._cursor = cursor
+                yield cursor
+            finally:
+                cursor.close()
+        else:
+            with self._lock:
+                if job is not None:
+                    job._cursor = self._connection
+                yield self._connection
+
+    def _execute(self, query, params=None, as_pandas=True, job=None):
+        query = query.strip().rstrip(";").strip()
+        kind = statement_kind(query)
+
+        emulated = self._emulate(query, kind, job)
+        if emulated is not None:
+            return emulated
+        if "VALIDATE" in query.upper():
+            query = _VALIDATE.sub(self._validate_source, query)
+
+        sql = translate(query, self.variables) if "$" in query else _translate_cached(query)
+        if kind == "MERGE" and not re.search(r"\bRETURNING\b", sql, re.IGNORECASE):
+            sql += "\nRETURNING merge_action"
+
+        with self._connection_for(kind, job) as connection:
+            cursor = connection.execute(sql, params) if params else connection.execute(sql)
+            if kind == "MERGE":
+                return self._merge_counts(cursor)
+            if kind in _ROW_COUNT_LABELS:
+                return Result([_ROW_COUNT_LABELS[kind]], [(cursor.fetchone()[0],)])
+            if kind not in _READ_KINDS or cursor.description is None:
+                self._track_transaction(kind)
+                return _status()
+
+            columns = [d[0].upper() for d in cursor.description]
+            if not as_pandas:
+                return Result(columns, rows=cursor.fetchall())
+            types = [str(d[1]) for d in cursor.description]
+            frame = cursor.df()
+            frame.columns = columns
+            return Result(columns, frame=_snowflake_dtypes(frame, types))
+
+    def _execute_batches(self, query, params=None, batch_rows=BATCH_ROWS):
+        """Lecture par lots : le résultat n'est jamais matérialisé en entier"""
+        query = query.strip().rstrip(";").strip()
+        kind = statement_kind(query)
+        if kind not in _READ_KINDS:
+            yield self._execute(query, params).to_pandas()
+            return
+
+        sql = translate(query, self.variables) if "$" in query else _translate_cached(query)
+        vectors = max(1, batch_rows // _VECTOR_ROWS)
+        with self._connection_for(kind) as connection:
+            cursor = connection.execute(sql, params) if params else connection.execute(sql)
+            columns = [d[0].upper() for d in cursor.description]
+            types = [str(d[1]) for d in cursor.description]
+            first = True
+            while True:
+                frame = cursor.fetch_df_chunk(vectors)
+                if frame.empty and not first:
+                    return
+                frame.columns = columns
+                yield _snowflake_dtypes(frame, types)
+                if frame.empty:
+                    return
+                first = False
+
+    def _track_transaction(self, kind):
+        if kind in ("BEGIN", "START"):
+            self._in_transaction = True
+        elif kind in ("COMMIT", "ROLLBACK"):
+            self._in_transaction = False
+
+    def _merge_counts(self, cursor):
+        counts = dict.fromkeys(_ROW_COUNT_LABELS.values(), 0)
+        for batch in cursor.fetch_record_batch():
+            for action in batch.column(0).to_pylist():
+                counts[_ROW_COUNT_LABELS[action]] += 1
+        return Result(list(counts), [tuple(counts.values())])
+
+    # ------------------------------------------------------------------
+    # Instructions émulées
+    # ------------------------------------------------------------------
+    def _emulate(self, query, kind, job=None):
+        """Résultat des instructions sans équivalent DuckDB (None sinon)"""
+        if _NO_OP.match(query):
+            return _status()
+
+        match = _STAGE.match(query)
+        if match:
+            self._register("STAGE", match.group(1), self._format_options(match.group(2)))
+            return _status(f"Stage area {match.group(1).upper()} successfully created.")
+
+        match = _FILE_FORMAT.match(query)
+        if match:
+            self._register("FILE FORMAT", match.group(1), self._format_options(match.group(2)))
+            return _status(f"File format {match.group(1).upper()} successfully created.")
+
+        match = _USE_SCHEMA.match(query)
+        if match:
+            with self._lock:
+                self._schema = match.group(1).split(".")[-1]
+                self._connection.execute(f"USE {self._schema}")
+            return _status()
+
+        if kind == "SET":
+            return self._set(query)
+        if kind == "UNSET":
+            names = _UNSET.match(query).group(1)
+            for name in names.split(","):
+                self.variables.pop(name.strip().upper(), None)
+            return _status()
+        if kind == "COPY":
+            return self._copy(query, job)
+        match = _SWAP.match(query)
+        if match:
+            return self._swap(match.group(1), match.group(2))
+        if kind in ("LIST", "LS"):
+            return self._list(query)
+        return None
+
+    def _swap(self, first, second):
+        """ALTER TABLE a SWAP WITH b : trois renommages dans une même transaction"""
+        schema = first.rsplit(".", 1)[0] + "." if "." in first else ""
+        temporary = f"{first.split('.')[-1]}_swap_{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            own_transaction = not self._in_transaction
+            if own_transaction:
+                self._connection.execute("BEGIN TRANSACTION")
+            try:
+                self._connection.execute(f"ALTER TABLE {first} RENAME TO {temporary}")
+                self._connection.execute(f"ALTER TABLE {second} RENAME TO {first.split('.')[-1]}")
+                self._connection.execute(f"ALTER TABLE {schema}{temporary} RENAME TO {second.split('.')[-1]}")
+                if own_transaction:
+                    self._connection.execute("COMMIT")
+            except Exception:
+                if own_transaction:
+                    self._connection.execute("ROLLBACK")
+                raise
+        return _status()
+
+    def _set(self, query):
+        """SET nom = expr / SET (a, b) = (SELECT ...)"""
+        match = _SET_MANY.match(query)
+        if match:
+            names = [name.strip() for name in match.group(1).split(",")]
+            expression = match.group(2).strip()
+        else:
+            match = _SET_ONE.match(query)
+            if match is None:
+                raise ValueError(f"SET non reconnu : {query[:80]}")
+            names = [match.group(1)]
+            expression = match.group(2).strip()
+        if statement_kind(expression) not in ("SELECT", "WITH"):
+            expression = f"SELECT {expression}"
+
+        with self._lock:
+            values = self._connection.execute(translate(expression, self.variables)).fetchone()
+        if values is None or len(values) != len(names):
+            raise ValueError(f"SET : {len(names)} variable(s) attendue(s)")
+        for name, value in zip(names, values):
+            self.variables[name.upper()] = value
+        return _status()
+
+    def _register(self, object_type, name, options):
+        with self._lock:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {OBJECTS_TABLE} VALUES (?, ?, ?)",
+                [object_type, name.upper(), json.dumps(options)]
+            )
+
+    def _object_options(self, object_type, name):
+        """Options d'un stage / format déclaré ({} s'il est inconnu)"""
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT options FROM {OBJECTS_TABLE} WHERE object_type = ? AND name = ?",
+                [object_type, name.upper()]
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _format_options(self, text):
+        """Options TYPE / SKIP_HEADER / FIELD_DELIMITER ... (clés en majuscules)"""
+        masked, literals = mask_literals(text)
+        options = {}
+        for key, value in _OPTION.findall(masked):
+            value = unmask_literals(value, literals)
+            if value.startswith("'"):
+                value = value[1:-1].replace("''", "'")
+            options[key.upper()] = value
+        return options
+
+    # ------------------------------------------------------------------
+    # COPY INTO
+    # ------------------------------------------------------------------
+    def _copy(self, query, job=None):
+        """COPY INTO table FROM @stage/fichier | (SELECT $1, ... FROM @stage/fichier) [FILES = (...)]"""
+        if not self.stage_dir:
+            raise ValueError("COPY INTO en local nécessite un dossier de stage (stage_dir)")
+        table = _COPY.match(query).group(1)
+        masked, literals = mask_literals(query)
+        start = _COPY.match(masked).end()
+
+        transform = None
+        if masked[start] == "(":
+            close_index = find_closing_paren(masked, start)
+            transform = masked[start + 1:close_index]
+            options_text = masked[close_index + 1:]
+        else:
+            options_text = masked[start:]
+        stage_match = _STAGE_PATH.search(transform if transform is not None else options_text)
+        stage, prefix = stage_match.group(1).upper(), stage_match.group(2) or ""
+
+        # FILES = ('a.csv', ...) : fichiers relatifs au chemin du stage
+        files_match = _FILES.search(options_text)
+        if files_match:
+            names = [unmask_literals(name.strip(), literals)[1:-1] for name in files_match.group(1).split(",")]
+            paths = [posixpath.join(prefix, name) for name in names if name]
+        else:
+            paths = [prefix]
+
+        # Format : options du stage, puis FILE_FORMAT = (...) ou format nommé
+        file_format = self._object_options("STAGE", stage)
+        format_match = re.search(r"FILE_FORMAT\s*=\s*(\(([^)]*)\)|[\w.]+)", options_text, re.IGNORECASE)
+        if format_match and format_match.group(2) is not None:
+            inline = self._format_options(unmask_literals(format_match.group(2), literals))
+            if "FORMAT_NAME" in inline:
+                file_format.update(self._object_options("FILE FORMAT", inline.pop("FORMAT_NAME")))
+            file_format.update(inline)
+        elif format_match:
+            file_format.update(self._object_options("FILE FORMAT", format_match.group(1)))
+        on_error = self._format_options(unmask_literals(options_text, literals)).get("ON_ERROR", "ABORT_STATEMENT")
+        tolerant = on_error.upper() != "ABORT_STATEMENT"
+        skip = int(file_format.get("SKIP_HEADER", 0))
+        job_id = job.query_id if job is not None else str(uuid.uuid4())
+
+        with self._lock:
+            self._last_copy_job = job_id
+            target = self._connection.execute(f"DESCRIBE {table}").fetchall()
+            target = [(name, column_type) for name, column_type, *_ in target]
+
+            # Une ligne de résultat par fichier, comme Snowflake
+            rows = []
+            for path in paths:
+                if transform is not None:
+                    width = max([int(n) for n in re.findall(r"\$(\d+)", transform)] or [len(target)])
+                    alias = stage_match.group(3) or "_stage"
+                    source_query = transform[:stage_match.start()] + "\x01" + transform[stage_match.end():]
+                    source_query = re.sub(r"\$(\d+)", lambda m: f"column{int(m.group(1)) - 1}", source_query)
+                    source_query = translate(unmask_literals(source_query, literals), self.variables)
+                    source = source_query.replace("\x01", self._reader(path, file_format, width, tolerant, alias))
+                else:
+                    reader = self._reader(path, file_format, len(target), tolerant, strict_columns=True)
+                    source = f"SELECT * FROM {reader}"
+                rows.append(self._load(table, target, source, path, tolerant, job_id, skip))
+
+            return Result(["file", "status", "rows_parsed", "rows_loaded", "errors_seen", "first_error"], rows)
+
+    def _list(self, query):
+        """LIST @stage[/chemin] : fichiers du dossier de stage (md5 = ETag)"""
+        if not self.stage_dir:
+            raise ValueError("LIST en local nécessite un dossier de stage (stage_dir)")
+        match = _LIST.match(query)
+        stage, prefix = match.group(1), match.group(2) or ""
+        # Noms préfixés par l'URL du stage, comme pour un stage externe
+        url = self._object_options("STAGE", stage).get("URL") or stage.split(".")[-1].lower()
+        rows = []
+        for directory, subdirectories, files in os.walk(self.stage_dir):
+            subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+            for file_name in sorted(files):
+                path = os.path.join(directory, file_name)
+                relative = os.path.relpath(path, self.stage_dir).replace(os.sep, "/")
+                if file_name.startswith(".") or not relative.startswith(prefix):
+                    continue
+                stat = os.stat(path)
+                rows.append((
+                    url.rstrip("/") + "/" + relative, stat.st_size, _md5(path),
+                    formatdate(stat.st_mtime, usegmt=True)
+                ))
+        return Result(["name", "size", "md5", "last_modified"], rows)
+
+    def _validate_source(self, match):
+        """TABLE(VALIDATE(table, JOB_ID => ...)) -> lignes rejetées conservées par COPY INTO"""
+        job_id = match.group(2)
+        if job_id == "_last":
+            job_id = self._last_copy_job or ""
+        return (
+            "(SELECT error, file, line, column_name, row_number, rejected_record "
+            f"FROM {REJECTS_TABLE} WHERE job_id = {_quote(job_id)} "
+            f"AND table_name = {_quote(match.group(1).upper())})"
+        )
+
+    def _reader(self, path, file_format, width, tolerant, alias="_stage", strict_columns=False):
+        """
+        Lecture du fichier de stage : (SELECT ...) AS alias(column0, ..., columnN).
+        CSV : strict_columns rejette les lignes de longueur différente (sinon
+        complétées par des NULL) ; si tolerant, les lignes illisibles sont
+        écartées et décrites dans READ_ERRORS_TABLE, sinon la lecture échoue.
+        """
+        local_path = os.path.join(self.stage_dir, path)
+        parquet_path = os.path.splitext(local_path)[0] + ".parquet"
+        columns = ", ".join(f"column{i}" for i in range(width))
+
+        if os.path.exists(parquet_path):
+            reader = f"read_parquet({_quote(parquet_path)})"
+        elif not os.path.exists(local_path):
+            raise FileNotFoundError(f"Fichier de stage introuvable : {local_path}")
+        elif file_format.get("TYPE", "CSV").upper() == "JSON":
+            reader = f"read_json_objects({_quote(local_path)}, format='unstructured')"
+        else:
+            delimiter = file_format.get("FIELD_DELIMITER", ",")
+            if delimiter.upper() == "NONE":
+                delimiter = "\x01"  # ligne entière dans une seule colonne
+            quote = file_format.get("FIELD_OPTIONALLY_ENCLOSED_BY", "NONE")
+            quote = "" if quote.upper() == "NONE" else quote
+            types = ", ".join(f"'column{i}': 'VARCHAR'" for i in range(width))
+            rejects = (f", store_rejects=true, rejects_table={_quote(READ_ERRORS_TABLE)}, "
+                       f"rejects_scan={_quote(READ_SCANS_TABLE)}") if tolerant else ""
+            reader = (
+                f"read_csv({_quote(local_path)}, header=false, skip={int(file_format.get('SKIP_HEADER', 0))}, "
+                f"delim={_quote(delimiter)}, quote={_quote(quote)}, escape={_quote(quote)}, "
+                f"columns={{{types}}}, auto_detect=false, "
+                f"null_padding={'false' if strict_columns else 'true'}{rejects})"
+            )
+        return f"(SELECT * FROM {reader}) AS {alias}({columns})"
+
+    def _load(self, table, target, source, path, tolerant, job_id, skip=0):
+        """Conversion vers les types de la table ; ON_ERROR=CONTINUE écarte les lignes invalides (conservées pour VALIDATE)"""
+        width = len(target)
+        source_columns = ", ".join(f"c{i}" for i in range(width))
+        cast = "TRY_CAST" if tolerant else "CAST"
+        converted = ", ".join(f'{cast}(c{i} AS {column_type}) AS "{name}"' for i, (name, column_type) in enumerate(target))
+        valid = " AND ".join(
+            f'(c{i} IS NULL OR "{name}" IS NOT NULL)' for i, (name, _) in enumerate(target)
+        )
+        # Première colonne non convertible de chaque ligne rejetée, et message associé
+        failed = [(f'c{i} IS NOT NULL AND "{name}" IS NULL', i, name, column_type)
+                  for i, (name, column_type) in enumerate(target)]
+        error_column = " ".join(f"WHEN {check} THEN {_quote(name.upper())}" for check, _, name, _ in failed)
+        error = " ".join(
+            f"WHEN {check} THEN 'Valeur non convertible en {column_type} : ' || c{i}"
+            for check, i, _, column_type in failed
+        )
+        raw = " || ',' || ".join(f"COALESCE(CAST(c{i} AS VARCHAR), '')" for i in range(width))
+        # Erreurs de lecture de ce fichier seulement (store_rejects cumule les lectures)
+        self._connection.execute(f"DROP TABLE IF EXISTS {READ_ERRORS_TABLE}")
+        self._connection.execute(f"DROP TABLE IF EXISTS {READ_SCANS_TABLE}")
+        self._connection.execute(
+            f"CREATE OR REPLACE TEMP TABLE _copy_rows AS "
+            f"SELECT {converted}, {valid} AS _valid, ROW_NUMBER() OVER () AS _row, "
+            f"CASE WHEN NOT ({valid}) THEN CASE {error_column} END END AS _column, "
+            f"CASE WHEN NOT ({valid}) THEN CASE {error} END END AS _error, "
+            f"CASE WHEN NOT ({valid}) THEN {raw} END AS _raw "
+            f"FROM ({source}) AS _src({source_columns})"
+        )
+        try:
+            parsed, loaded = self._connection.execute(
+                "SELECT COUNT(*), COUNT(*) FILTER (WHERE _valid) FROM _copy_rows"
+            ).fetchone()
+            names = ", ".join(f'"{name}"' for name, _ in target)
+            self._connection.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM _copy_rows WHERE _valid")
+            unreadable, first_unreadable = self._read_errors(table, target, path, job_id, skip)
+
+            # Ligne du fichier d'une ligne lue : rang parmi les lignes non écartées à la lecture
+            lines = ""
+            if unreadable:
+                self._connection.execute(
+                    "CREATE OR REPLACE TEMP TABLE _copy_lines AS "
+                    "SELECT ROW_NUMBER() OVER (ORDER BY line) AS _row, line FROM range(?, ?) AS r(line) "
+                    f"WHERE line NOT IN (SELECT line FROM {READ_ERRORS_TABLE})",
+                    [skip + 1, skip + parsed + unreadable + 1]
+                )
+                lines = "LEFT JOIN _copy_lines USING (_row)"
+            line = "COALESCE(_copy_lines.line, _row + ?)" if lines else "_row + ?"
+            self._connection.execute(
+                f"INSERT INTO {REJECTS_TABLE} "
+                f"SELECT ?, ?, ?, {line}, _row, _column, _error, _raw FROM _copy_rows {lines} WHERE NOT _valid",
+                [job_id, table.upper(), path, skip]
+            )
+            first_error = self._connection.execute(
+                f"SELECT {line}, _error FROM _copy_rows {lines} WHERE NOT _valid ORDER BY _row LIMIT 1", [skip]
+            ).fetchone()
+        finally:
+            self._connection.execute("DROP TABLE IF EXISTS _copy_rows")
+            self._connection.execute("DROP TABLE IF EXISTS _copy_lines")
+            self._connection.execute(f"DROP TABLE IF EXISTS {READ_ERRORS_TABLE}")
+            self._connection.execute(f"DROP TABLE IF EXISTS {READ_SCANS_TABLE}")
+
+        # Lignes illisibles : analysées et rejetées, comme dans Snowflake
+        parsed += unreadable
+        if first_unreadable is not None and (first_error is None or first_unreadable[0] < first_error[0]):
+            first_error = first_unreadable
+
+        status = "LOADED" if loaded == parsed else ("PARTIALLY_LOADED" if loaded else "LOAD_FAILED")
+        return (path, status, parsed, loaded, parsed - loaded, first_error[1] if first_error else None)
+
+    def _read_errors(self, table, target, path, job_id, skip):
+        """Lignes écartées à la lecture (nombre de champs, guillemets) -> REJECTS_TABLE ; (nombre, (ligne, erreur))"""
+        exists = self._connection.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE temporary AND table_name = ?", [READ_ERRORS_TABLE]
+        ).fetchone()[0]
+        if not exists:
+            return 0, None
+        # Une ligne peut porter plusieurs erreurs : la première colonne en cause
+        errors = (
+            "SELECT line, column_idx, csv_line, "
+            "CASE WHEN error_type IN ('TOO MANY COLUMNS', 'MISSING COLUMNS') "
+            "THEN 'Nombre de champs différent de celui de la table : ' || error_message "
+            "ELSE error_message END AS error "
+            f"FROM {READ_ERRORS_TABLE} "
+            "QUALIFY ROW_NUMBER() OVER (PARTITION BY line ORDER BY column_idx) = 1"
+        )
+        names = "[" + ", ".join(_quote(name.upper()) for name, _ in target) + "]"
+        self._connection.execute(
+            f"INSERT INTO {REJECTS_TABLE} "
+            f"SELECT ?, ?, ?, line, line - ?, list_extract({names}, CAST(column_idx AS BIGINT) + 1), error, csv_line FROM ({errors})",
+            [job_id, table.upper(), path, skip]
+        )
+        count, line, error = self._connection.execute(
+            f"SELECT COUNT(*), MIN(line), ARG_MIN(error, line) FROM ({errors})"
+        ).fetchone()
+        return count, (line, error) if count else None
+
+
+def _md5(path):
+    """Empreinte MD5 d'un fichier (équivalent local de l'ETag S3)"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snowflake_dtypes(frame, types):
+    """NUMBER(p, 0) sans NULL -> entiers, comme to_pandas() de Snowpark"""
+    for column, column_type in zip(frame.columns, types):
+        integer = column_type == "HUGEINT" or (
+            column_type.startswith("DECIMAL") and column_type.replace(" ", "").endswith(",0)")
+        )
+        if integer and frame[column].dtype.kind == "f":
+            if not frame[column].isna().any():
+                frame[column] = frame[column].astype("int64")
+    return frame
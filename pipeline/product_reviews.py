@@ -0,0 +1,451 @@
+# product_reviews.py
+"""
+Analyse de product_reviews.csv en colonnes typées (remplace SPLIT_PART).
+
+    python -m pipeline.product_reviews --stage data/bronze          # stage local
+    python -m pipeline.product_reviews                              # stage Snowflake
+    python -m pipeline.product_reviews --input avis.csv --out /tmp/avis   # fichier d'essai
+
+Le fichier est lu une seule fois, en flux, par blocs de --chunk-mb :
+
+1. chaque bloc est coupé à la dernière fin de ligne hors guillemets, selon
+   l'état CSV suivi d'un bloc à l'autre (RecordScanner : guillemet ouvrant
+   en début de champ seulement, "" échappé), de sorte qu'aucun
+   enregistrement ne soit partagé entre deux blocs : un avis contenant des
+   virgules ou des retours à la ligne entre guillemets reste entier, le
+   découpage ne dépend pas de la taille des blocs. Un enregistrement de plus
+   de MAX_RECORD_MB (guillemet jamais fermé) est rejeté ;
+2. les blocs sont analysés en parallèle (--workers processus, module csv,
+   guillemets RFC 4180) et convertis en colonnes typées : rating entier 1-5
+   et review_date DATE, NULL si non convertibles (comme TRY_TO_NUMBER /
+   TRY_TO_DATE auparavant) ; au plus 2 × workers blocs en mémoire ;
+3. les résultats sont écrits dans l'ordre du fichier : lignes valides dans
+   parsed/product_reviews.parquet, lignes mal formées (nombre de champs,
+   guillemet mal placé ou non fermé, encodage, reviewer_id vide) dans
+   parsed/product_review_rejects.parquet avec ligne d'origine et motif.
+
+ETL SQL.sql charge ces deux fichiers (COPY INTO Parquet depuis
+@BRONZE.parsed_stage) dans BRONZE.product_reviews et
+BRONZE.product_review_rejects. En local, les fichiers sont écrits dans le
+dossier de stage ; avec Snowflake, le CSV est lu en flux dans le bucket S3
+de @BRONZE.food_beverage_stage (GET ne lit que les stages internes) puis
+les Parquet sont déposés (PUT) dans @BRONZE.parsed_stage. La sortie ne dépend que du fichier source et de la
+taille des blocs : un fichier inchangé donne des Parquet identiques (même
+md5, rien à recharger pour pipeline.ingestion).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle : uniquement pour l'analyse des avis
+    pa = pq = None
+
+from pipeline.session import get_session
+
+SOURCE_FILE = "product_reviews.csv"
+SOURCE_STAGE = "BRONZE.food_beverage_stage"
+PARSED_STAGE = "BRONZE.parsed_stage"
+PARSED_DIR = "parsed"
+REVIEWS_FILE = "product_reviews.parquet"
+REJECTS_FILE = "product_review_rejects.parquet"
+
+# Octets non UTF-8 (conservés par surrogateescape)
+_INVALID_BYTES = re.compile("[\udc80-\udcff]")
+
+DEFAULT_CHUNK_MB = 16
+
+# Enregistrement le plus long accepté (guillemet non fermé : rejet au-delà)
+MAX_RECORD_MB = 16
+# Texte conservé d'un enregistrement rejeté pour sa taille
+REJECT_PREVIEW_BYTES = 1 << 16
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Colonnes du fichier : obligatoires, puis facultatives (texte de l'avis)
+REQUIRED_COLUMNS = ("reviewer_id", "reviewer_name", "rating", "review_date", "product_category")
+OPTIONAL_COLUMNS = ("review_text",)
+
+# Même ordre que BRONZE.product_reviews / BRONZE.product_review_rejects
+if pa is not None:
+    REVIEWS_SCHEMA = pa.schema([
+        ("reviewer_id", pa.string()),
+        ("reviewer_name", pa.string()),
+        ("rating", pa.int8()),
+        ("review_date", pa.date32()),
+        ("product_category", pa.string()),
+        ("review_text", pa.string()),
+        ("source_file", pa.string()),
+        ("source_line", pa.int64()),
+    ])
+    REJECTS_SCHEMA = pa.schema([
+        ("source_file", pa.string()),
+        ("source_line", pa.int64()),
+        ("error", pa.string()),
+        ("rejected_record", pa.string()),
+    ])
+
+
+# ============================================================================
+# DÉCOUPAGE EN BLOCS (FRONTIÈRES D'ENREGISTREMENT)
+# ============================================================================
+
+class RecordScanner:
+    """
+    Fins d'enregistrement d'un flux CSV, état conservé d'un bloc à l'autre :
+    comme le module csv, un guillemet n'ouvre un champ qu'en début de champ
+    (ailleurs il est littéral : 5" screen), "" est un guillemet échappé.
+    """
+
+    def __init__(self):
+        self.quoted = False         # dans un champ entre guillemets
+        self.quote_pending = False  # guillemet final d'un champ : fermeture ou "" ?
+
+    def scan(self, buffer, start):
+        """Examiner buffer[start:] (buffer commence en début d'enregistrement) ;
+        renvoie la position après la dernière fin de ligne hors guillemets, None si aucune"""
+        end = None
+        position = start
+        size = len(buffer)
+        if self.quote_pending and position < size:
+            self.quote_pending = False
+            if buffer[position:position + 1] == b'"':
+                position += 1
+            else:
+                self.quoted = False
+        while position < size:
+            quote = buffer.find(b'"', position)
+            if self.quoted:
+                if quote < 0:
+                    break
+                if quote + 1 == size:
+                    self.quote_pending = True
+                    break
+                if buffer[quote + 1:quote + 2] == b'"':
+                    position = quote + 2
+                else:
+                    self.quoted = False
+                    position = quote + 1
+                continue
+            newline = buffer.rfind(b"\n", position, size if quote < 0 else quote)
+            if newline >= 0:
+                end = newline + 1
+            if quote < 0:
+                break
+            # Début de champ : début d'enregistrement, après un séparateur ou une fin de ligne
+            self.quoted = quote == 0 or buffer[quote - 1:quote] in (b",", b"\n", b"\r")
+            position = quote + 1
+        return end
+
+
+def iter_chunks(stream, chunk_bytes, max_record_bytes=MAX_RECORD_MB << 20):
+    """
+    (première ligne, octets, erreur) de blocs d'enregistrements complets, en
+    flux. Un enregistrement plus long qu'un bloc agrandit le bloc, jusqu'à
+    max_record_bytes : au-delà (guillemet jamais fermé, ligne démesurée), sa
+    première ligne est rejetée (erreur renseignée, texte tronqué) et l'analyse
+    reprend à la ligne suivante ; la mémoire reste bornée.
+    """
+    scanner = RecordScanner()
+    pending = b""
+    scanned = 0
+    end = 0
+    line = 1
+    discarding = False
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            break
+        if discarding:
+            # Suite d'une ligne démesurée déjà rejetée : ignorée jusqu'à sa fin
+            newline = block.find(b"\n")
+            if newline < 0:
+                continue
+            block, discarding = block[newline + 1:], False
+            line += 1
+        pending += block
+        while True:
+            found = scanner.scan(pending, scanned)
+            scanned = len(pending)
+            if found is not None:
+                end = found
+            if end:
+                chunk, pending = pending[:end], pending[end:]
+                scanned -= end
+                end = 0
+                yield line, chunk, None
+                line += chunk.count(b"\n")
+            if len(pending) <= max_record_bytes:
+                break
+            error = f"enregistrement de plus de {max_record_bytes >> 20} Mo (guillemet non fermé ?)"
+            newline = pending.find(b"\n")
+            if newline < 0:
+                yield line, pending[:REJECT_PREVIEW_BYTES], error
+                pending, scanned, discarding = b"", 0, True
+                scanner = RecordScanner()
+                break
+            yield line, pending[:min(newline + 1, REJECT_PREVIEW_BYTES)], error
+            pending, scanned = pending[newline + 1:], 0
+            line += 1
+            scanner = RecordScanner()
+    if pending and not discarding:
+        yield line, pending, None
+
+
+def read_header(stream):
+    """Noms de colonnes (minuscules) de la première ligne ; le flux est positionné après"""
+    header = stream.readline()
+    columns = [name.strip().lower() for name in next(csv.reader([header.decode("utf-8-sig")]))]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"{SOURCE_FILE} : colonne(s) absente(s) de l'en-tête : {', '.join(missing)}")
+    return columns
+
+
+# ============================================================================
+# ANALYSE D'UN BLOC (PROCESSUS DE TRAVAIL)
+# ============================================================================
+
+def _rating(value):
+    """Note entière de 1 à 5, sinon NULL (comme TRY_TO_NUMBER : sentiment 'Unknown')"""
+    try:
+        rating = int(value)
+    except ValueError:
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+
+def _review_date(value):
+    """Date ISO, sinon NULL (comme TRY_TO_DATE)"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def parse_chunk(task):
+    """
+    Analyser un bloc : (source, colonnes, première ligne, octets) ->
+    (colonnes typées des lignes valides, lignes rejetées).
+    """
+    source, columns, first_line, data, error = task
+    positions = {name: columns.index(name) for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in columns}
+    text_position = positions.get("review_text")
+    reviews = {name: [] for name in REVIEWS_SCHEMA.names}
+    rejects = {name: [] for name in REJECTS_SCHEMA.names}
+
+    try:
+        text, invalid_bytes = data.decode("utf-8"), False
+    except UnicodeDecodeError:
+        text, invalid_bytes = data.decode("utf-8", errors="surrogateescape"), True
+    # Lignes physiques (fins de ligne conservées) : texte brut des rejets
+    lines = list(io.StringIO(text, newline=""))
+    reader = csv.reader(iter(lines), strict=True)
+    consumed = 0
+
+    def reject(error):
+        rejects["source_file"].append(source)
+        rejects["source_line"].append(first_line + start)
+        rejects["error"].append(error)
+        rejects["rejected_record"].append(
+            "".join(lines[start:max(reader.line_num, start + 1)]).rstrip("\r\n")
+            .encode("utf-8", errors="surrogateescape").decode("utf-8", errors="replace")
+        )
+
+    if error is not None:
+        # Enregistrement écarté par iter_chunks (trop long) : rejeté tel quel
+        start = 0
+        reject(error)
+        return (pa.table(reviews, schema=REVIEWS_SCHEMA), pa.table(rejects, schema=REJECTS_SCHEMA))
+
+    while True:
+        start = consumed
+        try:
+            fields = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            reject(f"CSV mal formé : {e}")
+            consumed = max(reader.line_num, start + 1)
+            continue
+        consumed = reader.line_num
+        if not fields or fields == [""]:
+            continue  # ligne vide
+        if len(fields) != len(columns):
+            reject(f"{len(fields)} champ(s) au lieu de {len(columns)}")
+            continue
+        if invalid_bytes and any(_INVALID_BYTES.search(field) for field in fields):
+            reject("encodage UTF-8 invalide")
+            continue
+
+        reviewer_id = fields[positions["reviewer_id"]].strip()
+        if not reviewer_id:
+            reject("reviewer_id vide")
+            continue
+        reviews["reviewer_id"].append(reviewer_id)
+        reviews["reviewer_name"].append(fields[positions["reviewer_name"]].strip() or None)
+        reviews["rating"].append(_rating(fields[positions["rating"]].strip()))
+        reviews["review_date"].append(_review_date(fields[positions["review_date"]].strip()))
+        reviews["product_category"].append(fields[positions["product_category"]].strip() or None)
+        reviews["review_text"].append(fields[text_position] if text_position is not None else None)
+        reviews["source_file"].append(source)
+        reviews["source_line"].append(first_line + start)
+
+    return (pa.table(reviews, schema=REVIEWS_SCHEMA), pa.table(rejects, schema=REJECTS_SCHEMA))
+
+
+# ============================================================================
+# STAGE EXTERNE
+# ============================================================================
+
+def stage_url(session, stage=SOURCE_STAGE):
+    """URL du stage externe (DESC STAGE), terminée par /"""
+    for row in session.sql(f"DESC STAGE {stage}").collect():
+        values = {key.lower(): value for key, value in row.as_dict().items()}
+        if values.get("property") == "URL":
+            return json.loads(values["property_value"])[0].rstrip("/") + "/"
+    raise ValueError(f"{stage} n'est pas un stage externe")
+
+
+def https_url(url):
+    """s3://bucket/chemin -> URL HTTPS du bucket (public, comme le stage sans identifiants)"""
+    bucket, _, key = url[len("s3://"):].partition("/")
+    return f"https://{bucket}.s3.amazonaws.com/{key}"
+
+
+def open_source(location):
+    """Flux binaire d'un fichier local ou d'une URL HTTPS"""
+    if location.startswith("https://"):
+        return urllib.request.urlopen(location)
+    return open(location, "rb")
+
+
+# ============================================================================
+# ANALYSE DU FICHIER
+# ============================================================================
+
+def parse_stream(stream, reviews_path, rejects_path, source=SOURCE_FILE,
+                 workers=DEFAULT_WORKERS, chunk_mb=DEFAULT_CHUNK_MB):
+    """Analyser un flux CSV vers deux fichiers Parquet ; renvoie le rapport (dict)"""
+    if pa is None:
+        raise ImportError("L'analyse des avis nécessite pyarrow : pip install pyarrow")
+    started = time.monotonic()
+    # +1 : l'en-tête est la ligne 1 du fichier
+    columns = read_header(stream)
+    tasks = ((source, columns, line + 1, chunk, error) for line, chunk, error in iter_chunks(stream, chunk_mb << 20))
+    report = {"chunks": 0, "rows": 0, "rejects": 0}
+
+    with pq.ParquetWriter(reviews_path, REVIEWS_SCHEMA) as reviews_writer, \
+            pq.ParquetWriter(rejects_path, REJECTS_SCHEMA) as rejects_writer:
+
+        def write(result):
+            reviews, rejects = result
+            report["chunks"] += 1
+            report["rows"] += reviews.num_rows
+            report["rejects"] += rejects.num_rows
+            if reviews.num_rows:
+                reviews_writer.write_table(reviews)
+            if rejects.num_rows:
+                rejects_writer.write_table(rejects)
+
+        if workers <= 1:
+            for task in tasks:
+                write(parse_chunk(task))
+        else:
+            # Résultats écrits dans l'ordre de soumission, 2 × workers blocs au plus en vol
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for task in tasks:
+                    in_flight.append(pool.submit(parse_chunk, task))
+                    if len(in_flight) >= 2 * workers:
+                        write(in_flight.popleft().result())
+                while in_flight:
+                    write(in_flight.popleft().result())
+
+    report["seconds"] = time.monotonic() - started
+    return report
+
+
+def parse_file(path, out_dir, workers=DEFAULT_WORKERS, chunk_mb=DEFAULT_CHUNK_MB):
+    """Analyser un fichier local vers out_dir/{product_reviews,product_review_rejects}.parquet"""
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path, "rb") as stream:
+        return parse_stream(stream, os.path.join(out_dir, REVIEWS_FILE), os.path.join(out_dir, REJECTS_FILE),
+                            source=os.path.basename(path), workers=workers, chunk_mb=chunk_mb)
+
+
+def stage_product_reviews(session, workers=DEFAULT_WORKERS, chunk_mb=DEFAULT_CHUNK_MB, log=print):
+    """
+    Analyser product_reviews.csv du stage et déposer les Parquet lus par
+    ETL SQL.sql (section 4.9) ; renvoie le rapport, None sans fichier source.
+    """
+    stage_dir = getattr(session, "stage_dir", None)
+    if stage_dir:
+        source = os.path.join(stage_dir, SOURCE_FILE)
+        if not os.path.exists(source):
+            return None
+        report = parse_file(source, os.path.join(stage_dir, PARSED_DIR), workers, chunk_mb)
+    else:
+        session.sql(f"CREATE STAGE IF NOT EXISTS {PARSED_STAGE}").collect()
+        with tempfile.TemporaryDirectory(prefix="product_reviews_") as directory:
+            try:
+                stream = open_source(https_url(stage_url(session) + SOURCE_FILE))
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    return None
+                raise
+            with stream:
+                report = parse_stream(stream, os.path.join(directory, REVIEWS_FILE),
+                                      os.path.join(directory, REJECTS_FILE), workers=workers, chunk_mb=chunk_mb)
+            for name in (REVIEWS_FILE, REJECTS_FILE):
+                session.file.put(os.path.join(directory, name), f"@{PARSED_STAGE}/{PARSED_DIR}",
+                                 auto_compress=False, overwrite=True)
+    log(f"  {SOURCE_FILE} : {report['rows']:,} avis, {report['rejects']:,} rejet(s), "
+        f"{report['chunks']} bloc(s) en {report['seconds']:.1f}s")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse de product_reviews.csv en Parquet typé")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--input", default=None, help="Fichier CSV à analyser (sans session)")
+    parser.add_argument("--out", default=None, help="Dossier de sortie (avec --input)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Processus d'analyse")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_MB, help="Taille des blocs lus (Mo)")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        out_dir = args.out or os.path.join(os.path.dirname(os.path.abspath(args.input)), PARSED_DIR)
+        report = parse_file(args.input, out_dir, args.workers, args.chunk_mb)
+        print(f"{args.input} : {report['rows']:,} avis, {report['rejects']:,} rejet(s), "
+              f"{report['chunks']} bloc(s) en {report['seconds']:.1f}s -> {out_dir}")
+        return
+
+    if args.stage:
+        report = parse_file(os.path.join(args.stage, SOURCE_FILE), os.path.join(args.stage, PARSED_DIR),
+                            args.workers, args.chunk_mb)
+        print(f"{SOURCE_FILE} : {report['rows']:,} avis, {report['rejects']:,} rejet(s), "
+              f"{report['chunks']} bloc(s) en {report['seconds']:.1f}s")
+        return
+
+    session = get_session()
+    try:
+        if stage_product_reviews(session, args.workers, args.chunk_mb) is None:
+            raise SystemExit(f"{SOURCE_FILE} introuvable dans le stage")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+# profile_sketches.py
+"""
+Esquisses fusionnables du profilage des colonnes (pipeline/data_quality.py).
+
+Chaque lot chargé est résumé une fois par colonne ; les résumés de plusieurs
+lots se fusionnent ensuite sans relire les lignes :
+
+- TDigest : quantiles et fonction de répartition (colonnes numériques et
+  dates), centroïdes (moyenne, poids) regroupés selon la fonction d'échelle
+  k1 (Dunning) : centroïdes étroits aux extrémités, précision relative des
+  quantiles extrêmes ;
+- HyperLogLog : nombre de valeurs distinctes (m = 4096 registres, erreur
+  type ≈ 1,6 %, mêmes paramètres que streamlit/reach_sketches.py) ;
+- TopK : valeurs les plus fréquentes (colonnes texte), avec la borne
+  d'erreur des effectifs après fusion ;
+- ColumnProfile : lignes, valeurs manquantes, min / max, moyenne et
+  variance (fusion de Chan), et les esquisses ci-dessus ; sérialisé en JSON.
+"""
+import base64
+import datetime
+import json
+import zlib
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+# t-digest : au plus ~COMPRESSION / 2 centroïdes ; en deçà de COMPRESSION
+# valeurs, les points bruts sont conservés tels quels (quantiles exacts)
+COMPRESSION = 300
+
+# HyperLogLog : m = 2^PRECISION registres
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+# Valeurs fréquentes conservées par colonne texte
+TOPK_CAPACITY = 50
+
+NUMERIC = "NUMERIC"
+DATE = "DATE"
+TEXT = "TEXT"
+
+_EPOCH = pd.Timestamp("1970-01-01")
+_DAY = pd.Timedelta(days=1)
+_BYTE_BITS = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _pack(array):
+    """Tableau numpy -> texte (zlib + base64)"""
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(array).tobytes())).decode("ascii")
+
+
+def _unpack(text, dtype):
+    return np.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=dtype).copy()
+
+
+# ============================================================================
+# T-DIGEST
+# ============================================================================
+
+class TDigest:
+    """Quantiles approchés d'une distribution (centroïdes triés, fusionnables)"""
+
+    def __init__(self, means=None, weights=None, minimum=None, maximum=None, compression=COMPRESSION):
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=COMPRESSION):
+        """Esquisse d'un tableau de valeurs non manquantes"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return cls(compression=compression)
+        digest = cls(values, np.ones(len(values)), float(values.min()), float(values.max()), compression)
+        digest._compress()
+        return digest
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def _compress(self):
+        order = np.argsort(self.means, kind="stable")
+        self.means, self.weights = self.means[order], self.weights[order]
+        if len(self.means) <= self.compression and self.weights.max() <= 1:
+            return
+        # Rang médian de chaque centroïde -> cellule entière de l'échelle k1
+        quantiles = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        scale = np.floor(self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * quantiles - 1, -1, 1)))
+        _, cells = np.unique(scale, return_inverse=True)
+        weights = np.bincount(cells, weights=self.weights)
+        self.means = np.bincount(cells, weights=self.weights * self.means) / weights
+        self.weights = weights
+
+    def merge(self, other):
+        """Esquisse de l'union des deux distributions"""
+        if not len(other.means):
+            return TDigest(self.means, self.weights, self.minimum, self.maximum, self.compression)
+        if not len(self.means):
+            return TDigest(other.means, other.weights, other.minimum, other.maximum, self.compression)
+        digest = TDigest(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]),
+            min(self.minimum, other.minimum),
+            max(self.maximum, other.maximum),
+            self.compression
+        )
+        digest._compress()
+        return digest
+
+    def _knots(self):
+        """Points d'interpolation (valeur, rang cumulé) : min, centres des centroïdes, max"""
+        positions = np.cumsum(self.weights) - self.weights / 2
+        values = np.concatenate([[self.minimum], self.means, [self.maximum]])
+        positions = np.concatenate([[0.0], positions, [self.total]])
+        return values, positions
+
+    def quantile(self, q):
+        """Valeur(s) au(x) quantile(s) q (interpolation linéaire entre centroïdes)"""
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        values, positions = self._knots()
+        result = np.interp(np.asarray(q, dtype=np.float64) * self.total, positions, values)
+        return result if np.ndim(q) else float(result)
+
+    def cdf(self, x):
+        """Part des valeurs inférieures ou égales à x"""
+        if not len(self.means):
+            return np.full(np.shape(x), np.nan) if np.ndim(x) else float("nan")
+        values, positions = self._knots()
+        x = np.asarray(x, dtype=np.float64)
+        result = np.where(x < self.minimum, 0.0,
+                          np.where(x >= self.maximum, 1.0, np.interp(x, values, positions) / self.total))
+        return result if np.ndim(result) else float(result)
+
+    def to_dict(self):
+        return {
+            "means": _pack(self.means), "weights": _pack(self.weights),
+            "min": self.minimum, "max": self.maximum, "compression": self.compression,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(_unpack(data["means"], np.float64), _unpack(data["weights"], np.float64),
+                   data["min"], data["max"], data.get("compression", COMPRESSION))
+
+
+def ks_distance(a, b):
+    """Distance de Kolmogorov-Smirnov approchée entre deux t-digests"""
+    if not len(a.means) or not len(b.means):
+        return float("nan")
+    points = np.concatenate([a.means, b.means, [a.minimum, a.maximum, b.minimum, b.maximum]])
+    return float(np.abs(a.cdf(points) - b.cdf(points)).max())
+
+
+# ============================================================================
+# HYPERLOGLOG
+# ============================================================================
+
+def _bit_length(values):
+    """Nombre de bits significatifs de chaque entier non signé 64 bits"""
+    smeared = np.array(values, dtype=np.uint64)
+    for shift in (1, 2, 4, 8, 16, 32):
+        smeared |= smeared >> np.uint64(shift)
+    # Bits à 1 octet par octet (np.bitwise_count n'existe qu'à partir de numpy 2.0)
+    return _BYTE_BITS[smeared.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+
+
+class HyperLogLog:
+    """Esquisse HyperLogLog (m registres) fusionnable"""
+
+    def __init__(self, registers=None):
+        if registers is None:
+            registers = np.zeros(REGISTERS, dtype=np.uint8)
+        self.registers = registers
+
+    @classmethod
+    def from_hashes(cls, hashes):
+        """Esquisse d'un tableau de hachages 64 bits"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        indices = (hashes >> np.uint64(64 - PRECISION)).astype(np.int64)
+        remainder = hashes << np.uint64(PRECISION)
+        ranks = np.minimum(64 - _bit_length(remainder).astype(np.int64), 64 - PRECISION) + 1
+        registers = np.zeros(REGISTERS, dtype=np.uint8)
+        np.maximum.at(registers, indices, ranks.astype(np.uint8))
+        return cls(registers)
+
+    def merge(self, other):
+        """Union des deux ensembles"""
+        return HyperLogLog(np.maximum(self.registers, other.registers))
+
+    def estimate(self):
+        empty = int((self.registers == 0).sum())
+        raw = ALPHA * REGISTERS * REGISTERS / np.exp2(-self.registers.astype(np.float64)).sum()
+        if raw <= 2.5 * REGISTERS and empty:
+            return int(round(REGISTERS * np.log(REGISTERS / empty)))
+        return int(round(raw))
+
+    def to_dict(self):
+        return _pack(self.registers)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(_unpack(data, np.uint8))
+
+
+# ============================================================================
+# VALEURS FRÉQUENTES
+# ============================================================================
+
+class TopK:
+    """Valeurs les plus fréquentes ; error majore l'effectif sous-estimé de chacune"""
+
+    def __init__(self, counts=None, error=0, capacity=TOPK_CAPACITY):
+        self.counts = dict(counts or {})
+        self.error = error
+        self.capacity = capacity
+
+    @classmethod
+    def from_values(cls, values, capacity=TOPK_CAPACITY):
+        topk = cls(capacity=capacity)
+        topk._keep(pd.Series(values).value_counts().head(capacity + 1).to_dict())
+        return topk
+
+    def _keep(self, counts):
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        if len(ranked) > self.capacity:
+            # Une valeur écartée ici a pu apparaître ailleurs : son effectif
+            # maximal s'ajoute à l'erreur des fusions suivantes
+            self.error += ranked[self.capacity][1]
+        self.counts = {value: int(count) for value, count in ranked[:self.capacity]}
+
+    def merge(self, other):
+        counts = dict(self.counts)
+        for value, count in other.counts.items():
+            counts[value] = counts.get(value, 0) + count
+        topk = TopK(error=self.error + other.error, capacity=self.capacity)
+        topk._keep(counts)
+        return topk
+
+    def top(self, n=10):
+        """[(valeur, effectif)] par effectif décroissant"""
+        return list(self.counts.items())[:n]
+
+    def to_dict(self):
+        return {"counts": [[value, count] for value, count in self.counts.items()], "error": self.error}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({value: count for value, count in data["counts"]}, data["error"])
+
+
+def top_values_distance(a, b, a_total, b_total):
+    """Distance en variation totale entre deux distributions de valeurs fréquentes
+    (le reste de chaque distribution compte comme une seule valeur)"""
+    if not a_total or not b_total:
+        return float("nan")
+    values = set(a.counts) | set(b.counts)
+    pa = np.array([a.counts.get(v, 0) / a_total for v in values])
+    pb = np.array([b.counts.get(v, 0) / b_total for v in values])
+    rest = abs((1 - pa.sum()) - (1 - pb.sum()))
+    return float((np.abs(pa - pb).sum() + rest) / 2)
+
+
+# ============================================================================
+# PROFIL D'UNE COLONNE
+# ============================================================================
+
+def infer_kind(series):
+    """NUMERIC, DATE ou TEXT selon le type pandas (ou la première valeur non manquante)"""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return TEXT
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return NUMERIC
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return DATE
+    present = series.dropna()
+    if len(present) and series.dtype == object:
+        value = present.iloc[0]
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return NUMERIC
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return DATE
+    return TEXT
+
+
+def _values(series, kind):
+    """Valeurs non manquantes : float64 (dates en jours depuis 1970) ou série de chaînes"""
+    if kind == NUMERIC:
+        values = pd.to_numeric(series, errors="coerce").astype("float64")
+        return values[values.notna()].to_numpy()
+    if kind == DATE:
+        values = pd.to_datetime(series, errors="coerce")
+        values = values[values.notna()]
+        if getattr(values.dt, "tz", None) is not None:
+            values = values.dt.tz_convert(None)
+        return ((values - _EPOCH) / _DAY).to_numpy(dtype=np.float64)
+    return series[series.notna()].astype(str)
+
+
+def format_value(value, kind):
+    """Min / max lisible (et convertible en SQL) : nombre, date ISO ou texte"""
+    if value is None:
+        return None
+    if kind == NUMERIC:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    if kind == DATE:
+        moment = _EPOCH + pd.to_timedelta(value, unit="D")
+        return moment.date().isoformat() if moment == moment.normalize() else moment.round("s").isoformat(sep=" ")
+    return value
+
+
+def to_days(value):
+    """Date (ou horodatage) -> jours depuis 1970, l'unité des esquisses de dates"""
+    return (pd.Timestamp(value) - _EPOCH) / _DAY
+
+
+class ColumnProfile:
+    """Statistiques fusionnables d'une colonne sur un ou plusieurs lots"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        # Moments (fusion de Chan) : colonnes numériques
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.digest = TDigest() if kind != TEXT else None
+        self.hll = HyperLogLog()
+        self.topk = TopK() if kind == TEXT else None
+
+    @classmethod
+    def of(cls, series, kind=None):
+        """Profil d'une colonne pandas"""
+        profile = cls(kind or infer_kind(series))
+        values = _values(series, profile.kind)
+        profile.rows = len(series)
+        profile.nulls = len(series) - len(values)
+        if not len(values):
+            return profile
+        if profile.kind == TEXT:
+            profile.minimum, profile.maximum = str(values.min()), str(values.max())
+            profile.topk = TopK.from_values(values)
+            profile.hll = HyperLogLog.from_hashes(pd.util.hash_array(values.to_numpy(dtype=object)))
+            return profile
+        profile.minimum, profile.maximum = float(values.min()), float(values.max())
+        if profile.kind == NUMERIC:
+            profile.count = len(values)
+            profile.mean = float(values.mean())
+            profile.m2 = float(((values - profile.mean) ** 2).sum())
+        profile.digest = TDigest.from_values(values)
+        profile.hll = HyperLogLog.from_hashes(pd.util.hash_array(values))
+        return profile
+
+    def merge(self, other):
+        """Profil de l'union des lots"""
+        if other.kind != self.kind:
+            # Colonne entièrement vide d'un côté : type déduit de l'autre
+            if not other.present:
+                other = other._as_empty(self.kind)
+            elif not self.present:
+                return self._as_empty(other.kind).merge(other)
+            else:
+                raise ValueError(f"Profils incompatibles : {self.kind} / {other.kind}")
+        merged = ColumnProfile(self.kind)
+        merged.rows = self.rows + other.rows
+        merged.nulls = self.nulls + other.nulls
+        bounds = [v for v in (self.minimum, other.minimum) if v is not None]
+        merged.minimum = min(bounds) if bounds else None
+        bounds = [v for v in (self.maximum, other.maximum) if v is not None]
+        merged.maximum = max(bounds) if bounds else None
+        merged.count = self.count + other.count
+        if merged.count:
+            delta = other.mean - self.mean
+            merged.mean = self.mean + delta * other.count / merged.count
+            merged.m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / merged.count
+        if self.digest is not None:
+            merged.digest = self.digest.merge(other.digest)
+        merged.hll = self.hll.merge(other.hll)
+        if self.topk is not None:
+            merged.topk = self.topk.merge(other.topk)
+        return merged
+
+    def _as_empty(self, kind):
+        """Même nombre de lignes, toutes manquantes, du type kind"""
+        empty = ColumnProfile(kind)
+        empty.rows = empty.nulls = self.rows
+        return empty
+
+    @property
+    def present(self):
+        return self.rows - self.nulls
+
+    @property
+    def null_rate(self):
+        return self.nulls / self.rows if self.rows else float("nan")
+
+    @property
+    def stddev(self):
+        """Écart type d'échantillon (comme STDDEV en SQL)"""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None
+
+    def quantile(self, q):
+        return self.digest.quantile(q) if self.digest is not None and self.present else None
+
+    def summary(self):
+        """Colonnes de ANALYTICS.data_quality_profiles"""
+        quantiles = self.quantile([0.05, 0.5, 0.95]) if self.kind == NUMERIC else None
+        return {
+            "column_kind": self.kind,
+            "row_count": self.rows,
+            "null_count": self.nulls,
+            "distinct_estimate": min(self.hll.estimate(), self.present),
+            "min_value": format_value(self.minimum, self.kind),
+            "max_value": format_value(self.maximum, self.kind),
+            "mean_value": self.mean if self.count else None,
+            "stddev_value": self.stddev,
+            "p05_value": float(quantiles[0]) if quantiles is not None else None,
+            "median_value": float(quantiles[1]) if quantiles is not None else None,
+            "p95_value": float(quantiles[2]) if quantiles is not None else None,
+            "top_values": json.dumps(self.topk.top(), ensure_ascii=False) if self.topk is not None else None,
+        }
+
+    def to_json(self):
+        return json.dumps({
+            "kind": self.kind, "rows": self.rows, "nulls": self.nulls,
+            "min": self.minimum, "max": self.maximum,
+            "count": self.count, "mean": self.mean, "m2": self.m2,
+            "digest": self.digest.to_dict() if self.digest is not None else None,
+            "hll": self.hll.to_dict(),
+            "topk": self.topk.to_dict() if self.topk is not None else None,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        profile = cls(data["kind"])
+        profile.rows, profile.nulls = data["rows"], data["nulls"]
+        profile.minimum, profile.maximum = data["min"], data["max"]
+        profile.count, profile.mean, profile.m2 = data["count"], data["mean"], data["m2"]
+        if data["digest"] is not None:
+            profile.digest = TDigest.from_dict(data["digest"])
+        profile.hll = HyperLogLog.from_dict(data["hll"])
+        if data["topk"] is not None:
+            profile.topk = TopK.from_dict(data["topk"])
+        return profile
@@ -0,0 +1,129 @@
+# sales_enriched.py
+"""
+Rafraîchissement de ANALYTICS.sales_enriched.
+
+    python -m pipeline.sales_enriched          # incrémental (MERGE depuis le watermark)
+    python -m pipeline.sales_enriched --full   # remise à zéro puis recalcul complet
+
+Le calendrier région × jour (sql/promo_campaign_calendar.sql) est d'abord
+reconstruit, puis sql/sales_enriched_incremental.sql est exécuté : seules les
+transactions nouvelles depuis le watermark, ou situées dans une fenêtre de
+promotion / campagne modifiée, sont recalculées puis fusionnées dans la cible.
+Les jours touchés du cube ANALYTICS.sales_daily_rollup (sql/sales_rollups.sql)
+et des esquisses ANALYTICS.customer_reach_sketches (sql/customer_reach_sketches.sql),
+ainsi que les audiences des campagnes / promotions touchées
+(ANALYTICS.customer_audiences, sql/customer_audiences.sql), sont recalculés
+dans la même transaction. Le rapport indique les lignes
+insérées, mises à jour, supprimées et recalculées.
+"""
+import argparse
+import re
+import time
+
+from pipeline.session import get_session
+from pipeline.snapshots import publish_after_refresh
+from pipeline.sql_script import read_script, split_statements, statement_kind
+
+CALENDAR_SCRIPT = "promo_campaign_calendar.sql"
+INCREMENTAL_SCRIPT = "sales_enriched_incremental.sql"
+
+# Instructions visant la table cible (les autres MERGE / DELETE portent sur
+# les tables de contrôle et ne sont pas comptés)
+_TARGET_MERGE = re.compile(r"^MERGE\s+INTO\s+ANALYTICS\.sales_enriched\b", re.IGNORECASE)
+_TARGET_DELETE = re.compile(r"^DELETE\s+FROM\s+ANALYTICS\.sales_enriched\b", re.IGNORECASE)
+_TARGET_CREATE = re.compile(r"^CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+ANALYTICS\.sales_enriched\b", re.IGNORECASE)
+
+# Mode --full : exécuté après la création des objets de contrôle, avant la
+# lecture du watermark. La cible est recréée (prise en compte d'un changement
+# de structure de la vue) et toutes les transactions sont recalculées.
+RESET_STATEMENTS = [
+    "DELETE FROM ANALYTICS.sales_enriched_window_snapshot",
+    "DELETE FROM ANALYTICS.etl_watermarks WHERE table_name = 'SALES_ENRICHED'",
+    "DELETE FROM ANALYTICS.sales_daily_rollup",
+    "DELETE FROM ANALYTICS.customer_reach_sketches",
+    "DELETE FROM ANALYTICS.customer_audiences",
+    "DROP TABLE ANALYTICS.sales_enriched",
+]
+
+
+def _row_count(rows, label):
+    """Compteur renvoyé par un DML Snowflake ('number of rows inserted'...)"""
+    if not rows:
+        return 0
+    values = rows[0].as_dict()
+    return int(values.get(label, 0) or 0)
+
+
+def refresh_sales_enriched(session, full=False):
+    """Exécuter le rafraîchissement et renvoyer le rapport (dict)"""
+    statements = split_statements(read_script(INCREMENTAL_SCRIPT))
+    first_set = next(i for i, s in enumerate(statements) if statement_kind(s) == "SET")
+    if full:
+        setup, rest = statements[:first_set], statements[first_set:]
+        recreate = [s for s in setup if _TARGET_CREATE.match(s)]
+        statements = setup + RESET_STATEMENTS + recreate + rest
+    statements = split_statements(read_script(CALENDAR_SCRIPT)) + statements
+
+    report = {"mode": "full" if full else "incremental", "rows_inserted": 0, "rows_updated": 0, "rows_deleted": 0}
+    started = time.monotonic()
+    in_transaction = False
+    try:
+        for index, statement in enumerate(statements):
+            kind = statement_kind(statement)
+            rows = session.sql(statement).collect()
+
+            if kind == "BEGIN":
+                in_transaction = True
+            elif kind in ("COMMIT", "ROLLBACK"):
+                in_transaction = False
+            elif _TARGET_MERGE.match(statement):
+                report["rows_inserted"] += _row_count(rows, "number of rows inserted")
+                report["rows_updated"] += _row_count(rows, "number of rows updated")
+            elif _TARGET_DELETE.match(statement):
+                report["rows_deleted"] += _row_count(rows, "number of rows deleted")
+            elif index == len(statements) - 1 and rows:
+                # Rapport final du script (compteurs de recalcul, ancien watermark)
+                report.update({key.lower(): value for key, value in rows[0].as_dict().items()})
+    except Exception:
+        if in_transaction:
+            try:
+                session.sql("ROLLBACK").collect()
+            except Exception:
+                pass
+        raise
+
+    report["elapsed_s"] = round(time.monotonic() - started, 1)
+    return report
+
+
+def format_report(report):
+    """Rapport lisible"""
+    lines = [
+        f"Rafraîchissement sales_enriched ({report['mode']}) en {report['elapsed_s']}s",
+        f"  Lignes insérées        : {report['rows_inserted']:,}",
+        f"  Lignes mises à jour    : {report['rows_updated']:,}",
+        f"  Lignes supprimées      : {report['rows_deleted']:,}",
+        f"  Lignes recalculées     : {report.get('rows_scanned', 0):,}",
+        f"  Transactions nouvelles : {report.get('new_transactions', 0):,}",
+        f"  Transactions recalculées (fenêtres modifiées) : {report.get('window_transactions', 0):,}",
+        f"  Fenêtres promotions / campagnes modifiées : {report.get('changed_windows', 0):,}",
+        f"  Jours du rollup réagrégés : {report.get('rollup_days', 0):,}",
+        f"  Audiences recalculées  : {report.get('audiences_refreshed', 0):,}",
+        f"  Watermark précédent    : {report.get('previous_watermark_date')} / {report.get('previous_watermark_ingested_at')}",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rafraîchissement incrémental de ANALYTICS.sales_enriched")
+    parser.add_argument("--full", action="store_true", help="Remettre à zéro watermark et cible, puis tout recalculer")
+    args = parser.parse_args(argv)
+
+    session = get_session()
+    report = refresh_sales_enriched(session, full=args.full)
+    print(format_report(report))
+    publish_after_refresh(session)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# session.py
+"""
+Obtention d'une session Snowpark pour les traitements du pipeline.
+
+Dans Snowflake (worksheet Python, Streamlit in Snowflake) la session active est
+réutilisée ; sinon une connexion est ouverte à partir des variables
+d'environnement SNOWFLAKE_*.
+
+Avec ANYCOMPANY_BACKEND=local, une session DuckDB locale est renvoyée à la
+place (pipeline/local_session.py) :
+- ANYCOMPANY_DUCKDB : fichier de base (défaut local/anycompany.duckdb)
+- ANYCOMPANY_STAGE_DIR : dossier des copies locales des fichiers bronze
+"""
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LOCAL_DATABASE = os.path.join(ROOT_DIR, "local", "anycompany.duckdb")
+
+CONNECTION_ENV = {
+    "account": "SNOWFLAKE_ACCOUNT",
+    "user": "SNOWFLAKE_USER",
+    "password": "SNOWFLAKE_PASSWORD",
+    "role": "SNOWFLAKE_ROLE",
+    "warehouse": "SNOWFLAKE_WAREHOUSE",
+}
+
+
+def use_local_backend():
+    """Vrai si l'exécution locale (DuckDB) est demandée"""
+    return os.environ.get("ANYCOMPANY_BACKEND", "snowflake").strip().lower() == "local"
+
+
+def get_local_session(database=None, stage_dir=None, read_only=False):
+    """Session DuckDB locale (fichier et stage par défaut issus de l'environnement)"""
+    from pipeline.local_session import LocalSession
+
+    return LocalSession(
+        database or os.environ.get("ANYCOMPANY_DUCKDB", DEFAULT_LOCAL_DATABASE),
+        stage_dir=stage_dir or os.environ.get("ANYCOMPANY_STAGE_DIR"),
+        read_only=read_only
+    )
+
+
+def get_session():
+    """Session active si disponible, sinon nouvelle session (base ANYCOMPANY_LAB)"""
+    if use_local_backend():
+        return get_local_session()
+
+    try:
+        from snowflake.snowpark.context import get_active_session
+        return get_active_session()
+    except Exception:
+        pass
+
+    from snowflake.snowpark import Session
+
+    configs = {key: os.environ[env] for key, env in CONNECTION_ENV.items() if os.environ.get(env)}
+    configs["database"] = os.environ.get("SNOWFLAKE_DATABASE", "ANYCOMPANY_LAB")
+    configs["schema"] = os.environ.get("SNOWFLAKE_SCHEMA", "ANALYTICS")
+    return Session.builder.configs(configs).create()
@@ -0,0 +1,154 @@
+# snapshots.py
+"""
+Instantanés Parquet des tables lues par les dashboards (démarrage à chaud).
+
+    python -m pipeline.snapshots --out local/snapshots
+    python -m pipeline.snapshots --out local/snapshots --stage local/benchmarks/data/1m-42 --database local/1m.duckdb
+    python -m pipeline.snapshots --status
+
+Les tables de SNAPSHOT_TABLES sont écrites en Parquet partitionné dans
+<dossier>/<version>/<table>/, avec la version de leur source (nombre de
+lignes et empreinte, comme pipeline/dag.py). Le fichier <dossier>/CURRENT
+(JSON, remplacé atomiquement) désigne l'instantané publié : toutes les
+répliques Streamlit qui montent le même dossier lisent le même instantané
+(streamlit/snapshot_store.py). Si aucune source n'a changé depuis le
+précédent, rien n'est réécrit ; les KEEP_VERSIONS derniers instantanés sont
+conservés pour les lecteurs encore ouverts sur un ancien.
+
+Avec ANYCOMPANY_SNAPSHOT_DIR défini, un instantané est publié à la fin de
+pipeline.local_run, pipeline.dag, pipeline.sales_enriched et
+pipeline.blue_green (publish_after_refresh).
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+
+from pipeline.dag import source_version
+from pipeline.session import get_local_session, get_session
+from pipeline.star_export import write_parquet
+
+SNAPSHOT_ENV = "ANYCOMPANY_SNAPSHOT_DIR"
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 3
+
+# Table -> (colonne de partition, expression si colonne calculée)
+SNAPSHOT_TABLES = {
+    "ANALYTICS.PROMOTIONS_ACTIVE": ("start_year", None),
+    "ANALYTICS.MARKETING_PERFORMANCE": ("start_year", None),
+    "ANALYTICS.SALES_DAILY_ROLLUP": ("sale_year", "YEAR(sale_date)"),
+    "ANALYTICS.CUSTOMER_REACH_SKETCHES": ("sketch_type", None),
+    "ANALYTICS.CUSTOMER_AUDIENCES": ("audience_type", None),
+}
+
+
+def read_current(directory):
+    """Manifeste de l'instantané publié (None si aucun)"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _publish(directory, manifest):
+    """Remplacer CURRENT en une opération (os.replace est atomique)"""
+    path = os.path.join(directory, CURRENT_FILE)
+    temporary = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+def _prune(directory, current):
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name)) and name != current
+    )
+    for name in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def write_snapshot(session, directory, force=False, log=print):
+    """Écrire puis publier un instantané ; renvoie son manifeste"""
+    os.makedirs(directory, exist_ok=True)
+    versions = {table: source_version(session, table) for table in SNAPSHOT_TABLES}
+    versions = {table: version for table, version in versions.items() if version != "absent"}
+
+    current = read_current(directory)
+    if current is not None and not force and versions == {
+        table: entry["source_version"] for table, entry in current["tables"].items()
+    }:
+        log(f"Instantané {current['version']} à jour (sources inchangées)")
+        return current
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    manifest = {"version": version, "created_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    for table, source in versions.items():
+        partition, expression = SNAPSHOT_TABLES[table]
+        query = f"SELECT * FROM {table}" if expression is None else \
+            f"SELECT *, {expression} AS {partition} FROM {table}"
+        relative = os.path.join(version, table.split(".")[-1].lower())
+        started = time.monotonic()
+        rows, files = write_parquet(session, query, os.path.join(directory, relative), partition,
+                                    keep_partition=expression is None)
+        manifest["tables"][table] = {
+            "path": relative,
+            "source_version": source,
+            "rows": rows,
+            "files": files,
+        }
+        log(f"  {table} : {rows:,} lignes, {files} fichier(s) en {time.monotonic() - started:.2f}s")
+
+    _publish(directory, manifest)
+    _prune(directory, version)
+    log(f"Instantané {version} publié dans {directory}")
+    return manifest
+
+
+def publish_after_refresh(session, log=print):
+    """Publier un instantané si ANYCOMPANY_SNAPSHOT_DIR est défini (échec signalé, non bloquant)"""
+    directory = os.environ.get(SNAPSHOT_ENV)
+    if not directory:
+        return None
+    try:
+        return write_snapshot(session, directory, log=log)
+    except Exception as e:
+        log(f"⚠️ Instantané des dashboards non publié : {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instantanés Parquet des tables des dashboards")
+    parser.add_argument("--out", default=os.environ.get(SNAPSHOT_ENV),
+                        help=f"Dossier des instantanés (défaut : ${SNAPSHOT_ENV})")
+    parser.add_argument("--force", action="store_true", help="Réécrire même si les sources sont inchangées")
+    parser.add_argument("--status", action="store_true", help="Afficher l'instantané publié")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--database", default=None, help="Fichier DuckDB (avec --stage)")
+    args = parser.parse_args(argv)
+    if not args.out:
+        parser.error(f"--out ou {SNAPSHOT_ENV} requis")
+
+    if args.status:
+        current = read_current(args.out)
+        if current is None:
+            print(f"Aucun instantané publié dans {args.out}")
+            return
+        print(f"Instantané {current['version']} ({current['created_at']})")
+        for table, entry in current["tables"].items():
+            print(f"  {table} : {entry['rows']:,} lignes, {entry['files']} fichier(s)")
+        return
+
+    session = get_local_session(args.database, stage_dir=args.stage) if args.stage else get_session()
+    try:
+        write_snapshot(session, args.out, force=args.force)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# sql_dialect.py
+"""
+Traduction du dialecte Snowflake des scripts sql/ vers DuckDB.
+
+Utilisée par la session locale (pipeline/local_session.py) pour exécuter les
+mêmes scripts sans entrepôt. La traduction est syntaxique : les littéraux
+('...'), identifiants quotés ("...") et commentaires sont d'abord masqués,
+puis :
+
+- types STRING, VARIANT, NUMBER[(p, s)], TIMESTAMP_NTZ / LTZ / TZ ;
+- TRY_TO_NUMBER, TRY_TO_DATE, DATEDIFF, DATEADD, EQUAL_NULL, REGEXP_SUBSTR,
+  CURRENT_DATE() / CURRENT_TIMESTAMP() / CURRENT_USER(), HASH_AGG(*) ;
+- COUNT(DISTINCT a, b), TABLE(GENERATOR(ROWCOUNT => n)) et SEQ4() ;
+- LATERAL FLATTEN(input => x) f et chemins JSON f.value:champ ;
+- clauses CLUSTER BY (...) et COMMENT = '...', tables TEMPORARY / TRANSIENT,
+  CREATE TABLE ... LIKE ;
+- variables de session $nom (valeurs fournies par l'appelant).
+
+Les instructions sans équivalent (COPY INTO, SET, stages, formats de
+fichier...) sont émulées par la session elle-même.
+"""
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_MARKER = re.compile("\x00(\\d+)\x00")
+
+_DATE_UNITS = {
+    "year": "years", "years": "years", "yy": "years", "yyyy": "years",
+    "quarter": "quarters", "month": "months", "months": "months", "mm": "months",
+    "week": "weeks", "weeks": "weeks", "day": "days", "days": "days", "dd": "days",
+    "hour": "hours", "hours": "hours", "minute": "minutes", "minutes": "minutes",
+    "second": "seconds", "seconds": "seconds",
+}
+
+_VARIABLE = re.compile(r"\$([A-Za-z_]\w*)")
+_JSON_PATH = re.compile(r"(?<![\w.$\x00])([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*):([A-Za-z_]\w*)")
+
+
+# ============================================================================
+# MASQUAGE DES LITTÉRAUX
+# ============================================================================
+
+def mask_literals(sql):
+    """Remplacer littéraux, identifiants quotés et commentaires par des marqueurs \\x00n\\x00"""
+    literals = []
+
+    def _mask(match):
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    return _LITERAL.sub(_mask, sql), literals
+
+
+def unmask_literals(sql, literals):
+    """Restaurer les littéraux (échappements \\ de Snowflake -> chaînes E'...')"""
+    def _unmask(match):
+        literal = literals[int(match.group(1))]
+        if literal.startswith("'") and "\\" in literal:
+            return "E" + literal
+        return literal
+
+    return _MARKER.sub(_unmask, sql)
+
+
+def find_closing_paren(sql, open_index):
+    """Position de la parenthèse fermant celle située à open_index"""
+    depth = 0
+    for i in range(open_index, len(sql)):
+        if sql[i] == "(":
+            depth += 1
+        elif sql[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"Parenthèse non fermée : {sql[open_index:open_index + 60]}...")
+
+
+def split_arguments(text):
+    """Découper une liste d'arguments sur les virgules de premier niveau"""
+    args = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(text):
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "," and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    if text.strip():
+        args.append(text[start:].strip())
+    return args
+
+
+def sql_literal(value):
+    """Littéral SQL d'une valeur Python (substitution des variables $nom)"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        kind = "TIMESTAMPTZ" if value.tzinfo is not None else "TIMESTAMP"
+        return f"{kind} '{value.isoformat(sep=' ')}'"
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# ============================================================================
+# RÉÉCRITURE DES FONCTIONS
+# ============================================================================
+
+def _rewrite_calls(sql, name, rewrite):
+    """Réécrire les appels name(...) ; les plus internes sont traités d'abord"""
+    pattern = re.compile(r"(?<![\w.$])" + name + r"\s*\(", re.IGNORECASE)
+    for match in reversed(list(pattern.finditer(sql))):
+        open_index = match.end() - 1
+        close_index = find_closing_paren(sql, open_index)
+        replacement = rewrite(split_arguments(sql[open_index + 1:close_index]))
+        if replacement is not None:
+            sql = sql[:match.start()] + replacement + sql[close_index + 1:]
+    return sql
+
+
+def _remove_clause(sql, pattern):
+    """Retirer une clause suivie d'une liste entre parenthèses (CLUSTER BY (...))"""
+    for match in reversed(list(re.finditer(pattern, sql, re.IGNORECASE))):
+        close_index = find_closing_paren(sql, match.end() - 1)
+        sql = sql[:match.start()] + sql[close_index + 1:]
+    return sql
+
+
+def translate(sql, variables=None):
+    """Instruction Snowflake -> instruction DuckDB équivalente"""
+    masked, literals = mask_literals(sql)
+
+    def _part(arg):
+        # Unité de date : mot-clé (DAY) ou littéral ('day')
+        match = _MARKER.fullmatch(arg.strip())
+        text = literals[int(match.group(1))].strip("'") if match else arg.strip()
+        return text.lower()
+
+    def _variable(match):
+        name = match.group(1).upper()
+        if variables is None or name not in variables:
+            raise KeyError(f"Variable de session ${match.group(1)} non définie")
+        literals.append(sql_literal(variables[name]))
+        return f"\x00{len(literals) - 1}\x00"
+
+    def _datediff(args):
+        return f"date_diff('{_part(args[0])}', {args[1]}, {args[2]})"
+
+    def _dateadd(args):
+        unit = _DATE_UNITS.get(_part(args[0]))
+        if unit == "days":
+            return f"({args[2]} + CAST({args[1]} AS INTEGER))"
+        if unit == "quarters":
+            return f"({args[2]} + to_months(3 * CAST({args[1]} AS INTEGER)))"
+        return f"({args[2]} + to_{unit}(CAST({args[1]} AS INTEGER)))"
+
+    def _try_to_number(args):
+        if len(args) == 3:
+            return f"TRY_CAST({args[0]} AS DECIMAL({args[1]}, {args[2]}))"
+        return f"TRY_CAST({args[0]} AS DECIMAL(38, 0))" if len(args) == 1 else None
+
+    def _regexp_substr(args):
+        if len(args) == 2:
+            return f"NULLIF(regexp_extract({args[0]}, {args[1]}), '')"
+        return None
+
+    def _count(args):
+        # COUNT(DISTINCT a, b) : lignes où aucune colonne n'est NULL
+        if len(args) < 2 or not re.match(r"DISTINCT\s", args[0], re.IGNORECASE):
+            return None
+        args = [re.sub(r"^DISTINCT\s+", "", args[0], flags=re.IGNORECASE)] + args[1:]
+        not_null = " AND ".join(f"{arg} IS NOT NULL" for arg in args)
+        return f"COUNT(DISTINCT CASE WHEN {not_null} THEN ROW({', '.join(args)}) END)"
+
+    masked = _VARIABLE.sub(_variable, masked)
+
+    masked = _rewrite_calls(masked, "DATEDIFF", _datediff)
+    masked = _rewrite_calls(masked, "DATEADD", _dateadd)
+    masked = _rewrite_calls(masked, "TRY_TO_NUMBER", _try_to_number)
+    masked = _rewrite_calls(masked, "TRY_TO_DATE", lambda args: f"TRY_CAST({args[0]} AS DATE)" if len(args) == 1 else None)
+    masked = _rewrite_calls(masked, "EQUAL_NULL", lambda args: f"({args[0]} IS NOT DISTINCT FROM {args[1]})")
+    masked = _rewrite_calls(masked, "REGEXP_SUBSTR", _regexp_substr)
+    masked = _rewrite_calls(masked, "COUNT", _count)
+    masked = re.sub(r"\bCURRENT_(DATE|TIMESTAMP|USER)\s*\(\s*\)", r"CURRENT_\1", masked, flags=re.IGNORECASE)
+    # Empreinte d'une table (indépendante de l'ordre des lignes)
+    masked = re.sub(r"\bHASH_AGG\s*\(\s*\*\s*\)", "SUM(hash(*COLUMNS(*)))", masked, flags=re.IGNORECASE)
+
+    # Générateur de lignes et FLATTEN
+    masked = re.sub(r"\bTABLE\s*\(\s*GENERATOR\s*\(\s*ROWCOUNT\s*=>\s*(\d+)\s*\)\s*\)", r"range(\1)",
+                    masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bSEQ[1248]\s*\(\s*\)", "range", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bLATERAL\s+FLATTEN\s*\(\s*INPUT\s*=>\s*([\w.]+)\s*\)",
+                    r"LATERAL (SELECT unnest(CAST(\1 AS JSON[])) AS value)", masked, flags=re.IGNORECASE)
+    masked = _JSON_PATH.sub(r"(\1->>'\2')", masked)
+
+    # CREATE TABLE ... LIKE : structure seule
+    masked = re.sub(r"^(\s*CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[\w.]+)\s+LIKE\s+([\w.]+)\s*$",
+                    r"\1 AS SELECT * FROM \2 LIMIT 0", masked, flags=re.IGNORECASE)
+
+    # Clauses de stockage sans équivalent
+    masked = _remove_clause(masked, r"\bCLUSTER\s+BY\s*\(")
+    masked = re.sub(r"\bCOMMENT\s*=\s*\x00\d+\x00", "", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\b(?:TEMPORARY|TEMP|TRANSIENT)\s+TABLE\b", "TABLE", masked, flags=re.IGNORECASE)
+
+    # Types
+    masked = re.sub(r"\bSTRING\b", "VARCHAR", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bVARIANT\b", "JSON", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bTIMESTAMP_NTZ\b", "TIMESTAMP", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bTIMESTAMP_(?:LTZ|TZ)\b", "TIMESTAMPTZ", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bNUMBER\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)", r"DECIMAL(\1, \2)", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bNUMBER\s*\(\s*(\d+)\s*\)", r"DECIMAL(\1, 0)", masked, flags=re.IGNORECASE)
+    masked = re.sub(r"\bNUMBER\b", "DECIMAL(38, 0)", masked, flags=re.IGNORECASE)
+
+    return unmask_literals(masked, literals)
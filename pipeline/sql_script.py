@@ -0,0 +1,72 @@
+# sql_script.py
+"""
+Lecture et découpage des scripts SQL du dossier sql/.
+
+Le découpage sur ';' ignore les points-virgules situés dans les littéraux
+('...'), les identifiants quotés ("..."), les blocs $$...$$ et les
+commentaires ; les commentaires sont retirés des instructions renvoyées.
+"""
+import os
+import re
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+
+def read_script(name):
+    """Contenu d'un script du dossier sql/"""
+    with open(os.path.join(SQL_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def split_statements(script):
+    """Découper un script en instructions (sans commentaires ni ';' final)"""
+    statements = []
+    current = []
+    i = 0
+    n = len(script)
+    while i < n:
+        c = script[i]
+        if c in ("'", '"'):
+            j = i + 1
+            while j < n:
+                if script[j] == "\\" and c == "'":
+                    j += 2
+                elif script[j] == c and j + 1 < n and script[j + 1] == c:
+                    j += 2
+                elif script[j] == c:
+                    break
+                else:
+                    j += 1
+            current.append(script[i:j + 1])
+            i = j + 1
+        elif script.startswith("$$", i):
+            j = script.find("$$", i + 2)
+            j = n if j == -1 else j + 2
+            current.append(script[i:j])
+            i = j
+        elif script.startswith("--", i):
+            j = script.find("\n", i)
+            i = n if j == -1 else j
+        elif script.startswith("/*", i):
+            j = script.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            current.append(" ")
+        elif c == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+        else:
+            current.append(c)
+            i += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def statement_kind(statement):
+    """Premier mot-clé d'une instruction, en majuscules (SELECT, MERGE, SET...)"""
+    match = re.match(r"\s*([A-Za-z]+)", statement)
+    return match.group(1).upper() if match else ""
@@ -0,0 +1,164 @@
+# star_export.py
+"""
+Extraction Parquet du schéma en étoile des ventes (sql/sales_star_export.sql).
+
+    python -m pipeline.star_export --out exports/star
+    python -m pipeline.star_export --out exports/star --skip-build
+    python -m pipeline.star_export --stage local/benchmarks/data/1m-42 --database local/1m.duckdb --out exports/star
+
+Le script SQL est d'abord exécuté (faits, dimensions, instantanés et tests),
+puis chaque table est écrite dans <out>/<table>/ :
+- dimensions et instantanés : un fichier part-0.parquet ;
+- export_fact_sales : partitions Hive par mois de vente
+  (sale_month=AAAAMM/part-0.parquet), un fichier par mois.
+
+Chaque table est lue en un seul parcours, par lots (to_pandas_batches) ; un
+écrivain Parquet reste ouvert par partition et reçoit les lignes du lot qui
+la concernent. Mémoire bornée à un lot, durée proportionnelle au nombre de
+ventes. Le dossier d'une table est remplacé à chaque extraction.
+"""
+import argparse
+import os
+import shutil
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle : uniquement pour l'extraction
+    pa = pc = pq = None
+
+from pipeline.local_run import run_script
+from pipeline.session import get_local_session, get_session
+
+EXPORT_SCRIPT = "sales_star_export.sql"
+
+# Table -> colonne de partition (None : un seul fichier)
+EXPORT_TABLES = {
+    "ANALYTICS.export_dim_date": None,
+    "ANALYTICS.export_dim_region": None,
+    "ANALYTICS.export_dim_customer": None,
+    "ANALYTICS.export_dim_promotion": None,
+    "ANALYTICS.export_dim_campaign": None,
+    "ANALYTICS.export_dim_shipment": None,
+    "ANALYTICS.export_inventory_snapshot": None,
+    "ANALYTICS.export_review_snapshot": None,
+    "ANALYTICS.export_fact_sales": "sale_month",
+}
+
+# Colonnes de partition calculées à la lecture
+PARTITION_EXPRESSIONS = {
+    "sale_month": "CAST(FLOOR(date_key / 100) AS INTEGER)",
+}
+
+# Dossier des lignes sans valeur de partition (convention Hive)
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+
+
+class _PartitionedWriter:
+    """Écrivains Parquet d'une table, un par valeur de partition"""
+
+    def __init__(self, directory, partition=None, keep_partition=False):
+        self.directory = directory
+        self.partition = partition
+        self.keep_partition = keep_partition
+        self.schema = None
+        self.rows = 0
+        self._writers = {}
+
+    def _writer(self, value):
+        if value not in self._writers:
+            folder = self.directory if self.partition is None else os.path.join(
+                self.directory, f"{self.partition}={HIVE_NULL if value is None else value}")
+            os.makedirs(folder, exist_ok=True)
+            self._writers[value] = pq.ParquetWriter(os.path.join(folder, "part-0.parquet"), self.schema)
+        return self._writers[value]
+
+    def write(self, frame):
+        frame.columns = [str(c).lower() for c in frame.columns]
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.schema is None:
+            # Schéma fixé par le premier lot ; colonnes entièrement nulles typées en texte
+            self.schema = pa.schema([
+                pa.field(f.name, pa.string() if pa.types.is_null(f.type) else f.type)
+                for f in table.schema if self.keep_partition or f.name != self.partition
+            ])
+        if self.partition is None:
+            self._writer(None).write_table(table.cast(self.schema))
+        else:
+            values = table.column(self.partition)
+            for value in values.unique().to_pylist():
+                mask = pc.is_null(values) if value is None else pc.equal(values, value)
+                part = table.filter(mask)
+                if not self.keep_partition:
+                    part = part.drop([self.partition])
+                self._writer(value).write_table(part.cast(self.schema))
+        self.rows += len(frame)
+
+    @property
+    def files(self):
+        return len(self._writers)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+
+def write_parquet(session, query, directory, partition=None, keep_partition=False):
+    """
+    Écrire le résultat de query dans directory (remplacé) ; renvoie (lignes, fichiers).
+    partition : colonne du résultat (en minuscules) donnant le sous-dossier
+    partition=valeur ; retirée des fichiers sauf si keep_partition.
+    """
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    writer = _PartitionedWriter(directory, partition, keep_partition)
+    try:
+        for batch in session.sql(query).to_pandas_batches():
+            writer.write(batch)
+    finally:
+        writer.close()
+    return writer.rows, writer.files
+
+
+def export_table(session, table, directory, partition=None):
+    """Écrire une table dans directory ; renvoie (lignes, fichiers)"""
+    columns = "*" if partition is None else f"*, {PARTITION_EXPRESSIONS[partition]} AS {partition}"
+    return write_parquet(session, f"SELECT {columns} FROM {table}", directory, partition)
+
+
+def export_star(session, out_dir, build=True, log=print):
+    """(Re)construire le schéma en étoile puis l'extraire en Parquet ; renvoie {table: métriques}"""
+    if pq is None:
+        raise RuntimeError("pyarrow est requis pour l'extraction Parquet (pip install pyarrow)")
+    if build:
+        run_script(session, EXPORT_SCRIPT, log=log)
+
+    report = {}
+    for table, partition in EXPORT_TABLES.items():
+        started = time.monotonic()
+        directory = os.path.join(out_dir, table.split(".")[-1].lower())
+        rows, files = export_table(session, table, directory, partition)
+        report[table] = {"rows": rows, "files": files, "seconds": round(time.monotonic() - started, 2)}
+        log(f"  {table} : {rows:,} lignes, {files} fichier(s) en {report[table]['seconds']}s")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction Parquet du schéma en étoile des ventes")
+    parser.add_argument("--out", required=True, help="Dossier de l'extraction")
+    parser.add_argument("--skip-build", action="store_true", help=f"Extraire sans réexécuter {EXPORT_SCRIPT}")
+    parser.add_argument("--stage", default=None, help="Dossier local tenant lieu de stage (exécution DuckDB)")
+    parser.add_argument("--database", default=None, help="Fichier DuckDB (avec --stage)")
+    args = parser.parse_args(argv)
+
+    session = get_local_session(args.database, stage_dir=args.stage) if args.stage else get_session()
+    try:
+        export_star(session, args.out, build=not args.skip_build)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,14 @@ URL = 's3://logbrain-datalake/datasets/food-beverage/'
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"')
 COMMENT = 'Stage externe pour les datasets food & beverage';
 
+-- Stage interne des fichiers préparés par le pipeline Python : avis produits
+-- analysés par python -m pipeline.product_reviews, JSON découpés par
+-- python -m pipeline.json_staging. Reconstruction complète : les lancer entre
+-- les sections 3 et 4 (la base vient d'être recréée ; json_staging --force) ;
+-- pipeline.local_run et pipeline.ingestion les lancent eux-mêmes.
+CREATE STAGE IF NOT EXISTS BRONZE.parsed_stage
+COMMENT = 'Stage interne des fichiers Parquet préparés (avis produits analysés, JSON découpés)';
+
 ---------------------------------------------------------------
 -- SECTION 3: BRONZE LAYER - RAW TABLES CREATION
 ---------------------------------------------------------------
@@ -73,7 +81,8 @@ CREATE OR REPLACE TABLE BRONZE.financial_transactions (
     payment_method STRING,
     entity STRING,
     region STRING,
-    account_code STRING
+    account_code STRING,
+    ingested_at TIMESTAMP_NTZ -- Horodatage de chargement (watermark du rafraîchissement incrémental)
 )
 COMMENT = 'Transactions financières brutes';
 
@@ -149,38 +158,88 @@ CREATE OR REPLACE TABLE BRONZE.employee_records (
 )
 COMMENT = 'Dossiers bruts des employés';
 
--- 3.9 Table des avis produits (format brut)
+-- 3.9 Tables des avis produits (analysés par pipeline/product_reviews.py)
 CREATE OR REPLACE TABLE BRONZE.product_reviews (
-    raw_line STRING
+    reviewer_id STRING,
+    reviewer_name STRING,
+    rating NUMBER(1,0),
+    review_date DATE,
+    product_category STRING,
+    review_text STRING,
+    source_file STRING,
+    source_line NUMBER
 )
-COMMENT = 'Avis produits en format brut (une ligne complète)';
+COMMENT = 'Avis produits typés (CSV analysé avec guillemets, une ligne par avis)';
 
--- 3.10 Format JSON pour les fichiers structurés
-CREATE OR REPLACE FILE FORMAT BRONZE.json_format
-TYPE = 'JSON'
-COMMENT = 'Format pour fichiers JSON';
+CREATE OR REPLACE TABLE BRONZE.product_review_rejects (
+    source_file STRING,
+    source_line NUMBER,
+    error STRING,
+    rejected_record STRING
+)
+COMMENT = 'Lignes mal formées de product_reviews.csv (ligne d''origine et motif)';
 
--- 3.11 Tables de staging pour données JSON
+-- 3.10 Tables de staging pour données JSON : un enregistrement par ligne,
+-- découpés et typés par pipeline/json_staging.py (plus de VARIANT à aplatir)
 CREATE OR REPLACE TABLE BRONZE.inventory_staging (
-    raw_data VARIANT
+    product_id VARCHAR(50),
+    product_category VARCHAR(100),
+    region VARCHAR(100),
+    country VARCHAR(100),
+    warehouse VARCHAR(100),
+    current_stock NUMBER,
+    reorder_point NUMBER,
+    lead_time NUMBER,
+    last_restock_date DATE,
+    source_file STRING,
+    source_record NUMBER
 )
-COMMENT = 'Staging pour données JSON d''inventaire';
+COMMENT = 'Staging des données JSON d''inventaire (un enregistrement par ligne)';
 
 CREATE OR REPLACE TABLE BRONZE.store_locations_staging (
-    raw_data VARIANT
+    store_id VARCHAR(50),
+    store_name VARCHAR(100),
+    store_type VARCHAR(50),
+    region VARCHAR(100),
+    country VARCHAR(100),
+    city VARCHAR(100),
+    address VARCHAR(200),
+    postal_code NUMBER,
+    square_footage DECIMAL(10,2),
+    employee_count NUMBER,
+    source_file STRING,
+    source_record NUMBER
+)
+COMMENT = 'Staging des données JSON des magasins (un enregistrement par ligne)';
+
+-- 3.11 Enregistrements JSON rejetés (rang dans le fichier et motif)
+CREATE OR REPLACE TABLE BRONZE.inventory_rejects (
+    source_file STRING,
+    source_record NUMBER,
+    error STRING,
+    rejected_record STRING
 )
-COMMENT = 'Staging pour données JSON des magasins';
+COMMENT = 'Enregistrements d''inventaire invalides ou JSON mal formé';
 
--- 3.12 Format CSV pour lignes complètes (reviews)
-CREATE OR REPLACE FILE FORMAT BRONZE.csv_full_line
-TYPE = 'CSV'
-FIELD_DELIMITER = NONE
-SKIP_HEADER = 1
-COMMENT = 'Format CSV pour lignes non délimitées (avis produits)';
+CREATE OR REPLACE TABLE BRONZE.store_locations_rejects (
+    source_file STRING,
+    source_record NUMBER,
+    error STRING,
+    rejected_record STRING
+)
+COMMENT = 'Enregistrements de magasins invalides ou JSON mal formé';
+
+-- 3.12 Format Parquet pour les fichiers préparés (avis produits, JSON découpés)
+CREATE OR REPLACE FILE FORMAT BRONZE.parquet_format
+TYPE = 'PARQUET'
+COMMENT = 'Format pour les fichiers Parquet du stage interne';
 
 ---------------------------------------------------------------
 -- SECTION 4: DATA LOADING INTO BRONZE LAYER
 ---------------------------------------------------------------
+-- Chargement initial. Rafraîchissements : python -m pipeline.ingestion
+-- (nouveaux fichiers uniquement, quarantaine des rejets, voir
+-- bronze_ingestion.sql) ; ces COPY INTO y sont réutilisés avec FILES = (...).
 
 -- 4.1 Chargement des données démographiques clients
 COPY INTO BRONZE.customer_demographics
@@ -196,7 +255,10 @@ ON_ERROR = 'CONTINUE';
 
 -- 4.3 Chargement des transactions financières
 COPY INTO BRONZE.financial_transactions
-FROM @BRONZE.food_beverage_stage/financial_transactions.csv
+FROM (
+    SELECT $1, $2, $3, $4, $5, $6, $7, $8, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ
+    FROM @BRONZE.food_beverage_stage/financial_transactions.csv
+)
 FILE_FORMAT = (TYPE = 'CSV' SKIP_HEADER = 1 FIELD_OPTIONALLY_ENCLOSED_BY='"')
 ON_ERROR = 'CONTINUE';
 
@@ -230,21 +292,44 @@ FROM @BRONZE.food_beverage_stage/employee_records.csv
 FILE_FORMAT = (TYPE = 'CSV' SKIP_HEADER = 1 FIELD_OPTIONALLY_ENCLOSED_BY='"')
 ON_ERROR = 'CONTINUE';
 
--- 4.9 Chargement des avis produits
+-- 4.9 Chargement des avis produits : Parquet typés produits par
+-- python -m pipeline.product_reviews à partir de product_reviews.csv
 COPY INTO BRONZE.product_reviews
-FROM @BRONZE.food_beverage_stage/product_reviews.csv
-FILE_FORMAT = BRONZE.csv_full_line
+FROM @BRONZE.parsed_stage/parsed/product_reviews.parquet
+FILE_FORMAT = BRONZE.parquet_format
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+ON_ERROR = 'CONTINUE';
+
+COPY INTO BRONZE.product_review_rejects
+FROM @BRONZE.parsed_stage/parsed/product_review_rejects.parquet
+FILE_FORMAT = BRONZE.parquet_format
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
 ON_ERROR = 'CONTINUE';
 
--- 4.10 Chargement des données JSON
+-- 4.10 Chargement des données JSON : Parquet typés produits par
+-- python -m pipeline.json_staging à partir de inventory.json et store_locations.json
 COPY INTO BRONZE.inventory_staging
-FROM @BRONZE.food_beverage_stage/inventory.json
-FILE_FORMAT = BRONZE.json_format
+FROM @BRONZE.parsed_stage/parsed/inventory.parquet
+FILE_FORMAT = BRONZE.parquet_format
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+ON_ERROR = 'CONTINUE';
+
+COPY INTO BRONZE.inventory_rejects
+FROM @BRONZE.parsed_stage/parsed/rejected_inventory.parquet
+FILE_FORMAT = BRONZE.parquet_format
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
 ON_ERROR = 'CONTINUE';
 
 COPY INTO BRONZE.store_locations_staging
-FROM @BRONZE.food_beverage_stage/store_locations.json
-FILE_FORMAT = BRONZE.json_format
+FROM @BRONZE.parsed_stage/parsed/store_locations.parquet
+FILE_FORMAT = BRONZE.parquet_format
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+ON_ERROR = 'CONTINUE';
+
+COPY INTO BRONZE.store_locations_rejects
+FROM @BRONZE.parsed_stage/parsed/rejected_store_locations.parquet
+FILE_FORMAT = BRONZE.parquet_format
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
 ON_ERROR = 'CONTINUE';
 
 ---------------------------------------------------------------
@@ -262,7 +347,8 @@ SELECT
     payment_method,
     entity,
     region,
-    account_code
+    account_code,
+    ingested_at
 FROM BRONZE.financial_transactions
 WHERE TRY_TO_NUMBER(REPLACE(amount, ' ', '')) > 0 -- Exclut les montants nuls/négatifs
 QUALIFY ROW_NUMBER() OVER (PARTITION BY transaction_id ORDER BY transaction_date) = 1; -- Dédoublonnage
@@ -449,42 +535,45 @@ WHERE start_date <= end_date
 
 COMMENT ON TABLE SILVER.marketing_campaigns_clean IS 'Campagnes marketing nettoyées avec indicateurs d''efficacité';
 
--- 5.9 Nettoyage des avis produits (SIMPLIFIÉ - nécessite parsing spécifique)
+-- 5.9 Nettoyage des avis produits (colonnes déjà typées en BRONZE)
 CREATE OR REPLACE TABLE SILVER.product_reviews_clean AS
 SELECT
-    -- Extraction basique des données (à adapter selon le format réel)
-    SPLIT_PART(raw_line, ',', 1) AS reviewer_id,
-    SPLIT_PART(raw_line, ',', 2) AS reviewer_name,
-    TRY_TO_NUMBER(SPLIT_PART(raw_line, ',', 3)) AS rating,
-    TRY_TO_DATE(SPLIT_PART(raw_line, ',', 4)) AS review_date,
-    SPLIT_PART(raw_line, ',', 5) AS product_category,
+    reviewer_id,
+    reviewer_name,
+    rating,
+    review_date,
+    product_category,
+    review_text,
     -- Classification du sentiment basé sur la note
     CASE
-        WHEN TRY_TO_NUMBER(SPLIT_PART(raw_line, ',', 3)) >= 4 THEN 'Positive'
-        WHEN TRY_TO_NUMBER(SPLIT_PART(raw_line, ',', 3)) = 3 THEN 'Neutral'
-        WHEN TRY_TO_NUMBER(SPLIT_PART(raw_line, ',', 3)) <= 2 THEN 'Negative'
+        WHEN rating >= 4 THEN 'Positive'
+        WHEN rating = 3 THEN 'Neutral'
+        WHEN rating <= 2 THEN 'Negative'
         ELSE 'Unknown'
     END AS sentiment
 FROM BRONZE.product_reviews
-WHERE raw_line IS NOT NULL
-  AND raw_line != ''
-QUALIFY ROW_NUMBER() OVER (PARTITION BY SPLIT_PART(raw_line, ',', 1) 
-                          ORDER BY TRY_TO_DATE(SPLIT_PART(raw_line, ',', 4)) DESC) = 1;
+WHERE reviewer_id IS NOT NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY reviewer_id
+                          ORDER BY review_date DESC, source_line DESC) = 1;
 
 COMMENT ON TABLE SILVER.product_reviews_clean IS 'Avis produits nettoyés avec analyse de sentiment';
 
--- 5.10 Transformation des données d'inventaire JSON
-CREATE OR REPLACE TABLE SILVER.inventory_clean AS
-SELECT 
-    f.value:product_id::VARCHAR(50) AS product_id,
-    f.value:product_category::VARCHAR(100) AS product_category,
-    f.value:region::VARCHAR(100) AS region,
-    f.value:country::VARCHAR(100) AS country,
-    f.value:warehouse::VARCHAR(100) AS warehouse,
-    f.value:current_stock::NUMBER AS current_stock,
-    f.value:reorder_point::NUMBER AS reorder_point,
-    f.value:lead_time::NUMBER AS lead_time,
-    f.value:last_restock_date::DATE AS last_restock_date,
+-- 5.10 Inventaire : une ligne par (product_id, warehouse), dernier
+-- enregistrement reçu (fichier, puis rang dans le fichier). La vue porte la
+-- logique, partagée avec le rafraîchissement incrémental par clé
+-- (sql/inventory_incremental.sql, lancé par pipeline.ingestion quand seuls
+-- des fichiers d'inventaire nouveaux sont chargés).
+CREATE OR REPLACE VIEW SILVER.inventory_source AS
+SELECT
+    product_id,
+    product_category,
+    region,
+    country,
+    warehouse,
+    current_stock,
+    reorder_point,
+    lead_time,
+    last_restock_date,
     -- Calcul du niveau de stock
     CASE
         WHEN current_stock <= reorder_point THEN 'Critique'
@@ -493,34 +582,47 @@ SELECT
         ELSE 'Élevé'
     END AS stock_level,
     -- Calcul des jours depuis le dernier réapprovisionnement
-    DATEDIFF('day', last_restock_date, CURRENT_DATE()) AS days_since_restock
-FROM BRONZE.inventory_staging,
-LATERAL FLATTEN(input => raw_data) f
-WHERE f.value:product_id IS NOT NULL;
+    DATEDIFF('day', last_restock_date, CURRENT_DATE()) AS days_since_restock,
+    source_file,
+    source_record
+FROM BRONZE.inventory_staging
+WHERE product_id IS NOT NULL;
+
+CREATE OR REPLACE TABLE SILVER.inventory_clean AS
+SELECT *
+FROM SILVER.inventory_source
+QUALIFY ROW_NUMBER() OVER (PARTITION BY product_id, warehouse
+                          ORDER BY source_file DESC, source_record DESC) = 1;
 
 COMMENT ON TABLE SILVER.inventory_clean IS 'Inventaire structuré avec indicateurs de stock';
 
+-- Fichiers d'inventaire déjà fusionnés dans inventory_clean
+CREATE OR REPLACE TABLE SILVER.inventory_clean_files AS
+SELECT DISTINCT
+    source_file,
+    CURRENT_TIMESTAMP()::TIMESTAMP_NTZ AS merged_at
+FROM BRONZE.inventory_staging;
+
 -- 5.11 Transformation des données des magasins JSON
 CREATE OR REPLACE TABLE SILVER.store_locations_clean AS
 SELECT 
-    f.value:store_id::VARCHAR(50) AS store_id,
-    f.value:store_name::VARCHAR(100) AS store_name,
-    f.value:store_type::VARCHAR(50) AS store_type,
-    f.value:region::VARCHAR(100) AS region,
-    f.value:country::VARCHAR(100) AS country,
-    f.value:city::VARCHAR(100) AS city,
-    f.value:address::VARCHAR(200) AS address,
-    f.value:postal_code::NUMBER AS postal_code,
-    f.value:square_footage::DECIMAL(10,2) AS square_footage,
-    f.value:employee_count::NUMBER AS employee_count,
+    store_id,
+    store_name,
+    store_type,
+    region,
+    country,
+    city,
+    address,
+    postal_code,
+    square_footage,
+    employee_count,
     -- Calcul de la densité d'employés
     CASE
         WHEN square_footage > 0 THEN employee_count / square_footage
         ELSE NULL
     END AS employee_density
-FROM BRONZE.store_locations_staging,
-LATERAL FLATTEN(input => raw_data) f
-WHERE f.value:store_id IS NOT NULL;
+FROM BRONZE.store_locations_staging
+WHERE store_id IS NOT NULL;
 
 COMMENT ON TABLE SILVER.store_locations_clean IS 'Localisations magasins avec indicateurs opérationnels';
 
@@ -528,7 +630,13 @@ COMMENT ON TABLE SILVER.store_locations_clean IS 'Localisations magasins avec in
 -- SECTION 6: DATA QUALITY CHECKS
 ---------------------------------------------------------------
 
--- 6.1 Vérification des comptes par table (ÉTENDU)
+-- Les statistiques des tables SILVER (comptes, valeurs manquantes, plages de
+-- valeurs, intégrité temporelle) ne sont plus recalculées ici par relecture
+-- complète : pipeline.data_quality les tient à jour par lot de chargement
+-- (ANALYTICS.data_quality_profiles, sql/data_quality_profiles.sql), après
+-- chaque reconstruction (pipeline.local_run, pipeline.dag, pipeline.ingestion).
+
+-- 6.1 Vérification des comptes des tables BRONZE
 SELECT 'BRONZE Layer' AS layer, table_name, record_count FROM (
     SELECT 'customer_demographics' AS table_name, COUNT(*) AS record_count FROM BRONZE.customer_demographics
     UNION ALL SELECT 'financial_transactions', COUNT(*) FROM BRONZE.financial_transactions
@@ -538,92 +646,10 @@ SELECT 'BRONZE Layer' AS layer, table_name, record_count FROM (
     UNION ALL SELECT 'supplier_information', COUNT(*) FROM BRONZE.supplier_information
     UNION ALL SELECT 'employee_records', COUNT(*) FROM BRONZE.employee_records
     UNION ALL SELECT 'product_reviews', COUNT(*) FROM BRONZE.product_reviews
+    UNION ALL SELECT 'product_review_rejects', COUNT(*) FROM BRONZE.product_review_rejects
     UNION ALL SELECT 'inventory_staging', COUNT(*) FROM BRONZE.inventory_staging
     UNION ALL SELECT 'store_locations_staging', COUNT(*) FROM BRONZE.store_locations_staging
+    UNION ALL SELECT 'inventory_rejects', COUNT(*) FROM BRONZE.inventory_rejects
+    UNION ALL SELECT 'store_locations_rejects', COUNT(*) FROM BRONZE.store_locations_rejects
 )
-UNION ALL
-SELECT 'SILVER Layer' AS layer, table_name, record_count FROM (
-    SELECT 'financial_transactions_clean', COUNT(*) FROM SILVER.financial_transactions_clean
-    UNION ALL SELECT 'promotions_clean', COUNT(*) FROM SILVER.promotions_clean
-    UNION ALL SELECT 'customer_demographics_clean', COUNT(*) FROM SILVER.customer_demographics_clean
-    UNION ALL SELECT 'employee_records_clean', COUNT(*) FROM SILVER.employee_records_clean
-    UNION ALL SELECT 'supplier_information_clean', COUNT(*) FROM SILVER.supplier_information_clean
-    UNION ALL SELECT 'logistics_and_shipping_clean', COUNT(*) FROM SILVER.logistics_and_shipping_clean
-    UNION ALL SELECT 'customer_service_interactions_clean', COUNT(*) FROM SILVER.customer_service_interactions_clean
-    UNION ALL SELECT 'marketing_campaigns_clean', COUNT(*) FROM SILVER.marketing_campaigns_clean
-    UNION ALL SELECT 'product_reviews_clean', COUNT(*) FROM SILVER.product_reviews_clean
-    UNION ALL SELECT 'inventory_clean', COUNT(*) FROM SILVER.inventory_clean
-    UNION ALL SELECT 'store_locations_clean', COUNT(*) FROM SILVER.store_locations_clean
-)
-ORDER BY layer, table_name;
-
--- 6.2 Statistiques de qualité des données
-SELECT 
-    table_name,
-    total_records,
-    records_with_null,
-    ROUND(records_with_null * 100.0 / total_records, 2) AS null_percentage,
-    unique_records
-FROM (
-    SELECT 
-        'financial_transactions_clean' AS table_name,
-        COUNT(*) AS total_records,
-        SUM(CASE WHEN amount IS NULL THEN 1 ELSE 0 END) AS records_with_null,
-        COUNT(DISTINCT transaction_id) AS unique_records
-    FROM SILVER.financial_transactions_clean
-    UNION ALL
-    SELECT 
-        'customer_demographics_clean',
-        COUNT(*),
-        SUM(CASE WHEN customer_id IS NULL THEN 1 ELSE 0 END),
-        COUNT(DISTINCT customer_id)
-    FROM SILVER.customer_demographics_clean
-    UNION ALL
-    SELECT 
-        'employee_records_clean',
-        COUNT(*),
-        SUM(CASE WHEN employee_id IS NULL THEN 1 ELSE 0 END),
-        COUNT(DISTINCT employee_id)
-    FROM SILVER.employee_records_clean
-) ORDER BY null_percentage DESC;
-
--- 6.3 Validation des plages de valeurs
-SELECT 
-    'SALARY' AS metric,
-    MIN(salary) AS min_value,
-    MAX(salary) AS max_value,
-    AVG(salary) AS avg_value,
-    STDDEV(salary) AS std_dev
-FROM SILVER.employee_records_clean
-UNION ALL
-SELECT 
-    'ANNUAL_INCOME',
-    MIN(annual_income),
-    MAX(annual_income),
-    AVG(annual_income),
-    STDDEV(annual_income)
-FROM SILVER.customer_demographics_clean
-UNION ALL
-SELECT 
-    'TRANSACTION_AMOUNT',
-    MIN(amount),
-    MAX(amount),
-    AVG(amount),
-    STDDEV(amount)
-FROM SILVER.financial_transactions_clean;
-
--- 6.4 Vérification de l'intégrité temporelle
-SELECT 
-    'Promotions' AS dataset,
-    COUNT(*) AS total,
-    SUM(CASE WHEN start_date > CURRENT_DATE() THEN 1 ELSE 0 END) AS future_start,
-    SUM(CASE WHEN end_date < CURRENT_DATE() THEN 1 ELSE 0 END) AS expired
-FROM SILVER.promotions_clean
-UNION ALL
-SELECT 
-    'Campagnes marketing',
-    COUNT(*),
-    SUM(CASE WHEN start_date > CURRENT_DATE() THEN 1 ELSE 0 END),
-    SUM(CASE WHEN end_date < CURRENT_DATE() THEN 1 ELSE 0 END)
-FROM SILVER.marketing_campaigns_clean;
-
+ORDER BY table_name;
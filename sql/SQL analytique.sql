@@ -155,74 +155,42 @@ FROM table_stats
 ORDER BY record_count DESC;
 
 -- 2.1.3 Analyse des valeurs manquantes par table clé
-SELECT 
-    'financial_transactions_clean' AS table_name,
-    COUNT(*) AS total_records,
-    SUM(CASE WHEN amount IS NULL THEN 1 ELSE 0 END) AS missing_amount,
-    SUM(CASE WHEN transaction_date IS NULL THEN 1 ELSE 0 END) AS missing_date,
-    SUM(CASE WHEN region IS NULL THEN 1 ELSE 0 END) AS missing_region,
-    ROUND(SUM(CASE WHEN amount IS NULL THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) AS pct_missing_amount
-FROM financial_transactions_clean
-UNION ALL
-SELECT 
-    'customer_demographics_clean',
-    COUNT(*),
-    SUM(CASE WHEN annual_income IS NULL THEN 1 ELSE 0 END),
-    SUM(CASE WHEN date_of_birth IS NULL THEN 1 ELSE 0 END),
-    SUM(CASE WHEN region IS NULL THEN 1 ELSE 0 END),
-    ROUND(SUM(CASE WHEN annual_income IS NULL THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2)
-FROM customer_demographics_clean
-UNION ALL
-SELECT 
-    'customer_service_interactions_clean',
-    COUNT(*),
-    SUM(CASE WHEN customer_satisfaction IS NULL THEN 1 ELSE 0 END),
-    SUM(CASE WHEN interaction_date IS NULL THEN 1 ELSE 0 END),
-    SUM(CASE WHEN duration_minutes IS NULL THEN 1 ELSE 0 END),
-    ROUND(SUM(CASE WHEN customer_satisfaction IS NULL THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2)
-FROM customer_service_interactions_clean;
+-- Profils par lot tenus à jour par pipeline.data_quality (sans relecture des tables)
+SELECT
+    LOWER(REPLACE(table_name, 'SILVER.', '')) AS table_name,
+    MAX(row_count) AS total_records,
+    MAX(CASE WHEN column_name IN ('AMOUNT', 'ANNUAL_INCOME', 'CUSTOMER_SATISFACTION') THEN null_count END) AS missing_amount,
+    MAX(CASE WHEN column_name IN ('TRANSACTION_DATE', 'DATE_OF_BIRTH', 'INTERACTION_DATE') THEN null_count END) AS missing_date,
+    MAX(CASE WHEN column_name IN ('REGION', 'DURATION_MINUTES') THEN null_count END) AS missing_region,
+    MAX(CASE WHEN column_name IN ('AMOUNT', 'ANNUAL_INCOME', 'CUSTOMER_SATISFACTION') THEN null_percentage END) AS pct_missing_amount
+FROM ANALYTICS.data_quality_summary
+WHERE table_name IN ('SILVER.FINANCIAL_TRANSACTIONS_CLEAN', 'SILVER.CUSTOMER_DEMOGRAPHICS_CLEAN',
+                     'SILVER.CUSTOMER_SERVICE_INTERACTIONS_CLEAN')
+GROUP BY table_name;
 
 -- 2.1.4 Distribution des données numériques clés
+-- Médiane : quantile t-digest (approché) des profils pipeline.data_quality
 WITH numeric_stats AS (
-    SELECT 
-        'Montant transaction' AS metric,
-        MIN(amount) AS min_value,
-        MAX(amount) AS max_value,
-        AVG(amount) AS avg_value,
-        MEDIAN(amount) AS median_value,
-        STDDEV(amount) AS std_dev,
-        COUNT(*) AS sample_size
-    FROM financial_transactions_clean
-    UNION ALL
-    SELECT 
-        'Revenu annuel client',
-        MIN(annual_income),
-        MAX(annual_income),
-        AVG(annual_income),
-        MEDIAN(annual_income),
-        STDDEV(annual_income),
-        COUNT(*)
-    FROM customer_demographics_clean
-    UNION ALL
-    SELECT 
-        'Salaire employé',
-        MIN(salary),
-        MAX(salary),
-        AVG(salary),
-        MEDIAN(salary),
-        STDDEV(salary),
-        COUNT(*)
-    FROM employee_records_clean
-    UNION ALL
-    SELECT 
-        'Stock actuel',
-        MIN(current_stock),
-        MAX(current_stock),
-        AVG(current_stock),
-        MEDIAN(current_stock),
-        STDDEV(current_stock),
-        COUNT(*)
-    FROM inventory_clean
+    SELECT
+        CASE column_name
+            WHEN 'AMOUNT' THEN 'Montant transaction'
+            WHEN 'ANNUAL_INCOME' THEN 'Revenu annuel client'
+            WHEN 'SALARY' THEN 'Salaire employé'
+            WHEN 'CURRENT_STOCK' THEN 'Stock actuel'
+        END AS metric,
+        CAST(min_value AS FLOAT) AS min_value,
+        CAST(max_value AS FLOAT) AS max_value,
+        mean_value AS avg_value,
+        median_value,
+        stddev_value AS std_dev,
+        row_count AS sample_size
+    FROM ANALYTICS.data_quality_summary
+    WHERE (table_name, column_name) IN (
+        ('SILVER.FINANCIAL_TRANSACTIONS_CLEAN', 'AMOUNT'),
+        ('SILVER.CUSTOMER_DEMOGRAPHICS_CLEAN', 'ANNUAL_INCOME'),
+        ('SILVER.EMPLOYEE_RECORDS_CLEAN', 'SALARY'),
+        ('SILVER.INVENTORY_CLEAN', 'CURRENT_STOCK')
+    )
 )
 SELECT 
     metric,
@@ -379,38 +347,46 @@ ORDER BY revenue_per_customer DESC;
 
 -- 2.3.1 VENTES ET PROMOTIONS
 -- Comparaison ventes avec/sans promotion (par catégorie)
+-- Ventes agrégées par jour puis jointes par égalité de date au calendrier
+-- ANALYTICS.promotion_day_calendar (promotion_day_calendar.sql), au lieu
+-- d'une jointure BETWEEN et d'un NOT EXISTS sur chaque transaction
 WITH promotion_periods AS (
     SELECT 
-        product_category,
-        start_date,
-        end_date
-    FROM promotions_clean
+        calendar_date,
+        product_category
+    FROM ANALYTICS.promotion_day_calendar
     WHERE CURRENT_DATE() BETWEEN start_date AND end_date
 ),
+daily_sales AS (
+    SELECT 
+        transaction_date,
+        COUNT(*) AS transaction_count,
+        SUM(amount) AS total_revenue
+    FROM financial_transactions_clean
+    WHERE transaction_type = 'Sale'
+    GROUP BY transaction_date
+),
 sales_with_promotion AS (
     SELECT 
         p.product_category,
         'Avec promotion' AS promotion_status,
-        COUNT(*) AS transaction_count,
-        SUM(ft.amount) AS total_revenue,
-        AVG(ft.amount) AS avg_transaction_value
-    FROM financial_transactions_clean ft
-    JOIN promotion_periods p ON ft.transaction_date BETWEEN p.start_date AND p.end_date
-    WHERE ft.transaction_type = 'Sale'
+        SUM(ds.transaction_count) AS transaction_count,
+        SUM(ds.total_revenue) AS total_revenue,
+        SUM(ds.total_revenue) / SUM(ds.transaction_count) AS avg_transaction_value
+    FROM promotion_periods p
+    JOIN daily_sales ds ON ds.transaction_date = p.calendar_date
     GROUP BY p.product_category
 ),
 sales_without_promotion AS (
     SELECT 
         'Sans promotion' AS promotion_status,
-        COUNT(*) AS transaction_count,
-        SUM(ft.amount) AS total_revenue,
-        AVG(ft.amount) AS avg_transaction_value
-    FROM financial_transactions_clean ft
-    WHERE ft.transaction_type = 'Sale'
-    AND NOT EXISTS (
-        SELECT 1 FROM promotion_periods p 
-        WHERE ft.transaction_date BETWEEN p.start_date AND p.end_date
-    )
+        COALESCE(SUM(ds.transaction_count), 0) AS transaction_count,
+        SUM(ds.total_revenue) AS total_revenue,
+        SUM(ds.total_revenue) / NULLIF(SUM(ds.transaction_count), 0) AS avg_transaction_value
+    FROM daily_sales ds
+    LEFT JOIN (SELECT DISTINCT calendar_date FROM promotion_periods) p 
+        ON ds.transaction_date = p.calendar_date
+    WHERE p.calendar_date IS NULL
 )
 SELECT * FROM sales_with_promotion
 UNION ALL
@@ -419,18 +395,41 @@ FROM sales_without_promotion
 ORDER BY product_category, promotion_status;
 
 -- 2.3.2 Sensibilité des catégories aux promotions
-WITH promotion_impact AS (
+-- Ventes de chaque promotion = somme des ventes quotidiennes de ses jours
+-- d'activité (jointure d'égalité sur le calendrier)
+WITH daily_sales AS (
+    SELECT 
+        transaction_date,
+        COUNT(*) AS transaction_count,
+        SUM(amount) AS total_revenue
+    FROM financial_transactions_clean
+    WHERE transaction_type = 'Sale'
+    GROUP BY transaction_date
+),
+promotion_sales AS (
+    SELECT 
+        c.promotion_id,
+        c.start_date,
+        c.end_date,
+        SUM(ds.transaction_count) AS sale_count,
+        SUM(ds.total_revenue) AS revenue
+    FROM ANALYTICS.promotion_day_calendar c
+    JOIN daily_sales ds ON ds.transaction_date = c.calendar_date
+    GROUP BY c.promotion_id, c.start_date, c.end_date
+),
+promotion_impact AS (
     SELECT 
         p.product_category,
         p.discount_percentage,
         COUNT(DISTINCT p.promotion_id) AS promotion_count,
-        COUNT(ft.transaction_id) AS sales_during_promotion,
-        SUM(ft.amount) AS revenue_during_promotion,
-        AVG(ft.amount) AS avg_sale_during_promotion
+        COALESCE(SUM(ps.sale_count), 0) AS sales_during_promotion,
+        SUM(ps.revenue) AS revenue_during_promotion,
+        SUM(ps.revenue) / SUM(ps.sale_count) AS avg_sale_during_promotion
     FROM promotions_clean p
-    LEFT JOIN financial_transactions_clean ft 
-        ON ft.transaction_date BETWEEN p.start_date AND p.end_date
-        AND ft.transaction_type = 'Sale'
+    LEFT JOIN promotion_sales ps 
+        ON p.promotion_id = ps.promotion_id
+        AND p.start_date = ps.start_date
+        AND p.end_date = ps.end_date
     GROUP BY p.product_category, p.discount_percentage
 ),
 category_baseline AS (
@@ -747,47 +746,37 @@ ORDER BY recommendation_rank;
 ---------------------------------------------------------------
 
 -- 2.5.1 Préparation des données pour Tableau/PowerBI
+-- Vue à plat du schéma en étoile (sales_star_export.sql) : 1 ligne par
+-- vente, dimensions jointes sur leurs clés de substitution. Pour les
+-- extractions volumineuses, utiliser les tables ANALYTICS.export_* en
+-- Parquet (python -m pipeline.star_export) ; stock et avis y sont des
+-- instantanés agrégés (export_inventory_snapshot, export_review_snapshot).
 CREATE OR REPLACE VIEW SILVER.sales_analysis_export AS
 SELECT 
-    ft.transaction_date,
-    ft.entity,
-    ft.region,
-    ft.amount,
-    ft.transaction_type,
-    cd.customer_id,
-    cd.age,
-    cd.gender,
-    cd.annual_income,
-    cd.marital_status,
-    mc.campaign_name,
-    mc.campaign_type,
+    f.transaction_id,
+    d.calendar_date AS transaction_date,
+    r.region,
+    f.amount,
+    f.payment_method,
+    c.customer_id,
+    c.age,
+    c.gender,
+    c.annual_income,
+    c.marital_status,
+    m.campaign_name,
+    m.campaign_type,
     p.promotion_type,
     p.discount_percentage,
-    i.product_category,
-    i.stock_level,
-    i.current_stock,
-    i.reorder_point,
-    ls.shipping_method,
-    ls.delivery_status,
-    csi.satisfaction_category,
-    pr.sentiment,
-    pr.avg_rating
-FROM financial_transactions_clean ft
-LEFT JOIN customer_demographics_clean cd ON ft.entity = cd.customer_id
-LEFT JOIN marketing_campaigns_clean mc 
-    ON ft.transaction_date BETWEEN mc.start_date AND mc.end_date
-    AND ft.region = mc.region
-LEFT JOIN promotions_clean p 
-    ON ft.transaction_date BETWEEN p.start_date AND p.end_date
-LEFT JOIN inventory_clean i ON ft.region = i.region
-LEFT JOIN logistics_and_shipping_clean ls ON ft.entity = ls.order_id
-LEFT JOIN customer_service_interactions_clean csi ON ft.entity = csi.customer_id
-LEFT JOIN (
-    SELECT product_category, AVG(rating) as avg_rating, sentiment
-    FROM product_reviews_clean
-    GROUP BY product_category, sentiment
-) pr ON i.product_category = pr.product_category
-WHERE ft.transaction_type = 'Sale';
+    p.product_category AS promo_product_category,
+    s.shipping_method,
+    s.delivery_status
+FROM ANALYTICS.export_fact_sales f
+JOIN ANALYTICS.export_dim_date d ON f.date_key = d.date_key
+JOIN ANALYTICS.export_dim_region r ON f.region_key = r.region_key
+JOIN ANALYTICS.export_dim_customer c ON f.customer_key = c.customer_key
+JOIN ANALYTICS.export_dim_promotion p ON f.promotion_key = p.promotion_key
+JOIN ANALYTICS.export_dim_campaign m ON f.campaign_key = m.campaign_key
+JOIN ANALYTICS.export_dim_shipment s ON f.shipment_key = s.shipment_key;
 
 -- 2.5.2 Statistiques pour rapport mensuel
 CREATE OR REPLACE VIEW SILVER.monthly_report_data AS
@@ -0,0 +1,79 @@
+-- ============================================================================
+-- ANYCOMPANY DATA PIPELINE - INGESTION INCRÉMENTALE BRONZE
+-- ============================================================================
+-- Description : Objets de contrôle de l'ingestion incrémentale depuis
+--               @BRONZE.food_beverage_stage (pipeline/ingestion.py)
+-- Prérequis : ETL SQL.sql (stage, formats et tables BRONZE)
+--
+-- Principe :
+--   1. LIST @stage ; chaque fichier (nom + md5 / ETag) est comparé au manifeste
+--   2. Fichiers nouveaux : COPY INTO ... FILES = (...) en ajout
+--      Fichier déjà chargé mais modifié (ou table absente du manifeste) :
+--      TRUNCATE puis rechargement de tous les fichiers de la table
+--   3. Lignes rejetées (ON_ERROR = 'CONTINUE') : copiées en quarantaine via
+--      TABLE(VALIDATE(table, JOB_ID => query id du COPY))
+--   4. Seules les tables SILVER / ANALYTICS lisant une table modifiée sont
+--      reconstruites
+--
+-- Fichiers reconnus pour une table : le fichier d'origine de ETL SQL.sql
+-- (financial_transactions.csv), les lots datés de même préfixe
+-- (financial_transactions_20261017.csv) ou un sous-dossier de même nom
+-- (financial_transactions/2026-10-17.csv), avec la même extension.
+-- ============================================================================
+
+-- ============================================================================
+-- MANIFESTE DES FICHIERS CHARGÉS
+-- ============================================================================
+-- 1 ligne = 1 fichier du stage (dernier chargement)
+
+CREATE TABLE IF NOT EXISTS BRONZE.ingestion_manifest (
+    file_name STRING,           -- chemin relatif dans le stage
+    table_name STRING,
+    file_md5 STRING,            -- md5 renvoyé par LIST (ETag S3)
+    file_size NUMBER,
+    last_modified STRING,
+    status STRING,              -- LOADED / PARTIALLY_LOADED / LOAD_FAILED / LOAD_SKIPPED
+    rows_parsed NUMBER,
+    rows_loaded NUMBER,
+    errors_seen NUMBER,
+    first_error STRING,
+    load_mode STRING,           -- APPEND / RELOAD
+    copy_query_id STRING,
+    run_id STRING,
+    loaded_at TIMESTAMP_NTZ
+)
+COMMENT = 'Fichiers du stage chargés dans BRONZE (empreinte md5, compteurs du COPY INTO)';
+
+-- ============================================================================
+-- QUARANTAINE DES LIGNES REJETÉES
+-- ============================================================================
+-- 1 ligne = 1 ligne rejetée par COPY INTO (ON_ERROR = 'CONTINUE')
+
+CREATE TABLE IF NOT EXISTS BRONZE.ingestion_quarantine (
+    run_id STRING,
+    table_name STRING,
+    file_name STRING,
+    line_number NUMBER,
+    column_name STRING,
+    error STRING,
+    rejected_record STRING,
+    copy_query_id STRING,
+    quarantined_at TIMESTAMP_NTZ
+)
+COMMENT = 'Lignes rejetées au chargement BRONZE, avec fichier, ligne et erreur';
+
+-- ============================================================================
+-- VUE : ingestion_quarantine_summary (rejets par table et fichier)
+-- ============================================================================
+
+CREATE OR REPLACE VIEW BRONZE.ingestion_quarantine_summary AS
+SELECT
+    table_name,
+    file_name,
+    COUNT(*) AS rejected_rows,
+    COUNT(DISTINCT column_name) AS columns_in_error,
+    MIN(quarantined_at) AS first_quarantined_at,
+    MAX(quarantined_at) AS last_quarantined_at
+FROM BRONZE.ingestion_quarantine
+GROUP BY table_name, file_name
+;
@@ -0,0 +1,152 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER 1 quater : CUSTOMER_AUDIENCES (Audiences exactes des campagnes et promotions)
+-- Description : Ensemble exact des clients (merchant_entity) touchés par
+--               chaque campagne et chaque promotion, sous forme d'identifiants
+--               entiers, chargé en bitmaps compressés par le dashboard
+--               marketing (streamlit/audience_bitmaps.py)
+-- Granularité : 1 ligne = 1 campagne ou promotion × 1 client
+-- Clé primaire : (audience_type, audience_key, customer_id)
+-- Usage : union, intersection et matrice de recouvrement exactes d'une
+--         sélection de campagnes / promotions, calculées en mémoire au lieu
+--         d'un COUNT(DISTINCT merchant_entity) sur sales_enriched par sélection.
+--         Les esquisses HyperLogLog (customer_reach_sketches.sql) restent
+--         utilisées pour la portée approchée par jour.
+-- À exécuter après customer_reach_sketches.sql. Maintenu ensuite par le
+-- rafraîchissement incrémental (sales_enriched_incremental.sql) : seules les
+-- audiences des campagnes / promotions touchées sont recalculées, dans la même
+-- transaction que le MERGE de sales_enriched.
+-- ============================================================================
+
+-- ============================================================================
+-- TABLE : customer_ids (dictionnaire client -> identifiant entier)
+-- ============================================================================
+-- Identifiants denses et stables : un client garde son identifiant d'un
+-- rafraîchissement à l'autre, les nouveaux reçoivent les suivants. Ils
+-- servent d'index de bit dans les bitmaps (entiers non signés 32 bits).
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS ANALYTICS.customer_ids (
+    customer_id NUMBER,
+    merchant_entity STRING,
+    first_seen_at TIMESTAMP_NTZ
+)
+COMMENT = 'Identifiant entier stable de chaque client (merchant_entity)';
+
+INSERT INTO ANALYTICS.customer_ids
+SELECT
+    COALESCE((SELECT MAX(customer_id) FROM ANALYTICS.customer_ids), 0)
+        + ROW_NUMBER() OVER (ORDER BY merchant_entity) AS customer_id,
+    merchant_entity,
+    CURRENT_TIMESTAMP() AS first_seen_at
+FROM (
+    SELECT DISTINCT merchant_entity
+    FROM ANALYTICS.sales_enriched
+    WHERE merchant_entity IS NOT NULL
+) e
+WHERE merchant_entity NOT IN (SELECT merchant_entity FROM ANALYTICS.customer_ids);
+
+-- ============================================================================
+-- VUE : customer_audience_source (logique de construction)
+-- ============================================================================
+-- Partagée par la reconstruction complète ci-dessous et par le rafraîchissement
+-- incrémental, qui la filtre sur les campagnes / promotions à recalculer.
+-- Même périmètre que promotion_impact.sql et customers_marketing.sql.
+-- ============================================================================
+CREATE OR REPLACE VIEW ANALYTICS.customer_audience_source AS
+SELECT DISTINCT
+    'CAMPAIGN' AS audience_type,
+    s.campaign_id AS audience_key,
+    c.customer_id
+FROM ANALYTICS.sales_enriched s
+INNER JOIN ANALYTICS.customer_ids c
+    ON c.merchant_entity = s.merchant_entity
+WHERE s.campaign_id IS NOT NULL
+UNION ALL
+SELECT DISTINCT
+    'PROMOTION' AS audience_type,
+    s.promotion_id AS audience_key,
+    c.customer_id
+FROM ANALYTICS.sales_enriched s
+INNER JOIN ANALYTICS.customer_ids c
+    ON c.merchant_entity = s.merchant_entity
+WHERE s.promotion_id IS NOT NULL
+;
+
+-- ============================================================================
+-- TABLE : customer_audiences (reconstruction complète)
+-- ============================================================================
+CREATE OR REPLACE TABLE ANALYTICS.customer_audiences
+CLUSTER BY (audience_type, audience_key)
+COMMENT = 'Clients de chaque campagne / promotion (identifiants de customer_ids)'
+AS
+SELECT * FROM ANALYTICS.customer_audience_source
+;
+
+MERGE INTO ANALYTICS.rollup_freshness f
+USING (
+    SELECT
+        'CUSTOMER_AUDIENCES' AS rollup_name,
+        'FULL' AS refresh_mode,
+        NULL AS days_refreshed,
+        COUNT(*) AS row_count,
+        NULL AS source_transactions,
+        NULL AS last_sale_date
+    FROM ANALYTICS.customer_audiences
+) s
+    ON f.rollup_name = s.rollup_name
+WHEN MATCHED THEN UPDATE SET
+    refreshed_at = CURRENT_TIMESTAMP(),
+    refresh_mode = s.refresh_mode,
+    days_refreshed = s.days_refreshed,
+    row_count = s.row_count,
+    source_transactions = s.source_transactions,
+    last_sale_date = s.last_sale_date
+WHEN NOT MATCHED THEN INSERT (rollup_name, refreshed_at, refresh_mode, days_refreshed, row_count, source_transactions, last_sale_date)
+VALUES (s.rollup_name, CURRENT_TIMESTAMP(), s.refresh_mode, s.days_refreshed, s.row_count, s.source_transactions, s.last_sale_date);
+
+-- ============================================================================
+-- TESTS DE QUALITÉ SPÉCIFIQUES À LA TABLE customer_audiences
+-- ============================================================================
+
+-- Test 1 : Dictionnaire client sans doublon
+SELECT
+    'Test 1: Unicité des identifiants clients' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' identifiants ou clients en double'
+    END AS test_result
+FROM (
+    SELECT customer_id FROM ANALYTICS.customer_ids GROUP BY customer_id HAVING COUNT(*) > 1
+    UNION ALL
+    SELECT NULL FROM ANALYTICS.customer_ids GROUP BY merchant_entity HAVING COUNT(*) > 1
+);
+
+-- Test 2 : Taille de chaque audience = COUNT(DISTINCT merchant_entity)
+SELECT
+    'Test 2: Audiences = COUNT(DISTINCT)' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' campagnes / promotions avec un écart'
+    END AS test_result
+FROM (
+    SELECT 'CAMPAIGN' AS audience_type, campaign_id AS audience_key, COUNT(DISTINCT merchant_entity) AS exact_customers
+    FROM ANALYTICS.sales_enriched
+    WHERE campaign_id IS NOT NULL
+    GROUP BY campaign_id
+    UNION ALL
+    SELECT 'PROMOTION' AS audience_type, promotion_id AS audience_key, COUNT(DISTINCT merchant_entity) AS exact_customers
+    FROM ANALYTICS.sales_enriched
+    WHERE promotion_id IS NOT NULL
+    GROUP BY promotion_id
+) x
+LEFT JOIN (
+    SELECT audience_type, audience_key, COUNT(*) AS audience_size
+    FROM ANALYTICS.customer_audiences
+    GROUP BY audience_type, audience_key
+) a
+    ON a.audience_type = x.audience_type
+    AND a.audience_key = x.audience_key
+WHERE COALESCE(a.audience_size, 0) <> x.exact_customers;
@@ -0,0 +1,191 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER 1 ter : CUSTOMER_REACH_SKETCHES (Esquisses HyperLogLog de la portée)
+-- Description : Registres HyperLogLog des clients (merchant_entity) touchés
+--               par jour et par promotion / campagne
+-- Granularité : 1 ligne = 1 jour × 1 promotion ou campagne × 1 registre non vide
+-- Clé primaire : (sketch_date, sketch_type, sketch_key, register_index)
+-- Usage : nombre de clients distincts d'une sélection quelconque de
+--         promotions / campagnes (et de jours) sans relire sales_enriched.
+--         La somme de unique_customers_reached / unique_customers_acquired
+--         compte plusieurs fois un client touché par plusieurs promotions ;
+--         la fusion des esquisses (MAX par registre) ne le compte qu'une fois.
+-- Fusion et estimation : en SQL (vue customer_reach_estimates ci-dessous,
+--         requêtes des dashboards) ou en Python (streamlit/reach_sketches.py)
+-- À exécuter après sales_rollups.sql. Maintenu ensuite par le rafraîchissement
+-- incrémental (sales_enriched_incremental.sql) : seuls les jours touchés sont
+-- recalculés, dans la même transaction que le MERGE de sales_enriched.
+-- ============================================================================
+
+-- ============================================================================
+-- PARAMÈTRES DE L'ESQUISSE (identiques dans streamlit/reach_sketches.py)
+-- ============================================================================
+-- Précision p = 12 : m = 4096 registres, erreur type 1,04 / √m ≈ 1,6 %
+-- Empreinte d'un client : HASH(merchant_entity) ramené à 52 bits
+--   - register_index = 12 bits de poids faible
+--   - register_rank  = position du premier bit à 1 dans les 40 bits restants
+--                      (41 si tous sont nuls)
+-- Calcul arithmétique (MOD, FLOOR, LOG) plutôt que HLL_ACCUMULATE : les
+-- registres sont lisibles, fusionnables par MAX et identiques en exécution
+-- locale (DuckDB)
+-- ============================================================================
+
+-- ============================================================================
+-- VUE : customer_reach_sketch_source (logique de construction)
+-- ============================================================================
+-- Partagée par la reconstruction complète ci-dessous et par le rafraîchissement
+-- incrémental, qui la filtre sur les jours à recalculer.
+-- Même périmètre que promotion_impact.sql et customers_marketing.sql : toutes
+-- les lignes de sales_enriched rattachées à une promotion / campagne.
+-- ============================================================================
+CREATE OR REPLACE VIEW ANALYTICS.customer_reach_sketch_source AS
+WITH customer_hashes AS (
+    SELECT
+        sale_date,
+        'PROMOTION' AS sketch_type,
+        promotion_id AS sketch_key,
+        ABS(MOD(HASH(merchant_entity), 4503599627370496)) AS customer_hash  -- 2^52
+    FROM ANALYTICS.sales_enriched
+    WHERE promotion_id IS NOT NULL
+      AND merchant_entity IS NOT NULL
+    UNION ALL
+    SELECT
+        sale_date,
+        'CAMPAIGN' AS sketch_type,
+        campaign_id AS sketch_key,
+        ABS(MOD(HASH(merchant_entity), 4503599627370496)) AS customer_hash
+    FROM ANALYTICS.sales_enriched
+    WHERE campaign_id IS NOT NULL
+      AND merchant_entity IS NOT NULL
+)
+SELECT
+    sale_date AS sketch_date,
+    sketch_type,
+    sketch_key,
+    CAST(MOD(customer_hash, 4096) AS INTEGER) AS register_index,
+    CAST(MAX(
+        CASE
+            WHEN FLOOR(customer_hash / 4096) = 0 THEN 41
+            ELSE 40 - FLOOR(LOG(2, FLOOR(customer_hash / 4096)))
+        END
+    ) AS INTEGER) AS register_rank
+FROM customer_hashes
+GROUP BY sale_date, sketch_type, sketch_key, MOD(customer_hash, 4096)
+;
+
+-- ============================================================================
+-- TABLE : customer_reach_sketches (reconstruction complète)
+-- ============================================================================
+CREATE OR REPLACE TABLE ANALYTICS.customer_reach_sketches
+CLUSTER BY (sketch_type, sketch_date)
+COMMENT = 'Registres HyperLogLog des clients touchés (jour × promotion / campagne)'
+AS
+SELECT * FROM ANALYTICS.customer_reach_sketch_source
+;
+
+MERGE INTO ANALYTICS.rollup_freshness f
+USING (
+    SELECT
+        'CUSTOMER_REACH_SKETCHES' AS rollup_name,
+        'FULL' AS refresh_mode,
+        COUNT(DISTINCT sketch_date) AS days_refreshed,
+        COUNT(*) AS row_count,
+        NULL AS source_transactions,
+        MAX(sketch_date) AS last_sale_date
+    FROM ANALYTICS.customer_reach_sketches
+) s
+    ON f.rollup_name = s.rollup_name
+WHEN MATCHED THEN UPDATE SET
+    refreshed_at = CURRENT_TIMESTAMP(),
+    refresh_mode = s.refresh_mode,
+    days_refreshed = s.days_refreshed,
+    row_count = s.row_count,
+    source_transactions = s.source_transactions,
+    last_sale_date = s.last_sale_date
+WHEN NOT MATCHED THEN INSERT (rollup_name, refreshed_at, refresh_mode, days_refreshed, row_count, source_transactions, last_sale_date)
+VALUES (s.rollup_name, CURRENT_TIMESTAMP(), s.refresh_mode, s.days_refreshed, s.row_count, s.source_transactions, s.last_sale_date);
+
+-- ============================================================================
+-- VUE : customer_reach_estimates (portée estimée par promotion / campagne)
+-- ============================================================================
+-- Fusion de tous les jours puis estimation HyperLogLog :
+--   brute = α·m² / (Σ 2^-rang des registres non vides + nombre de registres vides)
+--   petite cardinalité (brute ≤ 2,5·m et registres vides) : m·ln(m / vides)
+-- avec m = 4096 et α = 0,7213 / (1 + 1,079 / m). Une sélection de plusieurs
+-- promotions / campagnes se fusionne de la même façon (GROUP BY register_index
+-- puis MAX), voir streamlit/reach_sketches.py.
+-- ============================================================================
+CREATE OR REPLACE VIEW ANALYTICS.customer_reach_estimates AS
+WITH merged AS (
+    SELECT
+        sketch_type,
+        sketch_key,
+        register_index,
+        MAX(register_rank) AS register_rank
+    FROM ANALYTICS.customer_reach_sketches
+    GROUP BY sketch_type, sketch_key, register_index
+)
+SELECT
+    sketch_type,
+    sketch_key,
+    COUNT(*) AS filled_registers,
+    ROUND(
+        CASE
+            WHEN 0.7213 / (1 + 1.079 / 4096) * 4096 * 4096
+                 / (SUM(POWER(2, -register_rank)) + 4096 - COUNT(*)) <= 2.5 * 4096
+                 AND COUNT(*) < 4096
+            THEN 4096 * LN(4096 / (4096 - COUNT(*)))
+            ELSE 0.7213 / (1 + 1.079 / 4096) * 4096 * 4096
+                 / (SUM(POWER(2, -register_rank)) + 4096 - COUNT(*))
+        END
+    ) AS estimated_customers
+FROM merged
+GROUP BY sketch_type, sketch_key
+;
+
+COMMENT ON VIEW ANALYTICS.customer_reach_estimates IS
+'Nombre estimé de clients distincts par promotion / campagne (fusion des esquisses quotidiennes).';
+
+-- ============================================================================
+-- TESTS DE QUALITÉ SPÉCIFIQUES À LA TABLE customer_reach_sketches
+-- ============================================================================
+
+-- Test 1 : Unicité du grain
+SELECT
+    'Test 1: Unicité du grain des esquisses' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' registres en double'
+    END AS test_result
+FROM (
+    SELECT sketch_date, sketch_type, sketch_key, register_index
+    FROM ANALYTICS.customer_reach_sketches
+    GROUP BY sketch_date, sketch_type, sketch_key, register_index
+    HAVING COUNT(*) > 1
+);
+
+-- Test 2 : Estimation proche du comptage exact (3 erreurs types, au moins 2 clients)
+SELECT
+    'Test 2: Portée estimée ≈ COUNT(DISTINCT)' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' promotions / campagnes hors tolérance'
+    END AS test_result
+FROM (
+    SELECT 'PROMOTION' AS sketch_type, promotion_id AS sketch_key, COUNT(DISTINCT merchant_entity) AS exact_customers
+    FROM ANALYTICS.sales_enriched
+    WHERE promotion_id IS NOT NULL
+    GROUP BY promotion_id
+    UNION ALL
+    SELECT 'CAMPAIGN' AS sketch_type, campaign_id AS sketch_key, COUNT(DISTINCT merchant_entity) AS exact_customers
+    FROM ANALYTICS.sales_enriched
+    WHERE campaign_id IS NOT NULL
+    GROUP BY campaign_id
+) x
+LEFT JOIN ANALYTICS.customer_reach_estimates e
+    ON e.sketch_type = x.sketch_type
+    AND e.sketch_key = x.sketch_key
+WHERE ABS(COALESCE(e.estimated_customers, 0) - x.exact_customers) > GREATEST(2, 0.05 * x.exact_customers);
@@ -0,0 +1,161 @@
+-- ============================================================================
+-- ANYCOMPANY DATA PIPELINE - PROFILS DE QUALITÉ DES TABLES SILVER
+-- ============================================================================
+-- Description : Statistiques par colonne et par lot de chargement des tables
+--               SILVER (pipeline/data_quality.py), à la place des relectures
+--               complètes de ETL SQL.sql (section 6) et de SQL analytique.sql
+--               (2.1.3, 2.1.4)
+-- Prérequis : ETL SQL.sql (tables SILVER)
+--
+-- Principe :
+--   1. Lot = valeur de la colonne de lot de la table (ingested_at des
+--      transactions, fichier source de l'inventaire) ; table entière (FULL)
+--      pour les tables reconstruites d'un bloc
+--   2. Version d'un lot : COUNT(*) et HASH_AGG(*) ; seuls les lots nouveaux
+--      ou modifiés sont relus et profilés (coût proportionnel aux nouvelles
+--      données)
+--   3. Profil d'une colonne : lignes, valeurs manquantes, min / max, moyenne
+--      et écart type, esquisses fusionnables (t-digest, HyperLogLog, valeurs
+--      fréquentes) ; le total de la table (batch_id = 'TOTAL') est la fusion
+--      des esquisses de ses lots courants, sans relecture
+--   4. Un lot disparu ou remplacé reste en historique (is_current = FALSE)
+--      pour la détection de dérive (pipeline.data_quality --drift)
+-- ============================================================================
+
+-- ============================================================================
+-- PROFILS PAR LOT
+-- ============================================================================
+-- 1 ligne = 1 table × 1 lot × 1 colonne
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.data_quality_profiles (
+    table_name STRING,          -- SCHEMA.TABLE, en majuscules
+    batch_id STRING,            -- valeur de la colonne de lot, FULL ou TOTAL
+    batch_version STRING,       -- COUNT(*):HASH_AGG(*) du lot (TOTAL : empreinte des versions des lots)
+    is_current BOOLEAN,
+    column_name STRING,
+    column_kind STRING,         -- NUMERIC / DATE / TEXT
+    row_count NUMBER,
+    null_count NUMBER,
+    distinct_estimate NUMBER,   -- HyperLogLog (erreur type ≈ 1,6 %)
+    min_value STRING,           -- nombre, date ISO ou texte
+    max_value STRING,
+    mean_value FLOAT,
+    stddev_value FLOAT,
+    p05_value FLOAT,            -- quantiles t-digest (colonnes numériques)
+    median_value FLOAT,
+    p95_value FLOAT,
+    top_values STRING,          -- JSON [[valeur, effectif], ...] (colonnes texte)
+    sketch STRING,              -- JSON : esquisses fusionnables (pipeline/profile_sketches.py)
+    profiled_at TIMESTAMP_NTZ
+)
+COMMENT = 'Profils de colonnes des tables SILVER par lot de chargement (esquisses fusionnables)';
+
+-- ============================================================================
+-- PROFILS COURANTS PAR TABLE
+-- ============================================================================
+
+CREATE OR REPLACE VIEW ANALYTICS.data_quality_summary AS
+SELECT
+    table_name,
+    column_name,
+    column_kind,
+    row_count,
+    null_count,
+    ROUND(null_count * 100.0 / NULLIF(row_count, 0), 2) AS null_percentage,
+    distinct_estimate,
+    min_value,
+    max_value,
+    mean_value,
+    stddev_value,
+    p05_value,
+    median_value,
+    p95_value,
+    top_values,
+    profiled_at
+FROM ANALYTICS.data_quality_profiles
+WHERE batch_id = 'TOTAL'
+  AND is_current;
+
+-- ============================================================================
+-- CONTRÔLES (anciennes sections 6.1 à 6.3 de ETL SQL.sql)
+-- ============================================================================
+
+-- 6.1 Comptes des tables SILVER
+SELECT
+    'SILVER Layer' AS layer,
+    table_name,
+    MAX(row_count) AS record_count
+FROM ANALYTICS.data_quality_summary
+GROUP BY table_name
+ORDER BY table_name;
+
+-- 6.2 Statistiques de qualité des données (valeurs manquantes, valeurs distinctes)
+SELECT
+    table_name,
+    column_name,
+    row_count AS total_records,
+    null_count AS records_with_null,
+    null_percentage,
+    distinct_estimate AS unique_records
+FROM ANALYTICS.data_quality_summary
+ORDER BY null_percentage DESC, table_name, column_name;
+
+-- 6.3 Validation des plages de valeurs
+SELECT
+    table_name,
+    column_name AS metric,
+    CAST(min_value AS FLOAT) AS min_value,
+    CAST(max_value AS FLOAT) AS max_value,
+    mean_value AS avg_value,
+    stddev_value AS std_dev,
+    median_value
+FROM ANALYTICS.data_quality_summary
+WHERE column_kind = 'NUMERIC'
+ORDER BY table_name, column_name;
+
+-- 6.4 Intégrité temporelle (dates de début futures, dates de fin passées) :
+-- calculée par pipeline.data_quality sur les t-digests des dates
+
+-- ============================================================================
+-- TESTS DE QUALITÉ
+-- ============================================================================
+
+-- Test 1 : Identifiants sans valeur manquante
+SELECT
+    'Test 1: Identifiants renseignés' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' colonnes d''identifiant avec valeurs manquantes'
+    END AS test_result
+FROM ANALYTICS.data_quality_summary
+WHERE null_count > 0
+  AND (table_name, column_name) IN (
+      ('SILVER.FINANCIAL_TRANSACTIONS_CLEAN', 'TRANSACTION_ID'),
+      ('SILVER.PROMOTIONS_CLEAN', 'PROMOTION_ID'),
+      ('SILVER.CUSTOMER_DEMOGRAPHICS_CLEAN', 'CUSTOMER_ID'),
+      ('SILVER.EMPLOYEE_RECORDS_CLEAN', 'EMPLOYEE_ID'),
+      ('SILVER.SUPPLIER_INFORMATION_CLEAN', 'SUPPLIER_ID'),
+      ('SILVER.LOGISTICS_AND_SHIPPING_CLEAN', 'SHIPMENT_ID'),
+      ('SILVER.CUSTOMER_SERVICE_INTERACTIONS_CLEAN', 'INTERACTION_ID'),
+      ('SILVER.MARKETING_CAMPAIGNS_CLEAN', 'CAMPAIGN_ID'),
+      ('SILVER.INVENTORY_CLEAN', 'PRODUCT_ID'),
+      ('SILVER.STORE_LOCATIONS_CLEAN', 'STORE_ID')
+  );
+
+-- Test 2 : Total de chaque colonne = somme de ses lots courants
+SELECT
+    'Test 2: Totaux cohérents avec les lots' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' colonnes dont le total diffère de la somme des lots'
+    END AS test_result
+FROM (
+    SELECT table_name, column_name
+    FROM ANALYTICS.data_quality_profiles
+    WHERE is_current
+    GROUP BY table_name, column_name
+    HAVING SUM(CASE WHEN batch_id = 'TOTAL' THEN row_count ELSE 0 END)
+        <> SUM(CASE WHEN batch_id <> 'TOTAL' THEN row_count ELSE 0 END)
+);
@@ -0,0 +1,75 @@
+-- ============================================================================
+-- RAFRAÎCHISSEMENT INCRÉMENTAL : SILVER.inventory_clean
+-- ============================================================================
+-- Description : Fusion (MERGE par product_id, warehouse) des enregistrements
+--               des fichiers d'inventaire chargés depuis la dernière
+--               reconstruction, au lieu de relire tout BRONZE.inventory_staging
+-- Lancé par pipeline.ingestion quand BRONZE.inventory_staging ne reçoit que
+-- des fichiers nouveaux (APPEND) ; un fichier modifié (RELOAD) passe par la
+-- reconstruction complète de ETL SQL.sql (section 5.10).
+-- Même logique que la reconstruction : vue SILVER.inventory_source, dernier
+-- enregistrement par clé (fichier, puis rang dans le fichier). Un fichier
+-- plus ancien chargé en retard ne remplace pas une ligne plus récente.
+-- ============================================================================
+
+MERGE INTO SILVER.inventory_clean t
+USING (
+    SELECT *
+    FROM SILVER.inventory_source
+    WHERE source_file NOT IN (SELECT source_file FROM SILVER.inventory_clean_files)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY product_id, warehouse
+                              ORDER BY source_file DESC, source_record DESC) = 1
+) s
+    ON t.product_id = s.product_id
+    AND t.warehouse IS NOT DISTINCT FROM s.warehouse
+WHEN MATCHED AND (s.source_file > t.source_file
+                  OR (s.source_file = t.source_file AND s.source_record > t.source_record)) THEN UPDATE SET
+    product_category = s.product_category,
+    region = s.region,
+    country = s.country,
+    current_stock = s.current_stock,
+    reorder_point = s.reorder_point,
+    lead_time = s.lead_time,
+    last_restock_date = s.last_restock_date,
+    stock_level = s.stock_level,
+    days_since_restock = s.days_since_restock,
+    source_file = s.source_file,
+    source_record = s.source_record
+WHEN NOT MATCHED THEN INSERT
+    (product_id, product_category, region, country, warehouse, current_stock, reorder_point, lead_time,
+     last_restock_date, stock_level, days_since_restock, source_file, source_record)
+VALUES
+    (s.product_id, s.product_category, s.region, s.country, s.warehouse, s.current_stock, s.reorder_point,
+     s.lead_time, s.last_restock_date, s.stock_level, s.days_since_restock, s.source_file, s.source_record);
+
+INSERT INTO SILVER.inventory_clean_files
+SELECT DISTINCT
+    source_file,
+    CURRENT_TIMESTAMP()::TIMESTAMP_NTZ AS merged_at
+FROM BRONZE.inventory_staging
+WHERE source_file NOT IN (SELECT source_file FROM SILVER.inventory_clean_files);
+
+-- days_since_restock est relatif au jour du rafraîchissement : lignes des
+-- jours précédents remises à jour (aucune si déjà rafraîchi aujourd'hui)
+UPDATE SILVER.inventory_clean
+SET days_since_restock = DATEDIFF('day', last_restock_date, CURRENT_DATE())
+WHERE days_since_restock IS DISTINCT FROM DATEDIFF('day', last_restock_date, CURRENT_DATE());
+
+-- ============================================================================
+-- TESTS DE QUALITÉ
+-- ============================================================================
+
+-- Test 1 : Une seule ligne par (product_id, warehouse)
+SELECT
+    'Test 1: Unicité (product_id, warehouse)' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' clés en double'
+    END AS test_result
+FROM (
+    SELECT product_id, warehouse
+    FROM SILVER.inventory_clean
+    GROUP BY product_id, warehouse
+    HAVING COUNT(*) > 1
+);
@@ -0,0 +1,50 @@
+-- ============================================================================
+-- ANYCOMPANY DATA PIPELINE - ÉTAT DU GRAPHE DE DÉPENDANCES
+-- ============================================================================
+-- Description : Objets de contrôle de l'exécuteur parallèle des scripts
+--               (pipeline/dag.py)
+-- Prérequis : ETL SQL.sql (schémas)
+--
+-- Principe :
+--   1. Un nœud = un objet SILVER / ANALYTICS créé par CREATE ... AS SELECT,
+--      avec les instructions qui le modifient et les tests qui le lisent
+--   2. Signature d'un nœud = empreinte de ses instructions + versions de ses
+--      entrées (sources BRONZE : COUNT(*) et HASH_AGG(*) ; autres nœuds :
+--      leur propre signature)
+--   3. Nœud sauté si sa signature est celle de sa dernière exécution réussie
+--      et que l'objet existe
+-- ============================================================================
+
+-- ============================================================================
+-- ÉTAT COURANT DES NŒUDS
+-- ============================================================================
+-- 1 ligne = 1 nœud (dernière exécution réussie)
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.pipeline_node_state (
+    node_name STRING,           -- objet principal (SCHEMA.TABLE, en majuscules)
+    script_name STRING,
+    signature STRING,
+    duration_s FLOAT,
+    run_id STRING,
+    refreshed_at TIMESTAMP_NTZ
+)
+COMMENT = 'Signature de la dernière exécution réussie de chaque nœud du pipeline';
+
+-- ============================================================================
+-- HISTORIQUE DES EXÉCUTIONS
+-- ============================================================================
+-- 1 ligne = 1 nœud × 1 exécution, avec sa place par rapport au chemin critique
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.pipeline_node_runs (
+    run_id STRING,
+    node_name STRING,
+    status STRING,              -- OK / SKIPPED / FAILED / BLOCKED
+    start_s FLOAT,              -- secondes depuis le début de l'exécution
+    duration_s FLOAT,
+    path_s FLOAT,               -- plus longue chaîne se terminant par ce nœud
+    slack_s FLOAT,              -- marge avant d'allonger le chemin critique
+    on_critical_path BOOLEAN,
+    error STRING,
+    run_at TIMESTAMP_NTZ
+)
+COMMENT = 'Durées par nœud et chemin critique de chaque exécution du pipeline';
@@ -0,0 +1,134 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER 0 : PROMO_CAMPAIGN_CALENDAR (Calendrier région × jour)
+-- Description : Promotion et campagne actives pour chaque région et chaque jour
+-- Granularité : 1 ligne = 1 région × 1 jour couvert par au moins une
+--               promotion ou une campagne
+-- Clé primaire : (region, calendar_date)
+-- Usage : jointure d'égalité sur (région, date) dans sales_enriched, à la
+--         place des jointures BETWEEN start_date AND end_date
+-- À exécuter avant sales_trends.sql (et avant chaque rafraîchissement
+-- incrémental, cf. pipeline/sales_enriched.py)
+-- ============================================================================
+-- RÈGLE DE RÉSOLUTION DES CHEVAUCHEMENTS (déterministe)
+--   Promotion retenue : plus forte remise (discount_percentage DESC),
+--                       puis la plus récente (start_date DESC),
+--                       puis promotion_id croissant
+--   Campagne retenue  : la plus récente (start_date DESC),
+--                       puis plus gros budget (budget DESC),
+--                       puis campaign_id croissant
+--   Le nombre d'éléments actifs est conservé (active_promotion_count,
+--   active_campaign_count). Même règle en local : pipeline/interval_calendar.py
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.promo_campaign_calendar
+CLUSTER BY (calendar_date, region)
+COMMENT = 'Promotion et campagne actives par région et par jour (résolution déterministe des chevauchements)'
+AS
+WITH day_offsets AS (
+    -- Décalages 0..N-1 pour développer chaque fenêtre jour par jour
+    -- (fenêtres limitées à 100 ans)
+    SELECT ROW_NUMBER() OVER (ORDER BY SEQ4()) - 1 AS n
+    FROM TABLE(GENERATOR(ROWCOUNT => 36525))
+),
+
+promotion_days AS (
+    SELECT
+        p.region,
+        DATEADD(DAY, o.n, p.start_date) AS calendar_date,
+        p.promotion_id,
+        p.product_category,
+        p.promotion_type,
+        p.discount_percentage,
+        p.start_date,
+        p.end_date
+    FROM SILVER.promotions_clean p
+    INNER JOIN day_offsets o
+        ON o.n <= DATEDIFF(DAY, p.start_date, p.end_date)
+    WHERE p.region IS NOT NULL
+),
+
+promotion_winner AS (
+    SELECT
+        *,
+        COUNT(*) OVER (PARTITION BY region, calendar_date) AS active_promotion_count
+    FROM promotion_days
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY region, calendar_date
+        ORDER BY discount_percentage DESC NULLS LAST, start_date DESC, promotion_id
+    ) = 1
+),
+
+campaign_days AS (
+    SELECT
+        m.region,
+        DATEADD(DAY, o.n, m.start_date) AS calendar_date,
+        m.campaign_id,
+        m.campaign_name,
+        m.campaign_type,
+        m.product_category,
+        m.target_audience,
+        m.budget,
+        m.reach,
+        m.conversion_rate,
+        m.start_date
+    FROM SILVER.marketing_campaigns_clean m
+    INNER JOIN day_offsets o
+        ON o.n <= DATEDIFF(DAY, m.start_date, m.end_date)
+    WHERE m.region IS NOT NULL
+),
+
+campaign_winner AS (
+    SELECT
+        *,
+        COUNT(*) OVER (PARTITION BY region, calendar_date) AS active_campaign_count
+    FROM campaign_days
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY region, calendar_date
+        ORDER BY start_date DESC, budget DESC NULLS LAST, campaign_id
+    ) = 1
+)
+
+SELECT
+    COALESCE(p.region, m.region)                AS region,
+    COALESCE(p.calendar_date, m.calendar_date)  AS calendar_date,
+
+    -- Promotion retenue
+    p.promotion_id,
+    p.product_category                          AS promo_product_category,
+    p.promotion_type,
+    p.discount_percentage,
+    p.start_date                                AS promo_start_date,
+    p.end_date                                  AS promo_end_date,
+    COALESCE(p.active_promotion_count, 0)       AS active_promotion_count,
+
+    -- Campagne retenue
+    m.campaign_id,
+    m.campaign_name,
+    m.campaign_type,
+    m.product_category                          AS campaign_product_category,
+    m.target_audience                           AS campaign_target,
+    m.budget                                    AS campaign_budget,
+    m.reach                                     AS campaign_reach,
+    m.conversion_rate                           AS campaign_conversion_rate,
+    COALESCE(m.active_campaign_count, 0)        AS active_campaign_count
+
+FROM promotion_winner p
+FULL OUTER JOIN campaign_winner m
+    ON p.region = m.region
+    AND p.calendar_date = m.calendar_date
+;
+
+-- ============================================================================
+-- TEST DE QUALITÉ : unicité de la clé (region, calendar_date)
+-- ============================================================================
+
+SELECT
+    'Test: Unicité region × jour' AS test_name,
+    COUNT(*) - COUNT(DISTINCT region, calendar_date) AS failed_records,
+    CASE
+        WHEN COUNT(*) = COUNT(DISTINCT region, calendar_date) THEN '✅ PASS'
+        ELSE '❌ FAIL - doublons region × jour détectés'
+    END AS test_result
+FROM ANALYTICS.promo_campaign_calendar;
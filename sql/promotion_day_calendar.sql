@@ -0,0 +1,73 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER 0 bis : PROMOTION_DAY_CALENDAR (Calendrier promotion × jour)
+-- Description : Jours d'activité de chaque promotion, avec ses attributs
+-- Granularité : 1 ligne = 1 promotion × 1 jour de sa fenêtre
+--               [start_date, end_date]
+-- Clé primaire : (promotion_id, start_date, end_date, calendar_date)
+-- Usage : analyses promotion vs référence (SQL analytique.sql, 2.3.1 et
+--         2.3.2) par jointure d'égalité sur la date, à la place des
+--         jointures BETWEEN et des NOT EXISTS corrélés sur les transactions ;
+--         filtres sur les promotions (statut, région, catégorie) appliqués
+--         au calendrier avant la jointure
+-- Contrairement à promo_campaign_calendar (région × jour, une promotion
+-- retenue), tous les chevauchements sont conservés.
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.promotion_day_calendar
+CLUSTER BY (calendar_date)
+COMMENT = 'Jours d''activité de chaque promotion (1 ligne par promotion et par jour)'
+AS
+WITH day_offsets AS (
+    -- Décalages 0..N-1 pour développer chaque fenêtre jour par jour
+    -- (fenêtres limitées à 100 ans)
+    SELECT ROW_NUMBER() OVER (ORDER BY SEQ4()) - 1 AS n
+    FROM TABLE(GENERATOR(ROWCOUNT => 36525))
+)
+SELECT
+    DATEADD(DAY, o.n, p.start_date) AS calendar_date,
+    p.promotion_id,
+    p.product_category,
+    p.promotion_type,
+    p.discount_percentage,
+    p.region,
+    p.start_date,
+    p.end_date
+FROM SILVER.promotions_clean p
+INNER JOIN day_offsets o
+    ON o.n <= DATEDIFF(DAY, p.start_date, p.end_date)
+;
+
+-- ============================================================================
+-- VUE : promotion_category_days (catégories en promotion par jour)
+-- ============================================================================
+-- 1 ligne = 1 jour × 1 catégorie ayant au moins une promotion active
+CREATE OR REPLACE VIEW ANALYTICS.promotion_category_days AS
+SELECT
+    calendar_date,
+    product_category,
+    COUNT(*) AS active_promotion_count,
+    COUNT(DISTINCT region) AS active_region_count,
+    MAX(discount_percentage) AS max_discount_percentage
+FROM ANALYTICS.promotion_day_calendar
+GROUP BY calendar_date, product_category
+;
+
+-- ============================================================================
+-- TESTS DE QUALITÉ
+-- ============================================================================
+
+-- Test : 1 ligne par jour de fenêtre pour chaque promotion
+SELECT
+    'Test: Jours de promotion = durée des fenêtres' AS test_name,
+    ABS(c.calendar_rows - p.window_days) AS failed_records,
+    CASE
+        WHEN c.calendar_rows = p.window_days THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || c.calendar_rows || ' lignes pour ' || p.window_days || ' jours de fenêtres'
+    END AS test_result
+FROM (SELECT COUNT(*) AS calendar_rows FROM ANALYTICS.promotion_day_calendar) c
+CROSS JOIN (
+    SELECT COALESCE(SUM(DATEDIFF(DAY, start_date, end_date) + 1), 0) AS window_days
+    FROM SILVER.promotions_clean
+) p;
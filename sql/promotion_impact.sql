@@ -14,10 +14,56 @@ USE SCHEMA ANALYTICS;
 -- ============================================================================
 -- TABLE : promotions_active
 -- ============================================================================
-CREATE OR REPLACE TABLE ANALYTICS.promotions_active 
+-- Construite en une seule passe (métriques de ventes et part de marché) dans
+-- promotions_active_staging, puis publiée par échange atomique (SWAP WITH) :
+-- pendant le rafraîchissement, les lecteurs voient l'ancienne version, jamais
+-- une table absente ou partielle.
+-- Mode blue/green (vue sur deux versions, tests avant bascule, retour
+-- arrière) : python -m pipeline.blue_green ; après la première bascule, les
+-- runners remplacent la construction, l'échange, la documentation et les
+-- tests de la table par ce rafraîchissement (ANALYTICS.table_versions)
+-- ============================================================================
+CREATE OR REPLACE TABLE ANALYTICS.promotions_active_staging 
 CLUSTER BY (start_date, region, promotion_type)
 COMMENT = 'Catalogue des promotions actives et historiques avec métriques de performance'
 AS
+WITH promotion_sales AS (
+    -- Agréger les ventes liées à chaque promotion avec plus de détails
+    SELECT 
+        promotion_id,
+        COUNT(*) AS sale_count,
+        SUM(sale_amount) AS total_revenue,
+        SUM(net_amount) AS total_net_revenue,
+        AVG(sale_amount) AS avg_transaction,
+        COUNT(DISTINCT merchant_entity) AS unique_customers_reached,  -- CORRECTION: Nom correct
+        SUM(sale_amount - net_amount) AS total_discount_given
+    FROM ANALYTICS.sales_enriched
+    WHERE promotion_id IS NOT NULL
+    GROUP BY promotion_id
+),
+
+daily_region_sales AS (
+    -- Ventes totales par région et jour
+    SELECT 
+        sale_region,
+        sale_date,
+        COUNT(*) AS daily_sales_count
+    FROM ANALYTICS.sales_enriched
+    GROUP BY sale_region, sale_date
+),
+
+market AS (
+    -- Ventes totales de la région pendant la période de chaque promotion
+    SELECT 
+        p.promotion_id,
+        SUM(drs.daily_sales_count) AS total_sales_in_period
+    FROM SILVER.promotions_clean p
+    LEFT JOIN daily_region_sales drs 
+        ON p.region = drs.sale_region
+        AND drs.sale_date BETWEEN p.start_date AND p.end_date
+    GROUP BY p.promotion_id
+)
+
 SELECT
     -- ========================================================================
     -- DIMENSIONS PROMOTION
@@ -91,31 +137,36 @@ SELECT
     CURRENT_TIMESTAMP() AS created_at,
     CURRENT_USER() AS created_by,
     'v1.0' AS data_version,
-    'PROMOTIONS_ACTIVE' AS data_source
+    'PROMOTIONS_ACTIVE' AS data_source,
 
-FROM SILVER.promotions_clean p
+    -- ========================================================================
+    -- PART DE MARCHÉ (ventes de la promotion / ventes de la région sur la période)
+    -- ========================================================================
+    CASE 
+        WHEN market.total_sales_in_period > 0
+        THEN ROUND(COALESCE(s.sale_count, 0) * 100.0 / market.total_sales_in_period, 2)
+        ELSE 0 
+    END AS market_share_pct_calculated,
+    COALESCE(market.total_sales_in_period, 0) AS total_market_sales
 
--- Agréger les ventes liées à chaque promotion avec plus de détails
-LEFT JOIN (
-    SELECT 
-        promotion_id,
-        COUNT(*) AS sale_count,
-        SUM(sale_amount) AS total_revenue,
-        SUM(net_amount) AS total_net_revenue,
-        AVG(sale_amount) AS avg_transaction,
-        COUNT(DISTINCT merchant_entity) AS unique_customers_reached,  -- CORRECTION: Nom correct
-        SUM(sale_amount - net_amount) AS total_discount_given
-    FROM ANALYTICS.sales_enriched
-    WHERE promotion_id IS NOT NULL
-    GROUP BY promotion_id
-) s ON p.promotion_id = s.promotion_id
+FROM SILVER.promotions_clean p
+LEFT JOIN promotion_sales s ON p.promotion_id = s.promotion_id
+LEFT JOIN market ON p.promotion_id = market.promotion_id
 ;
 
 -- ============================================================================
--- MISE À JOUR : Calculer la part de marché après création de la table
+-- PUBLICATION : échange atomique avec la table en service
 -- ============================================================================
+-- Au premier passage, une table vide de même structure sert de cible à
+-- l'échange ; après l'échange, promotions_active_staging contient l'ancienne
+-- version et est supprimée.
+CREATE TABLE IF NOT EXISTS ANALYTICS.promotions_active LIKE ANALYTICS.promotions_active_staging;
+ALTER TABLE ANALYTICS.promotions_active_staging SWAP WITH ANALYTICS.promotions_active;
+DROP TABLE ANALYTICS.promotions_active_staging;
 
--- Créer une vue pour les ventes totales par région et jour
+-- ============================================================================
+-- VUE : v_daily_region_sales (ventes totales par région et jour)
+-- ============================================================================
 CREATE OR REPLACE VIEW ANALYTICS.v_daily_region_sales AS
 SELECT 
     sale_region,
@@ -125,32 +176,6 @@ SELECT
 FROM ANALYTICS.sales_enriched
 GROUP BY sale_region, sale_date;
 
--- Mettre à jour la part de marché dans promotions_active
-CREATE OR REPLACE TABLE ANALYTICS.promotions_active_enhanced AS
-SELECT 
-    pa.*,
-    CASE 
-        WHEN market.total_sales_in_period > 0
-        THEN ROUND(pa.total_sales * 100.0 / market.total_sales_in_period, 2)
-        ELSE 0 
-    END AS market_share_pct_calculated,
-    COALESCE(market.total_sales_in_period, 0) AS total_market_sales
-FROM ANALYTICS.promotions_active pa
-LEFT JOIN (
-    SELECT 
-        p.promotion_id,
-        SUM(drs.daily_sales_count) AS total_sales_in_period
-    FROM SILVER.promotions_clean p
-    LEFT JOIN ANALYTICS.v_daily_region_sales drs 
-        ON p.region = drs.sale_region
-        AND drs.sale_date BETWEEN p.start_date AND p.end_date
-    GROUP BY p.promotion_id
-) market ON pa.promotion_id = market.promotion_id;
-
--- Remplacer la table originale par la version améliorée
-DROP TABLE ANALYTICS.promotions_active;
-ALTER TABLE ANALYTICS.promotions_active_enhanced RENAME TO promotions_active;
-
 -- ============================================================================
 -- DOCUMENTATION DE LA TABLE
 -- ============================================================================
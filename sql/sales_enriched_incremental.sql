@@ -0,0 +1,465 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER : SALES_ENRICHED - RAFRAÎCHISSEMENT INCRÉMENTAL
+-- Description : Met à jour ANALYTICS.sales_enriched par MERGE au lieu de la
+--               reconstruire entièrement (CREATE OR REPLACE de sales_trends.sql)
+-- Principe :
+--   1. Watermark (dernière transaction_date et dernier ingested_at traités)
+--   2. Détection des fenêtres promotions / campagnes nouvelles, modifiées ou
+--      supprimées (comparaison avec l'instantané du dernier rafraîchissement)
+--   3. Transactions à recalculer = nouvelles depuis le watermark
+--      + transactions situées dans une fenêtre modifiée (ancienne ou nouvelle)
+--   4. Recalcul de ces seules transactions via ANALYTICS.sales_enriched_source,
+--      suppression des ventes disparues puis MERGE sur sale_id
+--   5. Réagrégation des jours touchés dans ANALYTICS.sales_daily_rollup et
+--      ANALYTICS.customer_reach_sketches, des campagnes / promotions touchées
+--      dans ANALYTICS.customer_audiences, mise à jour de l'instantané et du
+--      watermark (même transaction)
+-- Coût : proportionnel aux nouvelles données et aux fenêtres modifiées,
+--        et non plus à tout l'historique
+-- Exécution : python -m pipeline.sales_enriched  (--full pour tout recalculer)
+-- Prérequis : vues ANALYTICS.sales_enriched_source (sales_trends.sql),
+--             ANALYTICS.sales_daily_rollup_source (sales_rollups.sql),
+--             ANALYTICS.customer_reach_sketch_source (customer_reach_sketches.sql)
+--             et ANALYTICS.customer_audience_source (customer_audiences.sql),
+--             calendrier ANALYTICS.promo_campaign_calendar reconstruit juste
+--             avant (promo_campaign_calendar.sql, lancé par le driver)
+-- Limite : une transaction supprimée de SILVER n'est retirée qu'en mode --full
+-- ============================================================================
+
+-- ============================================================================
+-- 1. OBJETS DE CONTRÔLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.etl_watermarks (
+    table_name STRING,
+    last_transaction_date DATE,
+    last_ingested_at TIMESTAMP_NTZ,
+    updated_at TIMESTAMP_NTZ
+)
+COMMENT = 'Watermarks des rafraîchissements incrémentaux';
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.sales_enriched_window_snapshot (
+    source STRING,          -- PROMOTION / CAMPAIGN
+    window_id STRING,
+    region STRING,
+    start_date DATE,
+    end_date DATE,
+    row_hash NUMBER
+)
+COMMENT = 'Fenêtres promotions / campagnes utilisées lors du dernier rafraîchissement de sales_enriched';
+
+-- Table cible (premier lancement : structure issue de la vue, sans données)
+CREATE TABLE IF NOT EXISTS ANALYTICS.sales_enriched
+CLUSTER BY (sale_date, sale_region)
+COMMENT = 'Table centrale des ventes enrichies avec promotions et campagnes marketing actives'
+AS
+SELECT * FROM ANALYTICS.sales_enriched_source WHERE 1 = 0;
+
+-- Agrégats quotidiens, esquisses, audiences et fraîcheur (premier lancement
+-- sans sales_rollups.sql, customer_reach_sketches.sql ni customer_audiences.sql)
+CREATE TABLE IF NOT EXISTS ANALYTICS.sales_daily_rollup
+CLUSTER BY (sale_date)
+COMMENT = 'Agrégats quotidiens des ventes (jour × région × promotion × campagne × paiement)'
+AS
+SELECT * FROM ANALYTICS.sales_daily_rollup_source WHERE 1 = 0;
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.customer_reach_sketches
+CLUSTER BY (sketch_type, sketch_date)
+COMMENT = 'Registres HyperLogLog des clients touchés (jour × promotion / campagne)'
+AS
+SELECT * FROM ANALYTICS.customer_reach_sketch_source WHERE 1 = 0;
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.customer_ids (
+    customer_id NUMBER,
+    merchant_entity STRING,
+    first_seen_at TIMESTAMP_NTZ
+)
+COMMENT = 'Identifiant entier stable de chaque client (merchant_entity)';
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.customer_audiences
+CLUSTER BY (audience_type, audience_key)
+COMMENT = 'Clients de chaque campagne / promotion (identifiants de customer_ids)'
+AS
+SELECT * FROM ANALYTICS.customer_audience_source WHERE 1 = 0;
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.rollup_freshness (
+    rollup_name STRING,
+    refreshed_at TIMESTAMP_NTZ,
+    refresh_mode STRING,
+    days_refreshed NUMBER,
+    row_count NUMBER,
+    source_transactions NUMBER,
+    last_sale_date DATE
+)
+COMMENT = 'Date et portée du dernier rafraîchissement de chaque table d''agrégats';
+
+-- ============================================================================
+-- 2. WATERMARK COURANT
+-- ============================================================================
+
+SET (wm_transaction_date, wm_ingested_at) = (
+    SELECT
+        COALESCE(MAX(last_transaction_date), '1900-01-01'::DATE),
+        COALESCE(MAX(last_ingested_at), '1900-01-01'::TIMESTAMP_NTZ)
+    FROM ANALYTICS.etl_watermarks
+    WHERE table_name = 'SALES_ENRICHED'
+);
+
+-- ============================================================================
+-- 3. FENÊTRES PROMOTIONS / CAMPAGNES MODIFIÉES
+-- ============================================================================
+
+CREATE OR REPLACE TEMPORARY TABLE ANALYTICS.tmp_current_windows AS
+SELECT
+    'PROMOTION' AS source,
+    promotion_id AS window_id,
+    region,
+    start_date,
+    end_date,
+    HASH(promotion_id, product_category, promotion_type, discount_percentage,
+         start_date, end_date, region) AS row_hash
+FROM SILVER.promotions_clean
+UNION ALL
+SELECT
+    'CAMPAIGN' AS source,
+    campaign_id AS window_id,
+    region,
+    start_date,
+    end_date,
+    HASH(campaign_id, campaign_name, campaign_type, product_category, target_audience,
+         start_date, end_date, region, budget, reach, conversion_rate) AS row_hash
+FROM SILVER.marketing_campaigns_clean;
+
+-- Nouvelle fenêtre des éléments ajoutés / modifiés
+-- + ancienne fenêtre des éléments modifiés / supprimés
+CREATE OR REPLACE TEMPORARY TABLE ANALYTICS.tmp_changed_windows AS
+SELECT c.region, c.start_date, c.end_date
+FROM ANALYTICS.tmp_current_windows c
+LEFT JOIN ANALYTICS.sales_enriched_window_snapshot s
+    ON s.source = c.source
+    AND s.window_id = c.window_id
+    AND s.row_hash = c.row_hash
+WHERE s.window_id IS NULL
+UNION
+SELECT s.region, s.start_date, s.end_date
+FROM ANALYTICS.sales_enriched_window_snapshot s
+LEFT JOIN ANALYTICS.tmp_current_windows c
+    ON c.source = s.source
+    AND c.window_id = s.window_id
+    AND c.row_hash = s.row_hash
+WHERE c.window_id IS NULL;
+
+-- ============================================================================
+-- 4. TRANSACTIONS À RECALCULER
+-- ============================================================================
+-- Tous types confondus : une transaction qui n'est plus une vente doit être
+-- retirée de la cible. ingested_at NULL = ligne chargée avant l'ajout de la
+-- colonne, couverte par le watermark sur transaction_date.
+
+CREATE OR REPLACE TEMPORARY TABLE ANALYTICS.tmp_sales_affected AS
+SELECT
+    ft.transaction_id,
+    ft.transaction_date,
+    ft.ingested_at,
+    TRUE AS is_new
+FROM SILVER.financial_transactions_clean ft
+WHERE ft.transaction_date > $wm_transaction_date
+   OR ft.ingested_at > $wm_ingested_at
+UNION ALL
+SELECT DISTINCT
+    ft.transaction_id,
+    ft.transaction_date,
+    ft.ingested_at,
+    FALSE AS is_new
+FROM SILVER.financial_transactions_clean ft
+INNER JOIN ANALYTICS.tmp_changed_windows w
+    ON ft.region = w.region
+    AND ft.transaction_date BETWEEN w.start_date AND w.end_date
+WHERE NOT (ft.transaction_date > $wm_transaction_date OR COALESCE(ft.ingested_at > $wm_ingested_at, FALSE));
+
+-- Lignes enrichies recalculées (seule lecture de la vue d'enrichissement)
+CREATE OR REPLACE TEMPORARY TABLE ANALYTICS.tmp_sales_enriched_delta AS
+SELECT src.*
+FROM ANALYTICS.sales_enriched_source src
+WHERE src.sale_id IN (SELECT transaction_id FROM ANALYTICS.tmp_sales_affected);
+
+-- Jours du rollup à réagréger : date des transactions recalculées dans SILVER
+-- et dans la cible avant MERGE (une date de transaction peut avoir changé)
+CREATE OR REPLACE TEMPORARY TABLE ANALYTICS.tmp_rollup_dates AS
+SELECT transaction_date AS sale_date
+FROM ANALYTICS.tmp_sales_affected
+UNION
+SELECT t.sale_date
+FROM ANALYTICS.sales_enriched t
+INNER JOIN ANALYTICS.tmp_sales_affected a
+    ON t.sale_id = a.transaction_id;
+
+-- Audiences à recalculer : campagnes / promotions des transactions recalculées,
+-- avant (cible) et après (delta) MERGE
+CREATE OR REPLACE TEMPORARY TABLE ANALYTICS.tmp_audience_keys AS
+SELECT 'CAMPAIGN' AS audience_type, campaign_id AS audience_key
+FROM ANALYTICS.tmp_sales_enriched_delta
+WHERE campaign_id IS NOT NULL
+UNION
+SELECT 'PROMOTION' AS audience_type, promotion_id AS audience_key
+FROM ANALYTICS.tmp_sales_enriched_delta
+WHERE promotion_id IS NOT NULL
+UNION
+SELECT 'CAMPAIGN' AS audience_type, t.campaign_id AS audience_key
+FROM ANALYTICS.sales_enriched t
+INNER JOIN ANALYTICS.tmp_sales_affected a
+    ON t.sale_id = a.transaction_id
+WHERE t.campaign_id IS NOT NULL
+UNION
+SELECT 'PROMOTION' AS audience_type, t.promotion_id AS audience_key
+FROM ANALYTICS.sales_enriched t
+INNER JOIN ANALYTICS.tmp_sales_affected a
+    ON t.sale_id = a.transaction_id
+WHERE t.promotion_id IS NOT NULL;
+
+-- ============================================================================
+-- 5. APPLICATION DES CHANGEMENTS (transaction unique)
+-- ============================================================================
+
+BEGIN TRANSACTION;
+
+-- Ventes disparues : transaction recalculée qui n'est plus une vente
+DELETE FROM ANALYTICS.sales_enriched t
+USING ANALYTICS.tmp_sales_affected a
+WHERE t.sale_id = a.transaction_id
+  AND t.sale_id NOT IN (SELECT sale_id FROM ANALYTICS.tmp_sales_enriched_delta);
+
+-- Insertion des nouvelles ventes, mise à jour de celles dont le contenu a changé
+MERGE INTO ANALYTICS.sales_enriched t
+USING ANALYTICS.tmp_sales_enriched_delta s
+    ON t.sale_id = s.sale_id
+WHEN MATCHED AND HASH(
+        t.sale_date, t.sale_amount, t.payment_method, t.merchant_entity, t.sale_region, t.account_code,
+        t.promotion_id, t.promo_product_category, t.promotion_type, t.discount_percentage,
+        t.promo_start_date, t.promo_end_date, t.active_promotion_count,
+        t.campaign_id, t.campaign_name, t.campaign_type, t.campaign_product_category, t.campaign_target,
+        t.campaign_budget, t.campaign_reach, t.campaign_conversion_rate, t.active_campaign_count
+    ) <> HASH(
+        s.sale_date, s.sale_amount, s.payment_method, s.merchant_entity, s.sale_region, s.account_code,
+        s.promotion_id, s.promo_product_category, s.promotion_type, s.discount_percentage,
+        s.promo_start_date, s.promo_end_date, s.active_promotion_count,
+        s.campaign_id, s.campaign_name, s.campaign_type, s.campaign_product_category, s.campaign_target,
+        s.campaign_budget, s.campaign_reach, s.campaign_conversion_rate, s.active_campaign_count
+    )
+THEN UPDATE SET
+    sale_date = s.sale_date,
+    sale_amount = s.sale_amount,
+    payment_method = s.payment_method,
+    merchant_entity = s.merchant_entity,
+    sale_region = s.sale_region,
+    account_code = s.account_code,
+    sale_year = s.sale_year,
+    sale_month = s.sale_month,
+    sale_quarter = s.sale_quarter,
+    sale_day_of_week = s.sale_day_of_week,
+    sale_week_start = s.sale_week_start,
+    promotion_id = s.promotion_id,
+    promo_product_category = s.promo_product_category,
+    promotion_type = s.promotion_type,
+    discount_percentage = s.discount_percentage,
+    promo_start_date = s.promo_start_date,
+    promo_end_date = s.promo_end_date,
+    active_promotion_count = s.active_promotion_count,
+    has_promotion = s.has_promotion,
+    discount_rate = s.discount_rate,
+    campaign_id = s.campaign_id,
+    campaign_name = s.campaign_name,
+    campaign_type = s.campaign_type,
+    campaign_product_category = s.campaign_product_category,
+    campaign_target = s.campaign_target,
+    campaign_budget = s.campaign_budget,
+    campaign_reach = s.campaign_reach,
+    campaign_conversion_rate = s.campaign_conversion_rate,
+    active_campaign_count = s.active_campaign_count,
+    has_campaign = s.has_campaign,
+    net_amount = s.net_amount,
+    estimated_campaign_impact = s.estimated_campaign_impact,
+    amount_category = s.amount_category,
+    day_type = s.day_type,
+    created_at = s.created_at,
+    created_by = s.created_by,
+    data_version = s.data_version,
+    data_source = s.data_source
+WHEN NOT MATCHED THEN INSERT (
+    sale_id, sale_date, sale_amount, payment_method, merchant_entity, sale_region, account_code,
+    sale_year, sale_month, sale_quarter, sale_day_of_week, sale_week_start,
+    promotion_id, promo_product_category, promotion_type, discount_percentage,
+    promo_start_date, promo_end_date, active_promotion_count, has_promotion, discount_rate,
+    campaign_id, campaign_name, campaign_type, campaign_product_category, campaign_target,
+    campaign_budget, campaign_reach, campaign_conversion_rate, active_campaign_count, has_campaign,
+    net_amount, estimated_campaign_impact, amount_category, day_type,
+    created_at, created_by, data_version, data_source
+) VALUES (
+    s.sale_id, s.sale_date, s.sale_amount, s.payment_method, s.merchant_entity, s.sale_region, s.account_code,
+    s.sale_year, s.sale_month, s.sale_quarter, s.sale_day_of_week, s.sale_week_start,
+    s.promotion_id, s.promo_product_category, s.promotion_type, s.discount_percentage,
+    s.promo_start_date, s.promo_end_date, s.active_promotion_count, s.has_promotion, s.discount_rate,
+    s.campaign_id, s.campaign_name, s.campaign_type, s.campaign_product_category, s.campaign_target,
+    s.campaign_budget, s.campaign_reach, s.campaign_conversion_rate, s.active_campaign_count, s.has_campaign,
+    s.net_amount, s.estimated_campaign_impact, s.amount_category, s.day_type,
+    s.created_at, s.created_by, s.data_version, s.data_source
+);
+
+-- Réagrégation des jours touchés (les autres jours du cube sont inchangés)
+DELETE FROM ANALYTICS.sales_daily_rollup
+WHERE sale_date IN (SELECT sale_date FROM ANALYTICS.tmp_rollup_dates)
+   OR (sale_date IS NULL AND EXISTS (SELECT 1 FROM ANALYTICS.tmp_rollup_dates WHERE sale_date IS NULL));
+
+INSERT INTO ANALYTICS.sales_daily_rollup
+SELECT *
+FROM ANALYTICS.sales_daily_rollup_source
+WHERE sale_date IN (SELECT sale_date FROM ANALYTICS.tmp_rollup_dates)
+   OR (sale_date IS NULL AND EXISTS (SELECT 1 FROM ANALYTICS.tmp_rollup_dates WHERE sale_date IS NULL));
+
+MERGE INTO ANALYTICS.rollup_freshness f
+USING (
+    SELECT
+        'SALES_DAILY_ROLLUP' AS rollup_name,
+        'INCREMENTAL' AS refresh_mode,
+        (SELECT COUNT(*) FROM ANALYTICS.tmp_rollup_dates) AS days_refreshed,
+        COUNT(*) AS row_count,
+        SUM(transactions) AS source_transactions,
+        MAX(sale_date) AS last_sale_date
+    FROM ANALYTICS.sales_daily_rollup
+) s
+    ON f.rollup_name = s.rollup_name
+WHEN MATCHED THEN UPDATE SET
+    refreshed_at = CURRENT_TIMESTAMP(),
+    refresh_mode = s.refresh_mode,
+    days_refreshed = s.days_refreshed,
+    row_count = s.row_count,
+    source_transactions = s.source_transactions,
+    last_sale_date = s.last_sale_date
+WHEN NOT MATCHED THEN INSERT (rollup_name, refreshed_at, refresh_mode, days_refreshed, row_count, source_transactions, last_sale_date)
+VALUES (s.rollup_name, CURRENT_TIMESTAMP(), s.refresh_mode, s.days_refreshed, s.row_count, s.source_transactions, s.last_sale_date);
+
+-- Esquisses de portée des jours touchés (mêmes jours que le cube)
+DELETE FROM ANALYTICS.customer_reach_sketches
+WHERE sketch_date IN (SELECT sale_date FROM ANALYTICS.tmp_rollup_dates)
+   OR (sketch_date IS NULL AND EXISTS (SELECT 1 FROM ANALYTICS.tmp_rollup_dates WHERE sale_date IS NULL));
+
+INSERT INTO ANALYTICS.customer_reach_sketches
+SELECT *
+FROM ANALYTICS.customer_reach_sketch_source
+WHERE sketch_date IN (SELECT sale_date FROM ANALYTICS.tmp_rollup_dates)
+   OR (sketch_date IS NULL AND EXISTS (SELECT 1 FROM ANALYTICS.tmp_rollup_dates WHERE sale_date IS NULL));
+
+MERGE INTO ANALYTICS.rollup_freshness f
+USING (
+    SELECT
+        'CUSTOMER_REACH_SKETCHES' AS rollup_name,
+        'INCREMENTAL' AS refresh_mode,
+        (SELECT COUNT(*) FROM ANALYTICS.tmp_rollup_dates) AS days_refreshed,
+        COUNT(*) AS row_count,
+        NULL AS source_transactions,
+        MAX(sketch_date) AS last_sale_date
+    FROM ANALYTICS.customer_reach_sketches
+) s
+    ON f.rollup_name = s.rollup_name
+WHEN MATCHED THEN UPDATE SET
+    refreshed_at = CURRENT_TIMESTAMP(),
+    refresh_mode = s.refresh_mode,
+    days_refreshed = s.days_refreshed,
+    row_count = s.row_count,
+    source_transactions = s.source_transactions,
+    last_sale_date = s.last_sale_date
+WHEN NOT MATCHED THEN INSERT (rollup_name, refreshed_at, refresh_mode, days_refreshed, row_count, source_transactions, last_sale_date)
+VALUES (s.rollup_name, CURRENT_TIMESTAMP(), s.refresh_mode, s.days_refreshed, s.row_count, s.source_transactions, s.last_sale_date);
+
+-- Audiences des campagnes / promotions touchées (nouveaux clients d'abord
+-- ajoutés au dictionnaire)
+INSERT INTO ANALYTICS.customer_ids
+SELECT
+    COALESCE((SELECT MAX(customer_id) FROM ANALYTICS.customer_ids), 0)
+        + ROW_NUMBER() OVER (ORDER BY merchant_entity) AS customer_id,
+    merchant_entity,
+    CURRENT_TIMESTAMP() AS first_seen_at
+FROM (
+    SELECT DISTINCT merchant_entity
+    FROM ANALYTICS.tmp_sales_enriched_delta
+    WHERE merchant_entity IS NOT NULL
+) e
+WHERE merchant_entity NOT IN (SELECT merchant_entity FROM ANALYTICS.customer_ids);
+
+DELETE FROM ANALYTICS.customer_audiences t
+USING ANALYTICS.tmp_audience_keys k
+WHERE t.audience_type = k.audience_type
+  AND t.audience_key = k.audience_key;
+
+INSERT INTO ANALYTICS.customer_audiences
+SELECT src.*
+FROM ANALYTICS.customer_audience_source src
+WHERE (src.audience_type = 'CAMPAIGN'
+       AND src.audience_key IN (SELECT audience_key FROM ANALYTICS.tmp_audience_keys WHERE audience_type = 'CAMPAIGN'))
+   OR (src.audience_type = 'PROMOTION'
+       AND src.audience_key IN (SELECT audience_key FROM ANALYTICS.tmp_audience_keys WHERE audience_type = 'PROMOTION'));
+
+MERGE INTO ANALYTICS.rollup_freshness f
+USING (
+    SELECT
+        'CUSTOMER_AUDIENCES' AS rollup_name,
+        'INCREMENTAL' AS refresh_mode,
+        NULL AS days_refreshed,
+        COUNT(*) AS row_count,
+        NULL AS source_transactions,
+        NULL AS last_sale_date
+    FROM ANALYTICS.customer_audiences
+) s
+    ON f.rollup_name = s.rollup_name
+WHEN MATCHED THEN UPDATE SET
+    refreshed_at = CURRENT_TIMESTAMP(),
+    refresh_mode = s.refresh_mode,
+    days_refreshed = s.days_refreshed,
+    row_count = s.row_count,
+    source_transactions = s.source_transactions,
+    last_sale_date = s.last_sale_date
+WHEN NOT MATCHED THEN INSERT (rollup_name, refreshed_at, refresh_mode, days_refreshed, row_count, source_transactions, last_sale_date)
+VALUES (s.rollup_name, CURRENT_TIMESTAMP(), s.refresh_mode, s.days_refreshed, s.row_count, s.source_transactions, s.last_sale_date);
+
+-- Instantané des fenêtres désormais prises en compte
+DELETE FROM ANALYTICS.sales_enriched_window_snapshot;
+
+INSERT INTO ANALYTICS.sales_enriched_window_snapshot
+SELECT source, window_id, region, start_date, end_date, row_hash
+FROM ANALYTICS.tmp_current_windows;
+
+-- Nouveau watermark
+MERGE INTO ANALYTICS.etl_watermarks w
+USING (
+    SELECT
+        'SALES_ENRICHED' AS table_name,
+        GREATEST($wm_transaction_date, COALESCE(MAX(transaction_date), $wm_transaction_date)) AS last_transaction_date,
+        GREATEST($wm_ingested_at, COALESCE(MAX(ingested_at), $wm_ingested_at)) AS last_ingested_at
+    FROM ANALYTICS.tmp_sales_affected
+    WHERE is_new
+) s
+    ON w.table_name = s.table_name
+WHEN MATCHED THEN UPDATE SET
+    last_transaction_date = s.last_transaction_date,
+    last_ingested_at = s.last_ingested_at,
+    updated_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (table_name, last_transaction_date, last_ingested_at, updated_at)
+VALUES (s.table_name, s.last_transaction_date, s.last_ingested_at, CURRENT_TIMESTAMP());
+
+COMMIT;
+
+-- ============================================================================
+-- 6. RAPPORT
+-- ============================================================================
+
+SELECT
+    (SELECT COUNT(*) FROM ANALYTICS.tmp_sales_affected WHERE is_new) AS new_transactions,
+    (SELECT COUNT(*) FROM ANALYTICS.tmp_sales_affected WHERE NOT is_new) AS window_transactions,
+    (SELECT COUNT(*) FROM ANALYTICS.tmp_changed_windows) AS changed_windows,
+    (SELECT COUNT(*) FROM ANALYTICS.tmp_sales_enriched_delta) AS rows_scanned,
+    (SELECT COUNT(*) FROM ANALYTICS.tmp_rollup_dates) AS rollup_days,
+    (SELECT COUNT(*) FROM ANALYTICS.tmp_audience_keys) AS audiences_refreshed,
+    $wm_transaction_date AS previous_watermark_date,
+    $wm_ingested_at AS previous_watermark_ingested_at;
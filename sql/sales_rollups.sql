@@ -0,0 +1,179 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER 1 bis : SALES_DAILY_ROLLUP (Agrégats précalculés des ventes)
+-- Description : Cube jour × région × promotion × campagne × moyen de paiement
+--               alimentant le tableau de bord des ventes et daily_sales_summary
+-- Granularité : 1 ligne = 1 jour × 1 région × has_promotion × has_campaign
+--               × 1 moyen de paiement
+-- Clé primaire : (sale_date, sale_region, has_promotion, has_campaign, payment_method)
+-- Usage : KPI, tendances et classements sans relire sales_enriched
+--         (quelques milliers de lignes au lieu d'une ligne par vente)
+-- À exécuter après sales_trends.sql. Maintenu ensuite par le rafraîchissement
+-- incrémental (sales_enriched_incremental.sql) : seuls les jours touchés par
+-- les transactions recalculées sont réagrégés, dans la même transaction que
+-- le MERGE de sales_enriched.
+-- Fraîcheur : ANALYTICS.rollup_freshness (date du dernier rafraîchissement,
+--             mode, jours recalculés, dernière date couverte)
+-- ============================================================================
+
+-- ============================================================================
+-- VUE : sales_daily_rollup_source (logique d'agrégation)
+-- ============================================================================
+-- Partagée par la reconstruction complète ci-dessous et par le rafraîchissement
+-- incrémental, qui la filtre sur les jours à recalculer.
+-- Mesures additives uniquement (sommes, comptes, min / max) : tout niveau
+-- plus agrégé se déduit du cube (moyenne = somme / nombre de transactions).
+-- Ventes de montant positif, comme les requêtes du tableau de bord (SILVER
+-- exclut déjà les autres).
+-- ============================================================================
+CREATE OR REPLACE VIEW ANALYTICS.sales_daily_rollup_source AS
+SELECT
+    -- Dimensions
+    sale_date,
+    sale_region,
+    has_promotion,
+    has_campaign,
+    payment_method,
+
+    -- Mesures
+    COUNT(*)                             AS transactions,
+    SUM(sale_amount)                     AS revenue,
+    SUM(net_amount)                      AS net_revenue,
+    SUM(sale_amount - net_amount)        AS discount_given,
+    SUM(discount_rate)                   AS discount_rate_sum,
+    SUM(estimated_campaign_impact)       AS campaign_impact,
+    MIN(sale_amount)                     AS min_sale_amount,
+    MAX(sale_amount)                     AS max_sale_amount,
+    MAX(active_promotion_count)          AS max_active_promotions,
+    MAX(active_campaign_count)           AS max_active_campaigns
+FROM ANALYTICS.sales_enriched
+WHERE sale_amount > 0
+GROUP BY sale_date, sale_region, has_promotion, has_campaign, payment_method
+;
+
+-- ============================================================================
+-- TABLE : sales_daily_rollup (reconstruction complète)
+-- ============================================================================
+CREATE OR REPLACE TABLE ANALYTICS.sales_daily_rollup
+CLUSTER BY (sale_date)
+COMMENT = 'Agrégats quotidiens des ventes (jour × région × promotion × campagne × paiement)'
+AS
+SELECT * FROM ANALYTICS.sales_daily_rollup_source
+;
+
+-- ============================================================================
+-- FRAÎCHEUR DES AGRÉGATS
+-- ============================================================================
+-- 1 ligne par table d'agrégats, mise à jour à chaque reconstruction ou
+-- rafraîchissement incrémental (même transaction que les données)
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.rollup_freshness (
+    rollup_name STRING,
+    refreshed_at TIMESTAMP_NTZ,
+    refresh_mode STRING,        -- FULL / INCREMENTAL
+    days_refreshed NUMBER,
+    row_count NUMBER,
+    source_transactions NUMBER,
+    last_sale_date DATE
+)
+COMMENT = 'Date et portée du dernier rafraîchissement de chaque table d''agrégats';
+
+MERGE INTO ANALYTICS.rollup_freshness f
+USING (
+    SELECT
+        'SALES_DAILY_ROLLUP' AS rollup_name,
+        'FULL' AS refresh_mode,
+        COUNT(DISTINCT sale_date) AS days_refreshed,
+        COUNT(*) AS row_count,
+        SUM(transactions) AS source_transactions,
+        MAX(sale_date) AS last_sale_date
+    FROM ANALYTICS.sales_daily_rollup
+) s
+    ON f.rollup_name = s.rollup_name
+WHEN MATCHED THEN UPDATE SET
+    refreshed_at = CURRENT_TIMESTAMP(),
+    refresh_mode = s.refresh_mode,
+    days_refreshed = s.days_refreshed,
+    row_count = s.row_count,
+    source_transactions = s.source_transactions,
+    last_sale_date = s.last_sale_date
+WHEN NOT MATCHED THEN INSERT (rollup_name, refreshed_at, refresh_mode, days_refreshed, row_count, source_transactions, last_sale_date)
+VALUES (s.rollup_name, CURRENT_TIMESTAMP(), s.refresh_mode, s.days_refreshed, s.row_count, s.source_transactions, s.last_sale_date);
+
+-- ============================================================================
+-- VUE : daily_sales_summary (Résumé quotidien des ventes)
+-- ============================================================================
+-- Description : Agrégation quotidienne pour dashboards et reporting
+-- Granularité : 1 ligne = 1 jour × 1 région
+-- Usage : Dashboards BI, monitoring quotidien
+-- Lue dans le cube précalculé (et non plus dans sales_enriched)
+-- ============================================================================
+
+CREATE OR REPLACE VIEW ANALYTICS.daily_sales_summary AS
+SELECT
+    sale_date,
+    sale_region,
+
+    -- Métriques de vente
+    SUM(transactions) AS total_transactions,
+    SUM(revenue) AS total_revenue,
+    SUM(revenue) / NULLIF(SUM(transactions), 0) AS avg_transaction_value,
+
+    -- Métriques promotionnelles (promotions actives dans la région ce jour-là)
+    MAX(max_active_promotions) AS active_promotions,
+    SUM(CASE WHEN has_promotion = 1 THEN transactions ELSE 0 END) AS transactions_with_promo,
+    ROUND(SUM(CASE WHEN has_promotion = 1 THEN transactions ELSE 0 END) * 100.0 / NULLIF(SUM(transactions), 0), 2) AS promo_penetration_rate,
+
+    -- Métriques campagnes
+    MAX(max_active_campaigns) AS active_campaigns,
+    SUM(CASE WHEN has_campaign = 1 THEN transactions ELSE 0 END) AS transactions_with_campaign,
+
+    -- Métriques de discount
+    SUM(discount_rate_sum) / NULLIF(SUM(transactions), 0) AS avg_discount_rate,
+    SUM(discount_given) AS total_discount_given,
+
+    -- Breakdown par méthode de paiement
+    SUM(CASE WHEN payment_method = 'Credit Card' THEN transactions ELSE 0 END) AS cc_transactions,
+    SUM(CASE WHEN payment_method = 'Cash' THEN transactions ELSE 0 END) AS cash_transactions,
+    SUM(CASE WHEN payment_method = 'Bank Transfer' THEN transactions ELSE 0 END) AS transfer_transactions
+
+FROM ANALYTICS.sales_daily_rollup
+GROUP BY sale_date, sale_region
+;
+
+COMMENT ON VIEW ANALYTICS.daily_sales_summary IS
+'Résumé quotidien des ventes par région. Usage: Dashboards, monitoring quotidien, reporting opérationnel.';
+
+-- ============================================================================
+-- TESTS DE QUALITÉ SPÉCIFIQUES À LA TABLE sales_daily_rollup
+-- ============================================================================
+
+-- Test 1 : Les totaux du cube égalent ceux de sales_enriched
+SELECT
+    'Test 1: Totaux rollup = sales_enriched' AS test_name,
+    ABS(r.transactions - s.transactions) AS failed_records,
+    CASE
+        WHEN r.transactions = s.transactions AND ABS(r.revenue - s.revenue) < 0.01 THEN '✅ PASS'
+        ELSE '❌ FAIL - écart de ' || (s.transactions - r.transactions) || ' transactions / '
+             || ROUND(s.revenue - r.revenue, 2) || ' de CA'
+    END AS test_result
+FROM (SELECT COALESCE(SUM(transactions), 0) AS transactions, COALESCE(SUM(revenue), 0) AS revenue
+      FROM ANALYTICS.sales_daily_rollup) r
+CROSS JOIN (SELECT COUNT(*) AS transactions, COALESCE(SUM(sale_amount), 0) AS revenue
+            FROM ANALYTICS.sales_enriched WHERE sale_amount > 0) s;
+
+-- Test 2 : Unicité du grain
+SELECT
+    'Test 2: Unicité du grain du rollup' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' combinaisons en double'
+    END AS test_result
+FROM (
+    SELECT sale_date, sale_region, has_promotion, has_campaign, payment_method
+    FROM ANALYTICS.sales_daily_rollup
+    GROUP BY sale_date, sale_region, has_promotion, has_campaign, payment_method
+    HAVING COUNT(*) > 1
+);
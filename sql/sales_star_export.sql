@@ -0,0 +1,294 @@
+-- ============================================================================
+-- DATA PRODUCT ANALYTIQUE - PHASE 3
+-- ============================================================================
+-- FICHIER 4 : SALES_STAR_EXPORT (Export BI en schéma en étoile)
+-- Description : Table de faits des ventes, dimensions dédoublonnées à clés
+--               de substitution et instantanés agrégés (stock, avis), pour
+--               Tableau / PowerBI
+-- Usage : extraction Parquet partitionnée (pipeline/star_export.py) ;
+--         remplace les jointures de SILVER.sales_analysis_export
+--         (SQL analytique.sql, 2.5.1), qui multipliaient les lignes
+-- Prérequis : ETL SQL.sql, promo_campaign_calendar.sql
+-- ============================================================================
+-- RÈGLES
+--   - export_fact_sales : exactement 1 ligne par vente (transaction_type =
+--     'Sale') ; chaque dimension est jointe sur une clé unique, le volume
+--     croît linéairement avec le nombre de transactions
+--   - Promotion et campagne : celles retenues pour la région et le jour de
+--     la vente dans promo_campaign_calendar (même règle de résolution des
+--     chevauchements que sales_enriched)
+--   - Clé 0 : membre « Inconnu » de chaque dimension (aucune clé étrangère
+--     NULL dans la table de faits)
+--   - Stock et avis ne sont pas liés à une vente : instantanés agrégés par
+--     région × catégorie et par catégorie, à croiser dans l'outil BI
+--   - Interactions service client : aucun identifiant client dans
+--     SILVER.customer_service_interactions_clean, non exportées
+-- ============================================================================
+
+-- ============================================================================
+-- DIMENSION : export_dim_date
+-- ============================================================================
+-- 1 ligne = 1 jour portant au moins une vente ; date_key = AAAAMMJJ (0 : date inconnue)
+
+CREATE OR REPLACE TABLE ANALYTICS.export_dim_date
+COMMENT = 'Export BI : dimension date (clé AAAAMMJJ)'
+AS
+SELECT 0 AS date_key, NULL AS calendar_date, NULL AS calendar_year, NULL AS calendar_quarter,
+       NULL AS calendar_month, NULL AS day_of_week, NULL AS is_weekend
+UNION ALL
+SELECT
+    YEAR(transaction_date) * 10000 + MONTH(transaction_date) * 100 + DAY(transaction_date) AS date_key,
+    transaction_date AS calendar_date,
+    YEAR(transaction_date) AS calendar_year,
+    QUARTER(transaction_date) AS calendar_quarter,
+    MONTH(transaction_date) AS calendar_month,
+    DAYOFWEEK(transaction_date) AS day_of_week,
+    CASE WHEN DAYOFWEEK(transaction_date) IN (0, 6) THEN TRUE ELSE FALSE END AS is_weekend
+FROM (
+    SELECT DISTINCT transaction_date
+    FROM SILVER.financial_transactions_clean
+    WHERE transaction_type = 'Sale'
+      AND transaction_date IS NOT NULL
+) d;
+
+-- ============================================================================
+-- DIMENSION : export_dim_region
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.export_dim_region
+COMMENT = 'Export BI : dimension région'
+AS
+SELECT 0 AS region_key, 'Inconnu' AS region
+UNION ALL
+SELECT
+    ROW_NUMBER() OVER (ORDER BY region) AS region_key,
+    region
+FROM (
+    SELECT region FROM SILVER.financial_transactions_clean WHERE region IS NOT NULL
+    UNION
+    SELECT region FROM SILVER.inventory_clean WHERE region IS NOT NULL
+) r;
+
+-- ============================================================================
+-- DIMENSION : export_dim_customer
+-- ============================================================================
+-- 1 ligne = 1 customer_id (dernière occurrence conservée)
+
+CREATE OR REPLACE TABLE ANALYTICS.export_dim_customer
+COMMENT = 'Export BI : dimension client dédoublonnée'
+AS
+SELECT 0 AS customer_key, NULL AS customer_id, NULL AS age, 'Inconnu' AS gender,
+       NULL AS annual_income, 'Inconnu' AS marital_status, 'Inconnu' AS customer_region
+UNION ALL
+SELECT
+    ROW_NUMBER() OVER (ORDER BY customer_id) AS customer_key,
+    customer_id,
+    age,
+    gender,
+    annual_income,
+    marital_status,
+    region AS customer_region
+FROM SILVER.customer_demographics_clean
+WHERE customer_id IS NOT NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY date_of_birth DESC NULLS LAST, name) = 1;
+
+-- ============================================================================
+-- DIMENSION : export_dim_promotion
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.export_dim_promotion
+COMMENT = 'Export BI : dimension promotion dédoublonnée'
+AS
+SELECT 0 AS promotion_key, NULL AS promotion_id, 'Aucune' AS promotion_type,
+       NULL AS product_category, NULL AS discount_percentage, NULL AS start_date, NULL AS end_date
+UNION ALL
+SELECT
+    ROW_NUMBER() OVER (ORDER BY promotion_id) AS promotion_key,
+    promotion_id,
+    promotion_type,
+    product_category,
+    discount_percentage,
+    start_date,
+    end_date
+FROM SILVER.promotions_clean
+WHERE promotion_id IS NOT NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY promotion_id ORDER BY start_date DESC, end_date DESC) = 1;
+
+-- ============================================================================
+-- DIMENSION : export_dim_campaign
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.export_dim_campaign
+COMMENT = 'Export BI : dimension campagne marketing dédoublonnée'
+AS
+SELECT 0 AS campaign_key, NULL AS campaign_id, 'Aucune' AS campaign_name, NULL AS campaign_type,
+       NULL AS product_category, NULL AS target_audience, NULL AS budget
+UNION ALL
+SELECT
+    ROW_NUMBER() OVER (ORDER BY campaign_id) AS campaign_key,
+    campaign_id,
+    campaign_name,
+    campaign_type,
+    product_category,
+    target_audience,
+    budget
+FROM SILVER.marketing_campaigns_clean
+WHERE campaign_id IS NOT NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY campaign_id ORDER BY start_date DESC, budget DESC NULLS LAST) = 1;
+
+-- ============================================================================
+-- DIMENSION : export_dim_shipment
+-- ============================================================================
+-- 1 ligne = 1 commande (order_id) : expédition la plus récente
+
+CREATE OR REPLACE TABLE ANALYTICS.export_dim_shipment
+COMMENT = 'Export BI : dimension expédition (dernière expédition par commande)'
+AS
+SELECT 0 AS shipment_key, NULL AS order_id, 'Inconnu' AS shipping_method,
+       'Inconnu' AS delivery_status, NULL AS carrier
+UNION ALL
+SELECT
+    ROW_NUMBER() OVER (ORDER BY order_id) AS shipment_key,
+    order_id,
+    shipping_method,
+    delivery_status,
+    carrier
+FROM SILVER.logistics_and_shipping_clean
+WHERE order_id IS NOT NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY order_id ORDER BY ship_date DESC NULLS LAST, shipment_id) = 1;
+
+-- ============================================================================
+-- FAITS : export_fact_sales
+-- ============================================================================
+-- 1 ligne = 1 vente ; jointures d'égalité sur des clés uniques uniquement
+
+CREATE OR REPLACE TABLE ANALYTICS.export_fact_sales
+CLUSTER BY (date_key)
+COMMENT = 'Export BI : table de faits des ventes (1 ligne par vente)'
+AS
+SELECT
+    ft.transaction_id,
+    COALESCE(YEAR(ft.transaction_date) * 10000 + MONTH(ft.transaction_date) * 100 + DAY(ft.transaction_date), 0) AS date_key,
+    COALESCE(r.region_key, 0) AS region_key,
+    COALESCE(c.customer_key, 0) AS customer_key,
+    COALESCE(p.promotion_key, 0) AS promotion_key,
+    COALESCE(m.campaign_key, 0) AS campaign_key,
+    COALESCE(s.shipment_key, 0) AS shipment_key,
+    ft.amount,
+    ft.payment_method,
+    COALESCE(cal.active_promotion_count, 0) AS active_promotion_count,
+    COALESCE(cal.active_campaign_count, 0) AS active_campaign_count
+FROM SILVER.financial_transactions_clean ft
+LEFT JOIN ANALYTICS.export_dim_region r
+    ON ft.region = r.region
+    AND r.region_key > 0
+LEFT JOIN ANALYTICS.export_dim_customer c
+    ON TRY_TO_NUMBER(ft.entity) = c.customer_id
+LEFT JOIN ANALYTICS.export_dim_shipment s
+    ON TRY_TO_NUMBER(ft.entity) = s.order_id
+LEFT JOIN ANALYTICS.promo_campaign_calendar cal
+    ON ft.region = cal.region
+    AND ft.transaction_date = cal.calendar_date
+LEFT JOIN ANALYTICS.export_dim_promotion p
+    ON cal.promotion_id = p.promotion_id
+LEFT JOIN ANALYTICS.export_dim_campaign m
+    ON cal.campaign_id = m.campaign_id
+WHERE ft.transaction_type = 'Sale';
+
+-- ============================================================================
+-- INSTANTANÉ : export_inventory_snapshot (stock par région × catégorie)
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.export_inventory_snapshot
+COMMENT = 'Export BI : instantané du stock agrégé par région et catégorie'
+AS
+SELECT
+    CURRENT_DATE() AS snapshot_date,
+    COALESCE(r.region_key, 0) AS region_key,
+    i.product_category,
+    COUNT(*) AS product_count,
+    SUM(i.current_stock) AS total_current_stock,
+    SUM(i.reorder_point) AS total_reorder_point,
+    SUM(CASE WHEN i.current_stock <= i.reorder_point THEN 1 ELSE 0 END) AS products_below_reorder,
+    AVG(i.lead_time) AS avg_lead_time,
+    MAX(i.last_restock_date) AS last_restock_date
+FROM SILVER.inventory_clean i
+LEFT JOIN ANALYTICS.export_dim_region r
+    ON i.region = r.region
+    AND r.region_key > 0
+GROUP BY COALESCE(r.region_key, 0), i.product_category;
+
+-- ============================================================================
+-- INSTANTANÉ : export_review_snapshot (avis par catégorie)
+-- ============================================================================
+
+CREATE OR REPLACE TABLE ANALYTICS.export_review_snapshot
+COMMENT = 'Export BI : instantané des avis produits agrégés par catégorie'
+AS
+SELECT
+    CURRENT_DATE() AS snapshot_date,
+    product_category,
+    COUNT(*) AS review_count,
+    AVG(rating) AS avg_rating,
+    SUM(CASE WHEN sentiment = 'Positive' THEN 1 ELSE 0 END) AS positive_reviews,
+    SUM(CASE WHEN sentiment = 'Neutral' THEN 1 ELSE 0 END) AS neutral_reviews,
+    SUM(CASE WHEN sentiment = 'Negative' THEN 1 ELSE 0 END) AS negative_reviews
+FROM SILVER.product_reviews_clean
+GROUP BY product_category;
+
+-- ============================================================================
+-- TESTS DE QUALITÉ
+-- ============================================================================
+
+-- Test 1 : aucune démultiplication des ventes
+SELECT
+    'Test: 1 ligne de faits par vente' AS test_name,
+    ABS(f.fact_rows - s.sale_rows) AS failed_records,
+    CASE
+        WHEN f.fact_rows = s.sale_rows THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || f.fact_rows || ' lignes de faits pour ' || s.sale_rows || ' ventes'
+    END AS test_result
+FROM (SELECT COUNT(*) AS fact_rows FROM ANALYTICS.export_fact_sales) f
+CROSS JOIN (
+    SELECT COUNT(*) AS sale_rows
+    FROM SILVER.financial_transactions_clean
+    WHERE transaction_type = 'Sale'
+) s;
+
+-- Test 2 : clés naturelles uniques dans les dimensions
+SELECT
+    'Test: Unicité des clés de dimensions' AS test_name,
+    SUM(duplicates) AS failed_records,
+    CASE
+        WHEN SUM(duplicates) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || SUM(duplicates) || ' doublons de clé naturelle'
+    END AS test_result
+FROM (
+    SELECT COUNT(customer_id) - COUNT(DISTINCT customer_id) AS duplicates FROM ANALYTICS.export_dim_customer
+    UNION ALL SELECT COUNT(promotion_id) - COUNT(DISTINCT promotion_id) FROM ANALYTICS.export_dim_promotion
+    UNION ALL SELECT COUNT(campaign_id) - COUNT(DISTINCT campaign_id) FROM ANALYTICS.export_dim_campaign
+    UNION ALL SELECT COUNT(order_id) - COUNT(DISTINCT order_id) FROM ANALYTICS.export_dim_shipment
+    UNION ALL SELECT COUNT(*) - COUNT(DISTINCT region) FROM ANALYTICS.export_dim_region
+) d;
+
+-- Test 3 : intégrité référentielle des faits
+SELECT
+    'Test: Clés étrangères des faits' AS test_name,
+    COUNT(*) AS failed_records,
+    CASE
+        WHEN COUNT(*) = 0 THEN '✅ PASS'
+        ELSE '❌ FAIL - ' || COUNT(*) || ' ventes avec une clé de dimension inconnue'
+    END AS test_result
+FROM ANALYTICS.export_fact_sales f
+LEFT JOIN ANALYTICS.export_dim_date d ON f.date_key = d.date_key
+LEFT JOIN ANALYTICS.export_dim_region r ON f.region_key = r.region_key
+LEFT JOIN ANALYTICS.export_dim_customer c ON f.customer_key = c.customer_key
+LEFT JOIN ANALYTICS.export_dim_promotion p ON f.promotion_key = p.promotion_key
+LEFT JOIN ANALYTICS.export_dim_campaign m ON f.campaign_key = m.campaign_key
+LEFT JOIN ANALYTICS.export_dim_shipment s ON f.shipment_key = s.shipment_key
+WHERE d.date_key IS NULL
+   OR r.region_key IS NULL
+   OR c.customer_key IS NULL
+   OR p.promotion_key IS NULL
+   OR m.campaign_key IS NULL
+   OR s.shipment_key IS NULL;
@@ -9,12 +9,16 @@
 -- ============================================================================
 
 -- ============================================================================
--- TABLE : sales_enriched
+-- VUE : sales_enriched_source (logique d'enrichissement)
 -- ============================================================================
-CREATE OR REPLACE TABLE ANALYTICS.sales_enriched 
-CLUSTER BY (sale_date, sale_region)
-COMMENT = 'Table centrale des ventes enrichies avec promotions et campagnes marketing actives'
-AS
+-- Partagée par la reconstruction complète ci-dessous et par le rafraîchissement
+-- incrémental (sales_enriched_incremental.sql), qui la filtre sur les seules
+-- transactions à recalculer.
+-- Promotion et campagne actives lues dans ANALYTICS.promo_campaign_calendar
+-- (promo_campaign_calendar.sql) par jointure d'égalité sur (région, date) ;
+-- les chevauchements y sont résolus de façon déterministe : 1 ligne par vente.
+-- ============================================================================
+CREATE OR REPLACE VIEW ANALYTICS.sales_enriched_source AS
 SELECT
     -- ========================================================================
     -- IDENTIFIANTS ET DIMENSIONS TRANSACTION
@@ -39,36 +43,38 @@ SELECT
     -- ========================================================================
     -- DIMENSIONS PROMOTIONNELLES (jointure temporelle)
     -- ========================================================================
-    p.promotion_id                    AS promotion_id,
-    p.product_category                AS promo_product_category,
-    p.promotion_type,
-    p.discount_percentage,
-    p.start_date                      AS promo_start_date,
-    p.end_date                        AS promo_end_date,
+    c.promotion_id                    AS promotion_id,
+    c.promo_product_category,
+    c.promotion_type,
+    c.discount_percentage,
+    c.promo_start_date,
+    c.promo_end_date,
+    COALESCE(c.active_promotion_count, 0) AS active_promotion_count,
     
     -- Indicateurs binaires pour ML
     CASE 
-        WHEN p.promotion_id IS NOT NULL THEN 1 
+        WHEN c.promotion_id IS NOT NULL THEN 1 
         ELSE 0 
     END                               AS has_promotion,
     
-    COALESCE(p.discount_percentage, 0) AS discount_rate,
+    COALESCE(c.discount_percentage, 0) AS discount_rate,
     
     -- ========================================================================
     -- DIMENSIONS MARKETING (jointure temporelle et géographique)
     -- ========================================================================
-    m.campaign_id,
-    m.campaign_name,
-    m.campaign_type,
-    m.product_category                AS campaign_product_category,
-    m.target_audience                 AS campaign_target,
-    m.budget                          AS campaign_budget,
-    m.reach                           AS campaign_reach,
-    m.conversion_rate                 AS campaign_conversion_rate,
+    c.campaign_id,
+    c.campaign_name,
+    c.campaign_type,
+    c.campaign_product_category,
+    c.campaign_target,
+    c.campaign_budget,
+    c.campaign_reach,
+    c.campaign_conversion_rate,
+    COALESCE(c.active_campaign_count, 0) AS active_campaign_count,
     
     -- Indicateurs binaires pour ML
     CASE 
-        WHEN m.campaign_id IS NOT NULL THEN 1 
+        WHEN c.campaign_id IS NOT NULL THEN 1 
         ELSE 0 
     END                               AS has_campaign,
     
@@ -76,12 +82,12 @@ SELECT
     -- MÉTRIQUES CALCULÉES & BUSINESS LOGIC
     -- ========================================================================
     -- Montant net après application des promotions
-    ft.amount * (1 - COALESCE(p.discount_percentage, 0) / 100.0) AS net_amount,
+    ft.amount * (1 - COALESCE(c.discount_percentage, 0) / 100.0) AS net_amount,
     
     -- Impact estimé de la campagne sur cette transaction
     CASE 
-        WHEN m.campaign_id IS NOT NULL AND m.conversion_rate > 0
-        THEN ft.amount * m.conversion_rate 
+        WHEN c.campaign_id IS NOT NULL AND c.campaign_conversion_rate > 0
+        THEN ft.amount * c.campaign_conversion_rate 
         ELSE 0 
     END                               AS estimated_campaign_impact,
     
@@ -110,20 +116,29 @@ SELECT
 
 FROM SILVER.financial_transactions_clean ft
 
--- Jointure avec les promotions actives au moment de la transaction
-LEFT JOIN SILVER.promotions_clean p
-    ON ft.region = p.region
-    AND ft.transaction_date BETWEEN p.start_date AND p.end_date
-
--- Jointure avec les campagnes marketing actives au moment de la transaction
-LEFT JOIN SILVER.marketing_campaigns_clean m
-    ON ft.region = m.region
-    AND ft.transaction_date BETWEEN m.start_date AND m.end_date
+-- Promotion et campagne actives dans la région le jour de la transaction
+-- (jointure d'égalité sur le calendrier précalculé)
+LEFT JOIN ANALYTICS.promo_campaign_calendar c
+    ON ft.region = c.region
+    AND ft.transaction_date = c.calendar_date
 
 -- Filtrage : ne conserver que les transactions de type "vente"
 WHERE ft.transaction_type = 'Sale'
 ;
 
+-- ============================================================================
+-- TABLE : sales_enriched (reconstruction complète)
+-- ============================================================================
+-- Pour un rafraîchissement quotidien, préférer le mode incrémental :
+--   python -m pipeline.sales_enriched
+-- ============================================================================
+CREATE OR REPLACE TABLE ANALYTICS.sales_enriched 
+CLUSTER BY (sale_date, sale_region)
+COMMENT = 'Table centrale des ventes enrichies avec promotions et campagnes marketing actives'
+AS
+SELECT * FROM ANALYTICS.sales_enriched_source
+;
+
 -- ============================================================================
 -- DOCUMENTATION DE LA TABLE
 -- ============================================================================
@@ -133,48 +148,12 @@ COMMENT ON TABLE ANALYTICS.sales_enriched IS
 Sert de source unique pour analyses commerciales et modèles prédictifs.';
 
 -- ============================================================================
--- VUE : daily_sales_summary (Résumé quotidien des ventes)
+-- VUE : daily_sales_summary
 -- ============================================================================
--- Description : Agrégation quotidienne pour dashboards et reporting
--- Granularité : 1 ligne = 1 jour × 1 région
--- Usage : Dashboards BI, monitoring quotidien
+-- Définie dans sales_rollups.sql, à partir du cube précalculé
+-- ANALYTICS.sales_daily_rollup (à exécuter après ce script)
 -- ============================================================================
 
-CREATE OR REPLACE VIEW ANALYTICS.daily_sales_summary AS
-SELECT
-    sale_date,
-    sale_region,
-    
-    -- Métriques de vente
-    COUNT(*) AS total_transactions,
-    SUM(sale_amount) AS total_revenue,
-    AVG(sale_amount) AS avg_transaction_value,
-    
-    -- Métriques promotionnelles
-    COUNT(DISTINCT promotion_id) AS active_promotions,
-    SUM(has_promotion) AS transactions_with_promo,
-    ROUND(SUM(has_promotion) * 100.0 / NULLIF(COUNT(*), 0), 2) AS promo_penetration_rate,
-    
-    -- Métriques campagnes
-    COUNT(DISTINCT campaign_id) AS active_campaigns,
-    SUM(has_campaign) AS transactions_with_campaign,
-    
-    -- Métriques de discount
-    AVG(discount_rate) AS avg_discount_rate,
-    SUM(sale_amount - net_amount) AS total_discount_given,
-    
-    -- Breakdown par méthode de paiement
-    SUM(CASE WHEN payment_method = 'Credit Card' THEN 1 ELSE 0 END) AS cc_transactions,
-    SUM(CASE WHEN payment_method = 'Cash' THEN 1 ELSE 0 END) AS cash_transactions,
-    SUM(CASE WHEN payment_method = 'Bank Transfer' THEN 1 ELSE 0 END) AS transfer_transactions
-    
-FROM ANALYTICS.sales_enriched
-GROUP BY sale_date, sale_region
-;
-
-COMMENT ON VIEW ANALYTICS.daily_sales_summary IS 
-'Résumé quotidien des ventes par région. Usage: Dashboards, monitoring quotidien, reporting opérationnel.';
-
 -- ============================================================================
 -- TESTS DE QUALITÉ SPÉCIFIQUES À LA TABLE sales_enriched
 -- ============================================================================
@@ -0,0 +1,25 @@
+-- ============================================================================
+-- ANYCOMPANY DATA PIPELINE - VERSIONS PUBLIÉES (BLUE/GREEN)
+-- ============================================================================
+-- Description : Objet de contrôle de la publication blue/green
+--               (pipeline/blue_green.py)
+-- Prérequis : schéma ANALYTICS
+--
+-- Principe :
+--   1. Deux tables versionnées par table publiée (<table>__blue / __green)
+--   2. La table publiée est une vue sur la version active
+--   3. Rafraîchissement : reconstruction de la version inactive, tests de
+--      qualité, puis CREATE OR REPLACE VIEW (bascule atomique)
+--   4. La version précédente est conservée pour le retour arrière
+-- ============================================================================
+
+-- 1 ligne = 1 table publiée en blue/green
+
+CREATE TABLE IF NOT EXISTS ANALYTICS.table_versions (
+    table_name STRING,          -- vue publiée (SCHEMA.TABLE, en majuscules)
+    active_table STRING,        -- version lue par la vue
+    previous_table STRING,      -- version précédente (retour arrière)
+    build_s FLOAT,
+    switched_at TIMESTAMP_NTZ
+)
+COMMENT = 'Version active et précédente des tables publiées en blue/green';
@@ -0,0 +1,29 @@
+# app.py
+"""
+Application AnyCompany : point d'entrée unique des trois dashboards.
+
+    streamlit run streamlit/app.py
+    ANYCOMPANY_BACKEND=local ANYCOMPANY_DUCKDB=local/anycompany.duckdb streamlit run streamlit/app.py
+
+Un seul processus et une seule configuration de page ; st.navigation
+n'exécute que la page affichée, dont les modules (kpi_bundle,
+report_export...) ne sont importés qu'à la première visite. Les pages
+partagent le pool de sessions (session_pool), le cache de requêtes
+(query_cache), les instantanés (snapshot_store) et les mesures
+(query_metrics) : changer de page réutilise connexions et résultats.
+"""
+import streamlit as st
+
+st.set_page_config(
+    page_title="AnyCompany",
+    page_icon="📊",
+    layout="wide"
+)
+
+PAGES = [
+    st.Page("sales_dashboard.py", title="Ventes", icon="📊", default=True),
+    st.Page("promotion_analysis.py", title="Promotions", icon="🎯"),
+    st.Page("marketing_roi.py", title="Performance Marketing", icon="💰"),
+]
+
+st.navigation(PAGES).run()
@@ -0,0 +1,270 @@
+# audience_bitmaps.py
+"""
+Audiences exactes des campagnes et promotions en bitmaps compressés.
+
+ANALYTICS.customer_audiences (sql/customer_audiences.sql) liste les clients
+(identifiants entiers de customer_ids) de chaque campagne et promotion. La
+table est lue une fois par processus (cache partagé) et chaque audience est
+compressée à la manière de Roaring :
+
+- identifiants découpés en blocs de 65 536 (16 bits de poids fort) ;
+- bloc peu rempli (≤ 4 096 clients) : tableau trié d'entiers 16 bits ;
+- bloc dense : 1 024 mots de 64 bits (8 Ko), popcount pour compter.
+
+Union, intersection et matrice de recouvrement d'une sélection se calculent
+ensuite en mémoire, exactement, sans relire sales_enriched. La matrice
+compte les paires d'audiences de chaque client de la sélection : son coût
+suit les recouvrements réels, pas le nombre de paires d'audiences.
+
+Les estimations approchées par jour restent dans reach_sketches.py.
+"""
+import numpy as np
+import pandas as pd
+
+from query_cache import estimate_size, get_query_cache, make_cache_key
+from query_metrics import execute_query, get_query_metrics
+
+CAMPAIGN = "CAMPAIGN"
+PROMOTION = "PROMOTION"
+
+ARRAY_MAX = 4096        # au-delà, un bloc est stocké en mots de 64 bits
+WORDS = 1024            # 65 536 bits par bloc
+PAIR_BATCH = 1 << 24    # paires cumulées avant comptage (matrice de recouvrement)
+
+# Bits à 1 de chaque octet (np.bitwise_count n'existe qu'à partir de numpy 2.0)
+BYTE_BITS = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+AUDIENCES_QUERY = """
+SELECT
+    audience_type,
+    audience_key,
+    customer_id
+FROM ANALYTICS.CUSTOMER_AUDIENCES
+"""
+
+
+# ============================================================================
+# BITMAP COMPRESSÉ
+# ============================================================================
+
+def _to_words(lows):
+    words = np.zeros(WORDS, dtype=np.uint64)
+    lows = lows.astype(np.uint64)
+    np.bitwise_or.at(words, (lows >> np.uint64(6)).astype(np.int64), np.uint64(1) << (lows & np.uint64(63)))
+    return words
+
+
+def _to_lows(words):
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _popcount(words):
+    """Nombre de bits à 1 d'un tableau de mots de 64 bits"""
+    return int(BYTE_BITS[np.ascontiguousarray(words).view(np.uint8)].sum(dtype=np.int64))
+
+
+def _container(words):
+    """Forme compacte d'un bloc (None s'il est vide)"""
+    count = _popcount(words)
+    if count == 0:
+        return None
+    return _to_lows(words) if count <= ARRAY_MAX else words
+
+
+def _is_words(container):
+    return container.dtype == np.uint64
+
+
+def _count(container):
+    return _popcount(container) if _is_words(container) else len(container)
+
+
+class CustomerBitmap:
+    """Ensemble d'identifiants clients (entiers 32 bits) compressé par blocs"""
+
+    __slots__ = ("blocks",)
+
+    def __init__(self, blocks=None):
+        self.blocks = blocks or {}
+
+    @classmethod
+    def from_ids(cls, ids):
+        ids = np.unique(np.asarray(ids, dtype=np.uint32))
+        highs = ids >> 16
+        blocks = {}
+        for high, start, stop in _runs(highs):
+            lows = (ids[start:stop] & 0xFFFF).astype(np.uint16)
+            blocks[high] = lows if len(lows) <= ARRAY_MAX else _to_words(lows)
+        return cls(blocks)
+
+    def __len__(self):
+        return sum(_count(container) for container in self.blocks.values())
+
+    def to_ids(self):
+        parts = [
+            (np.uint32(high) << 16) | (_to_lows(c) if _is_words(c) else c).astype(np.uint32)
+            for high, c in sorted(self.blocks.items())
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+    def __or__(self, other):
+        return union([self, other])
+
+    def __and__(self, other):
+        return intersection([self, other])
+
+    def intersection_count(self, other):
+        """|self ∩ other| sans construire l'intersection"""
+        total = 0
+        for high in self.blocks.keys() & other.blocks.keys():
+            a, b = self.blocks[high], other.blocks[high]
+            if _is_words(a) and _is_words(b):
+                total += _popcount(a & b)
+            elif _is_words(a) or _is_words(b):
+                words, lows = (a, b) if _is_words(a) else (b, a)
+                lows = lows.astype(np.int64)
+                total += int(((words[lows >> 6] >> (lows & 63).astype(np.uint64)) & np.uint64(1)).sum())
+            else:
+                total += len(np.intersect1d(a, b, assume_unique=True))
+        return total
+
+    def nbytes(self):
+        return sum(container.nbytes for container in self.blocks.values())
+
+
+def _runs(sorted_values):
+    """(valeur, début, fin) de chaque suite de valeurs égales d'un tableau trié"""
+    if len(sorted_values) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    stops = np.r_[starts[1:], len(sorted_values)]
+    return [(int(sorted_values[start]), int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+def union(bitmaps):
+    """Union d'un nombre quelconque de bitmaps (OU des blocs communs)"""
+    blocks = {}
+    for bitmap in bitmaps:
+        for high, container in bitmap.blocks.items():
+            words = container if _is_words(container) else _to_words(container)
+            blocks[high] = words.copy() if high not in blocks else blocks[high] | words
+    return CustomerBitmap({high: _container(words) for high, words in blocks.items()})
+
+
+def intersection(bitmaps):
+    """Intersection d'un nombre quelconque de bitmaps (blocs présents partout)"""
+    bitmaps = list(bitmaps)
+    if not bitmaps:
+        return CustomerBitmap()
+    highs = set.intersection(*(set(bitmap.blocks) for bitmap in bitmaps))
+    blocks = {}
+    for high in highs:
+        words = None
+        for bitmap in bitmaps:
+            container = bitmap.blocks[high]
+            container = container if _is_words(container) else _to_words(container)
+            words = container if words is None else words & container
+        container = _container(words)
+        if container is not None:
+            blocks[high] = container
+    return CustomerBitmap(blocks)
+
+
+# ============================================================================
+# INDEX DES AUDIENCES
+# ============================================================================
+
+class AudienceIndex:
+    """Bitmap des clients de chaque (type, clé) : campagnes et promotions"""
+
+    def __init__(self, bitmaps):
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Résultat de AUDIENCES_QUERY -> un bitmap par audience"""
+        codes, labels = pd.MultiIndex.from_arrays([
+            frame["AUDIENCE_TYPE"].astype(str), frame["AUDIENCE_KEY"].astype(str)
+        ]).factorize()
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        ids = frame["CUSTOMER_ID"].to_numpy(dtype=np.uint32)[order]
+        bitmaps = {}
+        for code, start, stop in _runs(codes):
+            bitmaps[tuple(labels[code])] = CustomerBitmap.from_ids(ids[start:stop])
+        return cls(bitmaps)
+
+    def keys(self, audience_type=None):
+        return sorted(key for key in self.bitmaps if audience_type is None or key[0] == audience_type)
+
+    def _selected(self, keys):
+        return [self.bitmaps[key] for key in keys if key in self.bitmaps]
+
+    def union_size(self, keys):
+        """Clients distincts touchés par au moins une audience"""
+        return len(union(self._selected(keys)))
+
+    def intersection_size(self, keys):
+        """Clients touchés par toutes les audiences"""
+        selected = self._selected(keys)
+        if len(selected) < len(list(keys)):
+            return 0
+        return len(intersection(selected))
+
+    def overlap_matrix(self, keys):
+        """Matrice |A ∩ B| (diagonale = taille de l'audience), index et colonnes = clés"""
+        keys = list(dict.fromkeys(key for key in keys if key in self.bitmaps))
+        size = len(keys)
+        members = [self.bitmaps[key].to_ids() for key in keys]
+        ids = np.concatenate(members) if members else np.empty(0, dtype=np.uint32)
+        audiences = np.repeat(np.arange(size, dtype=np.uint64), [len(m) for m in members])
+
+        # Tri par (client, audience) : les audiences d'un même client sont
+        # contiguës et croissantes ; chaque décalage d ajoute les paires
+        # (p, p + d) encore dans le même client (coût = somme des carrés du
+        # nombre d'audiences sélectionnées par client)
+        pairs_key = np.sort((ids.astype(np.uint64) << np.uint64(32)) | audiences)
+        ids = pairs_key >> np.uint64(32)
+        audiences = (pairs_key & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        counts = np.zeros(size * size, dtype=np.int64)
+        batch, batched = [], 0
+        active = np.arange(len(ids) - 1)
+        offset = 1
+        while len(active):
+            active = active[ids[active] == ids[active + offset]]
+            batch.append(audiences[active] * size + audiences[active + offset])
+            batched += len(active)
+            active = active[active + offset + 1 < len(ids)]
+            offset += 1
+            if batched >= PAIR_BATCH or not len(active):
+                counts += np.bincount(np.concatenate(batch), minlength=size * size)
+                batch, batched = [], 0
+
+        counts = counts.reshape(size, size)
+        counts = counts + counts.T
+        counts[np.diag_indices(size)] = [len(m) for m in members]
+        labels = [key for _, key in keys]
+        return pd.DataFrame(counts, index=labels, columns=labels)
+
+    def nbytes(self):
+        return sum(bitmap.nbytes() for bitmap in self.bitmaps.values())
+
+
+def load_audience_index(session, ttl=None):
+    """Index des audiences du processus (lu une fois, partagé par les sessions)"""
+    key = make_cache_key(AUDIENCES_QUERY, ("audience_index",))
+    fetched = {}
+
+    def loader():
+        frame = execute_query(session, AUDIENCES_QUERY, info=fetched)
+        fetched["bytes"] = estimate_size(frame)
+        return AudienceIndex.from_frame(frame)
+
+    with get_query_metrics().track(AUDIENCES_QUERY, fingerprint=key, name="audience_index") as record:
+        try:
+            index, record.cache = get_query_cache().lookup(key, loader, ttl=ttl)
+        finally:
+            record.query_id = fetched.get("query_id")
+            record.bytes = fetched.get("bytes", 0)
+        record.rows = len(index.bitmaps)
+        return index
@@ -0,0 +1,113 @@
+# debug_panel.py
+"""
+Panneau de diagnostic des requêtes (sidebar), commun aux trois dashboards.
+
+Masqué par défaut ; activé par la case « 🐞 Diagnostic des requêtes », par
+?debug=1 dans l'URL ou par ANYCOMPANY_DEBUG=1. Il affiche, à partir de
+query_metrics :
+- les requêtes de l'exécution courante de la page (loader, cache, durée,
+  lignes, octets, query id, erreur) ;
+- les requêtes lentes récentes de la page, toutes sessions confondues ;
+- les p50 / p95 par loader, toutes sessions confondues.
+
+Appeler render_debug_panel(run_id) en fin de script, une fois les loaders
+terminés (run_id renvoyé par query_metrics.start_run()).
+"""
+import os
+
+import pandas as pd
+import streamlit as st
+
+from query_cache import format_cache_stats
+from query_metrics import SLOW_QUERY_SECONDS, current_page, get_query_metrics
+
+RECORD_COLUMNS = ["Loader", "Cache", "Durée (s)", "Lignes", "Ko", "Query ID", "Erreur"]
+SUMMARY_COLUMNS = ["Loader", "Appels", "Hits", "Erreurs", "Exécutions", "p50 (s)", "p95 (s)", "Max (s)"]
+
+
+def debug_enabled():
+    """Activation par défaut : ?debug=1 ou ANYCOMPANY_DEBUG=1"""
+    if os.environ.get("ANYCOMPANY_DEBUG", "").strip() in ("1", "true", "yes"):
+        return True
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+
+def _round(value, digits=3):
+    return round(value, digits) if value is not None else None
+
+
+def records_frame(records):
+    """Tableau des appels de requêtes, du plus lent au plus rapide"""
+    rows = [{
+        "Loader": r.loader,
+        "Cache": r.cache or "—",
+        "Durée (s)": _round(r.elapsed),
+        "Lignes": r.rows,
+        "Ko": round(r.bytes / 1024, 1) if r.bytes else 0,
+        "Query ID": r.query_id,
+        "Erreur": r.error,
+    } for r in records]
+    frame = pd.DataFrame(rows, columns=RECORD_COLUMNS)
+    return frame.sort_values("Durée (s)", ascending=False).reset_index(drop=True)
+
+
+def summary_frame(summary):
+    """Agrégats par loader (QueryMetrics.summary)"""
+    rows = [{
+        "Loader": row["loader"],
+        "Appels": row["calls"],
+        "Hits": f"{row['hit_rate']:.0%}",
+        "Erreurs": row["errors"],
+        "Exécutions": row["executions"],
+        "p50 (s)": _round(row["p50_s"]),
+        "p95 (s)": _round(row["p95_s"]),
+        "Max (s)": _round(row["max_s"]),
+    } for row in summary]
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def describe_failure(run_id):
+    """« loader (query id ...) » de la dernière requête en échec, ou None"""
+    record = get_query_metrics().last_error(run_id)
+    if record is None:
+        return None
+    if record.query_id:
+        return f"{record.loader} (query id {record.query_id})"
+    return record.loader
+
+
+def render_debug_panel(run_id):
+    """Panneau de diagnostic dans la sidebar"""
+    metrics = get_query_metrics()
+    records = metrics.records(run_id)
+    page = current_page()
+
+    with st.sidebar:
+        st.markdown("---")
+        if not st.checkbox("🐞 Diagnostic des requêtes", value=debug_enabled(), key="query_debug_panel"):
+            return
+
+        executed = [r for r in records if r.executed]
+        st.caption(
+            f"{len(records)} appel(s), {len(executed)} exécuté(s) sur le warehouse, "
+            f"{sum(r.elapsed for r in executed):.2f}s cumulées"
+        )
+        st.dataframe(records_frame(records), hide_index=True)
+        st.caption(format_cache_stats())
+
+        slow = metrics.slow_queries(page=page)
+        with st.expander(f"🐢 Requêtes lentes (> {SLOW_QUERY_SECONDS:g}s) : {len(slow)}"):
+            if slow:
+                st.dataframe(records_frame(slow), hide_index=True)
+                for record in slow[:3]:
+                    st.code(record.sql, language="sql")
+            else:
+                st.caption("Aucune requête lente récente")
+
+        with st.expander("📈 p50 / p95 par loader (toutes sessions)"):
+            st.dataframe(summary_frame(metrics.summary(page)), hide_index=True)
+            if metrics.log_path:
+                st.caption(f"Journal : {metrics.log_path}")
@@ -0,0 +1,91 @@
+# frame_dtypes.py
+"""
+Types compacts pour les DataFrames de résultats des dashboards.
+
+Avec les types par défaut de to_pandas(), les dimensions texte (région, type,
+catégorie, statut, rating...) sont des colonnes object (un objet Python par
+cellule) et les NUMBER arrivent en int64 / float64, voire en Decimal.
+compact_frame() convertit chaque résultat une seule fois, à sa réception,
+sans perte :
+- textes répétitifs (distincts <= 50 % des lignes) -> category ;
+- autres textes -> chaînes Arrow (string[pyarrow]) si pyarrow est installé ;
+- Decimal -> int64 (entiers sans NULL), ou float64 si chaque valeur en
+  revient à l'identique (repr du float = valeur décimale) ; sinon la colonne
+  reste en Decimal (au-delà de 2^53 ou de 15 à 17 chiffres significatifs) ;
+- int64 -> int32 quand toutes les valeurs y tiennent.
+
+Le DataFrame compacté est celui conservé par le cache partagé et passé tel
+quel aux tableaux et graphiques (st.dataframe le sérialise en Arrow, les
+category sous forme de dictionnaires) : aucune copie par utilisateur.
+
+Dans le code des pages :
+- groupby sur une colonne category : passer observed=True ;
+- pas de comparaison d'ordre (<, >=) sur une category non ordonnée.
+"""
+import decimal
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_STRING = "string[pyarrow]"
+except ImportError:  # dépendance optionnelle : les textes restent en object
+    ARROW_STRING = None
+
+CATEGORY_MAX_RATIO = 0.5
+_INT32_MIN, _INT32_MAX = -2 ** 31, 2 ** 31 - 1
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _compact_text(series, values):
+    if values.nunique() <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype("category")
+    if ARROW_STRING is not None and series.dtype == object:
+        return series.astype(ARROW_STRING)
+    return series
+
+
+def _compact_decimal(series, values):
+    integral = all(v == v.to_integral_value() for v in values)
+    if integral and len(values) == len(series) and _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+        return _compact_integer(series.astype("int64"))
+    if all(decimal.Decimal(repr(float(v))) == v for v in values):
+        return series.astype("float64")
+    return series
+
+
+def _compact_integer(series):
+    if len(series) and _INT32_MIN <= series.min() and series.max() <= _INT32_MAX:
+        return series.astype("int32")
+    return series
+
+
+def compact_column(series):
+    """Version compacte d'une colonne (la colonne elle-même si rien à gagner)"""
+    dtype = series.dtype
+    if dtype == "int64":
+        return _compact_integer(series)
+    if dtype == object:
+        values = series.dropna()
+        if values.empty:
+            return series
+        kinds = {type(v) for v in values}
+        if kinds <= {str}:
+            return _compact_text(series, values)
+        if kinds <= {decimal.Decimal}:
+            return _compact_decimal(series, values)
+        return series
+    if isinstance(dtype, pd.StringDtype):
+        values = series.dropna()
+        return _compact_text(series, values) if not values.empty else series
+    return series
+
+
+def compact_frame(frame):
+    """Compacter les colonnes d'un résultat fraîchement lu (modifié en place et renvoyé)"""
+    for column in frame.columns:
+        series = frame[column]
+        compacted = compact_column(series)
+        if compacted is not series:
+            frame[column] = compacted
+    return frame
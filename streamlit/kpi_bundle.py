@@ -0,0 +1,406 @@
+# kpi_bundle.py
+"""
+Mode "scan unique" des dashboards promotions et marketing.
+
+Au lieu de six ou sept requêtes sur la même petite table de faits, on récupère
+le détail une seule fois puis on recalcule localement (groupby pandas
+vectorisés) les agrégats produits jusqu'ici par les loaders SQL :
+KPI globaux, par type, par région, par catégorie et analyse temporelle.
+
+Les résultats reproduisent la sémantique SQL de Snowflake :
+- SUM d'un ensemble vide ou tout NULL = NULL, AVG ignore les NULL
+- WHERE col IS NOT NULL avant GROUP BY
+- ORDER BY avec NULL considéré comme la plus grande valeur
+  (NULLS LAST en ASC, NULLS FIRST en DESC)
+- LIMIT
+
+Les clients distincts d'un groupe (TOTAL_CUSTOMERS...) ne sont pas la somme
+des unique_customers_* des lignes : les esquisses HyperLogLog des promotions
+ou campagnes du groupe sont fusionnées (reach_sketches.py), chargées avec le
+détail et conservées dans le bundle (clé "sketches").
+"""
+import pandas as pd
+
+from query_cache import estimate_size, get_query_cache, make_cache_key
+from query_metrics import execute_query, get_query_metrics
+from reach_sketches import CAMPAIGN, PROMOTION, load_reach_sketches
+
+
+# ============================================================================
+# REQUÊTES DE BASE (un seul aller-retour par page)
+# ============================================================================
+
+PROMOTION_BASE_QUERY = """
+SELECT
+    promotion_id,
+    product_category,
+    promotion_type,
+    discount_percentage,
+    start_date,
+    end_date,
+    region,
+    duration_days,
+    promotion_status,
+    total_sales,
+    total_gross_revenue,
+    total_discount_cost,
+    total_net_revenue,
+    roi_percentage,
+    revenue_per_discount_euro,
+    unique_customers_reached,
+    market_share_pct,
+    avg_transaction_amount,
+    start_year,
+    start_quarter,
+    start_month
+FROM ANALYTICS.PROMOTIONS_ACTIVE
+"""
+
+PROMOTION_DETAIL_COLUMNS = [
+    "PROMOTION_ID", "PRODUCT_CATEGORY", "PROMOTION_TYPE", "DISCOUNT_PERCENTAGE",
+    "START_DATE", "END_DATE", "REGION", "DURATION_DAYS", "PROMOTION_STATUS",
+    "TOTAL_SALES", "TOTAL_GROSS_REVENUE", "TOTAL_DISCOUNT_COST", "TOTAL_NET_REVENUE",
+    "ROI_PERCENTAGE", "REVENUE_PER_DISCOUNT_EURO", "UNIQUE_CUSTOMERS_REACHED",
+    "MARKET_SHARE_PCT", "AVG_TRANSACTION_AMOUNT",
+]
+
+CAMPAIGN_BASE_QUERY = """
+SELECT
+    campaign_id,
+    campaign_name,
+    campaign_type,
+    product_category,
+    target_audience,
+    start_date,
+    end_date,
+    region,
+    campaign_duration_days,
+    campaign_budget,
+    estimated_reach,
+    target_conversion_rate,
+    actual_sales,
+    generated_revenue,
+    unique_customers_acquired,
+    avg_transaction_value,
+    roi_percentage,
+    revenue_per_euro_spent,
+    actual_conversion_rate,
+    cost_per_acquisition,
+    cost_per_unique_customer,
+    avg_customer_lifetime_value,
+    performance_rating,
+    conversion_performance,
+    start_year,
+    start_quarter,
+    start_month
+FROM ANALYTICS.MARKETING_PERFORMANCE
+"""
+
+CAMPAIGN_DETAIL_COLUMNS = [
+    "CAMPAIGN_ID", "CAMPAIGN_NAME", "CAMPAIGN_TYPE", "PRODUCT_CATEGORY", "TARGET_AUDIENCE",
+    "START_DATE", "END_DATE", "REGION", "CAMPAIGN_DURATION_DAYS", "CAMPAIGN_BUDGET",
+    "ESTIMATED_REACH", "TARGET_CONVERSION_PCT", "ACTUAL_SALES", "GENERATED_REVENUE",
+    "UNIQUE_CUSTOMERS_ACQUIRED", "AVG_TRANSACTION_VALUE", "ROI_PERCENTAGE",
+    "REVENUE_PER_EURO_SPENT", "ACTUAL_CONVERSION_PCT", "COST_PER_ACQUISITION",
+    "COST_PER_UNIQUE_CUSTOMER", "AVG_CUSTOMER_LIFETIME_VALUE", "PERFORMANCE_RATING",
+    "CONVERSION_PERFORMANCE",
+]
+
+
+# ============================================================================
+# PRIMITIVES "SQL" EN PANDAS
+# ============================================================================
+
+def count_(col=None):
+    return ("count", col, 1)
+
+
+def sum_(col, scale=1):
+    return ("sum", col, scale)
+
+
+def avg_(col, scale=1):
+    return ("avg", col, scale)
+
+
+def reach_(col, sketches):
+    """Clients distincts des clés de col (fusion des esquisses, 0 si aucune vente)"""
+    return ("reach", col, sketches)
+
+
+def aggregate(df, keys, specs):
+    """GROUP BY keys (ou agrégat global si keys est vide) avec specs {NOM: (fonction, colonne, échelle ou esquisses)}"""
+    if not keys:
+        row = {}
+        for name, (func, col, scale) in specs.items():
+            if func == "count":
+                row[name] = len(df)
+            elif func == "sum":
+                row[name] = df[col].sum(min_count=1) * scale
+            elif func == "reach":
+                row[name] = scale.reach(df[col])
+            else:
+                row[name] = df[col].mean() * scale
+        return pd.DataFrame([row])
+
+    # observed=True : seules les valeurs présentes des dimensions category forment un groupe
+    grouped = df.groupby(keys, sort=False, dropna=False, observed=True)
+    result = {}
+    for name, (func, col, scale) in specs.items():
+        if func == "count":
+            result[name] = grouped.size()
+        elif func == "sum":
+            result[name] = grouped[col].sum(min_count=1) * scale
+        elif func == "reach":
+            result[name] = grouped[col].agg(scale.reach)
+        else:
+            result[name] = grouped[col].mean() * scale
+    return pd.DataFrame(result).reset_index()
+
+
+def order_by(df, columns, limit=None):
+    """ORDER BY [(colonne, ascendant)] avec la sémantique NULL de Snowflake, puis LIMIT"""
+    # Tris stables successifs, de la clé la moins significative à la plus significative
+    for col, ascending in reversed(columns):
+        df = df.sort_values(
+            col,
+            ascending=ascending,
+            na_position="last" if ascending else "first",
+            kind="mergesort"
+        )
+    if limit is not None:
+        df = df.head(limit)
+    return df.reset_index(drop=True)
+
+
+def not_null(df, col):
+    return df[df[col].notna()]
+
+
+# ============================================================================
+# ROLLUPS PROMOTIONS
+# ============================================================================
+
+def promotion_rollups(base_df, sketches):
+    """Recalculer localement tous les jeux de données de promotion_analysis.py"""
+    status = base_df["PROMOTION_STATUS"]
+
+    kpi_scope = base_df[(status != "EXPIRED") | status.isna()]
+    kpis = _promotion_kpis(kpi_scope, sketches)
+
+    details = order_by(
+        base_df[PROMOTION_DETAIL_COLUMNS],
+        [("START_DATE", False), ("ROI_PERCENTAGE", False)]
+    )
+
+    by_type = order_by(aggregate(not_null(base_df, "PROMOTION_TYPE"), ["PROMOTION_TYPE"], {
+        "PROMOTION_COUNT": count_(),
+        "TOTAL_REVENUE": sum_("TOTAL_GROSS_REVENUE"),
+        "TOTAL_DISCOUNT": sum_("TOTAL_DISCOUNT_COST"),
+        "AVG_DISCOUNT_PCT": avg_("DISCOUNT_PERCENTAGE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "AVG_REVENUE_PER_EURO": avg_("REVENUE_PER_DISCOUNT_EURO"),
+        "TOTAL_TRANSACTIONS": sum_("TOTAL_SALES"),
+        "TOTAL_CUSTOMERS": reach_("PROMOTION_ID", sketches),
+    }), [("TOTAL_REVENUE", False)])
+
+    by_region = order_by(aggregate(not_null(base_df, "REGION"), ["REGION"], {
+        "PROMOTION_COUNT": count_(),
+        "TOTAL_REVENUE": sum_("TOTAL_GROSS_REVENUE"),
+        "TOTAL_DISCOUNT": sum_("TOTAL_DISCOUNT_COST"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "TOTAL_TRANSACTIONS": sum_("TOTAL_SALES"),
+        "TOTAL_CUSTOMERS": reach_("PROMOTION_ID", sketches),
+        "AVG_MARKET_SHARE": avg_("MARKET_SHARE_PCT"),
+    }), [("TOTAL_REVENUE", False)])
+
+    by_category = order_by(aggregate(not_null(base_df, "PRODUCT_CATEGORY"), ["PRODUCT_CATEGORY"], {
+        "PROMOTION_COUNT": count_(),
+        "TOTAL_REVENUE": sum_("TOTAL_GROSS_REVENUE"),
+        "TOTAL_DISCOUNT": sum_("TOTAL_DISCOUNT_COST"),
+        "AVG_DISCOUNT_PCT": avg_("DISCOUNT_PERCENTAGE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "TOTAL_TRANSACTIONS": sum_("TOTAL_SALES"),
+        "AVG_TICKET": avg_("AVG_TRANSACTION_AMOUNT"),
+    }), [("TOTAL_REVENUE", False)], limit=15)
+
+    time_keys = ["START_YEAR", "START_QUARTER", "START_MONTH", "PROMOTION_STATUS"]
+    time_analysis = order_by(aggregate(not_null(base_df, "START_YEAR"), time_keys, {
+        "PROMOTION_COUNT": count_(),
+        "TOTAL_REVENUE": sum_("TOTAL_GROSS_REVENUE"),
+        "TOTAL_DISCOUNT": sum_("TOTAL_DISCOUNT_COST"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+    }), [("START_YEAR", False), ("START_QUARTER", False), ("START_MONTH", False)])
+
+    return {
+        "kpis": kpis,
+        "details": details,
+        "by_type": by_type,
+        "by_region": by_region,
+        "by_category": by_category,
+        "time": time_analysis,
+        "overview": promotion_overview(details),
+        "sketches": sketches,
+    }
+
+
+def promotion_overview(details):
+    """Répartition par statut et période couverte (expander d'informations)"""
+    status = details["PROMOTION_STATUS"]
+    return pd.DataFrame([{
+        "TOTAL_COUNT": len(details),
+        "ACTIVE_COUNT": int((status == "ACTIVE").sum()),
+        "UPCOMING_COUNT": int((status == "UPCOMING").sum()),
+        "EXPIRED_COUNT": int((status == "EXPIRED").sum()),
+        "FIRST_START_DATE": details["START_DATE"].min(),
+        "LAST_END_DATE": details["END_DATE"].max(),
+    }])
+
+
+def _promotion_kpis(scope, sketches):
+    """KPI globaux (hors promotions expirées)"""
+    status = scope["PROMOTION_STATUS"]
+    kpis = aggregate(scope, [], {
+        "TOTAL_PROMOTIONS": count_(),
+        "TOTAL_GROSS_REVENUE": sum_("TOTAL_GROSS_REVENUE"),
+        "TOTAL_DISCOUNT_COST": sum_("TOTAL_DISCOUNT_COST"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "AVG_REVENUE_PER_DISCOUNT": avg_("REVENUE_PER_DISCOUNT_EURO"),
+        "TOTAL_TRANSACTIONS": sum_("TOTAL_SALES"),
+        "TOTAL_CUSTOMERS_REACHED": reach_("PROMOTION_ID", sketches),
+    })
+    # SUM(CASE WHEN ... THEN 1 ELSE 0 END) : NULL si aucune ligne
+    active = int((status == "ACTIVE").sum()) if len(scope) else None
+    upcoming = int((status == "UPCOMING").sum()) if len(scope) else None
+    kpis.insert(1, "ACTIVE_PROMOTIONS", active)
+    kpis.insert(2, "UPCOMING_PROMOTIONS", upcoming)
+    return kpis
+
+
+# ============================================================================
+# ROLLUPS CAMPAGNES MARKETING
+# ============================================================================
+
+def campaign_rollups(base_df, sketches):
+    """Recalculer localement tous les jeux de données de marketing_roi.py"""
+    budgeted = base_df[base_df["CAMPAIGN_BUDGET"] > 0]
+
+    kpis = aggregate(budgeted, [], {
+        "TOTAL_CAMPAIGNS": count_(),
+        "TOTAL_BUDGET": sum_("CAMPAIGN_BUDGET"),
+        "TOTAL_REVENUE": sum_("GENERATED_REVENUE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "AVG_CONVERSION_RATE": avg_("ACTUAL_CONVERSION_RATE", scale=100),
+        "TOTAL_CUSTOMERS_ACQUIRED": reach_("CAMPAIGN_ID", sketches),
+        "AVG_CPA": avg_("COST_PER_ACQUISITION"),
+        "AVG_REVENUE_PER_EURO": avg_("REVENUE_PER_EURO_SPENT"),
+    })
+
+    details = budgeted.assign(
+        TARGET_CONVERSION_PCT=budgeted["TARGET_CONVERSION_RATE"] * 100,
+        ACTUAL_CONVERSION_PCT=budgeted["ACTUAL_CONVERSION_RATE"] * 100,
+    )[CAMPAIGN_DETAIL_COLUMNS]
+    details = order_by(details, [("START_DATE", False), ("ROI_PERCENTAGE", False)])
+
+    by_type = order_by(aggregate(not_null(base_df, "CAMPAIGN_TYPE"), ["CAMPAIGN_TYPE"], {
+        "CAMPAIGN_COUNT": count_(),
+        "TOTAL_BUDGET": sum_("CAMPAIGN_BUDGET"),
+        "TOTAL_REVENUE": sum_("GENERATED_REVENUE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "AVG_CONVERSION_RATE": avg_("ACTUAL_CONVERSION_RATE", scale=100),
+        "AVG_REVENUE_PER_EURO": avg_("REVENUE_PER_EURO_SPENT"),
+        "TOTAL_CUSTOMERS": reach_("CAMPAIGN_ID", sketches),
+        "AVG_CPA": avg_("COST_PER_ACQUISITION"),
+    }), [("AVG_ROI", False)])
+
+    by_region = order_by(aggregate(not_null(base_df, "REGION"), ["REGION"], {
+        "CAMPAIGN_COUNT": count_(),
+        "TOTAL_BUDGET": sum_("CAMPAIGN_BUDGET"),
+        "TOTAL_REVENUE": sum_("GENERATED_REVENUE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "AVG_CONVERSION_RATE": avg_("ACTUAL_CONVERSION_RATE", scale=100),
+        "TOTAL_CUSTOMERS": reach_("CAMPAIGN_ID", sketches),
+        "AVG_CUSTOMER_COST": avg_("COST_PER_UNIQUE_CUSTOMER"),
+    }), [("AVG_ROI", False)])
+
+    by_category = order_by(aggregate(not_null(base_df, "PRODUCT_CATEGORY"), ["PRODUCT_CATEGORY"], {
+        "CAMPAIGN_COUNT": count_(),
+        "TOTAL_BUDGET": sum_("CAMPAIGN_BUDGET"),
+        "TOTAL_REVENUE": sum_("GENERATED_REVENUE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "AVG_CONVERSION_RATE": avg_("ACTUAL_CONVERSION_RATE", scale=100),
+        "TOTAL_SALES": sum_("ACTUAL_SALES"),
+        "AVG_TICKET": avg_("AVG_TRANSACTION_VALUE"),
+    }), [("AVG_ROI", False)], limit=15)
+
+    time_keys = ["START_YEAR", "START_QUARTER", "START_MONTH"]
+    time_analysis = order_by(aggregate(not_null(base_df, "START_YEAR"), time_keys, {
+        "CAMPAIGN_COUNT": count_(),
+        "TOTAL_BUDGET": sum_("CAMPAIGN_BUDGET"),
+        "TOTAL_REVENUE": sum_("GENERATED_REVENUE"),
+        "AVG_ROI": avg_("ROI_PERCENTAGE"),
+        "TOTAL_CUSTOMERS": reach_("CAMPAIGN_ID", sketches),
+    }), [("START_YEAR", False), ("START_QUARTER", False), ("START_MONTH", False)], limit=12)
+
+    return {
+        "kpis": kpis,
+        "details": details,
+        "by_type": by_type,
+        "by_region": by_region,
+        "by_category": by_category,
+        "time": time_analysis,
+        "overview": campaign_overview(details),
+        "sketches": sketches,
+    }
+
+
+def campaign_overview(details):
+    """Ratios d'efficacité, distribution des ratings et période couverte"""
+    rating = details["PERFORMANCE_RATING"]
+    return pd.DataFrame([{
+        "TOTAL_COUNT": len(details),
+        "EXCELLENT_CAMPAIGNS": int(((details["ROI_PERCENTAGE"] > 100) & (details["ACTUAL_CONVERSION_PCT"] > 5)).sum()),
+        "EFFICIENT_CAMPAIGNS": int((details["REVENUE_PER_EURO_SPENT"] > 3).sum()),
+        "LOW_CPA_CAMPAIGNS": int((details["COST_PER_ACQUISITION"] < 50).sum()),
+        "EXCELLENT_COUNT": int((rating == "EXCELLENT").sum()),
+        "GOOD_COUNT": int((rating == "GOOD").sum()),
+        "AVERAGE_COUNT": int((rating == "AVERAGE").sum()),
+        "POOR_COUNT": int((rating == "POOR").sum()),
+        "FIRST_START_DATE": details["START_DATE"].min(),
+        "LAST_END_DATE": details["END_DATE"].max(),
+        "TOTAL_BUDGET": details["CAMPAIGN_BUDGET"].sum(),
+    }])
+
+
+# ============================================================================
+# CHARGEMENT (une requête, résultat mis en cache)
+# ============================================================================
+
+def _load_bundle(session, query, rollups, sketch_type, ttl=None):
+    key = make_cache_key(query, (rollups.__name__, sketch_type))
+    fetched = {}
+
+    def loader():
+        details = execute_query(session, query, info=fetched)
+        sketches = load_reach_sketches(session, sketch_type)
+        fetched["bytes"] = estimate_size(details) + sketches.registers.nbytes
+        return rollups(details, sketches)
+
+    with get_query_metrics().track(query, fingerprint=key, name=f"bundle:{rollups.__name__}") as record:
+        try:
+            bundle, record.cache = get_query_cache().lookup(key, loader, ttl=ttl)
+        finally:
+            record.query_id = fetched.get("query_id")
+            record.bytes = fetched.get("bytes", 0)
+        record.rows = len(bundle["details"])
+        return bundle
+
+
+def load_promotion_bundle(session, ttl=None):
+    """Tous les jeux de données de la page promotions en un seul scan"""
+    return _load_bundle(session, PROMOTION_BASE_QUERY, promotion_rollups, PROMOTION, ttl)
+
+
+def load_campaign_bundle(session, ttl=None):
+    """Tous les jeux de données de la page marketing en un seul scan"""
+    return _load_bundle(session, CAMPAIGN_BASE_QUERY, campaign_rollups, CAMPAIGN, ttl)
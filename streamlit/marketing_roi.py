@@ -1,26 +1,28 @@
 # marketing_roi.py
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-from snowflake.snowpark.context import get_active_session
-
-# Configuration de la page
-st.set_page_config(
-    page_title="Performance Marketing - AnyCompany",
-    page_icon="💰",
-    layout="wide"
-)
+from datetime import datetime
 
-# Initialisation de la session Snowflake
-@st.cache_resource
-def get_snowflake_session():
-    try:
-        return get_active_session()
-    except:
-        st.error("❌ Impossible de se connecter à Snowflake")
-        return None
+from audience_bitmaps import load_audience_index
+from debug_panel import describe_failure, render_debug_panel
+from kpi_bundle import load_campaign_bundle
+from paginated_table import KeysetPager
+from query_builder import FilterSet, aggregate_query, eq, ge, isin, year_range
+from query_cache import format_cache_stats, run_query
+from query_executor import QueryExecutor, timings_frame
+from query_metrics import start_run
+from reach_sketches import CAMPAIGN, reach_query
+from report_export import ReportSection, render_export_button
+from session_pool import get_session
+
+run_id = start_run("marketing_roi")
 
-session = get_snowflake_session()
+# Session du pool partagé (session_pool.py)
+try:
+    session = get_session()
+except Exception:
+    st.error("❌ Impossible de se connecter à Snowflake")
+    session = None
 
 # Titre principal
 st.title("💰 Performance Marketing - AnyCompany")
@@ -31,15 +33,22 @@ st.markdown("---")
 with st.sidebar:
     st.header("🔍 Filtres d'Analyse")
     
+    # Mode scan unique : une requête, agrégats calculés localement
+    single_scan_mode = st.checkbox("⚡ Mode scan unique", value=True,
+                                   help="Charger la table une seule fois et calculer les agrégats localement")
+    
     # Type de campagne
     if session:
         try:
-            campaign_types = session.sql("""
-                SELECT DISTINCT campaign_type 
-                FROM ANALYTICS.MARKETING_PERFORMANCE 
-                WHERE campaign_type IS NOT NULL
-                ORDER BY campaign_type
-            """).to_pandas()
+            if single_scan_mode:
+                campaign_types = load_campaign_bundle(session)["by_type"][['CAMPAIGN_TYPE']].sort_values('CAMPAIGN_TYPE')
+            else:
+                campaign_types = run_query(session, """
+                    SELECT DISTINCT campaign_type 
+                    FROM ANALYTICS.MARKETING_PERFORMANCE 
+                    WHERE campaign_type IS NOT NULL
+                    ORDER BY campaign_type
+                """, name="campaign_types")
             selected_campaign_types = st.multiselect(
                 "Types de campagne",
                 options=campaign_types['CAMPAIGN_TYPE'].tolist(),
@@ -63,63 +72,70 @@ with st.sidebar:
     st.info("💡 ROI = (Revenu - Budget) × 100 / Budget")
 
 # Fonctions de chargement des données
-@st.cache_data(ttl=300)
+# Clients distincts : fusion des esquisses HyperLogLog (reach_sketches.py) et
+# non somme de unique_customers_acquired, qui compte plusieurs fois un client
+# touché par plusieurs campagnes
+def campaign_reach(group_columns=(), base_predicates=None, filters=None):
+    """Requête de portée des campagnes retenues, par groupe"""
+    return reach_query("ANALYTICS.MARKETING_PERFORMANCE", "campaign_id", CAMPAIGN,
+                       group_columns, filters, base_predicates)
+
 def load_marketing_kpis():
     """Charger les KPI marketing globaux"""
-    query = """
+    reach, _ = campaign_reach(base_predicates=["campaign_budget > 0"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         COUNT(*) as total_campaigns,
         SUM(campaign_budget) as total_budget,
         SUM(generated_revenue) as total_revenue,
         AVG(roi_percentage) as avg_roi,
         AVG(actual_conversion_rate) * 100 as avg_conversion_rate,
-        SUM(unique_customers_acquired) as total_customers_acquired,
+        (SELECT total_customers FROM reach) as total_customers_acquired,
         AVG(cost_per_acquisition) as avg_cpa,
         AVG(revenue_per_euro_spent) as avg_revenue_per_euro
     FROM ANALYTICS.MARKETING_PERFORMANCE
     WHERE campaign_budget > 0
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
-def load_campaign_details():
-    """Charger le détail des campagnes"""
-    query = """
-    SELECT 
-        campaign_id,
-        campaign_name,
-        campaign_type,
-        product_category,
-        target_audience,
-        start_date,
-        end_date,
-        region,
-        campaign_duration_days,
-        campaign_budget,
-        estimated_reach,
-        target_conversion_rate * 100 as target_conversion_pct,
-        actual_sales,
-        generated_revenue,
-        unique_customers_acquired,
-        avg_transaction_value,
-        roi_percentage,
-        revenue_per_euro_spent,
-        actual_conversion_rate * 100 as actual_conversion_pct,
-        cost_per_acquisition,
-        cost_per_unique_customer,
-        avg_customer_lifetime_value,
-        performance_rating,
-        conversion_performance
-    FROM ANALYTICS.MARKETING_PERFORMANCE
-    WHERE campaign_budget > 0
-    ORDER BY start_date DESC, roi_percentage DESC
-    """
-    return session.sql(query).to_pandas()
+# Détail complet (également exporté par lots par report_export)
+DETAILS_QUERY = """
+SELECT 
+    campaign_id,
+    campaign_name,
+    campaign_type,
+    product_category,
+    target_audience,
+    start_date,
+    end_date,
+    region,
+    campaign_duration_days,
+    campaign_budget,
+    estimated_reach,
+    target_conversion_rate * 100 as target_conversion_pct,
+    actual_sales,
+    generated_revenue,
+    unique_customers_acquired,
+    avg_transaction_value,
+    roi_percentage,
+    revenue_per_euro_spent,
+    actual_conversion_rate * 100 as actual_conversion_pct,
+    cost_per_acquisition,
+    cost_per_unique_customer,
+    avg_customer_lifetime_value,
+    performance_rating,
+    conversion_performance
+FROM ANALYTICS.MARKETING_PERFORMANCE
+WHERE campaign_budget > 0
+ORDER BY start_date DESC, roi_percentage DESC
+"""
 
-@st.cache_data(ttl=300)
 def load_campaign_by_type():
     """Charger les performances par type de campagne"""
-    query = """
+    reach, _ = campaign_reach(["campaign_type"], ["campaign_type IS NOT NULL"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         campaign_type,
         COUNT(*) as campaign_count,
@@ -128,19 +144,21 @@ def load_campaign_by_type():
         AVG(roi_percentage) as avg_roi,
         AVG(actual_conversion_rate) * 100 as avg_conversion_rate,
         AVG(revenue_per_euro_spent) as avg_revenue_per_euro,
-        SUM(unique_customers_acquired) as total_customers,
+        COALESCE(MAX(reach.total_customers), 0) as total_customers,
         AVG(cost_per_acquisition) as avg_cpa
     FROM ANALYTICS.MARKETING_PERFORMANCE
+    LEFT JOIN reach USING (campaign_type)
     WHERE campaign_type IS NOT NULL
     GROUP BY campaign_type
     ORDER BY avg_roi DESC
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
 def load_campaign_by_region():
     """Charger les campagnes par région"""
-    query = """
+    reach, _ = campaign_reach(["region"], ["region IS NOT NULL"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         region,
         COUNT(*) as campaign_count,
@@ -148,16 +166,16 @@ def load_campaign_by_region():
         SUM(generated_revenue) as total_revenue,
         AVG(roi_percentage) as avg_roi,
         AVG(actual_conversion_rate) * 100 as avg_conversion_rate,
-        SUM(unique_customers_acquired) as total_customers,
+        COALESCE(MAX(reach.total_customers), 0) as total_customers,
         AVG(cost_per_unique_customer) as avg_customer_cost
     FROM ANALYTICS.MARKETING_PERFORMANCE
+    LEFT JOIN reach USING (region)
     WHERE region IS NOT NULL
     GROUP BY region
     ORDER BY avg_roi DESC
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
 def load_campaign_by_category():
     """Charger les campagnes par catégorie produit"""
     query = """
@@ -176,12 +194,13 @@ def load_campaign_by_category():
     ORDER BY avg_roi DESC
     LIMIT 15
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
 def load_time_analysis():
     """Analyse temporelle des campagnes"""
-    query = """
+    reach, _ = campaign_reach(["start_year", "start_quarter", "start_month"], ["start_year IS NOT NULL"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         start_year,
         start_quarter,
@@ -190,379 +209,567 @@ def load_time_analysis():
         SUM(campaign_budget) as total_budget,
         SUM(generated_revenue) as total_revenue,
         AVG(roi_percentage) as avg_roi,
-        SUM(unique_customers_acquired) as total_customers
+        COALESCE(MAX(reach.total_customers), 0) as total_customers
     FROM ANALYTICS.MARKETING_PERFORMANCE
+    LEFT JOIN reach USING (start_year, start_quarter, start_month)
     WHERE start_year IS NOT NULL
     GROUP BY start_year, start_quarter, start_month
     ORDER BY start_year DESC, start_quarter DESC, start_month DESC
     LIMIT 12
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-# Chargement et affichage des données
-if session:
-    try:
-        # Charger les données
-        kpis_df = load_marketing_kpis()
-        details_df = load_campaign_details()
-        type_df = load_campaign_by_type()
-        region_df = load_campaign_by_region()
-        category_df = load_campaign_by_category()
-        time_df = load_time_analysis()
-        
-        # Section 1: KPI Marketing Globaux
-        st.subheader("📈 KPI Marketing Globaux")
-        
-        if not kpis_df.empty:
-            kpis = kpis_df.iloc[0]
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric(
-                    label="Budget Total",
-                    value=f"€{kpis['TOTAL_BUDGET']:,.0f}",
-                    delta=f"{kpis['TOTAL_CAMPAIGNS']} campagnes"
-                )
-            
-            with col2:
-                net_profit = kpis['TOTAL_REVENUE'] - kpis['TOTAL_BUDGET']
-                st.metric(
-                    label="ROI Moyen",
-                    value=f"{kpis['AVG_ROI']:.1f}%",
-                    delta=f"€{net_profit:,.0f} net"
-                )
-            
-            with col3:
-                st.metric(
-                    label="Taux Conversion",
-                    value=f"{kpis['AVG_CONVERSION_RATE']:.1f}%",
-                    delta=f"CPA: €{kpis['AVG_CPA']:.2f}"
-                )
-            
-            with col4:
-                st.metric(
-                    label="Clients Acquis",
-                    value=f"{kpis['TOTAL_CUSTOMERS_ACQUIRED']:,}",
-                    delta=f"€/{kpis['AVG_REVENUE_PER_EURO']:.2f}/€"
-                )
+# Colonnes du portefeuille (identiques à DETAILS_QUERY)
+CATALOGUE_COLUMNS = [
+    "campaign_id", "campaign_name", "campaign_type", "product_category", "target_audience",
+    "start_date", "end_date", "region", "campaign_duration_days", "campaign_budget",
+    "estimated_reach", "target_conversion_rate * 100 as target_conversion_pct", "actual_sales",
+    "generated_revenue", "unique_customers_acquired", "avg_transaction_value", "roi_percentage",
+    "revenue_per_euro_spent", "actual_conversion_rate * 100 as actual_conversion_pct",
+    "cost_per_acquisition", "cost_per_unique_customer", "avg_customer_lifetime_value",
+    "performance_rating", "conversion_performance",
+]
+
+# Portefeuille paginé côté serveur : seule la page visible est lue
+catalogue_pager = KeysetPager(
+    "campaign_catalogue",
+    "ANALYTICS.MARKETING_PERFORMANCE",
+    CATALOGUE_COLUMNS,
+    "campaign_id",
+    {
+        "Date de début": "start_date",
+        "ROI %": "roi_percentage",
+        "Revenus": "generated_revenue",
+        "Budget": "campaign_budget",
+    },
+    base_predicates=["campaign_budget > 0"]
+)
+
+# Agrégats du portefeuille filtré, calculés dans Snowflake
+CATALOGUE_STATS = {
+    "FILTERED_COUNT": "COUNT(*)",
+    "AVG_ROI": "AVG(roi_percentage)",
+    "TOTAL_BUDGET": "COALESCE(SUM(campaign_budget), 0)",
+    "AVG_CONVERSION": "AVG(actual_conversion_rate) * 100",
+}
+
+def build_catalogue_filters():
+    """Traduire les filtres de la sidebar en prédicats SQL"""
+    return FilterSet(
+        eq("performance_rating", selected_rating) if selected_rating != "ALL" else None,
+        isin("campaign_type", selected_campaign_types) if selected_campaign_types else None,
+        year_range("start_date", selected_year) if selected_year != "Toutes années" else None,
+        ge("roi_percentage", min_roi),
+    )
+
+def load_campaign_catalogue(filters, page_request):
+    """Charger la page visible du portefeuille filtré"""
+    return catalogue_pager.fetch(session, filters, page_request)
+
+def load_campaign_catalogue_stats(filters):
+    """Statistiques du portefeuille filtré"""
+    query, params = aggregate_query(
+        "ANALYTICS.MARKETING_PERFORMANCE", CATALOGUE_STATS, filters,
+        base_predicates=["campaign_budget > 0"]
+    )
+    stats_df = run_query(session, query, params).astype(float)
+    reach, reach_params = campaign_reach(base_predicates=["campaign_budget > 0"], filters=filters)
+    return stats_df.assign(REACH=run_query(session, reach, reach_params).iloc[0, 0])
+
+def load_campaign_overview():
+    """Ratios d'efficacité, distribution des ratings et période couverte"""
+    query = """
+    SELECT 
+        COUNT(*) as total_count,
+        SUM(CASE WHEN roi_percentage > 100 AND actual_conversion_rate * 100 > 5 THEN 1 ELSE 0 END) as excellent_campaigns,
+        SUM(CASE WHEN revenue_per_euro_spent > 3 THEN 1 ELSE 0 END) as efficient_campaigns,
+        SUM(CASE WHEN cost_per_acquisition < 50 THEN 1 ELSE 0 END) as low_cpa_campaigns,
+        SUM(CASE WHEN performance_rating = 'EXCELLENT' THEN 1 ELSE 0 END) as excellent_count,
+        SUM(CASE WHEN performance_rating = 'GOOD' THEN 1 ELSE 0 END) as good_count,
+        SUM(CASE WHEN performance_rating = 'AVERAGE' THEN 1 ELSE 0 END) as average_count,
+        SUM(CASE WHEN performance_rating = 'POOR' THEN 1 ELSE 0 END) as poor_count,
+        MIN(start_date) as first_start_date,
+        MAX(end_date) as last_end_date,
+        COALESCE(SUM(campaign_budget), 0) as total_budget
+    FROM ANALYTICS.MARKETING_PERFORMANCE
+    WHERE campaign_budget > 0
+    """
+    return run_query(session, query)
+
+def load_campaign_audiences():
+    """Audiences exactes des campagnes (bitmaps, chargés une fois par processus)"""
+    return load_audience_index(session)
+
+def local_catalogue(details_df, sketches, filters, page_request):
+    """Équivalent local du portefeuille filtré (mode scan unique)"""
+    filtered_df = filters.apply(details_df)
+    stats_df = pd.DataFrame([{
+        "FILTERED_COUNT": len(filtered_df),
+        "AVG_ROI": filtered_df['ROI_PERCENTAGE'].mean(),
+        "TOTAL_BUDGET": filtered_df['CAMPAIGN_BUDGET'].sum(),
+        "AVG_CONVERSION": filtered_df['ACTUAL_CONVERSION_PCT'].mean(),
+    }]).astype(float).assign(REACH=sketches.reach(filtered_df['CAMPAIGN_ID']))
+    return catalogue_pager.slice(filtered_df, FilterSet(), page_request), stats_df
+
+# Fonctions d'affichage des sections
+def afficher_kpis(kpis_df):
+    """Section 1 : KPI marketing globaux"""
+    st.subheader("📈 KPI Marketing Globaux")
+    
+    if not kpis_df.empty:
+        kpis = kpis_df.iloc[0]
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric(
+                label="Budget Total",
+                value=f"€{kpis['TOTAL_BUDGET']:,.0f}",
+                delta=f"{kpis['TOTAL_CAMPAIGNS']} campagnes"
+            )
+        
+        with col2:
+            net_profit = kpis['TOTAL_REVENUE'] - kpis['TOTAL_BUDGET']
+            st.metric(
+                label="ROI Moyen",
+                value=f"{kpis['AVG_ROI']:.1f}%",
+                delta=f"€{net_profit:,.0f} net"
+            )
+        
+        with col3:
+            st.metric(
+                label="Taux Conversion",
+                value=f"{kpis['AVG_CONVERSION_RATE']:.1f}%",
+                delta=f"CPA: €{kpis['AVG_CPA']:.2f}"
+            )
+        
+        with col4:
+            st.metric(
+                label="Clients Acquis",
+                value=f"{kpis['TOTAL_CUSTOMERS_ACQUIRED']:,}",
+                delta=f"€/{kpis['AVG_REVENUE_PER_EURO']:.2f}/€"
+            )
+    
+    st.markdown("---")
+
+def afficher_portefeuille(catalogue_page, stats_df):
+    """Section 2 : portefeuille filtré des campagnes"""
+    st.subheader("📋 Portefeuille des Campagnes")
+    
+    stats = stats_df.iloc[0]
+    if stats['FILTERED_COUNT'] > 0:
+        catalogue_pager.render_controls(catalogue_page, stats['FILTERED_COUNT'])
+        
+        # Afficher la page courante
+        st.dataframe(
+            catalogue_page.rows,
+            column_config={
+                "CAMPAIGN_NAME": "Nom Campagne",
+                "CAMPAIGN_TYPE": "Type",
+                "PRODUCT_CATEGORY": "Catégorie",
+                "TARGET_AUDIENCE": "Cible",
+                "START_DATE": st.column_config.DateColumn("Début"),
+                "END_DATE": st.column_config.DateColumn("Fin"),
+                "REGION": "Région",
+                "CAMPAIGN_DURATION_DAYS": "Durée (jours)",
+                "CAMPAIGN_BUDGET": st.column_config.NumberColumn("Budget (€)", format="€%.2f"),
+                "GENERATED_REVENUE": st.column_config.NumberColumn("Revenu (€)", format="€%.2f"),
+                "ROI_PERCENTAGE": st.column_config.NumberColumn("ROI %", format="%.1f%%"),
+                "REVENUE_PER_EURO_SPENT": st.column_config.NumberColumn("€/€ Budget", format="€%.2f"),
+                "ACTUAL_CONVERSION_PCT": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
+                "COST_PER_ACQUISITION": st.column_config.NumberColumn("CPA (€)", format="€%.2f"),
+                "UNIQUE_CUSTOMERS_ACQUIRED": "Clients Acquis",
+                "PERFORMANCE_RATING": "Rating",
+                "CONVERSION_PERFORMANCE": "Perf. Conversion"
+            },
+            hide_index=True,
+            use_container_width=True
+        )
         
+        # Statistiques du tableau filtré (clients distincts : fusion des esquisses)
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("ROI Moyen Filtre", f"{stats['AVG_ROI']:.1f}%")
+        
+        with col2:
+            st.metric("Budget Total Filtre", f"€{stats['TOTAL_BUDGET']:,.0f}")
+        
+        with col3:
+            st.metric("Conversion Moyenne", f"{stats['AVG_CONVERSION']:.1f}%")
+        
+        with col4:
+            st.metric("Clients Acquis Filtre", f"{stats['REACH']:,.0f}")
+
+    
+    st.markdown("---")
+
+def afficher_audiences(audience_index):
+    """Section 3 : audiences croisées des campagnes (clients exacts)"""
+    st.subheader("👥 Audiences Croisées des Campagnes")
+    
+    campaign_keys = audience_index.keys(CAMPAIGN)
+    if not campaign_keys:
+        st.info("Aucune audience de campagne disponible (ANALYTICS.CUSTOMER_AUDIENCES).")
         st.markdown("---")
+        return
+    
+    selected_campaigns = st.multiselect(
+        "Campagnes à comparer",
+        options=[key for _, key in campaign_keys],
+        default=[key for _, key in campaign_keys][:5],
+        key="audience_campaigns"
+    )
+    selected_keys = [(CAMPAIGN, key) for key in selected_campaigns]
+    
+    if selected_keys:
+        overlap_df = audience_index.overlap_matrix(selected_keys)
+        sizes = pd.Series(overlap_df.values.diagonal(), index=overlap_df.index)
         
-        # Section 2: Détail des Campagnes
-        st.subheader("📋 Portefeuille des Campagnes")
+        col1, col2, col3 = st.columns(3)
         
-        if not details_df.empty:
-            # Appliquer les filtres
-            filtered_df = details_df.copy()
-            
-            if selected_rating != "ALL":
-                filtered_df = filtered_df[filtered_df['PERFORMANCE_RATING'] == selected_rating]
-            
-            if selected_campaign_types:
-                filtered_df = filtered_df[filtered_df['CAMPAIGN_TYPE'].isin(selected_campaign_types)]
-            
-            if selected_year != "Toutes années":
-                filtered_df = filtered_df[filtered_df['START_DATE'].dt.year == int(selected_year)]
-            
-            filtered_df = filtered_df[filtered_df['ROI_PERCENTAGE'] >= min_roi]
+        with col1:
+            st.metric("Clients Touchés (union)", f"{audience_index.union_size(selected_keys):,}")
+        
+        with col2:
+            st.metric("Clients Communs (intersection)", f"{audience_index.intersection_size(selected_keys):,}")
+        
+        with col3:
+            st.metric("Audience Cumulée", f"{sizes.sum():,}",
+                      help="Somme des audiences : compte plusieurs fois un client partagé")
+        
+        # Recouvrement : clients communs ou indice de Jaccard |A ∩ B| / |A ∪ B|
+        mode = st.radio("Recouvrement", ["Clients communs", "Jaccard (%)"], horizontal=True,
+                        key="audience_overlap_mode")
+        if mode == "Jaccard (%)":
+            unions = sizes.values[:, None] + sizes.values[None, :] - overlap_df.values
+            overlap_df = (overlap_df / unions.clip(min=1) * 100).round(1)
+        st.dataframe(overlap_df, use_container_width=True)
+    
+    st.markdown("---")
+
+def afficher_par_type(type_df):
+    """Section 4 : performance par type de campagne"""
+    st.subheader("🎯 Performance par Type de Campagne")
+    
+    if not type_df.empty:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Tableau des types
+            st.dataframe(
+                type_df,
+                column_config={
+                    "CAMPAIGN_TYPE": "Type Campagne",
+                    "CAMPAIGN_COUNT": "Nombre",
+                    "TOTAL_BUDGET": st.column_config.NumberColumn("Budget Total (€)", format="€%.2f"),
+                    "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
+                    "AVG_REVENUE_PER_EURO": st.column_config.NumberColumn("€/€ Budget", format="€%.2f"),
+                    "AVG_CONVERSION_RATE": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
+                    "TOTAL_CUSTOMERS": "Clients Acquis",
+                    "AVG_CPA": st.column_config.NumberColumn("CPA Moyen (€)", format="€%.2f")
+                },
+                hide_index=True
+            )
+        
+        with col2:
+            # Graphique ROI par type
+            st.bar_chart(
+                type_df,
+                x='CAMPAIGN_TYPE',
+                y='AVG_ROI'
+            )
             
-            # Afficher le tableau
+            # Graphique Budget vs Revenu
+            st.write("📊 Budget vs Revenu par Type")
+            budget_vs_revenue = type_df[['CAMPAIGN_TYPE', 'TOTAL_BUDGET', 'TOTAL_REVENUE']].copy()
+            budget_vs_revenue.columns = ['Type', 'Budget (€)', 'Revenu (€)']
+            st.dataframe(budget_vs_revenue, hide_index=True)
+    
+    st.markdown("---")
+
+def afficher_par_region(region_df):
+    """Section 5 : performance par région"""
+    st.subheader("🌍 Performance par Région")
+    
+    if not region_df.empty:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Tableau des régions
             st.dataframe(
-                filtered_df,
+                region_df,
                 column_config={
-                    "CAMPAIGN_NAME": "Nom Campagne",
-                    "CAMPAIGN_TYPE": "Type",
-                    "PRODUCT_CATEGORY": "Catégorie",
-                    "TARGET_AUDIENCE": "Cible",
-                    "START_DATE": st.column_config.DateColumn("Début"),
-                    "END_DATE": st.column_config.DateColumn("Fin"),
                     "REGION": "Région",
-                    "CAMPAIGN_DURATION_DAYS": "Durée (jours)",
-                    "CAMPAIGN_BUDGET": st.column_config.NumberColumn("Budget (€)", format="€%.2f"),
-                    "GENERATED_REVENUE": st.column_config.NumberColumn("Revenu (€)", format="€%.2f"),
-                    "ROI_PERCENTAGE": st.column_config.NumberColumn("ROI %", format="%.1f%%"),
-                    "REVENUE_PER_EURO_SPENT": st.column_config.NumberColumn("€/€ Budget", format="€%.2f"),
-                    "ACTUAL_CONVERSION_PCT": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
-                    "COST_PER_ACQUISITION": st.column_config.NumberColumn("CPA (€)", format="€%.2f"),
-                    "UNIQUE_CUSTOMERS_ACQUIRED": "Clients Acquis",
-                    "PERFORMANCE_RATING": "Rating",
-                    "CONVERSION_PERFORMANCE": "Perf. Conversion"
+                    "CAMPAIGN_COUNT": "Campagnes",
+                    "TOTAL_BUDGET": st.column_config.NumberColumn("Budget Total (€)", format="€%.2f"),
+                    "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
+                    "AVG_CONVERSION_RATE": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
+                    "TOTAL_CUSTOMERS": "Clients Acquis",
+                    "AVG_CUSTOMER_COST": st.column_config.NumberColumn("Coût/Client (€)", format="€%.2f")
                 },
-                hide_index=True,
-                use_container_width=True
+                hide_index=True
             )
+        
+        with col2:
+            # Top 5 régions par ROI
+            st.write("🏆 Top 5 Régions par ROI")
+            top_regions = region_df.nlargest(5, 'AVG_ROI')
             
-            # Statistiques du tableau filtré
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                avg_roi_filtered = filtered_df['ROI_PERCENTAGE'].mean()
-                st.metric("ROI Moyen Filtre", f"{avg_roi_filtered:.1f}%")
-            
-            with col2:
-                total_budget_filtered = filtered_df['CAMPAIGN_BUDGET'].sum()
-                st.metric("Budget Total Filtre", f"€{total_budget_filtered:,.0f}")
-            
-            with col3:
-                conversion_rate_filtered = filtered_df['ACTUAL_CONVERSION_PCT'].mean()
-                st.metric("Conversion Moyenne", f"{conversion_rate_filtered:.1f}%")
+            for idx, row in top_regions.iterrows():
+                with st.container(border=True):
+                    cols = st.columns([3, 2, 2])
+                    with cols[0]:
+                        st.write(f"**{row['REGION']}**")
+                    with cols[1]:
+                        st.write(f"ROI: {row['AVG_ROI']:.1f}%")
+                    with cols[2]:
+                        st.write(f"Conversion: {row['AVG_CONVERSION_RATE']:.1f}%")
+    
+    st.markdown("---")
+
+def afficher_par_categorie(category_df):
+    """Section 6 : performance par catégorie produit"""
+    st.subheader("📦 Performance par Catégorie Produit")
+    
+    if not category_df.empty:
+        col1, col2 = st.columns(2)
         
-        st.markdown("---")
+        with col1:
+            # Tableau des catégories
+            st.dataframe(
+                category_df,
+                column_config={
+                    "PRODUCT_CATEGORY": "Catégorie",
+                    "CAMPAIGN_COUNT": "Campagnes",
+                    "TOTAL_BUDGET": st.column_config.NumberColumn("Budget Total (€)", format="€%.2f"),
+                    "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
+                    "AVG_CONVERSION_RATE": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
+                    "TOTAL_SALES": "Ventes",
+                    "AVG_TICKET": st.column_config.NumberColumn("Panier Moyen (€)", format="€%.2f")
+                },
+                hide_index=True
+            )
         
-        # Section 3: Analyse par Type de Campagne
-        st.subheader("🎯 Performance par Type de Campagne")
+        with col2:
+            # Graphique ROI par catégorie
+            st.bar_chart(
+                category_df.head(8),
+                x='PRODUCT_CATEGORY',
+                y='AVG_ROI'
+            )
+
+def afficher_efficacite(overview_df):
+    """Section 7 : analyse d'efficacité"""
+    st.markdown("---")
+    st.subheader("📊 Analyse d'Efficacité")
+    
+    overview = overview_df.iloc[0]
+    if overview['TOTAL_COUNT'] > 0:
+        col1, col2, col3 = st.columns(3)
         
-        if not type_df.empty:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Tableau des types
-                st.dataframe(
-                    type_df,
-                    column_config={
-                        "CAMPAIGN_TYPE": "Type Campagne",
-                        "CAMPAIGN_COUNT": "Nombre",
-                        "TOTAL_BUDGET": st.column_config.NumberColumn("Budget Total (€)", format="€%.2f"),
-                        "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
-                        "AVG_REVENUE_PER_EURO": st.column_config.NumberColumn("€/€ Budget", format="€%.2f"),
-                        "AVG_CONVERSION_RATE": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
-                        "TOTAL_CUSTOMERS": "Clients Acquis",
-                        "AVG_CPA": st.column_config.NumberColumn("CPA Moyen (€)", format="€%.2f")
-                    },
-                    hide_index=True
-                )
-            
-            with col2:
-                # Graphique ROI par type
-                st.bar_chart(
-                    type_df,
-                    x='CAMPAIGN_TYPE',
-                    y='AVG_ROI'
-                )
-                
-                # Graphique Budget vs Revenu
-                st.write("📊 Budget vs Revenu par Type")
-                budget_vs_revenue = type_df[['CAMPAIGN_TYPE', 'TOTAL_BUDGET', 'TOTAL_REVENUE']].copy()
-                budget_vs_revenue.columns = ['Type', 'Budget (€)', 'Revenu (€)']
-                st.dataframe(budget_vs_revenue, hide_index=True)
+        # Ratios d'efficacité (comptés dans Snowflake)
+        with col1:
+            # ROI vs Conversion
+            st.metric("Campagnes Excellentes", f"{overview['EXCELLENT_CAMPAIGNS']}")
+            st.caption("ROI > 100% & Conversion > 5%")
         
-        st.markdown("---")
+        with col2:
+            # Budget Efficiency
+            st.metric("Campagnes Efficaces", f"{overview['EFFICIENT_CAMPAIGNS']}")
+            st.caption("Revenu > 3€ par € dépensé")
         
-        # Section 4: Analyse Géographique
-        st.subheader("🌍 Performance par Région")
+        with col3:
+            # Customer Acquisition
+            st.metric("Acquisition Rentable", f"{overview['LOW_CPA_CAMPAIGNS']}")
+            st.caption("CPA < 50€")
+
+def afficher_insights(type_df, region_df, category_df):
+    """Section 8 : insights et recommandations"""
+    st.markdown("---")
+    st.subheader("💡 Insights et Recommandations")
+    
+    if not type_df.empty and not region_df.empty and not category_df.empty:
+        # Meilleur type de campagne
+        best_type = type_df.loc[type_df['AVG_ROI'].idxmax()]
+        # Meilleure région
+        best_region = region_df.loc[region_df['AVG_ROI'].idxmax()]
+        # Meilleure catégorie
+        best_category = category_df.loc[category_df['AVG_ROI'].idxmax()]
         
-        if not region_df.empty:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Tableau des régions
-                st.dataframe(
-                    region_df,
-                    column_config={
-                        "REGION": "Région",
-                        "CAMPAIGN_COUNT": "Campagnes",
-                        "TOTAL_BUDGET": st.column_config.NumberColumn("Budget Total (€)", format="€%.2f"),
-                        "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
-                        "AVG_CONVERSION_RATE": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
-                        "TOTAL_CUSTOMERS": "Clients Acquis",
-                        "AVG_CUSTOMER_COST": st.column_config.NumberColumn("Coût/Client (€)", format="€%.2f")
-                    },
-                    hide_index=True
-                )
-            
-            with col2:
-                # Top 5 régions par ROI
-                st.write("🏆 Top 5 Régions par ROI")
-                top_regions = region_df.nlargest(5, 'AVG_ROI')
-                
-                for idx, row in top_regions.iterrows():
-                    with st.container(border=True):
-                        cols = st.columns([3, 2, 2])
-                        with cols[0]:
-                            st.write(f"**{row['REGION']}**")
-                        with cols[1]:
-                            st.write(f"ROI: {row['AVG_ROI']:.1f}%")
-                        with cols[2]:
-                            st.write(f"Conversion: {row['AVG_CONVERSION_RATE']:.1f}%")
+        col1, col2, col3 = st.columns(3)
         
-        st.markdown("---")
+        with col1:
+            with st.container(border=True):
+                st.markdown("#### 🏆 Meilleur Type")
+                st.success(f"**{best_type['CAMPAIGN_TYPE']}**")
+                st.write(f"ROI: {best_type['AVG_ROI']:.1f}%")
+                st.write(f"Conversion: {best_type['AVG_CONVERSION_RATE']:.1f}%")
+                st.write(f"Campagnes: {best_type['CAMPAIGN_COUNT']}")
         
-        # Section 5: Analyse par Catégorie Produit
-        st.subheader("📦 Performance par Catégorie Produit")
+        with col2:
+            with st.container(border=True):
+                st.markdown("#### 🌍 Meilleure Région")
+                st.info(f"**{best_region['REGION']}**")
+                st.write(f"ROI: {best_region['AVG_ROI']:.1f}%")
+                st.write(f"Conversion: {best_region['AVG_CONVERSION_RATE']:.1f}%")
+                st.write(f"Campagnes: {best_region['CAMPAIGN_COUNT']}")
         
-        if not category_df.empty:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Tableau des catégories
-                st.dataframe(
-                    category_df,
-                    column_config={
-                        "PRODUCT_CATEGORY": "Catégorie",
-                        "CAMPAIGN_COUNT": "Campagnes",
-                        "TOTAL_BUDGET": st.column_config.NumberColumn("Budget Total (€)", format="€%.2f"),
-                        "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
-                        "AVG_CONVERSION_RATE": st.column_config.NumberColumn("Conversion %", format="%.1f%%"),
-                        "TOTAL_SALES": "Ventes",
-                        "AVG_TICKET": st.column_config.NumberColumn("Panier Moyen (€)", format="€%.2f")
-                    },
-                    hide_index=True
-                )
-            
-            with col2:
-                # Graphique ROI par catégorie
-                st.bar_chart(
-                    category_df.head(8),
-                    x='PRODUCT_CATEGORY',
-                    y='AVG_ROI'
-                )
-        
-        # Section 6: Analyse de l'Efficacité
-        st.markdown("---")
-        st.subheader("📊 Analyse d'Efficacité")
+        with col3:
+            with st.container(border=True):
+                st.markdown("#### 📦 Meilleure Catégorie")
+                st.warning(f"**{best_category['PRODUCT_CATEGORY']}**")
+                st.write(f"ROI: {best_category['AVG_ROI']:.1f}%")
+                st.write(f"Conversion: {best_category['AVG_CONVERSION_RATE']:.1f}%")
+                st.write(f"Campagnes: {best_category['CAMPAIGN_COUNT']}")
         
-        if not details_df.empty:
-            col1, col2, col3 = st.columns(3)
-            
-            # Calculer les ratios d'efficacité
-            with col1:
-                # ROI vs Conversion
-                high_roi_high_conv = len(details_df[
-                    (details_df['ROI_PERCENTAGE'] > 100) & 
-                    (details_df['ACTUAL_CONVERSION_PCT'] > 5)
-                ])
-                st.metric("Campagnes Excellentes", f"{high_roi_high_conv}")
-                st.caption("ROI > 100% & Conversion > 5%")
-            
-            with col2:
-                # Budget Efficiency
-                efficient_campaigns = len(details_df[
-                    details_df['REVENUE_PER_EURO_SPENT'] > 3
-                ])
-                st.metric("Campagnes Efficaces", f"{efficient_campaigns}")
-                st.caption("Revenu > 3€ par € dépensé")
-            
-            with col3:
-                # Customer Acquisition
-                low_cpa_campaigns = len(details_df[
-                    details_df['COST_PER_ACQUISITION'] < 50
-                ])
-                st.metric("Acquisition Rentable", f"{low_cpa_campaigns}")
-                st.caption("CPA < 50€")
-        
-        # Section 7: Insights et Recommandations
+        # Recommandations stratégiques
         st.markdown("---")
-        st.subheader("💡 Insights et Recommandations")
-        
-        if not type_df.empty and not region_df.empty and not category_df.empty:
-            # Meilleur type de campagne
-            best_type = type_df.loc[type_df['AVG_ROI'].idxmax()]
-            # Meilleure région
-            best_region = region_df.loc[region_df['AVG_ROI'].idxmax()]
-            # Meilleure catégorie
-            best_category = category_df.loc[category_df['AVG_ROI'].idxmax()]
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                with st.container(border=True):
-                    st.markdown("#### 🏆 Meilleur Type")
-                    st.success(f"**{best_type['CAMPAIGN_TYPE']}**")
-                    st.write(f"ROI: {best_type['AVG_ROI']:.1f}%")
-                    st.write(f"Conversion: {best_type['AVG_CONVERSION_RATE']:.1f}%")
-                    st.write(f"Campagnes: {best_type['CAMPAIGN_COUNT']}")
-            
-            with col2:
-                with st.container(border=True):
-                    st.markdown("#### 🌍 Meilleure Région")
-                    st.info(f"**{best_region['REGION']}**")
-                    st.write(f"ROI: {best_region['AVG_ROI']:.1f}%")
-                    st.write(f"Conversion: {best_region['AVG_CONVERSION_RATE']:.1f}%")
-                    st.write(f"Campagnes: {best_region['CAMPAIGN_COUNT']}")
-            
-            with col3:
-                with st.container(border=True):
-                    st.markdown("#### 📦 Meilleure Catégorie")
-                    st.warning(f"**{best_category['PRODUCT_CATEGORY']}**")
-                    st.write(f"ROI: {best_category['AVG_ROI']:.1f}%")
-                    st.write(f"Conversion: {best_category['AVG_CONVERSION_RATE']:.1f}%")
-                    st.write(f"Campagnes: {best_category['CAMPAIGN_COUNT']}")
-            
-            # Recommandations stratégiques
-            st.markdown("---")
-            st.subheader("🎯 Recommandations Stratégiques")
-            
-            reco_col1, reco_col2 = st.columns(2)
+        st.subheader("🎯 Recommandations Stratégiques")
+        
+        reco_col1, reco_col2 = st.columns(2)
+        
+        with reco_col1:
+            st.write("**🚀 Augmenter l'investissement dans:**")
+            if best_type['AVG_ROI'] > 150:
+                st.success(f"• Type: {best_type['CAMPAIGN_TYPE']}")
+            if best_region['AVG_ROI'] > 150:
+                st.success(f"• Région: {best_region['REGION']}")
+            if best_category['AVG_ROI'] > 150:
+                st.success(f"• Catégorie: {best_category['PRODUCT_CATEGORY']}")
+        
+        with reco_col2:
+            st.write("**⚡ Optimisations prioritaires:**")
+            # Identifier les types sous-performants
+            if len(type_df) > 3:
+                worst_type = type_df.loc[type_df['AVG_ROI'].idxmin()]
+                if worst_type['AVG_ROI'] < 50:
+                    st.warning(f"• Réviser: {worst_type['CAMPAIGN_TYPE']} (ROI: {worst_type['AVG_ROI']:.1f}%)")
             
-            with reco_col1:
-                st.write("**🚀 Augmenter l'investissement dans:**")
-                if best_type['AVG_ROI'] > 150:
-                    st.success(f"• Type: {best_type['CAMPAIGN_TYPE']}")
-                if best_region['AVG_ROI'] > 150:
-                    st.success(f"• Région: {best_region['REGION']}")
-                if best_category['AVG_ROI'] > 150:
-                    st.success(f"• Catégorie: {best_category['PRODUCT_CATEGORY']}")
+            # Identifier les régions sous-performantes
+            if len(region_df) > 3:
+                worst_region = region_df.loc[region_df['AVG_ROI'].idxmin()]
+                if worst_region['AVG_ROI'] < 50:
+                    st.warning(f"• Réviser: {worst_region['REGION']} (ROI: {worst_region['AVG_ROI']:.1f}%)")
+
+def afficher_export(type_df, region_df, category_df):
+    """Section 9 : export du rapport complet"""
+    st.markdown("---")
+    sections = [
+        ReportSection("details", query=DETAILS_QUERY),
+        ReportSection("par_type", frame=type_df),
+        ReportSection("par_region", frame=region_df),
+        ReportSection("par_categorie", frame=category_df),
+    ]
+    render_export_button(session, sections, "rapport_marketing", key="marketing_export")
+
+def afficher_informations(overview_df):
+    """Informations sur les données"""
+    st.markdown("---")
+    with st.expander("ℹ️ Informations sur les données"):
+        overview = overview_df.iloc[0]
+        if overview['TOTAL_COUNT'] > 0:
+            st.write(f"**Distribution des ratings:**")
+            st.write(f"• Excellent: {overview['EXCELLENT_COUNT']}")
+            st.write(f"• Bon: {overview['GOOD_COUNT']}")
+            st.write(f"• Moyen: {overview['AVERAGE_COUNT']}")
+            st.write(f"• Faible: {overview['POOR_COUNT']}")
             
-            with reco_col2:
-                st.write("**⚡ Optimisations prioritaires:**")
-                # Identifier les types sous-performants
-                if len(type_df) > 3:
-                    worst_type = type_df.loc[type_df['AVG_ROI'].idxmin()]
-                    if worst_type['AVG_ROI'] < 50:
-                        st.warning(f"• Réviser: {worst_type['CAMPAIGN_TYPE']} (ROI: {worst_type['AVG_ROI']:.1f}%)")
-                
-                # Identifier les régions sous-performantes
-                if len(region_df) > 3:
-                    worst_region = region_df.loc[region_df['AVG_ROI'].idxmin()]
-                    if worst_region['AVG_ROI'] < 50:
-                        st.warning(f"• Réviser: {worst_region['REGION']} (ROI: {worst_region['AVG_ROI']:.1f}%)")
+            st.write(f"**Période couverte:** {overview['FIRST_START_DATE']} au {overview['LAST_END_DATE']}")
+            st.write(f"**Budget total analysé:** €{overview['TOTAL_BUDGET']:,.0f}")
+            st.write(f"**Dernière mise à jour:** {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+            st.caption(format_cache_stats())
+
+
+# Sections de la page : (données requises, fonction d'affichage)
+SECTIONS = [
+    (['kpis'], afficher_kpis),
+    (['catalogue', 'catalogue_stats'], afficher_portefeuille),
+    (['audiences'], afficher_audiences),
+    (['by_type'], afficher_par_type),
+    (['by_region'], afficher_par_region),
+    (['by_category'], afficher_par_categorie),
+    (['overview'], afficher_efficacite),
+    (['by_type', 'by_region', 'by_category'], afficher_insights),
+    (['by_type', 'by_region', 'by_category'], afficher_export),
+    (['overview'], afficher_informations)
+]
+
+# Loaders indépendants, exécutés en parallèle hors mode scan unique
+LOADERS = {
+    "kpis": load_marketing_kpis,
+    "catalogue": load_campaign_catalogue,
+    "catalogue_stats": load_campaign_catalogue_stats,
+    "audiences": load_campaign_audiences,
+    "by_type": load_campaign_by_type,
+    "by_region": load_campaign_by_region,
+    "by_category": load_campaign_by_category,
+    "time": load_time_analysis,
+    "overview": load_campaign_overview
+}
+
+# Loaders qui dépendent des filtres de la sidebar
+FILTERED_LOADERS = {"catalogue", "catalogue_stats"}
+
+# Index en mémoire du processus, chargés de la même façon dans les deux modes
+INDEX_LOADERS = {"audiences"}
+
+def afficher_sections(containers, data, errors, rendered):
+    """Afficher chaque section dès que toutes ses données sont disponibles"""
+    for i, (deps, render) in enumerate(SECTIONS):
+        if i in rendered or not all(d in data or d in errors for d in deps):
+            continue
+        rendered.add(i)
+        with containers[i]:
+            failed = [d for d in deps if d in errors]
+            if failed:
+                st.error(f"Erreur lors du chargement de {', '.join(failed)}: {errors[failed[0]]}")
+                continue
+            render(*[data[d] for d in deps])
+
+# Chargement et affichage des données
+if session:
+    try:
+        # Un conteneur par section : l'ordre d'affichage reste stable quel que
+        # soit l'ordre d'arrivée des résultats
+        containers = [st.container() for _ in SECTIONS]
+        data, errors, rendered = {}, {}, set()
+        catalogue_filters = build_catalogue_filters()
+        catalogue_page = catalogue_pager.request(catalogue_filters)
+        loader_args = {"catalogue": (catalogue_filters, catalogue_page), "catalogue_stats": (catalogue_filters,)}
         
-        # Section 8: Export des données
-        st.markdown("---")
-        if st.button("📊 Générer Rapport Complet"):
-            with st.spinner("Préparation du rapport..."):
-                # Combiner les données
-                report_data = pd.concat([
-                    details_df,
-                    type_df,
-                    region_df,
-                    category_df
-                ], ignore_index=True)
+        if single_scan_mode:
+            bundle = load_campaign_bundle(session)
+            data = {name: bundle[name] for name in LOADERS if name not in FILTERED_LOADERS | INDEX_LOADERS}
+            data.update({name: LOADERS[name]() for name in INDEX_LOADERS})
+            data["catalogue"], data["catalogue_stats"] = local_catalogue(bundle["details"], bundle["sketches"], catalogue_filters, catalogue_page)
+            afficher_sections(containers, data, errors, rendered)
+        else:
+            with QueryExecutor() as executor:
+                for name, loader in LOADERS.items():
+                    executor.submit(name, loader, *loader_args.get(name, ()))
                 
-                csv_data = report_data.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="📥 Télécharger Rapport (CSV)",
-                    data=csv_data,
-                    file_name=f"rapport_marketing_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
-        
-        # Informations sur les données
-        st.markdown("---")
-        with st.expander("ℹ️ Informations sur les données"):
-            if not details_df.empty:
-                excellent_count = len(details_df[details_df['PERFORMANCE_RATING'] == 'EXCELLENT'])
-                good_count = len(details_df[details_df['PERFORMANCE_RATING'] == 'GOOD'])
-                average_count = len(details_df[details_df['PERFORMANCE_RATING'] == 'AVERAGE'])
-                poor_count = len(details_df[details_df['PERFORMANCE_RATING'] == 'POOR'])
-                
-                st.write(f"**Distribution des ratings:**")
-                st.write(f"• Excellent: {excellent_count}")
-                st.write(f"• Bon: {good_count}")
-                st.write(f"• Moyen: {average_count}")
-                st.write(f"• Faible: {poor_count}")
-                
-                st.write(f"**Période couverte:** {details_df['START_DATE'].min()} au {details_df['END_DATE'].max()}")
-                st.write(f"**Budget total analysé:** €{details_df['CAMPAIGN_BUDGET'].sum():,.0f}")
-                st.write(f"**Dernière mise à jour:** {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+                for result in executor.as_completed():
+                    if result.ok:
+                        data[result.name] = result.value
+                    else:
+                        errors[result.name] = result.error
+                    afficher_sections(containers, data, errors, rendered)
+            
+            with st.expander("⏱️ Temps de chargement des requêtes"):
+                st.dataframe(timings_frame(executor.timings()), hide_index=True)
         
     except Exception as e:
         st.error(f"Erreur lors du chargement des données: {str(e)}")
+        failed_query = describe_failure(run_id)
+        if failed_query:
+            st.caption(f"Requête en échec : {failed_query}")
         st.info("Vérifiez que la table ANALYTICS.MARKETING_PERFORMANCE existe dans Snowflake.")
 else:
     st.warning("⏳ En attente de connexion à Snowflake...")
 
+render_debug_panel(run_id)
+
 # Footer
 st.markdown("---")
 st.caption("© 2024 AnyCompany - Performance Marketing - Dernière mise à jour: " + datetime.now().strftime("%d/%m/%Y %H:%M"))
\ No newline at end of file
@@ -0,0 +1,191 @@
+# paginated_table.py
+"""
+Tableaux de détail paginés côté serveur (pagination par clé / keyset).
+
+Au lieu d'envoyer tout le DataFrame filtré au navigateur, seule la page
+visible est lue dans Snowflake :
+
+    WHERE <filtres> AND (tri, id) après le dernier élément de la page précédente
+    ORDER BY tri DESC NULLS LAST, id DESC
+    LIMIT taille + 1
+
+Contrairement à OFFSET, le coût d'une page ne dépend pas de sa position et
+la mémoire du processus reste bornée à une page par utilisateur (plus les
+entrées du cache LRU partagé), quel que soit le volume d'historique.
+
+Le tri se choisit parmi une liste de colonnes autorisées ; l'identifiant sert
+de départage pour garantir un ordre total. Les curseurs des pages visitées
+sont conservés dans st.session_state et réinitialisés dès que les filtres,
+le tri ou la taille de page changent. Le nombre total de lignes vient d'une
+requête COUNT(*) séparée (les statistiques du catalogue filtré).
+"""
+from datetime import date, datetime
+
+import pandas as pd
+import streamlit as st
+
+from query_builder import FilterSet, keyset_after, select_query
+from query_cache import run_query
+
+PAGE_SIZES = [25, 50, 100, 250]
+DEFAULT_PAGE_SIZE = 50
+ORDERS = ["Décroissant", "Croissant"]
+
+
+def _native(value):
+    """Convertir une valeur pandas/numpy en type Python pouvant être lié"""
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.to_pydatetime()
+    if isinstance(value, (date, datetime, str)):
+        return value
+    if pd.isna(value):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class PageRequest:
+    """Page demandée : tri, taille, curseur de départ (None = première page)"""
+
+    def __init__(self, sort_column, descending, page_size, cursor, page_number):
+        self.sort_column = sort_column
+        self.descending = descending
+        self.page_size = page_size
+        self.cursor = cursor
+        self.page_number = page_number
+
+
+class Page:
+    """Lignes d'une page et indicateur de page suivante"""
+
+    def __init__(self, rows, request, has_next):
+        self.rows = rows
+        self.request = request
+        self.has_next = has_next
+
+
+class KeysetPager:
+    """Pagination par clé (colonne de tri, identifiant) d'une table filtrée"""
+
+    def __init__(self, name, table, columns, id_column, sort_options, base_predicates=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.id_column = id_column
+        self.sort_options = sort_options  # libellé -> colonne
+        self.base_predicates = base_predicates
+
+    # ------------------------------------------------------------------
+    # État (thread principal uniquement)
+    # ------------------------------------------------------------------
+    def _widget_key(self, suffix):
+        return f"{self.name}_{suffix}"
+
+    def _state(self):
+        return st.session_state.setdefault(self._widget_key("pager"), {"signature": None, "cursors": [None]})
+
+    def request(self, filters):
+        """Lire tri / taille / curseur courants ; à appeler avant de soumettre le loader"""
+        labels = list(self.sort_options)
+        label = st.session_state.get(self._widget_key("sort"), labels[0])
+        sort_column = self.sort_options.get(label, self.sort_options[labels[0]])
+        descending = st.session_state.get(self._widget_key("order"), ORDERS[0]) == ORDERS[0]
+        page_size = st.session_state.get(self._widget_key("page_size"), DEFAULT_PAGE_SIZE)
+
+        state = self._state()
+        signature = (filters.key(), sort_column, descending, page_size)
+        if state["signature"] != signature:
+            state["signature"] = signature
+            state["cursors"] = [None]
+        return PageRequest(sort_column, descending, page_size, state["cursors"][-1], len(state["cursors"]))
+
+    # ------------------------------------------------------------------
+    # Lecture d'une page
+    # ------------------------------------------------------------------
+    def _page_filters(self, filters, request):
+        return FilterSet(
+            *filters.predicates,
+            keyset_after(request.sort_column, self.id_column, request.descending, request.cursor)
+        )
+
+    def query(self, filters, request):
+        """SQL et paramètres de la page demandée (une ligne de plus pour détecter la suite)"""
+        direction = "DESC" if request.descending else "ASC"
+        return select_query(
+            self.table,
+            self.columns,
+            self._page_filters(filters, request),
+            base_predicates=self.base_predicates,
+            order_by=[f"{request.sort_column} {direction} NULLS LAST", f"{self.id_column} {direction}"],
+            limit=request.page_size + 1
+        )
+
+    def fetch(self, session, filters, request):
+        """Lire la page dans Snowflake (via le cache partagé)"""
+        query, params = self.query(filters, request)
+        return self._page(run_query(session, query, params), request)
+
+    def slice(self, df, filters, request):
+        """Même page calculée sur un DataFrame déjà chargé (mode scan unique)"""
+        sort_column, id_column = request.sort_column.upper(), self.id_column.upper()
+        rows = self._page_filters(filters, request).apply(df)
+        rows = rows.sort_values(
+            [sort_column, id_column], ascending=not request.descending,
+            na_position="last", kind="mergesort"
+        )
+        return self._page(rows.head(request.page_size + 1), request)
+
+    def _page(self, rows, request):
+        has_next = len(rows) > request.page_size
+        return Page(rows.head(request.page_size).reset_index(drop=True), request, has_next)
+
+    # ------------------------------------------------------------------
+    # Affichage
+    # ------------------------------------------------------------------
+    def _next(self, cursor):
+        self._state()["cursors"].append(cursor)
+
+    def _previous(self):
+        cursors = self._state()["cursors"]
+        if len(cursors) > 1:
+            cursors.pop()
+
+    def _first(self):
+        self._state()["cursors"] = [None]
+
+    def render_controls(self, page, total_rows):
+        """Tri, taille de page et navigation précédente / suivante"""
+        request = page.request
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.selectbox("Trier par", list(self.sort_options), key=self._widget_key("sort"))
+        with col2:
+            st.selectbox("Ordre", ORDERS, key=self._widget_key("order"))
+        with col3:
+            st.selectbox("Lignes par page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                         key=self._widget_key("page_size"))
+
+        first_row = (request.page_number - 1) * request.page_size + 1
+        last_row = first_row + len(page.rows) - 1
+        total_pages = max(1, -(-int(total_rows) // request.page_size))
+
+        col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
+        with col1:
+            st.button("⏮️ Début", key=self._widget_key("first"), on_click=self._first,
+                      disabled=request.page_number == 1)
+        with col2:
+            st.button("◀️ Précédent", key=self._widget_key("previous"), on_click=self._previous,
+                      disabled=request.page_number == 1)
+        with col3:
+            cursor = None
+            if page.has_next:
+                last = page.rows.iloc[-1]
+                cursor = (_native(last[request.sort_column.upper()]), _native(last[self.id_column.upper()]))
+            st.button("Suivant ▶️", key=self._widget_key("next"), on_click=self._next, args=(cursor,),
+                      disabled=not page.has_next)
+        with col4:
+            if len(page.rows):
+                st.caption(f"Page {request.page_number} / {total_pages} - lignes {first_row:,} à {last_row:,} sur {int(total_rows):,}")
@@ -1,26 +1,27 @@
 # promotion_analysis.py
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-from snowflake.snowpark.context import get_active_session
-
-# Configuration de la page
-st.set_page_config(
-    page_title="Analyse des Promotions - AnyCompany",
-    page_icon="🎯",
-    layout="wide"
-)
+from datetime import datetime
 
-# Initialisation de la session Snowflake
-@st.cache_resource
-def get_snowflake_session():
-    try:
-        return get_active_session()
-    except:
-        st.error("❌ Impossible de se connecter à Snowflake")
-        return None
+from debug_panel import describe_failure, render_debug_panel
+from kpi_bundle import PROMOTION_DETAIL_COLUMNS, load_promotion_bundle
+from paginated_table import KeysetPager
+from query_builder import FilterSet, aggregate_query, between, eq, ge, isin
+from query_cache import format_cache_stats, run_query
+from query_executor import QueryExecutor, timings_frame
+from query_metrics import start_run
+from reach_sketches import PROMOTION, reach_query
+from report_export import ReportSection, render_export_button
+from session_pool import get_session
 
-session = get_snowflake_session()
+run_id = start_run("promotion_analysis")
+
+# Session du pool partagé (session_pool.py)
+try:
+    session = get_session()
+except Exception:
+    st.error("❌ Impossible de se connecter à Snowflake")
+    session = None
 
 # Titre principal
 st.title("🎯 Analyse des Promotions - AnyCompany")
@@ -31,6 +32,10 @@ st.markdown("---")
 with st.sidebar:
     st.header("🔍 Filtres d'Analyse")
     
+    # Mode scan unique : une requête, agrégats calculés localement
+    single_scan_mode = st.checkbox("⚡ Mode scan unique", value=True,
+                                   help="Charger la table une seule fois et calculer les agrégats localement")
+    
     # Statut de promotion
     status_options = ["ACTIVE", "UPCOMING", "EXPIRED", "ALL"]
     selected_status = st.selectbox("Statut Promotion", status_options, index=0)
@@ -38,12 +43,15 @@ with st.sidebar:
     # Type de promotion
     if session:
         try:
-            promo_types = session.sql("""
-                SELECT DISTINCT promotion_type 
-                FROM ANALYTICS.PROMOTIONS_ACTIVE 
-                WHERE promotion_type IS NOT NULL
-                ORDER BY promotion_type
-            """).to_pandas()
+            if single_scan_mode:
+                promo_types = load_promotion_bundle(session)["by_type"][['PROMOTION_TYPE']].sort_values('PROMOTION_TYPE')
+            else:
+                promo_types = run_query(session, """
+                    SELECT DISTINCT promotion_type 
+                    FROM ANALYTICS.PROMOTIONS_ACTIVE 
+                    WHERE promotion_type IS NOT NULL
+                    ORDER BY promotion_type
+                """, name="promotion_types")
             selected_promo_types = st.multiselect(
                 "Types de promotion",
                 options=promo_types['PROMOTION_TYPE'].tolist(),
@@ -67,10 +75,19 @@ with st.sidebar:
     st.info("💡 ROI = (Revenu Net - Coût Remises) × 100 / Coût Remises")
 
 # Fonctions de chargement des données
-@st.cache_data(ttl=300)
+# Clients distincts : fusion des esquisses HyperLogLog (reach_sketches.py) et
+# non somme de unique_customers_reached, qui compte plusieurs fois un client
+# touché par plusieurs promotions
+def promotion_reach(group_columns=(), base_predicates=None, filters=None):
+    """Requête de portée des promotions retenues, par groupe"""
+    return reach_query("ANALYTICS.PROMOTIONS_ACTIVE", "promotion_id", PROMOTION,
+                       group_columns, filters, base_predicates)
+
 def load_promotion_kpis():
     """Charger les KPI globaux des promotions"""
-    query = """
+    reach, _ = promotion_reach(base_predicates=["(promotion_status != 'EXPIRED' OR promotion_status IS NULL)"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         COUNT(*) as total_promotions,
         SUM(CASE WHEN promotion_status = 'ACTIVE' THEN 1 ELSE 0 END) as active_promotions,
@@ -80,44 +97,42 @@ def load_promotion_kpis():
         AVG(roi_percentage) as avg_roi,
         AVG(revenue_per_discount_euro) as avg_revenue_per_discount,
         SUM(total_sales) as total_transactions,
-        SUM(unique_customers_reached) as total_customers_reached
+        (SELECT total_customers FROM reach) as total_customers_reached
     FROM ANALYTICS.PROMOTIONS_ACTIVE
     WHERE promotion_status != 'EXPIRED' OR promotion_status IS NULL
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
-def load_promotion_details():
-    """Charger le détail des promotions"""
-    query = """
-    SELECT 
-        promotion_id,
-        product_category,
-        promotion_type,
-        discount_percentage,
-        start_date,
-        end_date,
-        region,
-        duration_days,
-        promotion_status,
-        total_sales,
-        total_gross_revenue,
-        total_discount_cost,
-        total_net_revenue,
-        roi_percentage,
-        revenue_per_discount_euro,
-        unique_customers_reached,
-        market_share_pct,
-        avg_transaction_amount
-    FROM ANALYTICS.PROMOTIONS_ACTIVE
-    ORDER BY start_date DESC, roi_percentage DESC
-    """
-    return session.sql(query).to_pandas()
+# Détail complet (également exporté par lots par report_export)
+DETAILS_QUERY = """
+SELECT 
+    promotion_id,
+    product_category,
+    promotion_type,
+    discount_percentage,
+    start_date,
+    end_date,
+    region,
+    duration_days,
+    promotion_status,
+    total_sales,
+    total_gross_revenue,
+    total_discount_cost,
+    total_net_revenue,
+    roi_percentage,
+    revenue_per_discount_euro,
+    unique_customers_reached,
+    market_share_pct,
+    avg_transaction_amount
+FROM ANALYTICS.PROMOTIONS_ACTIVE
+ORDER BY start_date DESC, roi_percentage DESC
+"""
 
-@st.cache_data(ttl=300)
 def load_promotion_by_type():
     """Charger les performances par type de promotion"""
-    query = """
+    reach, _ = promotion_reach(["promotion_type"], ["promotion_type IS NOT NULL"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         promotion_type,
         COUNT(*) as promotion_count,
@@ -127,18 +142,20 @@ def load_promotion_by_type():
         AVG(roi_percentage) as avg_roi,
         AVG(revenue_per_discount_euro) as avg_revenue_per_euro,
         SUM(total_sales) as total_transactions,
-        SUM(unique_customers_reached) as total_customers
+        COALESCE(MAX(reach.total_customers), 0) as total_customers
     FROM ANALYTICS.PROMOTIONS_ACTIVE
+    LEFT JOIN reach USING (promotion_type)
     WHERE promotion_type IS NOT NULL
     GROUP BY promotion_type
     ORDER BY total_revenue DESC
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
 def load_promotion_by_region():
     """Charger les promotions par région"""
-    query = """
+    reach, _ = promotion_reach(["region"], ["region IS NOT NULL"])
+    query = f"""
+    WITH reach AS ({reach})
     SELECT 
         region,
         COUNT(*) as promotion_count,
@@ -146,16 +163,16 @@ def load_promotion_by_region():
         SUM(total_discount_cost) as total_discount,
         AVG(roi_percentage) as avg_roi,
         SUM(total_sales) as total_transactions,
-        SUM(unique_customers_reached) as total_customers,
+        COALESCE(MAX(reach.total_customers), 0) as total_customers,
         AVG(market_share_pct) as avg_market_share
     FROM ANALYTICS.PROMOTIONS_ACTIVE
+    LEFT JOIN reach USING (region)
     WHERE region IS NOT NULL
     GROUP BY region
     ORDER BY total_revenue DESC
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
 def load_promotion_by_category():
     """Charger les promotions par catégorie produit"""
     query = """
@@ -174,9 +191,8 @@ def load_promotion_by_category():
     ORDER BY total_revenue DESC
     LIMIT 15
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-@st.cache_data(ttl=300)
 def load_time_analysis():
     """Analyse temporelle des promotions"""
     query = """
@@ -194,298 +210,417 @@ def load_time_analysis():
     GROUP BY start_year, start_quarter, start_month, promotion_status
     ORDER BY start_year DESC, start_quarter DESC, start_month DESC
     """
-    return session.sql(query).to_pandas()
+    return run_query(session, query)
 
-# Chargement et affichage des données
-if session:
-    try:
-        # Charger les données
-        kpis_df = load_promotion_kpis()
-        details_df = load_promotion_details()
-        type_df = load_promotion_by_type()
-        region_df = load_promotion_by_region()
-        category_df = load_promotion_by_category()
-        time_df = load_time_analysis()
+# Catalogue paginé côté serveur : seule la page visible est lue
+catalogue_pager = KeysetPager(
+    "promo_catalogue",
+    "ANALYTICS.PROMOTIONS_ACTIVE",
+    [column.lower() for column in PROMOTION_DETAIL_COLUMNS],
+    "promotion_id",
+    {
+        "Date de début": "start_date",
+        "ROI %": "roi_percentage",
+        "CA Brut": "total_gross_revenue",
+        "Réduction %": "discount_percentage",
+    }
+)
+
+# Agrégats du catalogue filtré, calculés dans Snowflake
+CATALOGUE_STATS = {
+    "FILTERED_COUNT": "COUNT(*)",
+    "AVG_ROI": "AVG(roi_percentage)",
+    "TOTAL_REVENUE": "COALESCE(SUM(total_gross_revenue), 0)",
+    "AVG_DISCOUNT": "AVG(discount_percentage)",
+}
+
+def build_catalogue_filters():
+    """Traduire les filtres de la sidebar en prédicats SQL"""
+    return FilterSet(
+        eq("promotion_status", selected_status) if selected_status != "ALL" else None,
+        isin("promotion_type", selected_promo_types) if selected_promo_types else None,
+        between("discount_percentage", discount_range[0], discount_range[1]),
+        ge("roi_percentage", min_roi),
+    )
+
+def load_promotion_catalogue(filters, page_request):
+    """Charger la page visible du catalogue filtré"""
+    return catalogue_pager.fetch(session, filters, page_request)
+
+def load_promotion_catalogue_stats(filters):
+    """Statistiques du catalogue filtré"""
+    query, params = aggregate_query("ANALYTICS.PROMOTIONS_ACTIVE", CATALOGUE_STATS, filters)
+    stats_df = run_query(session, query, params).astype(float)
+    reach, reach_params = promotion_reach(filters=filters)
+    return stats_df.assign(REACH=run_query(session, reach, reach_params).iloc[0, 0])
+
+def load_promotion_overview():
+    """Répartition par statut et période couverte"""
+    query = """
+    SELECT 
+        COUNT(*) as total_count,
+        SUM(CASE WHEN promotion_status = 'ACTIVE' THEN 1 ELSE 0 END) as active_count,
+        SUM(CASE WHEN promotion_status = 'UPCOMING' THEN 1 ELSE 0 END) as upcoming_count,
+        SUM(CASE WHEN promotion_status = 'EXPIRED' THEN 1 ELSE 0 END) as expired_count,
+        MIN(start_date) as first_start_date,
+        MAX(end_date) as last_end_date
+    FROM ANALYTICS.PROMOTIONS_ACTIVE
+    """
+    return run_query(session, query)
+
+def local_catalogue(details_df, sketches, filters, page_request):
+    """Équivalent local du catalogue filtré (mode scan unique)"""
+    filtered_df = filters.apply(details_df)
+    stats_df = pd.DataFrame([{
+        "FILTERED_COUNT": len(filtered_df),
+        "AVG_ROI": filtered_df['ROI_PERCENTAGE'].mean(),
+        "TOTAL_REVENUE": filtered_df['TOTAL_GROSS_REVENUE'].sum(),
+        "AVG_DISCOUNT": filtered_df['DISCOUNT_PERCENTAGE'].mean(),
+    }]).astype(float).assign(REACH=sketches.reach(filtered_df['PROMOTION_ID']))
+    return catalogue_pager.slice(filtered_df, FilterSet(), page_request), stats_df
+
+# Fonctions d'affichage des sections
+def afficher_kpis(kpis_df):
+    """Section 1 : KPI globaux des promotions"""
+    st.subheader("📊 KPI Globaux des Promotions")
+    
+    if not kpis_df.empty:
+        kpis = kpis_df.iloc[0]
         
-        # Section 1: KPI Globaux
-        st.subheader("📊 KPI Globaux des Promotions")
+        col1, col2, col3, col4 = st.columns(4)
         
-        if not kpis_df.empty:
-            kpis = kpis_df.iloc[0]
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric(
-                    label="Promotions Actives",
-                    value=f"{kpis['ACTIVE_PROMOTIONS']:,}",
-                    delta=f"{kpis['TOTAL_PROMOTIONS']:,} total"
-                )
-            
-            with col2:
-                st.metric(
-                    label="CA Brut Promotions",
-                    value=f"€{kpis['TOTAL_GROSS_REVENUE']:,.0f}",
-                    delta=None
-                )
-            
-            with col3:
-                st.metric(
-                    label="ROI Moyen",
-                    value=f"{kpis['AVG_ROI']:.1f}%",
-                    delta=None
-                )
-            
-            with col4:
-                st.metric(
-                    label="Clients Touchés",
-                    value=f"{kpis['TOTAL_CUSTOMERS_REACHED']:,}",
-                    delta=f"{kpis['TOTAL_TRANSACTIONS']:,} transactions"
-                )
+        with col1:
+            st.metric(
+                label="Promotions Actives",
+                value=f"{kpis['ACTIVE_PROMOTIONS']:,}",
+                delta=f"{kpis['TOTAL_PROMOTIONS']:,} total"
+            )
         
-        st.markdown("---")
+        with col2:
+            st.metric(
+                label="CA Brut Promotions",
+                value=f"€{kpis['TOTAL_GROSS_REVENUE']:,.0f}",
+                delta=None
+            )
         
-        # Section 2: Détail des Promotions
-        st.subheader("📋 Catalogue des Promotions")
+        with col3:
+            st.metric(
+                label="ROI Moyen",
+                value=f"{kpis['AVG_ROI']:.1f}%",
+                delta=None
+            )
         
-        if not details_df.empty:
-            # Appliquer les filtres
-            filtered_df = details_df.copy()
-            
-            if selected_status != "ALL":
-                filtered_df = filtered_df[filtered_df['PROMOTION_STATUS'] == selected_status]
-            
-            if selected_promo_types:
-                filtered_df = filtered_df[filtered_df['PROMOTION_TYPE'].isin(selected_promo_types)]
-            
-            filtered_df = filtered_df[
-                (filtered_df['DISCOUNT_PERCENTAGE'] >= discount_range[0]) &
-                (filtered_df['DISCOUNT_PERCENTAGE'] <= discount_range[1]) &
-                (filtered_df['ROI_PERCENTAGE'] >= min_roi)
-            ]
-            
-            # Afficher le tableau
+        with col4:
+            st.metric(
+                label="Clients Touchés",
+                value=f"{kpis['TOTAL_CUSTOMERS_REACHED']:,}",
+                delta=f"{kpis['TOTAL_TRANSACTIONS']:,} transactions"
+            )
+    
+    st.markdown("---")
+
+def afficher_catalogue(catalogue_page, stats_df):
+    """Section 2 : catalogue filtré des promotions"""
+    st.subheader("📋 Catalogue des Promotions")
+    
+    stats = stats_df.iloc[0]
+    if stats['FILTERED_COUNT'] > 0:
+        catalogue_pager.render_controls(catalogue_page, stats['FILTERED_COUNT'])
+        
+        # Afficher la page courante
+        st.dataframe(
+            catalogue_page.rows,
+            column_config={
+                "PROMOTION_ID": "ID Promotion",
+                "PRODUCT_CATEGORY": "Catégorie",
+                "PROMOTION_TYPE": "Type",
+                "DISCOUNT_PERCENTAGE": st.column_config.NumberColumn("Réduction %", format="%.1f%%"),
+                "START_DATE": st.column_config.DateColumn("Début"),
+                "END_DATE": st.column_config.DateColumn("Fin"),
+                "REGION": "Région",
+                "DURATION_DAYS": "Durée (jours)",
+                "PROMOTION_STATUS": "Statut",
+                "TOTAL_GROSS_REVENUE": st.column_config.NumberColumn("CA Brut (€)", format="€%.2f"),
+                "TOTAL_DISCOUNT_COST": st.column_config.NumberColumn("Coût Remises (€)", format="€%.2f"),
+                "ROI_PERCENTAGE": st.column_config.NumberColumn("ROI %", format="%.1f%%"),
+                "REVENUE_PER_DISCOUNT_EURO": st.column_config.NumberColumn("€/€ Réduction", format="€%.2f"),
+                "MARKET_SHARE_PCT": st.column_config.NumberColumn("Part Marché %", format="%.1f%%")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        # Statistiques du tableau filtré (clients distincts : fusion des esquisses)
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("ROI Moyen Filtre", f"{stats['AVG_ROI']:.1f}%")
+        
+        with col2:
+            st.metric("CA Total Filtre", f"€{stats['TOTAL_REVENUE']:,.0f}")
+        
+        with col3:
+            st.metric("Réduction Moyenne", f"{stats['AVG_DISCOUNT']:.1f}%")
+        
+        with col4:
+            st.metric("Clients Touchés Filtre", f"{stats['REACH']:,.0f}")
+
+    
+    st.markdown("---")
+
+def afficher_par_type(type_df):
+    """Section 3 : performance par type de promotion"""
+    st.subheader("🏷️ Performance par Type de Promotion")
+    
+    if not type_df.empty:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Tableau des types
             st.dataframe(
-                filtered_df,
+                type_df,
                 column_config={
-                    "PROMOTION_ID": "ID Promotion",
-                    "PRODUCT_CATEGORY": "Catégorie",
-                    "PROMOTION_TYPE": "Type",
-                    "DISCOUNT_PERCENTAGE": st.column_config.NumberColumn("Réduction %", format="%.1f%%"),
-                    "START_DATE": st.column_config.DateColumn("Début"),
-                    "END_DATE": st.column_config.DateColumn("Fin"),
-                    "REGION": "Région",
-                    "DURATION_DAYS": "Durée (jours)",
-                    "PROMOTION_STATUS": "Statut",
-                    "TOTAL_GROSS_REVENUE": st.column_config.NumberColumn("CA Brut (€)", format="€%.2f"),
-                    "TOTAL_DISCOUNT_COST": st.column_config.NumberColumn("Coût Remises (€)", format="€%.2f"),
-                    "ROI_PERCENTAGE": st.column_config.NumberColumn("ROI %", format="%.1f%%"),
-                    "REVENUE_PER_DISCOUNT_EURO": st.column_config.NumberColumn("€/€ Réduction", format="€%.2f"),
-                    "MARKET_SHARE_PCT": st.column_config.NumberColumn("Part Marché %", format="%.1f%%")
+                    "PROMOTION_TYPE": "Type Promotion",
+                    "PROMOTION_COUNT": "Nombre",
+                    "TOTAL_REVENUE": st.column_config.NumberColumn("CA Total (€)", format="€%.2f"),
+                    "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
+                    "AVG_REVENUE_PER_EURO": st.column_config.NumberColumn("€/€ Réduction", format="€%.2f"),
+                    "TOTAL_TRANSACTIONS": "Transactions",
+                    "TOTAL_CUSTOMERS": "Clients"
                 },
-                hide_index=True,
-                use_container_width=True
+                hide_index=True
             )
-            
-            # Statistiques du tableau filtré
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                avg_roi_filtered = filtered_df['ROI_PERCENTAGE'].mean()
-                st.metric("ROI Moyen Filtre", f"{avg_roi_filtered:.1f}%")
-            
-            with col2:
-                total_revenue_filtered = filtered_df['TOTAL_GROSS_REVENUE'].sum()
-                st.metric("CA Total Filtre", f"€{total_revenue_filtered:,.0f}")
-            
-            with col3:
-                avg_discount_filtered = filtered_df['DISCOUNT_PERCENTAGE'].mean()
-                st.metric("Réduction Moyenne", f"{avg_discount_filtered:.1f}%")
         
-        st.markdown("---")
+        with col2:
+            # Graphique ROI par type
+            st.bar_chart(
+                type_df,
+                x='PROMOTION_TYPE',
+                y='AVG_ROI'
+            )
+    
+    st.markdown("---")
+
+def afficher_par_region(region_df):
+    """Section 4 : performance par région"""
+    st.subheader("🌍 Performance par Région")
+    
+    if not region_df.empty:
+        col1, col2 = st.columns(2)
         
-        # Section 3: Analyse par Type de Promotion
-        st.subheader("🏷️ Performance par Type de Promotion")
+        with col1:
+            # Tableau des régions
+            st.dataframe(
+                region_df,
+                column_config={
+                    "REGION": "Région",
+                    "PROMOTION_COUNT": "Promotions",
+                    "TOTAL_REVENUE": st.column_config.NumberColumn("CA Total (€)", format="€%.2f"),
+                    "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
+                    "AVG_MARKET_SHARE": st.column_config.NumberColumn("Part Marché %", format="%.1f%%"),
+                    "TOTAL_TRANSACTIONS": "Transactions",
+                    "TOTAL_CUSTOMERS": "Clients"
+                },
+                hide_index=True
+            )
         
-        if not type_df.empty:
-            col1, col2 = st.columns(2)
+        with col2:
+            # Carte thermique des régions
+            st.write("📊 Top 5 Régions par ROI")
+            top_regions = region_df.nlargest(5, 'AVG_ROI')
             
-            with col1:
-                # Tableau des types
-                st.dataframe(
-                    type_df,
-                    column_config={
-                        "PROMOTION_TYPE": "Type Promotion",
-                        "PROMOTION_COUNT": "Nombre",
-                        "TOTAL_REVENUE": st.column_config.NumberColumn("CA Total (€)", format="€%.2f"),
-                        "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
-                        "AVG_REVENUE_PER_EURO": st.column_config.NumberColumn("€/€ Réduction", format="€%.2f"),
-                        "TOTAL_TRANSACTIONS": "Transactions",
-                        "TOTAL_CUSTOMERS": "Clients"
-                    },
-                    hide_index=True
-                )
-            
-            with col2:
-                # Graphique ROI par type
-                st.bar_chart(
-                    type_df,
-                    x='PROMOTION_TYPE',
-                    y='AVG_ROI'
-                )
-        
-        st.markdown("---")
-        
-        # Section 4: Analyse Géographique
-        st.subheader("🌍 Performance par Région")
+            for idx, row in top_regions.iterrows():
+                with st.container(border=True):
+                    cols = st.columns([3, 2, 2])
+                    with cols[0]:
+                        st.write(f"**{row['REGION']}**")
+                    with cols[1]:
+                        st.write(f"ROI: {row['AVG_ROI']:.1f}%")
+                    with cols[2]:
+                        st.write(f"Part marché: {row['AVG_MARKET_SHARE']:.1f}%")
+    
+    st.markdown("---")
+
+def afficher_par_categorie(category_df):
+    """Section 5 : performance par catégorie produit"""
+    st.subheader("📦 Performance par Catégorie Produit")
+    
+    if not category_df.empty:
+        col1, col2 = st.columns(2)
         
-        if not region_df.empty:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Tableau des régions
-                st.dataframe(
-                    region_df,
-                    column_config={
-                        "REGION": "Région",
-                        "PROMOTION_COUNT": "Promotions",
-                        "TOTAL_REVENUE": st.column_config.NumberColumn("CA Total (€)", format="€%.2f"),
-                        "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
-                        "AVG_MARKET_SHARE": st.column_config.NumberColumn("Part Marché %", format="%.1f%%"),
-                        "TOTAL_TRANSACTIONS": "Transactions",
-                        "TOTAL_CUSTOMERS": "Clients"
-                    },
-                    hide_index=True
-                )
-            
-            with col2:
-                # Carte thermique des régions
-                st.write("📊 Top 5 Régions par ROI")
-                top_regions = region_df.nlargest(5, 'AVG_ROI')
-                
-                for idx, row in top_regions.iterrows():
-                    with st.container(border=True):
-                        cols = st.columns([3, 2, 2])
-                        with cols[0]:
-                            st.write(f"**{row['REGION']}**")
-                        with cols[1]:
-                            st.write(f"ROI: {row['AVG_ROI']:.1f}%")
-                        with cols[2]:
-                            st.write(f"Part marché: {row['AVG_MARKET_SHARE']:.1f}%")
+        with col1:
+            # Tableau des catégories
+            st.dataframe(
+                category_df,
+                column_config={
+                    "PRODUCT_CATEGORY": "Catégorie",
+                    "PROMOTION_COUNT": "Promotions",
+                    "TOTAL_REVENUE": st.column_config.NumberColumn("CA Total (€)", format="€%.2f"),
+                    "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
+                    "AVG_DISCOUNT_PCT": st.column_config.NumberColumn("Réduction %", format="%.1f%%"),
+                    "TOTAL_TRANSACTIONS": "Transactions",
+                    "AVG_TICKET": st.column_config.NumberColumn("Panier Moyen (€)", format="€%.2f")
+                },
+                hide_index=True
+            )
         
-        st.markdown("---")
+        with col2:
+            # Graphique ROI vs Réduction
+            scatter_data = category_df.copy()
+            scatter_data = scatter_data[['PRODUCT_CATEGORY', 'AVG_DISCOUNT_PCT', 'AVG_ROI', 'TOTAL_REVENUE']]
+            scatter_data.columns = ['Catégorie', 'Réduction %', 'ROI %', 'CA Total']
+            st.write("📈 ROI vs Réduction par Catégorie")
+            st.dataframe(scatter_data, hide_index=True)
+
+def afficher_insights(type_df, region_df, category_df):
+    """Section 6 : insights et recommandations"""
+    st.markdown("---")
+    st.subheader("💡 Insights et Recommandations")
+    
+    if not type_df.empty and not region_df.empty:
+        # Meilleur type de promotion
+        best_type = type_df.loc[type_df['AVG_ROI'].idxmax()]
+        # Meilleure région
+        best_region = region_df.loc[region_df['AVG_ROI'].idxmax()]
+        # Meilleure catégorie
+        best_category = category_df.loc[category_df['AVG_ROI'].idxmax()] if not category_df.empty else None
         
-        # Section 5: Analyse par Catégorie Produit
-        st.subheader("📦 Performance par Catégorie Produit")
+        col1, col2, col3 = st.columns(3)
         
-        if not category_df.empty:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Tableau des catégories
-                st.dataframe(
-                    category_df,
-                    column_config={
-                        "PRODUCT_CATEGORY": "Catégorie",
-                        "PROMOTION_COUNT": "Promotions",
-                        "TOTAL_REVENUE": st.column_config.NumberColumn("CA Total (€)", format="€%.2f"),
-                        "AVG_ROI": st.column_config.NumberColumn("ROI Moyen %", format="%.1f%%"),
-                        "AVG_DISCOUNT_PCT": st.column_config.NumberColumn("Réduction %", format="%.1f%%"),
-                        "TOTAL_TRANSACTIONS": "Transactions",
-                        "AVG_TICKET": st.column_config.NumberColumn("Panier Moyen (€)", format="€%.2f")
-                    },
-                    hide_index=True
-                )
-            
-            with col2:
-                # Graphique ROI vs Réduction
-                scatter_data = category_df.copy()
-                scatter_data = scatter_data[['PRODUCT_CATEGORY', 'AVG_DISCOUNT_PCT', 'AVG_ROI', 'TOTAL_REVENUE']]
-                scatter_data.columns = ['Catégorie', 'Réduction %', 'ROI %', 'CA Total']
-                st.write("📈 ROI vs Réduction par Catégorie")
-                st.dataframe(scatter_data, hide_index=True)
+        with col1:
+            with st.container(border=True):
+                st.markdown("#### 🏆 Meilleur Type")
+                st.success(f"**{best_type['PROMOTION_TYPE']}**")
+                st.write(f"ROI: {best_type['AVG_ROI']:.1f}%")
+                st.write(f"€/€: {best_type['AVG_REVENUE_PER_EURO']:.2f}")
+                st.write(f"Promotions: {best_type['PROMOTION_COUNT']}")
         
-        # Section 6: Insights et Recommandations
-        st.markdown("---")
-        st.subheader("💡 Insights et Recommandations")
+        with col2:
+            with st.container(border=True):
+                st.markdown("#### 🌍 Meilleure Région")
+                st.info(f"**{best_region['REGION']}**")
+                st.write(f"ROI: {best_region['AVG_ROI']:.1f}%")
+                st.write(f"Part marché: {best_region['AVG_MARKET_SHARE']:.1f}%")
+                st.write(f"Promotions: {best_region['PROMOTION_COUNT']}")
         
-        if not type_df.empty and not region_df.empty:
-            # Meilleur type de promotion
-            best_type = type_df.loc[type_df['AVG_ROI'].idxmax()]
-            # Meilleure région
-            best_region = region_df.loc[region_df['AVG_ROI'].idxmax()]
-            # Meilleure catégorie
-            best_category = category_df.loc[category_df['AVG_ROI'].idxmax()] if not category_df.empty else None
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                with st.container(border=True):
-                    st.markdown("#### 🏆 Meilleur Type")
-                    st.success(f"**{best_type['PROMOTION_TYPE']}**")
-                    st.write(f"ROI: {best_type['AVG_ROI']:.1f}%")
-                    st.write(f"€/€: {best_type['AVG_REVENUE_PER_EURO']:.2f}")
-                    st.write(f"Promotions: {best_type['PROMOTION_COUNT']}")
-            
-            with col2:
+        with col3:
+            if best_category is not None:
                 with st.container(border=True):
-                    st.markdown("#### 🌍 Meilleure Région")
-                    st.info(f"**{best_region['REGION']}**")
-                    st.write(f"ROI: {best_region['AVG_ROI']:.1f}%")
-                    st.write(f"Part marché: {best_region['AVG_MARKET_SHARE']:.1f}%")
-                    st.write(f"Promotions: {best_region['PROMOTION_COUNT']}")
+                    st.markdown("#### 📦 Meilleure Catégorie")
+                    st.warning(f"**{best_category['PRODUCT_CATEGORY']}**")
+                    st.write(f"ROI: {best_category['AVG_ROI']:.1f}%")
+                    st.write(f"Réduction: {best_category['AVG_DISCOUNT_PCT']:.1f}%")
+                    st.write(f"Promotions: {best_category['PROMOTION_COUNT']}")
+
+def afficher_export(type_df, region_df, category_df):
+    """Section 7 : export du rapport complet"""
+    st.markdown("---")
+    sections = [
+        ReportSection("details", query=DETAILS_QUERY),
+        ReportSection("par_type", frame=type_df),
+        ReportSection("par_region", frame=region_df),
+        ReportSection("par_categorie", frame=category_df),
+    ]
+    render_export_button(session, sections, "rapport_promotions", key="promotions_export")
+
+def afficher_informations(overview_df):
+    """Informations sur les données"""
+    st.markdown("---")
+    with st.expander("ℹ️ Informations sur les données"):
+        overview = overview_df.iloc[0]
+        if overview['TOTAL_COUNT'] > 0:
+            st.write(f"**Statut des promotions:**")
+            st.write(f"• Actives: {overview['ACTIVE_COUNT']}")
+            st.write(f"• À venir: {overview['UPCOMING_COUNT']}")
+            st.write(f"• Expirées: {overview['EXPIRED_COUNT']}")
             
-            with col3:
-                if best_category is not None:
-                    with st.container(border=True):
-                        st.markdown("#### 📦 Meilleure Catégorie")
-                        st.warning(f"**{best_category['PRODUCT_CATEGORY']}**")
-                        st.write(f"ROI: {best_category['AVG_ROI']:.1f}%")
-                        st.write(f"Réduction: {best_category['AVG_DISCOUNT_PCT']:.1f}%")
-                        st.write(f"Promotions: {best_category['PROMOTION_COUNT']}")
-        
-        # Section 7: Export des données
-        st.markdown("---")
-        if st.button("📊 Générer Rapport Complet"):
-            with st.spinner("Préparation du rapport..."):
-                # Combiner les données
-                report_data = pd.concat([
-                    details_df,
-                    type_df,
-                    region_df,
-                    category_df
-                ], ignore_index=True)
-                
-                csv_data = report_data.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="📥 Télécharger Rapport (CSV)",
-                    data=csv_data,
-                    file_name=f"rapport_promotions_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
+            st.write(f"**Période couverte:** {overview['FIRST_START_DATE']} au {overview['LAST_END_DATE']}")
+            st.write(f"**Dernière mise à jour:** {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+            st.caption(format_cache_stats())
+
+
+# Sections de la page : (données requises, fonction d'affichage)
+SECTIONS = [
+    (['kpis'], afficher_kpis),
+    (['catalogue', 'catalogue_stats'], afficher_catalogue),
+    (['by_type'], afficher_par_type),
+    (['by_region'], afficher_par_region),
+    (['by_category'], afficher_par_categorie),
+    (['by_type', 'by_region', 'by_category'], afficher_insights),
+    (['by_type', 'by_region', 'by_category'], afficher_export),
+    (['overview'], afficher_informations)
+]
+
+# Loaders indépendants, exécutés en parallèle hors mode scan unique
+LOADERS = {
+    "kpis": load_promotion_kpis,
+    "catalogue": load_promotion_catalogue,
+    "catalogue_stats": load_promotion_catalogue_stats,
+    "by_type": load_promotion_by_type,
+    "by_region": load_promotion_by_region,
+    "by_category": load_promotion_by_category,
+    "time": load_time_analysis,
+    "overview": load_promotion_overview
+}
+
+# Loaders qui dépendent des filtres de la sidebar (et de la page du catalogue)
+FILTERED_LOADERS = {"catalogue", "catalogue_stats"}
+
+def afficher_sections(containers, data, errors, rendered):
+    """Afficher chaque section dès que toutes ses données sont disponibles"""
+    for i, (deps, render) in enumerate(SECTIONS):
+        if i in rendered or not all(d in data or d in errors for d in deps):
+            continue
+        rendered.add(i)
+        with containers[i]:
+            failed = [d for d in deps if d in errors]
+            if failed:
+                st.error(f"Erreur lors du chargement de {', '.join(failed)}: {errors[failed[0]]}")
+                continue
+            render(*[data[d] for d in deps])
+
+# Chargement et affichage des données
+if session:
+    try:
+        # Un conteneur par section : l'ordre d'affichage reste stable quel que
+        # soit l'ordre d'arrivée des résultats
+        containers = [st.container() for _ in SECTIONS]
+        data, errors, rendered = {}, {}, set()
+        catalogue_filters = build_catalogue_filters()
+        catalogue_page = catalogue_pager.request(catalogue_filters)
+        loader_args = {"catalogue": (catalogue_filters, catalogue_page), "catalogue_stats": (catalogue_filters,)}
         
-        # Informations sur les données
-        st.markdown("---")
-        with st.expander("ℹ️ Informations sur les données"):
-            if not details_df.empty:
-                active_count = len(details_df[details_df['PROMOTION_STATUS'] == 'ACTIVE'])
-                upcoming_count = len(details_df[details_df['PROMOTION_STATUS'] == 'UPCOMING'])
-                expired_count = len(details_df[details_df['PROMOTION_STATUS'] == 'EXPIRED'])
+        if single_scan_mode:
+            bundle = load_promotion_bundle(session)
+            data = {name: bundle[name] for name in LOADERS if name not in FILTERED_LOADERS}
+            data["catalogue"], data["catalogue_stats"] = local_catalogue(bundle["details"], bundle["sketches"], catalogue_filters, catalogue_page)
+            afficher_sections(containers, data, errors, rendered)
+        else:
+            with QueryExecutor() as executor:
+                for name, loader in LOADERS.items():
+                    executor.submit(name, loader, *loader_args.get(name, ()))
                 
-                st.write(f"**Statut des promotions:**")
-                st.write(f"• Actives: {active_count}")
-                st.write(f"• À venir: {upcoming_count}")
-                st.write(f"• Expirées: {expired_count}")
-                
-                st.write(f"**Période couverte:** {details_df['START_DATE'].min()} au {details_df['END_DATE'].max()}")
-                st.write(f"**Dernière mise à jour:** {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+                for result in executor.as_completed():
+                    if result.ok:
+                        data[result.name] = result.value
+                    else:
+                        errors[result.name] = result.error
+                    afficher_sections(containers, data, errors, rendered)
+            
+            with st.expander("⏱️ Temps de chargement des requêtes"):
+                st.dataframe(timings_frame(executor.timings()), hide_index=True)
         
     except Exception as e:
         st.error(f"Erreur lors du chargement des données: {str(e)}")
+        failed_query = describe_failure(run_id)
+        if failed_query:
+            st.caption(f"Requête en échec : {failed_query}")
         st.info("Vérifiez que la table ANALYTICS.PROMOTIONS_ACTIVE existe dans Snowflake.")
 else:
     st.warning("⏳ En attente de connexion à Snowflake...")
 
+render_debug_panel(run_id)
+
 # Footer
 st.markdown("---")
 st.caption("© 2024 AnyCompany - Analyse Promotions - Dernière mise à jour: " + datetime.now().strftime("%d/%m/%Y %H:%M"))
\ No newline at end of file
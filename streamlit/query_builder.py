@@ -0,0 +1,229 @@
+# query_builder.py
+"""
+Construction de requêtes paramétrées à partir des filtres de la sidebar.
+
+Les filtres (statut, type, plage de réduction, ROI minimum, année...) sont
+traduits en prédicats SQL avec paramètres liés (style `?` de Snowpark) et
+exécutés dans Snowflake, au lieu de télécharger tout le détail puis de le
+filtrer avec pandas. Le même FilterSet sait aussi s'appliquer à un DataFrame
+déjà chargé (mode scan unique) avec une sémantique identique : une valeur
+NULL ne satisfait aucun prédicat.
+
+Les noms de colonnes ne pouvant pas être liés, ils sont validés.
+"""
+import re
+from datetime import date, datetime
+
+import pandas as pd
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*(\.[A-Za-z_][A-Za-z0-9_$]*)*$")
+_ORDER_TERM = re.compile(r"^([A-Za-z_][A-Za-z0-9_$]*)(\s+(ASC|DESC))?(\s+NULLS\s+(FIRST|LAST))?$", re.IGNORECASE)
+
+
+def _check_identifier(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Identifiant SQL invalide : {name!r}")
+    return name
+
+
+# ============================================================================
+# PRÉDICATS
+# ============================================================================
+
+class Predicate:
+    """Prédicat simple sur une colonne : op parmi =, IN, >=, <=, <, >"""
+
+    def __init__(self, column, op, value):
+        self.column = _check_identifier(column)
+        self.op = op
+        self.value = value
+
+    def key(self):
+        value = tuple(self.value) if self.op == "IN" else self.value
+        return (self.column.upper(), self.op, value)
+
+    def to_sql(self):
+        if self.op == "IN":
+            placeholders = ", ".join("?" for _ in self.value)
+            return f"{self.column} IN ({placeholders})", list(self.value)
+        return f"{self.column} {self.op} ?", [self.value]
+
+    def mask(self, df):
+        series = df[self.column.upper()]
+        if self.op == "IN":
+            return series.isin(list(self.value))
+        if isinstance(series.dtype, pd.CategoricalDtype) and self.op != "=":
+            # Comparaison d'ordre sur les valeurs (category non ordonnée)
+            series = series.astype(object)
+        value = _comparable(series, self.value)
+        if self.op == "=":
+            return series == value
+        if self.op == ">=":
+            return series >= value
+        if self.op == "<=":
+            return series <= value
+        if self.op == ">":
+            return series > value
+        if self.op == "<":
+            return series < value
+        raise ValueError(f"Opérateur non supporté : {self.op}")
+
+
+def _comparable(series, value):
+    """Aligner le type d'une valeur date sur celui de la colonne pandas"""
+    if isinstance(value, (date, datetime)) and pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    return value
+
+
+def eq(column, value):
+    return Predicate(column, "=", value)
+
+
+def isin(column, values):
+    return Predicate(column, "IN", tuple(values))
+
+
+def ge(column, value):
+    return Predicate(column, ">=", value)
+
+
+def le(column, value):
+    return Predicate(column, "<=", value)
+
+
+def gt(column, value):
+    return Predicate(column, ">", value)
+
+
+def lt(column, value):
+    return Predicate(column, "<", value)
+
+
+def between(column, low, high):
+    """low <= column <= high (bornes incluses, comme BETWEEN)"""
+    return [ge(column, low), le(column, high)]
+
+
+def year_range(column, year):
+    """Filtre sur une année exprimé en plage de dates (exploite le clustering sur la date)"""
+    year = int(year)
+    return [ge(column, date(year, 1, 1)), lt(column, date(year + 1, 1, 1))]
+
+
+class KeysetPredicate:
+    """Position strictement après un curseur (valeur de tri, id) dans l'ordre
+    `tri ASC|DESC NULLS LAST, id ASC|DESC` (pagination par clé)"""
+
+    def __init__(self, sort_column, id_column, descending, cursor):
+        self.sort_column = _check_identifier(sort_column)
+        self.id_column = _check_identifier(id_column)
+        self.descending = descending
+        self.sort_value, self.id_value = cursor
+
+    def key(self):
+        return ("KEYSET", self.sort_column.upper(), self.id_column.upper(),
+                self.descending, self.sort_value, self.id_value)
+
+    def to_sql(self):
+        op = "<" if self.descending else ">"
+        s, k = self.sort_column, self.id_column
+        if self.sort_value is None:
+            # Curseur dans la zone des NULL (en fin d'ordre) : seul l'id départage
+            return f"({s} IS NULL AND {k} {op} ?)", [self.id_value]
+        return (
+            f"({s} {op} ? OR ({s} = ? AND {k} {op} ?) OR {s} IS NULL)",
+            [self.sort_value, self.sort_value, self.id_value]
+        )
+
+    def mask(self, df):
+        sort = df[self.sort_column.upper()]
+        ids = df[self.id_column.upper()]
+        after = (lambda a, b: a < b) if self.descending else (lambda a, b: a > b)
+        if self.sort_value is None:
+            return sort.isna() & after(ids, self.id_value)
+        value = _comparable(sort, self.sort_value)
+        return after(sort, value) | ((sort == value) & after(ids, self.id_value)) | sort.isna()
+
+
+def keyset_after(sort_column, id_column, descending, cursor):
+    """Prédicat de page suivante ; None pour la première page"""
+    if cursor is None:
+        return None
+    return KeysetPredicate(sort_column, id_column, descending, cursor)
+
+
+class FilterSet:
+    """Conjonction de prédicats ; les None sont ignorés (filtre désactivé)"""
+
+    def __init__(self, *predicates):
+        self.predicates = []
+        for predicate in predicates:
+            if predicate is None:
+                continue
+            if isinstance(predicate, (list, tuple)):
+                self.predicates.extend(p for p in predicate if p is not None)
+            else:
+                self.predicates.append(predicate)
+
+    def key(self):
+        """Tuple hashable identifiant la combinaison de filtres"""
+        return tuple(p.key() for p in self.predicates)
+
+    def where_sql(self, base_predicates=None):
+        """Clause WHERE et paramètres associés"""
+        clauses = list(base_predicates or [])
+        params = []
+        for predicate in self.predicates:
+            sql, values = predicate.to_sql()
+            clauses.append(sql)
+            params.extend(values)
+        if not clauses:
+            return "", params
+        return "WHERE " + "\n  AND ".join(clauses), params
+
+    def mask(self, df):
+        """Masque booléen équivalent pour un DataFrame (colonnes en majuscules)"""
+        result = pd.Series(True, index=df.index)
+        for predicate in self.predicates:
+            result &= predicate.mask(df).fillna(False).astype(bool)
+        return result
+
+    def apply(self, df):
+        return df[self.mask(df)]
+
+
+# ============================================================================
+# REQUÊTES
+# ============================================================================
+
+def select_query(table, columns, filters=None, base_predicates=None,
+                 order_by=None, limit=None, offset=None):
+    """SELECT columns FROM table WHERE ... ORDER BY ... LIMIT n OFFSET m"""
+    filters = filters or FilterSet()
+    where, params = filters.where_sql(base_predicates)
+    query = "SELECT\n    " + ",\n    ".join(columns) + f"\nFROM {_check_identifier(table)}"
+    if where:
+        query += "\n" + where
+    if order_by:
+        for term in order_by:
+            if not _ORDER_TERM.match(term.strip()):
+                raise ValueError(f"Tri invalide : {term!r}")
+        query += "\nORDER BY " + ", ".join(order_by)
+    if limit is not None:
+        # Entiers validés, insérés littéralement (LIMIT n'accepte pas toujours un bind)
+        query += f"\nLIMIT {int(limit)}"
+        if offset:
+            query += f" OFFSET {int(offset)}"
+    return query, tuple(params)
+
+
+def aggregate_query(table, expressions, filters=None, base_predicates=None):
+    """SELECT expr AS nom, ... FROM table WHERE ... (une ligne)"""
+    filters = filters or FilterSet()
+    where, params = filters.where_sql(base_predicates)
+    select = ",\n    ".join(f"{expr} AS {_check_identifier(name)}" for name, expr in expressions.items())
+    query = f"SELECT\n    {select}\nFROM {_check_identifier(table)}"
+    if where:
+        query += "\n" + where
+    return query, tuple(params)
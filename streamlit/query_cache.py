@@ -0,0 +1,320 @@
+# query_cache.py
+"""
+Cache partagé des résultats de requêtes Snowflake pour les dashboards AnyCompany.
+
+Utilisé par sales_dashboard.py, promotion_analysis.py et marketing_roi.py :
+- clé = texte SQL normalisé + paramètres liés
+- expiration (TTL) avec stale-while-revalidate : une entrée expirée est encore
+  servie pendant `stale_ttl` secondes pendant qu'un thread la rafraîchit
+- éviction LRU bornée en nombre d'entrées et en mémoire
+- compteurs hits / misses / stale / évictions
+- chaque appel de run() est mesuré par query_metrics (durée, lignes, query id)
+- résultats conservés aux types compacts (frame_dtypes : category, chaînes
+  Arrow, int32), taille comptée après compactage
+
+Les DataFrames renvoyés sont partagés entre les utilisateurs : ne jamais les
+modifier en place (utiliser .copy() avant de filtrer).
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from query_metrics import execute_query, get_query_metrics
+
+DEFAULT_TTL = 300                       # 5 minutes, comme l'ancien @st.cache_data(ttl=300)
+DEFAULT_STALE_TTL = 3600                # durée max pendant laquelle une entrée expirée reste servie
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024   # 512 Mo
+
+
+# ============================================================================
+# CLÉS DE CACHE
+# ============================================================================
+
+def normalize_sql(query):
+    """Normaliser un texte SQL (commentaires, espaces, ';' final) hors littéraux"""
+    out = []
+    i = 0
+    n = len(query)
+    pending_space = False
+    while i < n:
+        c = query[i]
+        if c in ("'", '"'):
+            # Littéral chaîne ou identifiant quoté : copié tel quel ('' = quote échappée)
+            j = i + 1
+            while j < n:
+                if query[j] == c and j + 1 < n and query[j + 1] == c:
+                    j += 2
+                elif query[j] == c:
+                    break
+                else:
+                    j += 1
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+            out.append(query[i:j + 1])
+            i = j + 1
+        elif c == "-" and query.startswith("--", i):
+            # Commentaire ligne
+            j = query.find("\n", i)
+            i = n if j == -1 else j
+            pending_space = True
+        elif c == "/" and query.startswith("/*", i):
+            # Commentaire bloc
+            j = query.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            pending_space = True
+        elif c.isspace():
+            pending_space = True
+            i += 1
+        else:
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+            out.append(c.upper())
+            i += 1
+    return "".join(out).rstrip(";").strip()
+
+
+def make_cache_key(query, params=None):
+    """Construire la clé de cache à partir du SQL normalisé et des paramètres"""
+    payload = normalize_sql(query) + "\x00" + repr(tuple(params) if params is not None else ())
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_size(value):
+    """Estimer l'empreinte mémoire d'un résultat (octets)"""
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    try:
+        return int(value.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return sys.getsizeof(value)
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class _Entry:
+    __slots__ = ("value", "size", "loaded_at", "ttl")
+
+    def __init__(self, value, size, loaded_at, ttl):
+        self.value = value
+        self.size = size
+        self.loaded_at = loaded_at
+        self.ttl = ttl
+
+    def age(self, now):
+        return now - self.loaded_at
+
+
+class _KeyLock:
+    """Verrou de chargement d'une clé et nombre de threads qui le tiennent ou l'attendent"""
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class QueryCache:
+    """Cache LRU thread-safe avec TTL et stale-while-revalidate"""
+
+    def __init__(self, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._refreshing = set()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "stale_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lecture / écriture
+    # ------------------------------------------------------------------
+    def get_or_load(self, key, loader, ttl=None):
+        """Renvoyer la valeur en cache ou l'obtenir via loader()"""
+        return self.lookup(key, loader, ttl=ttl)[0]
+
+    def lookup(self, key, loader, ttl=None):
+        """Comme get_or_load, avec l'issue de la lecture : (valeur, 'hit' | 'stale' | 'miss')"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = entry.age(now)
+                if age <= entry.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry.value, "hit"
+                if age <= entry.ttl + self.stale_ttl:
+                    # Entrée périmée : servie immédiatement, rafraîchie en arrière-plan
+                    self._entries.move_to_end(key)
+                    self._counters["stale_hits"] += 1
+                    self._schedule_refresh(key, loader, ttl)
+                    return entry.value, "stale"
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.users += 1
+
+        # Un seul chargement par clé : les autres lecteurs attendent le résultat
+        try:
+            with key_lock.lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.age(time.time()) <= entry.ttl:
+                        self._entries.move_to_end(key)
+                        self._counters["hits"] += 1
+                        return entry.value, "hit"
+                    self._counters["misses"] += 1
+                value = loader()
+                self._store(key, value, ttl)
+                return value, "miss"
+        finally:
+            # Verrou retiré par le dernier thread qui le tenait ou l'attendait
+            # (résultat mis en cache, trop gros ou loader en échec)
+            with self._lock:
+                key_lock.users -= 1
+                if key_lock.users == 0:
+                    del self._key_locks[key]
+
+    def run(self, session, query, params=None, ttl=None, name=None):
+        """Exécuter une requête via le cache, mesurée par query_metrics"""
+        key = make_cache_key(query, params)
+        fetched = {}
+
+        def loader():
+            frame = execute_query(session, query, params, info=fetched)
+            fetched["bytes"] = estimate_size(frame)
+            return frame
+
+        with get_query_metrics().track(query, params, fingerprint=key, name=name) as record:
+            try:
+                value, record.cache = self.lookup(key, loader, ttl=ttl)
+            finally:
+                # Requête exécutée par cet appel (pas par un rafraîchissement en arrière-plan)
+                record.query_id = fetched.get("query_id")
+                record.bytes = fetched.get("bytes", 0)
+            record.rows = len(value)
+            return value
+
+    def _store(self, key, value, ttl):
+        size = estimate_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if size > self.max_bytes:
+                # Résultat trop gros pour être conservé : servi sans mise en cache
+                return
+            self._entries[key] = _Entry(value, size, time.time(), ttl)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._counters["evictions"] += 1
+
+    # ------------------------------------------------------------------
+    # Rafraîchissement en arrière-plan
+    # ------------------------------------------------------------------
+    def _schedule_refresh(self, key, loader, ttl):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        thread = threading.Thread(
+            target=self._refresh, args=(key, loader, ttl),
+            name="query-cache-refresh", daemon=True
+        )
+        thread.start()
+
+    def _refresh(self, key, loader, ttl):
+        try:
+            value = loader()
+            self._store(key, value, ttl)
+            with self._lock:
+                self._counters["refreshes"] += 1
+        except Exception:
+            # On garde l'ancienne valeur ; le prochain accès retentera
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # ------------------------------------------------------------------
+    # Administration
+    # ------------------------------------------------------------------
+    def invalidate(self, query=None, params=None):
+        """Supprimer une entrée (ou tout le cache si query est None)"""
+        with self._lock:
+            if query is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(make_cache_key(query, params), None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def stats(self):
+        """Compteurs du cache (hits, misses, stale, évictions, taille)"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+            return stats
+
+
+# ============================================================================
+# INSTANCE PARTAGÉE PAR LES DASHBOARDS
+# ============================================================================
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_query_cache():
+    """Instance unique du cache pour tout le processus Streamlit"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryCache()
+        return _shared_cache
+
+
+def run_query(session, query, params=None, ttl=None, name=None):
+    """Raccourci : exécuter une requête via le cache partagé (name : loader affiché dans les mesures)"""
+    return get_query_cache().run(session, query, params=params, ttl=ttl, name=name)
+
+
+def format_cache_stats():
+    """Résumé lisible des compteurs du cache partagé"""
+    stats = get_query_cache().stats()
+    return (
+        f"Cache requêtes : {stats['hits']} hits, {stats['stale_hits']} stale, "
+        f"{stats['misses']} misses ({stats['hit_rate']:.0%}) - "
+        f"{stats['entries']} entrées, {stats['bytes'] / 1024 / 1024:.1f} Mo"
+    )
@@ -0,0 +1,185 @@
+# query_executor.py
+"""
+Exécution concurrente des loaders des dashboards.
+
+Les loaders indépendants (KPI, détail, par type, par région...) sont soumis
+en parallèle au lieu d'être appelés l'un après l'autre : le temps avant le
+premier affichage devient la latence de la requête la plus rapide, et le temps
+total celui de la plus lente au lieu de la somme.
+
+submit() soumet un callable Python (typiquement un loader qui passe par le
+cache partagé) à un pool de threads.
+
+as_completed() renvoie les résultats au fil de l'eau pour un rendu progressif,
+avec un timeout propre à chaque requête ; timings() expose la durée de chacune.
+Le délai court à partir de la prise en charge par un thread du pool, pas de
+la soumission : une tâche en file d'attente n'est pas pénalisée par les
+autres. À l'expiration, une tâche encore en file est annulée ; un loader déjà
+en cours ne peut pas être interrompu (il se termine dans son thread, son
+résultat est ignoré), sauf par le callable cancel éventuellement fourni à
+submit().
+Chaque tâche s'exécute dans loader_scope(nom) : ses requêtes sont attribuées
+à ce loader dans query_metrics.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from query_metrics import loader_scope
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 120  # secondes par requête
+QUEUE_POLL = 0.5       # secondes : tâches en file d'attente, délai pas encore démarré
+
+
+class QueryResult:
+    """Résultat d'un loader : valeur ou erreur, et durée d'exécution"""
+
+    def __init__(self, name, value=None, error=None, elapsed=None):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class _Task:
+    __slots__ = ("name", "future", "timeout", "deadline", "cancel", "started_at", "finished_at")
+
+    def __init__(self, name, future, timeout, cancel):
+        self.name = name
+        self.future = future
+        self.timeout = timeout
+        self.deadline = None        # fixé au début de l'exécution
+        self.cancel = cancel
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+            self.deadline = self.started_at + self.timeout
+
+
+class QueryExecutor:
+    """Soumettre des loaders indépendants et récupérer leurs résultats au fil de l'eau"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dashboard-loader")
+        self._tasks = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
+
+    # ------------------------------------------------------------------
+    # Soumission
+    # ------------------------------------------------------------------
+    def submit(self, name, loader, *args, timeout=None, cancel=None, **kwargs):
+        """Soumettre loader(*args, **kwargs) sous le nom `name` ; cancel() appelé à l'expiration du délai"""
+        timeout = self.timeout if timeout is None else timeout
+        task = _Task(name, None, timeout, cancel)
+        # Le thread du pool hérite de la page courante (query_metrics)
+        context = contextvars.copy_context()
+
+        def run():
+            task.start()
+            try:
+                with loader_scope(name):
+                    return loader(*args, **kwargs)
+            finally:
+                task.finished_at = time.monotonic()
+
+        task.future = self._pool.submit(context.run, run)
+        with self._lock:
+            self._tasks[name] = task
+        return task.future
+
+    # ------------------------------------------------------------------
+    # Récupération
+    # ------------------------------------------------------------------
+    def as_completed(self):
+        """Générer les QueryResult dans l'ordre de fin d'exécution (timeouts inclus)"""
+        with self._lock:
+            pending = {task.future: task for name, task in self._tasks.items() if name not in self._results}
+
+        while pending:
+            now = time.monotonic()
+            # Tâche encore en file : son délai démarrera avec son exécution
+            deadlines = [task.deadline if task.deadline is not None else now + QUEUE_POLL
+                         for task in pending.values()]
+            done, _ = wait(list(pending), timeout=max(0.0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                task = pending.pop(future)
+                yield self._record(task)
+
+            # Requêtes ayant dépassé leur délai
+            now = time.monotonic()
+            for future, task in list(pending.items()):
+                if task.deadline is not None and now >= task.deadline:
+                    pending.pop(future)
+                    future.cancel()
+                    if task.cancel is not None:
+                        try:
+                            task.cancel()
+                        except Exception:
+                            pass
+                    error = TimeoutError(f"Requête '{task.name}' interrompue après {task.timeout:.0f}s")
+                    yield self._store(QueryResult(task.name, error=error, elapsed=self._elapsed(task)))
+
+    def gather(self):
+        """Attendre tous les loaders et renvoyer {nom: QueryResult}"""
+        for _ in self.as_completed():
+            pass
+        with self._lock:
+            return dict(self._results)
+
+    def timings(self):
+        """Durée d'exécution (secondes) de chaque loader terminé"""
+        with self._lock:
+            return {name: result.elapsed for name, result in self._results.items()}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Interne
+    # ------------------------------------------------------------------
+    def _record(self, task):
+        error = task.future.exception()
+        value = None if error is not None else task.future.result()
+        return self._store(QueryResult(task.name, value=value, error=error, elapsed=self._elapsed(task)))
+
+    def _store(self, result):
+        with self._lock:
+            self._results[result.name] = result
+        return result
+
+    def _elapsed(self, task):
+        if task.started_at is None:
+            return None
+        end = task.finished_at if task.finished_at is not None else time.monotonic()
+        return end - task.started_at
+
+
+def timings_frame(timings):
+    """Tableau des durées par loader, du plus lent au plus rapide"""
+    rows = [
+        {"Requête": name, "Durée (s)": round(elapsed, 3) if elapsed is not None else None}
+        for name, elapsed in timings.items()
+    ]
+    frame = pd.DataFrame(rows, columns=["Requête", "Durée (s)"])
+    return frame.sort_values("Durée (s)", ascending=False, na_position="first").reset_index(drop=True)
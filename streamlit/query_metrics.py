@@ -0,0 +1,305 @@
+# query_metrics.py
+"""
+Instrumentation des requêtes des dashboards AnyCompany.
+
+Chaque passage par le cache partagé (query_cache.run, kpi_bundle) produit un
+QueryRecord : page, loader, durée, lignes renvoyées, octets rapatriés du
+warehouse (0 si servi par le cache), issue du cache (hit / stale / miss),
+identifiant de requête warehouse et erreur éventuelle.
+
+Les enregistrements sont :
+- conservés en mémoire (les MAX_RECORDS derniers) pour le panneau de
+  diagnostic (debug_panel.py) ;
+- agrégés par page × loader pour tout le processus, donc toutes sessions
+  confondues : appels, taux de hit, p50 / p95 des exécutions réelles ;
+- écrits en JSON, une ligne par requête, dans le fichier ANYCOMPANY_QUERY_LOG
+  (défaut local/query_metrics.jsonl, vide = pas de fichier). Au démarrage, ce
+  fichier réalimente les agrégats : les percentiles survivent aux redémarrages.
+
+La page et le loader courants sont portés par des contextvars : start_run()
+en tête de page, loader_scope() autour d'un loader (QueryExecutor.submit le
+fait pour chaque tâche soumise).
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from frame_dtypes import compact_frame
+from snapshot_store import route_query
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LOG_PATH = os.path.join(ROOT_DIR, "local", "query_metrics.jsonl")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+
+MAX_RECORDS = 2000          # requêtes récentes gardées en mémoire
+LATENCY_WINDOW = 500        # exécutions par loader retenues pour p50 / p95
+SLOW_QUERY_SECONDS = float(os.environ.get("ANYCOMPANY_SLOW_QUERY_SECONDS", 2.0))
+
+_page = contextvars.ContextVar("query_page", default=None)
+_run = contextvars.ContextVar("query_run", default=None)
+_loader = contextvars.ContextVar("query_loader", default=None)
+
+
+# ============================================================================
+# CONTEXTE (page, exécution, loader)
+# ============================================================================
+
+def start_run(page):
+    """Début d'une exécution de page ; renvoie l'identifiant de l'exécution"""
+    run_id = uuid.uuid4().hex[:12]
+    _page.set(page)
+    _run.set(run_id)
+    _loader.set(None)
+    return run_id
+
+
+def current_page():
+    """Page de l'exécution courante (None hors d'une page)"""
+    return _page.get()
+
+
+@contextmanager
+def loader_scope(name):
+    """Attribuer les requêtes du bloc au loader `name`"""
+    token = _loader.set(name)
+    try:
+        yield
+    finally:
+        _loader.reset(token)
+
+
+def execute_query(session, query, params=None, info=None):
+    """
+    Exécuter une requête et renvoyer un DataFrame pandas aux types compacts.
+
+    La requête passe par collect_nowait() pour connaître son identifiant
+    warehouse (info["query_id"]) avant même d'en attendre le résultat.
+    Le résultat est compacté (frame_dtypes) avant d'être mis en cache.
+    Les requêtes couvertes par l'instantané Parquet publié sont servies par
+    celui-ci (snapshot_store, info["source"] = "snapshot").
+    """
+    session, source = route_query(session, query)
+    if info is not None:
+        info["source"] = source
+    if params is None:
+        job = session.sql(query).collect_nowait()
+    else:
+        job = session.sql(query, params=list(params)).collect_nowait()
+    if info is not None:
+        info["query_id"] = getattr(job, "query_id", None)
+    return compact_frame(job.result("pandas"))
+
+
+# ============================================================================
+# ENREGISTREMENTS
+# ============================================================================
+
+class QueryRecord:
+    """Mesures d'un appel de requête (exécutée ou servie par le cache)"""
+
+    __slots__ = ("timestamp", "page", "run", "loader", "fingerprint", "sql", "params",
+                 "cache", "elapsed", "rows", "bytes", "query_id", "error")
+
+    def __init__(self, sql, params=None, fingerprint=None, name=None):
+        self.timestamp = time.time()
+        self.page = _page.get()
+        self.run = _run.get()
+        self.loader = name or _loader.get() or f"sql:{(fingerprint or '')[:8]}"
+        self.fingerprint = fingerprint
+        self.sql = " ".join(sql.split())[:500]
+        self.params = len(params) if params is not None else 0
+        self.cache = None
+        self.elapsed = None
+        self.rows = None
+        self.bytes = 0
+        self.query_id = None
+        self.error = None
+
+    @property
+    def executed(self):
+        """Vrai si la requête a réellement été envoyée au warehouse"""
+        return self.cache == "miss"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _percentile(values, q):
+    """Percentile par interpolation linéaire (values non vide)"""
+    values = sorted(values)
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class _LoaderStats:
+    __slots__ = ("calls", "hits", "errors", "durations", "rows")
+
+    def __init__(self, window):
+        self.calls = 0
+        self.hits = 0
+        self.errors = 0
+        self.durations = deque(maxlen=window)
+        self.rows = deque(maxlen=window)
+
+    def add(self, cache, elapsed, rows, error):
+        self.calls += 1
+        if cache in ("hit", "stale"):
+            self.hits += 1
+        if error:
+            self.errors += 1
+        elif cache == "miss" and elapsed is not None:
+            self.durations.append(elapsed)
+            if rows is not None:
+                self.rows.append(rows)
+
+
+class QueryMetrics:
+    """Enregistrements récents, agrégats par loader et journal JSON"""
+
+    def __init__(self, log_path=None, max_records=MAX_RECORDS, window=LATENCY_WINDOW):
+        self.window = window
+        self.log_path = log_path or None
+        self._records = deque(maxlen=max_records)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._logger = None
+        if self.log_path:
+            self._load_history()
+            self._logger = self._open_log()
+
+    # ------------------------------------------------------------------
+    # Mesure
+    # ------------------------------------------------------------------
+    @contextmanager
+    def track(self, sql, params=None, fingerprint=None, name=None):
+        """Mesurer un appel ; l'appelant renseigne cache, rows, bytes, query_id"""
+        record = QueryRecord(sql, params, fingerprint, name)
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.elapsed = time.perf_counter() - started
+            self.add(record)
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+            self._stats_for(record.page, record.loader).add(record.cache, record.elapsed, record.rows, record.error)
+        if self._logger is not None:
+            try:
+                self._logger.info(json.dumps(record.as_dict(), ensure_ascii=False, default=str))
+            except Exception:
+                pass
+
+    def _stats_for(self, page, loader):
+        key = (page, loader)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _LoaderStats(self.window)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Consultation
+    # ------------------------------------------------------------------
+    def records(self, run=None):
+        """Enregistrements récents (ceux d'une exécution de page si run est donné)"""
+        with self._lock:
+            return [r for r in self._records if run is None or r.run == run]
+
+    def last_error(self, run):
+        """Dernier appel en échec d'une exécution de page (None si aucun)"""
+        failed = [r for r in self.records(run) if r.error]
+        return failed[-1] if failed else None
+
+    def slow_queries(self, threshold=SLOW_QUERY_SECONDS, page=None, limit=20):
+        """Exécutions réelles les plus lentes au-delà du seuil, toutes sessions"""
+        slow = [
+            r for r in self.records()
+            if r.executed and r.elapsed >= threshold and (page is None or r.page == page)
+        ]
+        return sorted(slow, key=lambda r: r.elapsed, reverse=True)[:limit]
+
+    def summary(self, page=None):
+        """Agrégats par loader : appels, hits, erreurs, p50 / p95 / max des exécutions"""
+        with self._lock:
+            items = [(key, stats) for key, stats in self._stats.items() if page is None or key[0] == page]
+            rows = []
+            for (loader_page, loader), stats in items:
+                durations = list(stats.durations)
+                rows.append({
+                    "page": loader_page,
+                    "loader": loader,
+                    "calls": stats.calls,
+                    "hit_rate": stats.hits / stats.calls if stats.calls else 0.0,
+                    "errors": stats.errors,
+                    "executions": len(durations),
+                    "p50_s": _percentile(durations, 0.5) if durations else None,
+                    "p95_s": _percentile(durations, 0.95) if durations else None,
+                    "max_s": max(durations) if durations else None,
+                    "avg_rows": sum(stats.rows) / len(stats.rows) if stats.rows else None,
+                })
+        return sorted(rows, key=lambda row: row["p95_s"] or 0.0, reverse=True)
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+    def _open_log(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            handler = RotatingFileHandler(self.log_path, maxBytes=LOG_MAX_BYTES,
+                                          backupCount=LOG_BACKUPS, encoding="utf-8")
+        except OSError:
+            # Système de fichiers en lecture seule (Streamlit in Snowflake...)
+            self.log_path = None
+            return None
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger(f"anycompany.query_metrics.{id(self)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        return logger
+
+    def _load_history(self):
+        """Réalimenter les agrégats à partir du journal existant"""
+        try:
+            with open(self.log_path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+                stats = self._stats_for(record.get("page"), record.get("loader"))
+                stats.add(record.get("cache"), record.get("elapsed"), record.get("rows"), record.get("error"))
+            except (ValueError, AttributeError):
+                continue
+
+
+# ============================================================================
+# INSTANCE PARTAGÉE PAR LES DASHBOARDS
+# ============================================================================
+
+_shared_metrics = None
+_shared_lock = threading.Lock()
+
+
+def get_query_metrics():
+    """Instance unique pour tout le processus Streamlit"""
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = QueryMetrics(os.environ.get("ANYCOMPANY_QUERY_LOG", DEFAULT_LOG_PATH))
+        return _shared_metrics
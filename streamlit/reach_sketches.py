@@ -0,0 +1,162 @@
+# reach_sketches.py
+"""
+Portée (clients distincts) d'une sélection de promotions ou de campagnes.
+
+unique_customers_reached (PROMOTIONS_ACTIVE) et unique_customers_acquired
+(MARKETING_PERFORMANCE) sont des COUNT(DISTINCT merchant_entity) par ligne :
+leur somme sur plusieurs promotions compte plusieurs fois un client touché
+par plusieurs d'entre elles. Les esquisses HyperLogLog quotidiennes de
+ANALYTICS.customer_reach_sketches (sql/customer_reach_sketches.sql) se
+fusionnent au contraire sans double compte (MAX registre par registre) :
+
+- côté warehouse : reach_query() construit la requête de fusion et
+  d'estimation pour une sélection filtrée, éventuellement par groupe ;
+- côté Python : ReachSketches charge une fois les registres de chaque
+  promotion / campagne (jours déjà fusionnés) ; la portée d'une sélection
+  quelconque se calcule ensuite en quelques millisecondes (numpy).
+
+Paramètres identiques au script SQL : m = 4096 registres (p = 12), erreur
+type ≈ 1,6 %, correction petite cardinalité (comptage linéaire).
+"""
+import numpy as np
+
+from query_builder import FilterSet
+from query_metrics import execute_query
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+SKETCH_TABLE = "ANALYTICS.CUSTOMER_REACH_SKETCHES"
+PROMOTION = "PROMOTION"
+CAMPAIGN = "CAMPAIGN"
+
+# Registres par promotion / campagne, tous jours confondus
+SKETCHES_QUERY = f"""
+SELECT
+    sketch_key,
+    register_index,
+    MAX(register_rank) AS register_rank
+FROM {SKETCH_TABLE}
+WHERE sketch_type = ?
+GROUP BY sketch_key, register_index
+"""
+
+# Estimation HyperLogLog sur les registres fusionnés (une ligne par registre
+# non vide) ; α·m² précalculé (littéral court, sans débordement décimal)
+ESTIMATE_SQL = f"""ROUND(
+        CASE
+            WHEN {ALPHA * REGISTERS * REGISTERS:.4f}
+                 / (SUM(POWER(2, -register_rank)) + {REGISTERS} - COUNT(*)) <= 2.5 * {REGISTERS}
+                 AND COUNT(*) < {REGISTERS}
+            THEN {REGISTERS} * LN({REGISTERS} / ({REGISTERS} - COUNT(*)))
+            ELSE {ALPHA * REGISTERS * REGISTERS:.4f}
+                 / (SUM(POWER(2, -register_rank)) + {REGISTERS} - COUNT(*))
+        END
+    )"""
+
+
+# ============================================================================
+# ESTIMATION ET FUSION EN PYTHON
+# ============================================================================
+
+def estimate(registers):
+    """Cardinalité estimée d'un tableau de registres (dernier axe = m registres)"""
+    registers = np.asarray(registers)
+    empty = (registers == 0).sum(axis=-1)
+    raw = ALPHA * REGISTERS * REGISTERS / np.exp2(-registers.astype(np.float64)).sum(axis=-1)
+    small = (raw <= 2.5 * REGISTERS) & (empty > 0)
+    linear = REGISTERS * np.log(REGISTERS / np.maximum(empty, 1))
+    return np.rint(np.where(small, linear, raw)).astype(np.int64)
+
+
+class HyperLogLog:
+    """Esquisse HyperLogLog (m registres) fusionnable"""
+
+    def __init__(self, registers=None):
+        if registers is None:
+            registers = np.zeros(REGISTERS, dtype=np.uint8)
+        self.registers = registers
+
+    @classmethod
+    def from_rows(cls, indices, ranks):
+        """Esquisse à partir des lignes (register_index, register_rank) de la table"""
+        registers = np.zeros(REGISTERS, dtype=np.uint8)
+        np.maximum.at(registers, np.asarray(indices, dtype=np.int64), np.asarray(ranks, dtype=np.uint8))
+        return cls(registers)
+
+    def merge(self, other):
+        """Union des deux ensembles"""
+        return HyperLogLog(np.maximum(self.registers, other.registers))
+
+    def estimate(self):
+        return int(estimate(self.registers))
+
+
+class ReachSketches:
+    """Esquisses de toutes les promotions (ou campagnes) : une ligne de registres par clé"""
+
+    def __init__(self, keys, registers):
+        self.keys = list(keys)
+        self.registers = registers
+        self._positions = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Résultat de SKETCHES_QUERY -> matrice clés × registres"""
+        keys, codes = np.unique(frame["SKETCH_KEY"].astype(str).to_numpy(), return_inverse=True)
+        registers = np.zeros((len(keys), REGISTERS), dtype=np.uint8)
+        np.maximum.at(
+            registers,
+            (codes, frame["REGISTER_INDEX"].to_numpy(dtype=np.int64)),
+            frame["REGISTER_RANK"].to_numpy(dtype=np.uint8)
+        )
+        return cls(keys, registers)
+
+    def sketch(self, keys):
+        """Esquisse fusionnée d'une sélection (clés inconnues = aucune vente)"""
+        positions = [self._positions[key] for key in set(map(str, keys)) if key in self._positions]
+        if not positions:
+            return HyperLogLog()
+        return HyperLogLog(self.registers[positions].max(axis=0))
+
+    def reach(self, keys):
+        """Nombre estimé de clients distincts de la sélection"""
+        return self.sketch(keys).estimate()
+
+
+def load_reach_sketches(session, sketch_type, info=None):
+    """Esquisses de toutes les promotions (PROMOTION) ou campagnes (CAMPAIGN)"""
+    return ReachSketches.from_frame(execute_query(session, SKETCHES_QUERY, [sketch_type], info=info))
+
+
+# ============================================================================
+# FUSION CÔTÉ WAREHOUSE
+# ============================================================================
+
+def reach_query(table, key_column, sketch_type, group_columns=(), filters=None,
+                base_predicates=None, name="total_customers"):
+    """
+    Portée estimée des lignes de table retenues par les filtres, par groupe
+    (une seule ligne sans groupe). Renvoie (requête, paramètres) ; les
+    groupes sans vente sont absents du résultat.
+    """
+    filters = filters or FilterSet()
+    where, params = filters.where_sql(base_predicates)
+    groups = list(group_columns)
+    selection = ", ".join([key_column] + groups)
+    inner_groups = "".join(f"t.{column}, " for column in groups)
+    outer_groups = ", ".join(groups)
+    query = f"""
+    SELECT {outer_groups + ", " if groups else ""}{ESTIMATE_SQL} AS {name}
+    FROM (
+        SELECT {inner_groups}s.register_index, MAX(s.register_rank) AS register_rank
+        FROM (SELECT {selection} FROM {table} {where}) t
+        INNER JOIN {SKETCH_TABLE} s
+            ON s.sketch_type = '{sketch_type}'
+            AND s.sketch_key = t.{key_column}
+        GROUP BY {inner_groups}s.register_index
+    ) merged
+    {"GROUP BY " + outer_groups if groups else ""}
+    """
+    return query, tuple(params)
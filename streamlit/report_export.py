@@ -0,0 +1,173 @@
+# report_export.py
+"""
+Export du rapport complet (bouton « 📊 Générer Rapport Complet »).
+
+Le rapport est une archive zip contenant un fichier par section (détail,
+par type, par région, par catégorie), en CSV ou en Parquet : chaque section
+garde son propre schéma au lieu d'une union de colonnes hétérogènes.
+
+Le détail est lu par lots dans le warehouse (to_pandas_batches) et chaque
+lot est écrit dans l'archive dès sa réception : pendant la construction, la
+mémoire du processus reste bornée à un lot, quel que soit le volume
+d'historique. L'archive est écrite dans un fichier temporaire sur disque, et
+seulement au clic (données différées de st.download_button, exécutées dans
+un thread séparé de la page ; data appelable et on_click="ignore" :
+Streamlit 1.50 ou plus récent). Streamlit garde ensuite l'archive entière en
+mémoire pour la servir : le téléchargement coûte la taille du zip compressé.
+
+    sections = [
+        ReportSection("details", query=DETAILS_QUERY),
+        ReportSection("par_type", frame=type_df),
+    ]
+    render_export_button(session, sections, "rapport_promotions", key="promotions_export")
+"""
+import contextvars
+import io
+import tempfile
+import zipfile
+from datetime import datetime
+
+import streamlit as st
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle : uniquement pour l'export Parquet
+    pa = pq = None
+
+from query_cache import estimate_size
+from query_metrics import get_query_metrics
+
+# Libellé -> extension des fichiers de l'archive
+FORMATS = {"CSV": "csv", "Parquet": "parquet"}
+
+
+class ReportSection:
+    """Section du rapport : requête lue par lots, ou DataFrame déjà chargé (agrégats)"""
+
+    def __init__(self, name, query=None, frame=None):
+        self.name = name
+        self.query = query
+        self.frame = frame
+
+    def batches(self, session):
+        if self.query is None:
+            yield self.frame
+            return
+
+        # Requête d'export mesurée comme les autres (loader export:<section>)
+        with get_query_metrics().track(self.query, name=f"export:{self.name}") as record:
+            record.cache = "miss"
+            record.rows = 0
+            for batch in session.sql(self.query).to_pandas_batches():
+                record.rows += len(batch)
+                record.bytes += estimate_size(batch)
+                yield batch
+
+
+# ============================================================================
+# ÉCRITURE DES SECTIONS
+# ============================================================================
+# L'entrée de l'archive n'est créée qu'au premier lot : une section sans
+# aucun lot n'apparaît pas dans le rapport.
+
+class _CsvSink:
+    def __init__(self, archive, name):
+        self.archive = archive
+        self.name = name
+        self._text = None
+
+    def write(self, frame):
+        header = self._text is None
+        if header:
+            entry = self.archive.open(self.name, "w", force_zip64=True)
+            self._text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+        frame.to_csv(self._text, index=False, header=header)
+
+    def close(self):
+        if self._text is not None:
+            self._text.close()
+
+
+class _ParquetSink:
+    def __init__(self, archive, name):
+        self.archive = archive
+        self.name = name
+        self._entry = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            # Schéma fixé par le premier lot ; colonnes entièrement nulles typées en texte
+            self._schema = pa.schema([
+                pa.field(f.name, pa.string() if pa.types.is_null(f.type) else f.type)
+                for f in table.schema
+            ])
+            self._entry = self.archive.open(self.name, "w", force_zip64=True)
+            self._writer = pq.ParquetWriter(self._entry, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._entry.close()
+
+
+_SINKS = {"csv": _CsvSink, "parquet": _ParquetSink}
+
+
+def available_formats():
+    """Formats proposés (Parquet seulement si pyarrow est installé)"""
+    return [label for label, ext in FORMATS.items() if ext != "parquet" or pq is not None]
+
+
+def build_report(session, sections, fmt="csv"):
+    """Écrire l'archive zip du rapport dans un fichier temporaire, renvoyé rembobiné"""
+    output = tempfile.TemporaryFile(suffix=".zip")
+    try:
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for section in sections:
+                sink = _SINKS[fmt](archive, f"{section.name}.{fmt}")
+                try:
+                    for batch in section.batches(session):
+                        sink.write(batch)
+                finally:
+                    sink.close()
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def report_bytes(session, sections, fmt="csv"):
+    """Contenu de l'archive (bytes) : type accepté par les données différées de st.download_button"""
+    with build_report(session, sections, fmt) as output:
+        return output.read()
+
+
+# ============================================================================
+# BOUTON STREAMLIT
+# ============================================================================
+
+def render_export_button(session, sections, file_prefix, key):
+    """Choix du format et bouton de téléchargement ; le rapport est généré au clic"""
+    label = st.radio("Format du rapport", available_formats(), horizontal=True, key=f"{key}_format")
+    fmt = FORMATS[label]
+    # Page et exécution courantes pour query_metrics (le callable tourne dans un autre thread)
+    context = contextvars.copy_context()
+
+    def generate():
+        return context.copy().run(report_bytes, session, sections, fmt)
+
+    st.download_button(
+        label="📊 Générer Rapport Complet",
+        data=generate,
+        file_name=f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.zip",
+        mime="application/zip",
+        on_click="ignore",
+        key=f"{key}_download",
+    )
+    st.caption("Archive zip : un fichier par section, détail lu par lots dans le warehouse")
@@ -2,40 +2,51 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from snowflake.snowpark.context import get_active_session
 
-# Configuration minimale
-st.set_page_config(page_title="Ventes", layout="wide")
+from debug_panel import describe_failure, render_debug_panel
+from query_cache import format_cache_stats, run_query
+from query_metrics import start_run
+from session_pool import get_session
 
-# Session Snowflake
-def get_session():
-    try:
-        return get_active_session()
-    except:
-        st.error("Connexion Snowflake échouée")
-        return None
+run_id = start_run("sales_dashboard")
+
+# Au-delà, les agrégats sont signalés comme périmés
+ROLLUP_STALE_MINUTES = 24 * 60
 
-session = get_session()
+def format_age(minutes):
+    """Âge lisible d'un rafraîchissement"""
+    minutes = int(minutes)
+    if minutes < 60:
+        return f"{minutes} min"
+    if minutes < 48 * 60:
+        return f"{minutes // 60} h"
+    return f"{minutes // (24 * 60)} j"
+
+# Session du pool partagé (session_pool.py)
+try:
+    session = get_session()
+except Exception:
+    st.error("Connexion Snowflake échouée")
+    session = None
 
 st.title("📊 Tableau de Bord Ventes")
 
 if session:
     try:
-        # KPI de base
+        # KPI de base (cube précalculé ANALYTICS.SALES_DAILY_ROLLUP, sql/sales_rollups.sql)
         kpi_query = """
         SELECT 
-            COUNT(*) as transactions,
-            SUM(sale_amount) as revenue,
-            AVG(sale_amount) as avg_ticket,
+            SUM(transactions) as transactions,
+            SUM(revenue) as revenue,
+            SUM(revenue) / NULLIF(SUM(transactions), 0) as avg_ticket,
             MIN(sale_date) as first_date,
             MAX(sale_date) as last_date
-        FROM ANALYTICS.SALES_ENRICHED
-        WHERE sale_amount > 0
+        FROM ANALYTICS.SALES_DAILY_ROLLUP
         """
         
-        kpi_data = session.sql(kpi_query).to_pandas()
+        kpi_data = run_query(session, kpi_query, name="kpis")
         
-        if not kpi_data.empty:
+        if not kpi_data.empty and pd.notna(kpi_data['TRANSACTIONS'].iloc[0]):
             # Afficher KPI
             col1, col2, col3 = st.columns(3)
             
@@ -52,16 +63,15 @@ if session:
             daily_query = """
             SELECT 
                 sale_date,
-                SUM(sale_amount) as daily_revenue,
-                COUNT(*) as daily_transactions
-            FROM ANALYTICS.SALES_ENRICHED
-            WHERE sale_amount > 0
+                SUM(revenue) as daily_revenue,
+                SUM(transactions) as daily_transactions
+            FROM ANALYTICS.SALES_DAILY_ROLLUP
             GROUP BY sale_date
             ORDER BY sale_date DESC
             LIMIT 30
             """
             
-            daily_data = session.sql(daily_query).to_pandas()
+            daily_data = run_query(session, daily_query, name="daily")
             
             if not daily_data.empty:
                 st.subheader("Évolution des Ventes")
@@ -72,24 +82,37 @@ if session:
             region_query = """
             SELECT 
                 sale_region,
-                COUNT(*) as transactions,
-                SUM(sale_amount) as revenue
-            FROM ANALYTICS.SALES_ENRICHED
-            WHERE sale_amount > 0
-              AND sale_region IS NOT NULL
+                SUM(transactions) as transactions,
+                SUM(revenue) as revenue
+            FROM ANALYTICS.SALES_DAILY_ROLLUP
+            WHERE sale_region IS NOT NULL
             GROUP BY sale_region
             ORDER BY revenue DESC
             LIMIT 10
             """
             
-            region_data = session.sql(region_query).to_pandas()
+            region_data = run_query(session, region_query, name="regions")
             
             if not region_data.empty:
                 st.subheader("Top Régions")
                 st.dataframe(region_data)
             
-            # Dernières ventes
+            # Dernières ventes : le cube donne la plus ancienne date à lire pour
+            # obtenir 20 ventes, la table de détail n'est lue qu'à partir de là
             recent_query = """
+            WITH days AS (
+                SELECT sale_date, SUM(transactions) as transactions
+                FROM ANALYTICS.SALES_DAILY_ROLLUP
+                GROUP BY sale_date
+            ),
+            cutoff AS (
+                SELECT MIN(sale_date) as since
+                FROM (
+                    SELECT sale_date, SUM(transactions) OVER (ORDER BY sale_date DESC) - transactions as newer
+                    FROM days
+                )
+                WHERE newer < 20
+            )
             SELECT 
                 sale_date,
                 sale_id,
@@ -99,20 +122,54 @@ if session:
                 CASE WHEN has_promotion = 1 THEN 'Oui' ELSE 'Non' END as promotion
             FROM ANALYTICS.SALES_ENRICHED
             WHERE sale_amount > 0
+              AND sale_date >= (SELECT COALESCE(MAX(since), '1900-01-01'::DATE) FROM cutoff)
             ORDER BY sale_date DESC
             LIMIT 20
             """
             
-            recent_data = session.sql(recent_query).to_pandas()
+            recent_data = run_query(session, recent_query, name="recent")
             
             if not recent_data.empty:
                 st.subheader("Dernières Transactions")
                 st.dataframe(recent_data)
+            
+            # Fraîcheur du cube
+            freshness_query = """
+            SELECT 
+                refreshed_at,
+                refresh_mode,
+                days_refreshed,
+                last_sale_date,
+                DATEDIFF('minute', refreshed_at, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ) as minutes_since_refresh
+            FROM ANALYTICS.ROLLUP_FRESHNESS
+            WHERE rollup_name = 'SALES_DAILY_ROLLUP'
+            """
+            
+            freshness = run_query(session, freshness_query, ttl=60, name="freshness")
+            
+            if not freshness.empty:
+                f = freshness.iloc[0]
+                st.caption(
+                    f"🕒 Agrégats rafraîchis le {pd.Timestamp(f['REFRESHED_AT']):%d/%m/%Y %H:%M} "
+                    f"(il y a {format_age(f['MINUTES_SINCE_REFRESH'])}, {str(f['REFRESH_MODE']).lower()}, "
+                    f"{int(f['DAYS_REFRESHED']):,} jour(s) recalculé(s)) - ventes jusqu'au {pd.Timestamp(f['LAST_SALE_DATE']):%d/%m/%Y}"
+                )
+                if f['MINUTES_SINCE_REFRESH'] > ROLLUP_STALE_MINUTES:
+                    st.warning(f"Agrégats périmés : dernier rafraîchissement il y a {format_age(f['MINUTES_SINCE_REFRESH'])}")
+            else:
+                st.warning("Fraîcheur des agrégats inconnue (ANALYTICS.ROLLUP_FRESHNESS vide)")
+            
+            st.caption(format_cache_stats())
                 
         else:
             st.warning("Aucune donnée disponible")
             
     except Exception as e:
         st.error(f"Erreur: {str(e)}")
+        failed_query = describe_failure(run_id)
+        if failed_query:
+            st.caption(f"Requête en échec : {failed_query}")
 else:
-    st.warning("En attente de connexion...")
\ No newline at end of file
+    st.warning("En attente de connexion...")
+
+render_debug_panel(run_id)
@@ -0,0 +1,34 @@
+# session_backend.py
+"""
+Session utilisée par les dashboards : Snowflake (par défaut) ou locale.
+
+    ANYCOMPANY_BACKEND=local ANYCOMPANY_DUCKDB=local/anycompany.duckdb \\
+        streamlit run streamlit/app.py
+
+En mode local, la base DuckDB produite par `python -m pipeline.local_run`
+est ouverte en lecture seule (pipeline/local_session.py).
+
+create_session() est la fabrique du pool partagé (session_pool.py) : les
+pages n'ouvrent pas de session elles-mêmes, elles utilisent
+session_pool.get_session().
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _use_local_backend():
+    return os.environ.get("ANYCOMPANY_BACKEND", "snowflake").strip().lower() == "local"
+
+
+def create_session():
+    """Nouvelle session : session Snowpark active, ou base DuckDB locale si ANYCOMPANY_BACKEND=local"""
+    if not _use_local_backend():
+        from snowflake.snowpark.context import get_active_session as snowflake_session
+        return snowflake_session()
+
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    from pipeline.session import get_local_session
+    return get_local_session(read_only=True)
@@ -0,0 +1,140 @@
+# session_pool.py
+"""
+Pool de sessions partagé par les pages de l'application (app.py).
+
+Un seul pool par processus Streamlit, quel que soit le nombre de pages et
+d'utilisateurs : get_session() renvoie une session du pool (tourniquet),
+utilisable depuis plusieurs threads (loaders parallèles de query_executor).
+
+- contrôle de santé (SELECT 1) d'une session inutilisée depuis plus de
+  HEALTH_CHECK_SECONDS ; une session en échec est fermée et recréée ;
+- reconnexion avec attente exponentielle (BACKOFF_BASE_SECONDS doublé à
+  chaque échec, plafonné à BACKOFF_MAX_SECONDS) : pendant l'attente, les
+  autres sessions du pool sont utilisées, sinon SessionUnavailable est
+  levée immédiatement au lieu de bloquer la page ;
+- taille : ANYCOMPANY_POOL_SIZE (défaut 1 ; la session active de Streamlit
+  in Snowflake et la base DuckDB locale sont de toute façon uniques).
+"""
+import os
+import random
+import threading
+import time
+
+from session_backend import create_session
+
+DEFAULT_POOL_SIZE = 1
+HEALTH_CHECK_SECONDS = 60
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 60
+HEALTH_CHECK_SQL = "SELECT 1"
+
+
+class SessionUnavailable(RuntimeError):
+    """Aucune session du pool n'est utilisable (connexion en échec, attente en cours)"""
+
+
+class _Slot:
+    __slots__ = ("session", "checked_at", "failures", "retry_at", "error")
+
+    def __init__(self):
+        self.session = None
+        self.checked_at = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = None
+
+
+class SessionPool:
+    """Sessions partagées avec contrôle de santé et reconnexion progressive"""
+
+    def __init__(self, factory=create_session, size=DEFAULT_POOL_SIZE,
+                 health_check_seconds=HEALTH_CHECK_SECONDS):
+        self.factory = factory
+        self.health_check_seconds = health_check_seconds
+        self._slots = [_Slot() for _ in range(max(1, size))]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._counters = {"connects": 0, "connect_errors": 0, "health_checks": 0, "health_failures": 0}
+
+    def get_session(self):
+        """Session saine du pool ; SessionUnavailable si aucune ne l'est"""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self._slots)
+            order = self._slots[start:] + self._slots[:start]
+            for slot in order:
+                session = self._ready(slot)
+                if session is not None:
+                    return session
+            waits = [max(0.0, slot.retry_at - time.time()) for slot in self._slots]
+            error = next((slot.error for slot in order if slot.error is not None), None)
+        raise SessionUnavailable(f"Connexion indisponible (nouvel essai dans {min(waits):.0f}s) : {error}")
+
+    def _ready(self, slot):
+        now = time.time()
+        if slot.session is not None and now - slot.checked_at > self.health_check_seconds:
+            self._counters["health_checks"] += 1
+            try:
+                slot.session.sql(HEALTH_CHECK_SQL).collect()
+                slot.checked_at = now
+            except Exception as e:
+                self._counters["health_failures"] += 1
+                self._discard(slot, e)
+        if slot.session is None and now >= slot.retry_at:
+            self._connect(slot)
+        return slot.session
+
+    def _connect(self, slot):
+        try:
+            slot.session = self.factory()
+        except Exception as e:
+            self._counters["connect_errors"] += 1
+            slot.failures += 1
+            slot.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (slot.failures - 1))
+            slot.retry_at = time.time() + delay * random.uniform(0.8, 1.2)
+            return
+        self._counters["connects"] += 1
+        slot.checked_at = time.time()
+        slot.failures = 0
+        slot.retry_at = 0.0
+        slot.error = None
+
+    def _discard(self, slot, error):
+        session, slot.session = slot.session, None
+        slot.error = str(error).splitlines()[0] if str(error) else type(error).__name__
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Compteurs et état des sessions du pool"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._slots)
+            stats["connected"] = sum(slot.session is not None for slot in self._slots)
+            return stats
+
+
+# ============================================================================
+# INSTANCE PARTAGÉE PAR LES PAGES
+# ============================================================================
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_session_pool():
+    """Instance unique du pool pour tout le processus Streamlit"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            size = int(os.environ.get("ANYCOMPANY_POOL_SIZE", DEFAULT_POOL_SIZE))
+            _shared_pool = SessionPool(size=size)
+        return _shared_pool
+
+
+def get_session():
+    """Raccourci : session du pool partagé"""
+    return get_session_pool().get_session()
@@ -0,0 +1,173 @@
+# snapshot_store.py
+"""
+Lecture des instantanés Parquet des dashboards (pipeline/snapshots.py).
+
+    ANYCOMPANY_SNAPSHOT_DIR=/mnt/anycompany/snapshots streamlit run streamlit/app.py
+
+Si ANYCOMPANY_SNAPSHOT_DIR est défini, une requête qui ne lit que des tables
+de l'instantané publié est exécutée sur une session DuckDB en mémoire dont
+les vues pointent sur les fichiers Parquet (lus à la demande, rien n'est
+chargé au démarrage) ; les autres requêtes partent vers le warehouse. Un
+nouvel instantané (fichier CURRENT remplacé) est pris en compte sans
+redémarrage.
+
+Fraîcheur : la version de chaque source (nombre de lignes et empreinte) est
+relue sur le warehouse au plus toutes les CHECK_INTERVAL secondes, en
+arrière-plan ; une table dont la source a changé n'est plus servie par
+l'instantané jusqu'au suivant. Au démarrage, l'instantané est servi sans
+attendre le premier contrôle.
+
+Sans duckdb, sans instantané publié ou sans la variable, tout part vers le
+warehouse.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNAPSHOT_ENV = "ANYCOMPANY_SNAPSHOT_DIR"
+CURRENT_FILE = "CURRENT"
+CHECK_INTERVAL = 60  # secondes entre deux contrôles de fraîcheur
+
+_TABLE = re.compile(r"\b((?:ANALYTICS|SILVER|BRONZE|INFORMATION_SCHEMA)\.\w+)", re.IGNORECASE)
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def referenced_tables(query):
+    """Tables qualifiées (SCHEMA.NOM, en majuscules) lues par une requête"""
+    return {name.upper() for name in _TABLE.findall(_COMMENT.sub(" ", query))}
+
+
+class SnapshotStore:
+    """Instantané publié : session DuckDB sur les fichiers Parquet et contrôles de fraîcheur"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = None
+        self.session = None
+        self._mtime = None
+        self._stale = set()
+        self._checked_at = 0.0
+        self._checking = False
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+    def _reload(self):
+        """Ouvrir l'instantané désigné par CURRENT s'il a changé"""
+        path = os.path.join(self.directory, CURRENT_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["version"] == (self.manifest or {}).get("version"):
+            self._mtime = mtime
+            return
+
+        if ROOT_DIR not in sys.path:
+            sys.path.insert(0, ROOT_DIR)
+        from pipeline.local_session import LocalSession
+
+        session = LocalSession()
+        for table, entry in manifest["tables"].items():
+            files = os.path.join(self.directory, entry["path"], "**", "*.parquet")
+            session.sql(
+                f"CREATE OR REPLACE VIEW {table} AS "
+                f"SELECT * FROM read_parquet('{files}', hive_partitioning = false, union_by_name = true)"
+            ).collect()
+
+        # Les requêtes en cours sur l'ancienne session se terminent normalement
+        self.manifest, self.session, self._mtime = manifest, session, mtime
+        self._stale = set()
+        self._checked_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Fraîcheur
+    # ------------------------------------------------------------------
+    def _check(self, live_session, manifest):
+        from pipeline.dag import source_version
+
+        stale = {
+            table for table, entry in manifest["tables"].items()
+            if source_version(live_session, table) != entry["source_version"]
+        }
+        with self._lock:
+            if self.manifest is manifest:
+                self._stale = stale
+            self._checking = False
+
+    def _schedule_check(self, live_session):
+        if self._checking or time.time() - self._checked_at < CHECK_INTERVAL:
+            return
+        self._checking = True
+        self._checked_at = time.time()
+        threading.Thread(target=self._check, args=(live_session, self.manifest),
+                         name="snapshot-freshness", daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Routage
+    # ------------------------------------------------------------------
+    def route(self, live_session, query):
+        """(session, 'snapshot' | 'live') pour exécuter query"""
+        with self._lock:
+            try:
+                self._reload()
+            except Exception:
+                # Instantané illisible (publication en cours, fichier supprimé) : warehouse
+                return live_session, "live"
+            if self.session is None:
+                return live_session, "live"
+            if live_session is not None:
+                self._schedule_check(live_session)
+            tables = referenced_tables(query)
+            if tables and tables <= set(self.manifest["tables"]) and not tables & self._stale:
+                return self.session, "snapshot"
+            return live_session, "live"
+
+    def status(self):
+        """Version publiée et tables servies / périmées"""
+        with self._lock:
+            if self.manifest is None:
+                return None
+            return {
+                "version": self.manifest["version"],
+                "tables": sorted(self.manifest["tables"]),
+                "stale": sorted(self._stale),
+            }
+
+
+# ============================================================================
+# INSTANCE PARTAGÉE
+# ============================================================================
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Instance unique du processus (None si ANYCOMPANY_SNAPSHOT_DIR n'est pas défini)"""
+    global _store
+    directory = os.environ.get(SNAPSHOT_ENV)
+    if not directory:
+        return None
+    with _store_lock:
+        if _store is None or _store.directory != directory:
+            _store = SnapshotStore(directory)
+        return _store
+
+
+def route_query(session, query):
+    """Session à utiliser pour query (instantané si possible) et origine du résultat"""
+    store = get_snapshot_store()
+    if store is None:
+        return session, "live"
+    return store.route(session, query)
@@ -0,0 +1,39 @@
+# test_frame_dtypes.py
+"""
+Compactage des résultats des dashboards (streamlit/frame_dtypes.py) : les
+Decimal ne passent en float64 que si la conversion est sans perte.
+
+    python -m pytest tests
+"""
+import os
+import sys
+from decimal import Decimal
+
+import pandas as pd
+
+# Modules de l'application importés à plat, comme par `streamlit run`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "streamlit"))
+
+from frame_dtypes import compact_column  # noqa: E402
+
+
+def test_exact_decimals_become_float64():
+    series = pd.Series([Decimal("12.50"), Decimal("0.1"), None, Decimal("-3.75")], dtype=object)
+    compact = compact_column(series)
+    assert compact.dtype == "float64"
+    assert compact.tolist()[:2] == [12.5, 0.1] and pd.isna(compact[2])
+
+
+def test_decimals_beyond_float_precision_stay_decimal():
+    big = Decimal(2 ** 53 + 1)
+    precise = Decimal("1234567890.123456789")
+    for values in ([big, None], [Decimal("1.5"), precise]):
+        compact = compact_column(pd.Series(values, dtype=object))
+        assert compact.dtype == object
+        assert compact.tolist() == values
+
+
+def test_integral_decimals_without_null_become_integers():
+    compact = compact_column(pd.Series([Decimal(1), Decimal(2 ** 40)], dtype=object))
+    assert compact.dtype == "int64"
+    assert compact.tolist() == [1, 2 ** 40]
@@ -0,0 +1,85 @@
+# test_ingestion.py
+"""
+Ingestion incrémentale (pipeline/ingestion.py) sur le stage local DuckDB :
+arrêt avant tout chargement si ETL SQL.sql n'a pas été exécuté ; lignes mal
+formées rejetées, comptées au manifeste et mises en quarantaine, comme avec
+Snowflake.
+
+    python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("duckdb")
+
+from benchmarks.synthetic_bronze import generate_bronze  # noqa: E402
+from pipeline.ingestion import MissingBronzeTables, ingest  # noqa: E402
+from pipeline.local_run import run_pipeline  # noqa: E402
+from pipeline.session import get_local_session  # noqa: E402
+
+EMPLOYEES_HEADER = "employee_id,name,date_of_birth,hire_date,department,job_title,salary,region,country,email\n"
+
+
+def _quiet(*args):
+    pass
+
+
+@pytest.fixture
+def loaded_stage(tmp_path):
+    """Stage synthétique chargé dans BRONZE par ETL SQL.sql"""
+    stage = tmp_path / "stage"
+    generate_bronze(str(stage), 1000, log=_quiet)
+    session = get_local_session(str(tmp_path / "test.duckdb"), stage_dir=str(stage))
+    try:
+        run_pipeline(session, ["ETL SQL.sql"], log=_quiet)
+        yield session, stage
+    finally:
+        session.close()
+
+
+def _rows(session, query):
+    return [{key.lower(): value for key, value in row.as_dict().items()} for row in session.sql(query).collect()]
+
+
+def test_malformed_rows_are_counted_and_quarantined(loaded_stage):
+    session, stage = loaded_stage
+    (stage / "employee_records_2025.csv").write_text(
+        EMPLOYEES_HEADER
+        + "EMP900001,Valide,1990-01-01,2020-01-01,Sales,Analyst,50000,Europe,France,a@anycompany.com\n"
+        + "EMP900002,Champ en trop,1990-01-01,2020-01-01,Sales,Analyst,50000,Europe,France,a@anycompany.com,X\n"
+        + "EMP900003,Champs manquants,1990-01-01,2020-01-01,Sales\n"
+        + "EMP900004,Date invalide,1990-13-45,2020-01-01,Sales,Analyst,50000,Europe,France,a@anycompany.com\n",
+        encoding="utf-8",
+    )
+
+    plans = ingest(session, downstream=False, log=_quiet)
+    assert not any(plan.error for plan in plans)
+
+    manifest = _rows(session, "SELECT * FROM BRONZE.ingestion_manifest "
+                              "WHERE file_name = 'employee_records_2025.csv'")
+    assert len(manifest) == 1
+    assert manifest[0]["status"] == "PARTIALLY_LOADED"
+    assert (manifest[0]["rows_parsed"], manifest[0]["rows_loaded"], manifest[0]["errors_seen"]) == (4, 1, 3)
+
+    quarantine = _rows(session, "SELECT line_number, column_name, error, rejected_record "
+                                "FROM BRONZE.ingestion_quarantine "
+                                "WHERE file_name = 'employee_records_2025.csv' ORDER BY line_number")
+    assert [row["line_number"] for row in quarantine] == [3, 4, 5]
+    assert "Nombre de champs" in quarantine[0]["error"] and quarantine[0]["rejected_record"].endswith(",X")
+    assert "Nombre de champs" in quarantine[1]["error"]
+    assert quarantine[2]["column_name"] == "DATE_OF_BIRTH"
+
+    loaded = _rows(session, "SELECT employee_id FROM BRONZE.employee_records WHERE employee_id LIKE 'EMP9%'")
+    assert [row["employee_id"] for row in loaded] == ["EMP900001"]
+
+
+def test_missing_bronze_tables_stop_before_loading(tmp_path):
+    stage = tmp_path / "stage"
+    generate_bronze(str(stage), 1000, log=_quiet)
+    session = get_local_session(str(tmp_path / "empty.duckdb"), stage_dir=str(stage))
+    try:
+        with pytest.raises(MissingBronzeTables, match="ETL SQL.sql"):
+            ingest(session, downstream=False, log=_quiet)
+        assert not (stage / "parsed").exists()
+        assert _rows(session, "SELECT COUNT(*) AS n FROM BRONZE.ingestion_manifest")[0]["n"] == 0
+    finally:
+        session.close()
@@ -0,0 +1,121 @@
+# test_interval_calendar.py
+"""
+Calendrier région × jour local (pipeline/interval_calendar.py) : règle de
+résolution des chevauchements documentée, et résultat identique à
+sql/promo_campaign_calendar.sql exécuté sur la session locale DuckDB.
+
+    python -m pytest tests
+"""
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from pipeline.interval_calendar import build_calendar  # noqa: E402
+from pipeline.local_run import run_script  # noqa: E402
+from pipeline.session import get_local_session  # noqa: E402
+
+# promotion_id, product_category, promotion_type, discount_percentage, start_date, end_date, region
+PROMOTIONS = [
+    ("PR01", "Snacks", "Discount", 10.0, "2024-01-01", "2024-01-10", "Europe"),
+    ("PR02", "Dairy", "Bundle", 20.0, "2024-01-05", "2024-01-07", "Europe"),
+    ("PR03", "Bakery", "Flash Sale", 20.0, "2024-01-06", "2024-01-08", "Europe"),
+    ("PR00", "Organic", "Seasonal", 20.0, "2024-01-06", "2024-01-06", "Europe"),
+    ("PR05", "Snacks", "Discount", 5.0, "2024-01-03", "2024-01-04", "Asia Pacific"),
+    ("PR06", "Snacks", "Discount", 50.0, "2024-01-09", "2024-01-02", "Europe"),   # fenêtre inversée
+    ("PR07", "Snacks", "Discount", 50.0, "2024-01-01", "2024-01-02", None),       # sans région
+]
+
+# campaign_id, campaign_name, campaign_type, product_category, target_audience,
+# start_date, end_date, region, budget, reach, conversion_rate
+CAMPAIGNS = [
+    ("CA01", "Hiver", "Email", "Snacks", "Families", "2024-01-02", "2024-01-09", "Europe", 1000.0, 5000, 0.05),
+    ("CA02", "Flash", "TV", "Dairy", "Seniors", "2024-01-04", "2024-01-05", "Europe", 500.0, 2000, 0.02),
+    ("CA03", "Réseaux", "Social Media", "Bakery", "Students", "2024-01-04", "2024-01-04", "Europe", 800.0, 800, 0.10),
+    ("CA00", "Affichage", "Display", "Organic", "Professionals", "2024-01-04", "2024-01-04", "Europe", 800.0, 900, 0.08),
+    ("CA05", "Plage", "Influencer", "Beverages", "Young Adults", "2024-01-20", "2024-01-20", "Oceania", 300.0, 100, 0.01),
+]
+
+PROMOTION_SCHEMA = ["promotion_id", "product_category", "promotion_type", "discount_percentage",
+                    "start_date", "end_date", "region"]
+CAMPAIGN_SCHEMA = ["campaign_id", "campaign_name", "campaign_type", "product_category", "target_audience",
+                   "start_date", "end_date", "region", "budget", "reach", "conversion_rate"]
+
+
+def _frame(rows, columns):
+    frame = pd.DataFrame(rows, columns=columns)
+    for column in ("start_date", "end_date"):
+        frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+@pytest.fixture
+def calendar():
+    return build_calendar(_frame(PROMOTIONS, PROMOTION_SCHEMA), _frame(CAMPAIGNS, CAMPAIGN_SCHEMA))
+
+
+def _day(calendar, region, date):
+    rows = calendar[(calendar["region"] == region) & (calendar["calendar_date"] == pd.Timestamp(date))]
+    assert len(rows) == 1
+    return rows.iloc[0]
+
+
+def test_overlap_resolution(calendar):
+    # Promotion : plus forte remise, puis start_date la plus récente, puis promotion_id croissant
+    expected_promotions = {
+        "2024-01-03": ("PR01", 1),
+        "2024-01-05": ("PR02", 2),
+        "2024-01-06": ("PR00", 4),
+        "2024-01-07": ("PR03", 3),
+        "2024-01-09": ("PR01", 1),
+    }
+    for date, (promotion_id, count) in expected_promotions.items():
+        day = _day(calendar, "Europe", date)
+        assert (day["promotion_id"], day["active_promotion_count"]) == (promotion_id, count), date
+
+    # Campagne : start_date la plus récente, puis plus gros budget, puis campaign_id croissant
+    expected_campaigns = {
+        "2024-01-03": ("CA01", 1),
+        "2024-01-04": ("CA00", 4),
+        "2024-01-05": ("CA02", 2),
+        "2024-01-06": ("CA01", 1),
+    }
+    for date, (campaign_id, count) in expected_campaigns.items():
+        day = _day(calendar, "Europe", date)
+        assert (day["campaign_id"], day["active_campaign_count"]) == (campaign_id, count), date
+
+    # Campagne seule : aucune promotion ; fenêtres inversées ou sans région ignorées
+    beach = _day(calendar, "Oceania", "2024-01-20")
+    assert pd.isna(beach["promotion_id"]) and beach["active_promotion_count"] == 0
+    assert calendar["region"].notna().all()
+    assert not calendar["promotion_id"].isin(["PR06", "PR07"]).any()
+    assert not calendar.duplicated(["region", "calendar_date"]).any()
+
+
+def _create(session, table, columns, types, rows):
+    session.sql(f"CREATE OR REPLACE TABLE {table} ("
+                + ", ".join(f"{name} {kind}" for name, kind in zip(columns, types)) + ")").collect()
+    placeholders = ", ".join("?" for _ in columns)
+    for row in rows:
+        session.sql(f"INSERT INTO {table} VALUES ({placeholders})", params=list(row)).collect()
+
+
+def test_matches_sql_calendar(calendar, tmp_path):
+    session = get_local_session(str(tmp_path / "calendar.duckdb"))
+    try:
+        _create(session, "SILVER.promotions_clean", PROMOTION_SCHEMA,
+                ["STRING", "STRING", "STRING", "FLOAT", "DATE", "DATE", "STRING"], PROMOTIONS)
+        _create(session, "SILVER.marketing_campaigns_clean", CAMPAIGN_SCHEMA,
+                ["STRING", "STRING", "STRING", "STRING", "STRING", "DATE", "DATE", "STRING", "FLOAT",
+                 "INTEGER", "FLOAT"], CAMPAIGNS)
+        run_script(session, "promo_campaign_calendar.sql", log=lambda line: None)
+        sql = session.sql("SELECT * FROM ANALYTICS.promo_campaign_calendar").to_pandas()
+    finally:
+        session.close()
+
+    sql.columns = [column.lower() for column in sql.columns]
+    sql = sql[list(calendar.columns)].sort_values(["region", "calendar_date"]).reset_index(drop=True)
+    for column in ("calendar_date", "promo_start_date", "promo_end_date"):
+        sql[column] = pd.to_datetime(sql[column]).astype("datetime64[ns]")
+        calendar[column] = pd.to_datetime(calendar[column]).astype("datetime64[ns]")
+    pd.testing.assert_frame_equal(sql, calendar, check_dtype=False)
@@ -0,0 +1,72 @@
+# test_product_reviews.py
+"""
+Découpage en blocs de product_reviews.csv (pipeline/product_reviews.py) :
+même résultat que csv.reader sur le fichier entier, quelle que soit la
+taille des blocs ; mémoire bornée sur un guillemet jamais fermé.
+
+    python -m pytest tests
+"""
+import csv
+import io
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from pipeline.product_reviews import iter_chunks, parse_chunk, read_header  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "product_reviews_sample.csv")
+
+
+def _parse(data, chunk_bytes, max_record_bytes=1 << 20):
+    """Lignes valides et rejets de tous les blocs"""
+    stream = io.BytesIO(data)
+    columns = read_header(stream)
+    rows, rejects = [], []
+    for line, chunk, error in iter_chunks(stream, chunk_bytes, max_record_bytes):
+        reviews, rejected = parse_chunk(("sample.csv", columns, line + 1, chunk, error))
+        rows += reviews.to_pylist()
+        rejects += rejected.to_pylist()
+    return rows, rejects
+
+
+def test_sample_matches_csv_reader_for_every_chunk_size():
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    expected = list(csv.reader(io.StringIO(data.decode("utf-8"), newline=""), strict=True))[1:]
+
+    for chunk_bytes in (1, 2, 3, 7, 16, 64, 256, 1 << 20):
+        rows, rejects = _parse(data, chunk_bytes)
+        assert rejects == [], chunk_bytes
+        assert [row["reviewer_id"] for row in rows] == [fields[0] for fields in expected]
+        assert [row["review_text"] for row in rows] == [fields[5] for fields in expected]
+
+
+def test_literal_quote_in_unquoted_field_does_not_shift_boundaries():
+    data = (
+        b"reviewer_id,reviewer_name,rating,review_date,product_category,review_text\n"
+        b'R1,A,5,2024-01-01,Bakery,Ecran 5" screen\n'
+        b'R2,B,4,2024-01-02,Bakery,"multi\nligne, ""citee"""\n'
+        b"R3,C,3,2024-01-03,Bakery,fin\n"
+    )
+    for chunk_bytes in range(1, len(data) + 1):
+        rows, rejects = _parse(data, chunk_bytes)
+        assert rejects == []
+        assert [row["review_text"] for row in rows] == ['Ecran 5" screen', 'multi\nligne, "citee"', "fin"]
+
+
+def test_unclosed_quote_is_rejected_with_bounded_memory():
+    header = b"reviewer_id,reviewer_name,rating,review_date,product_category,review_text\n"
+    body = b'R1,A,5,2024-01-01,Bakery,"jamais ferme\n'
+    body += b"".join(b"R%d,B,4,2024-01-02,Bakery,ok\n" % i for i in range(2, 200))
+    stream = io.BytesIO(header + body)
+    read_header(stream)
+    largest = max(len(chunk) for _, chunk, _ in iter_chunks(stream, 64, max_record_bytes=1024))
+    assert largest <= 1024 + 64
+
+    rows, rejects = _parse(header + body, 64, max_record_bytes=1024)
+    assert len(rejects) == 1
+    assert rejects[0]["source_line"] == 2
+    assert "guillemet non fermé" in rejects[0]["error"]
+    assert [row["reviewer_id"] for row in rows] == [f"R{i}" for i in range(2, 200)]
@@ -0,0 +1,72 @@
+# test_report_export.py
+"""
+Export du rapport complet (streamlit/report_export.py) : les données
+différées du bouton passent la conversion de Streamlit et l'archive contient
+une entrée par section.
+
+    python -m pytest tests
+"""
+import io
+import os
+import sys
+import zipfile
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+# Modules de l'application importés à plat, comme par `streamlit run`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "streamlit"))
+
+import report_export  # noqa: E402
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime  # noqa: E402
+
+
+class _Query:
+    def __init__(self, batches):
+        self.batches = batches
+
+    def to_pandas_batches(self):
+        return iter(self.batches)
+
+
+class _Session:
+    """Session réduite à sql(...).to_pandas_batches()"""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+    def sql(self, query):
+        return _Query(self.batches)
+
+
+def _generate(monkeypatch, label):
+    """Callable passé à st.download_button(data=...) par render_export_button"""
+    captured = {}
+    monkeypatch.setattr(report_export.st, "radio", lambda *args, **kwargs: label)
+    monkeypatch.setattr(report_export.st, "download_button", lambda **kwargs: captured.update(kwargs))
+    monkeypatch.setattr(report_export.st, "caption", lambda *args, **kwargs: None)
+
+    session = _Session([pd.DataFrame({"promotion_id": ["P1", "P2"], "roi": [1.5, 2.0]}),
+                        pd.DataFrame({"promotion_id": ["P3"], "roi": [0.5]})])
+    sections = [
+        report_export.ReportSection("details", query="SELECT * FROM ANALYTICS.promotions_active"),
+        report_export.ReportSection("par_type", frame=pd.DataFrame({"promotion_type": ["A"], "n": [3]})),
+    ]
+    report_export.render_export_button(session, sections, "rapport_test", key="test_export")
+    assert captured["on_click"] == "ignore"
+    return captured["data"]
+
+
+@pytest.mark.parametrize("label", report_export.available_formats())
+def test_deferred_report_passes_streamlit_conversion(monkeypatch, label):
+    data = _generate(monkeypatch, label)()
+    payload, _ = convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError(type(data)))
+
+    ext = report_export.FORMATS[label]
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        assert archive.namelist() == [f"details.{ext}", f"par_type.{ext}"]
+        raw = archive.read(f"details.{ext}")
+    details = pd.read_csv(io.BytesIO(raw)) if ext == "csv" else pd.read_parquet(io.BytesIO(raw))
+    assert details["promotion_id"].tolist() == ["P1", "P2", "P3"]